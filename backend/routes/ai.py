@@ -1,32 +1,190 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from datetime import datetime
-import google.generativeai as genai
-import os
-import PyPDF2
-import io
 import re
+import json
+import base64
+from contextlib import contextmanager
+from functools import wraps
+
+from services import ai_client, ai_cache, ai_metrics, ai_rate_limit, chat_context, course_neighbors, course_recommender, document_summarizer, material_index, performance_snapshots
+from services.ai_client import AIOverloadedError
+from services import ai_jobs
+from services.ai_jobs import JobLimitError
 
 ai_bp = Blueprint('ai', __name__)
 
-# Configure Gemini AI
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print("⚠️  Warning: GEMINI_API_KEY not found. AI features will use fallback responses.")
+@ai_bp.after_request
+def flush_ai_metrics(response):
+    """Write this worker's pending AI usage counters to the daily rollups"""
+    try:
+        ai_metrics.maybe_flush(current_app.db)
+    except Exception:
+        pass
+    return response
+
+def ai_overloaded_response(error):
+    """503 response telling the client to retry once an AI slot frees up"""
+    return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
+
+def rate_limited_response(message, retry_after):
+    """429 response telling the client when to try again"""
+    return jsonify({'error': message, 'retry_after': retry_after}), 429, {'Retry-After': str(retry_after)}
 
-def extract_text_from_pdf(pdf_content):
-    """Extract text from PDF content"""
+# Roles rarely change; avoid a users read per AI request just to pick the limit
+_user_roles = ai_cache.LRUCache(max_entries=4096, ttl_seconds=300)
+
+def admit_ai_call(db, user_id, cost=1):
+    """Take an in-flight slot and ``cost`` tokens from the user's bucket.
+
+    Returns (decision, None) once admitted - the caller must leave the
+    in-flight limiter when the call is done - or (None, (message,
+    retry_after)) when the call is refused.
+    """
+    limiter = ai_rate_limit.get_in_flight_limiter()
+    if not limiter.try_enter():
+        return None, ('AI assistant is busy, please retry shortly', 1)
+    
+    try:
+        role = _user_roles.get(user_id)
+        if role is None:
+            user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
+            role = user.get('role', '') if user else ''
+            _user_roles.set(user_id, role)
+        
+        decision = ai_rate_limit.check_rate_limit(db, user_id, role, cost)
+    except BaseException:
+        limiter.leave()
+        raise
+    
+    if not decision.allowed:
+        limiter.leave()
+        return None, ('Too many AI requests, please slow down', decision.retry_after)
+    return decision, None
+
+@contextmanager
+def ai_call_admission(db, user_id, cost=1):
+    """Admission for an optional AI call inside an endpoint without @ai_admission.
+
+    Yields True while holding an in-flight slot, or False when the call was
+    refused and should be skipped.
+    """
+    decision, refusal = admit_ai_call(db, user_id, cost)
+    if refusal:
+        yield False
+        return
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+        yield True
+    finally:
+        ai_rate_limit.get_in_flight_limiter().leave()
+
+def ai_admission(cost=1):
+    """Per-user token bucket and per-worker in-flight cap for an AI endpoint.
+
+    Goes below @jwt_required(). The in-flight slot is released when the
+    response is closed, so streamed answers hold it until they finish.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            decision, refusal = admit_ai_call(current_app.db, get_jwt_identity(), cost)
+            if refusal:
+                return rate_limited_response(*refusal)
+            
+            limiter = ai_rate_limit.get_in_flight_limiter()
+            try:
+                response = current_app.make_response(f(*args, **kwargs))
+            except BaseException:
+                limiter.leave()
+                raise
+            
+            if decision.remaining != float('inf'):
+                response.headers['X-RateLimit-Remaining'] = str(int(decision.remaining))
+            response.call_on_close(limiter.leave)
+            return response
+        return decorated_function
+    return decorator
+
+def cached_generation(db, chat_type, message, context, prompt):
+    """Generate through the shared response cache.
+
+    The context must not carry per-user details: the response is reused for
+    every user who asks the same thing with the same context.
+    """
+    model = ai_client.DEFAULT_MODEL
+    key = ai_cache.build_cache_key(message, chat_type, model, context)
+    return ai_cache.get_or_generate(
+        db,
+        key,
+        lambda: ai_client.generate(prompt, endpoint=chat_type),
+        chat_type=chat_type,
+        model=model
+    )
+
+def sse_event(event, payload):
+    """Format a single server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def sse_response(events):
+    """Wrap an event generator in a non-buffered text/event-stream response"""
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def save_chat_history(db, user_id, message, response, chat_type, context):
+    """Persist one chat exchange and return its ID"""
+    chat_data = {
+        'user_id': user_id,
+        'message': message,
+        'response': response,
+        'type': chat_type,
+        'timestamp': datetime.utcnow(),
+        'context': context
+    }
+    return db.chat_history.insert_one(chat_data).inserted_id
+
+def stream_chat_events(db, user_id, message, chat_type, chunks, history_context, fallback, on_complete=None):
+    """Forward streamed chunks as SSE 'token' events, then save the exchange.
+
+    If the upstream call fails before any text was sent, the fallback answer is
+    sent instead. A stream that breaks part-way ends with an 'error' event and
+    is not saved.
+    """
+    parts = []
+    try:
+        for text in chunks:
+            parts.append(text)
+            yield sse_event('token', {'text': text})
     except Exception as e:
-        return f"Error extracting PDF text: {str(e)}"
+        print(f"Gemini API error: {str(e)}")
+        if parts:
+            yield sse_event('error', {'error': 'The response was interrupted. Please try again.'})
+            return
+        parts.append(fallback())
+        yield sse_event('token', {'text': parts[0]})
+    else:
+        if on_complete:
+            on_complete(''.join(parts))
+    
+    chat_id = save_chat_history(db, user_id, message, ''.join(parts), chat_type, history_context)
+    yield sse_event('done', {
+        'id': str(chat_id),
+        'timestamp': datetime.utcnow().isoformat(),
+        'type': chat_type
+    })
+
+def single_event_stream(db, user_id, message, chat_type, response, history_context):
+    """SSE stream for answers that are already complete (cached, fallback, reports)"""
+    chat_id = save_chat_history(db, user_id, message, response, chat_type, history_context)
+    yield sse_event('token', {'text': response})
+    yield sse_event('done', {
+        'id': str(chat_id),
+        'timestamp': datetime.utcnow().isoformat(),
+        'type': chat_type
+    })
 
 def generate_fallback_learning_path(goal, timeframe, enrolled_courses, user):
     """Generate a structured learning path when AI is not available"""
@@ -195,37 +353,27 @@ Contact your administrator to enable full AI capabilities for personalized respo
 
 Feel free to ask me anything about studying and learning! 😊"""
 
-def generate_explanation(topic, context=""):
-    """Generate detailed explanation of a topic"""
-    if not GEMINI_API_KEY:
-        return f"""## 📚 Understanding {topic}
-
-### 🎯 Key Concepts:
-This is a fundamental concept in your course. Let me break it down:
-
-- **Definition**: {topic} is an important concept that builds on previous knowledge
-- **Why it matters**: Understanding this helps you grasp more advanced topics
-- **Real-world application**: This concept is used in practical scenarios
+def materials_section(materials):
+    """Retrieved course passages for a prompt, or nothing"""
+    if not materials:
+        return ""
+    return f"""
+        Course Materials (excerpts from the teacher's materials; base your answer on these where they apply):
+        {materials}
+        """
 
-### 💡 Simple Explanation:
-Think of it like this: [simplified analogy would go here]
+def materials_cache_context(context, materials):
+    """Cache-key context for answers grounded in retrieved passages"""
+    return f"{context}\n{materials}" if materials else context
 
-### 📝 Study Tips:
-1. Review your course materials on this topic
-2. Practice with examples
-3. Connect it to what you already know
-4. Ask your instructor for clarification if needed
-
-Need more details? Feel free to ask! 😊"""
-    
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        prompt = f"""
+def build_explanation_prompt(topic, context, materials=""):
+    """Prompt for the 'explain' chat type"""
+    return f"""
         You are a patient and knowledgeable tutor. Explain the following topic in simple, easy-to-understand terms.
         
         Topic: {topic}
         Student Context: {context}
-        
+        {materials_section(materials)}
         Provide:
         1. A clear definition
         2. Why it's important
@@ -237,34 +385,10 @@ Need more details? Feel free to ask! 😊"""
         Use markdown formatting with headers (##, ###), bullet points, and emojis.
         Keep it conversational and encouraging.
         """
-        
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"Gemini API error: {str(e)}")
-        return generate_fallback_response(topic, context)
-
-def generate_summary(content, context=""):
-    """Generate a concise summary"""
-    if not GEMINI_API_KEY:
-        return f"""## 📝 Summary
 
-### Key Points:
-- Main concept 1
-- Main concept 2
-- Main concept 3
-
-### Important Takeaways:
-Focus on understanding the core concepts and how they connect.
-
-### Study Recommendation:
-Review these key points regularly and practice applying them.
-
-*For a more detailed summary, ensure AI features are properly configured.*"""
-    
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        prompt = f"""
+def build_summary_prompt(content, context):
+    """Prompt for the 'summarize' chat type"""
+    return f"""
         Summarize the following content into clear, concise bullet points.
         Focus on the most important concepts and key takeaways.
         
@@ -285,28 +409,15 @@ Review these key points regularly and practice applying them.
         
         Keep it brief but comprehensive. Use emojis and markdown.
         """
-        
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"Gemini API error: {str(e)}")
-        return generate_fallback_response(content, context)
-
-
 
-def generate_qa_response(question, context=""):
-    """Answer questions about course materials"""
-    if not GEMINI_API_KEY:
-        return generate_fallback_response(question, context)
-    
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        prompt = f"""
+def build_qa_prompt(question, context, materials=""):
+    """Prompt for the 'qa' chat type"""
+    return f"""
         You are a helpful tutor answering a student's question about their course material.
         
         Question: {question}
         Student Context: {context}
-        
+        {materials_section(materials)}
         Provide a clear, comprehensive answer that:
         1. Directly addresses the question
         2. Explains the reasoning
@@ -317,27 +428,18 @@ def generate_qa_response(question, context=""):
         Use markdown formatting with headers, bullet points, and emojis.
         Be friendly and encouraging.
         """
-        
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        print(f"Gemini API error: {str(e)}")
-        return generate_fallback_response(question, context)
 
-def generate_ai_response(prompt, context=""):
-    """Generate AI response using Gemini or fallback"""
-    
-    # Check if Gemini API is available
-    if not GEMINI_API_KEY:
-        return generate_fallback_response(prompt, context)
-    
-    try:
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        full_prompt = f"""
+def build_chat_prompt(prompt, context, history=""):
+    """Prompt for general chat messages (with recent turns for follow-up questions)"""
+    conversation = f"""
+        Recent Conversation (oldest first, use it to resolve follow-up questions):
+        {history}
+        """ if history else ""
+    return f"""
         You are an AI learning assistant for EduNexa LMS, a friendly and knowledgeable tutor who helps students succeed.
         
         Student Context: {context}
+        {conversation}
         Student Question: {prompt}
         
         IMPORTANT FORMATTING RULES:
@@ -373,9 +475,100 @@ def generate_ai_response(prompt, context=""):
         
         Now respond to the student's question in this style.
         """
-        
-        response = model.generate_content(full_prompt)
-        return response.text
+
+def generate_explanation(topic, context="", shareable=False, materials=""):
+    """Generate detailed explanation of a topic"""
+    if not ai_client.is_configured():
+        return f"""## 📚 Understanding {topic}
+
+### 🎯 Key Concepts:
+This is a fundamental concept in your course. Let me break it down:
+
+- **Definition**: {topic} is an important concept that builds on previous knowledge
+- **Why it matters**: Understanding this helps you grasp more advanced topics
+- **Real-world application**: This concept is used in practical scenarios
+
+### 💡 Simple Explanation:
+Think of it like this: [simplified analogy would go here]
+
+### 📝 Study Tips:
+1. Review your course materials on this topic
+2. Practice with examples
+3. Connect it to what you already know
+4. Ask your instructor for clarification if needed
+
+Need more details? Feel free to ask! 😊"""
+    
+    try:
+        prompt = build_explanation_prompt(topic, context, materials)
+        if shareable:
+            return cached_generation(current_app.db, 'explain', topic, materials_cache_context(context, materials), prompt)
+        return ai_client.generate(prompt, endpoint='explain')
+    except AIOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Gemini API error: {str(e)}")
+        return generate_fallback_response(topic, context)
+
+def generate_summary(content, context="", shareable=False):
+    """Generate a concise summary"""
+    if not ai_client.is_configured():
+        return f"""## 📝 Summary
+
+### Key Points:
+- Main concept 1
+- Main concept 2
+- Main concept 3
+
+### Important Takeaways:
+Focus on understanding the core concepts and how they connect.
+
+### Study Recommendation:
+Review these key points regularly and practice applying them.
+
+*For a more detailed summary, ensure AI features are properly configured.*"""
+    
+    try:
+        prompt = build_summary_prompt(content, context)
+        if shareable:
+            return cached_generation(current_app.db, 'summary', content, context, prompt)
+        return ai_client.generate(prompt, endpoint='summary')
+    except AIOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Gemini API error: {str(e)}")
+        return generate_fallback_response(content, context)
+
+
+
+def generate_qa_response(question, context="", shareable=False, materials=""):
+    """Answer questions about course materials"""
+    if not ai_client.is_configured():
+        return generate_fallback_response(question, context)
+    
+    try:
+        prompt = build_qa_prompt(question, context, materials)
+        if shareable:
+            return cached_generation(current_app.db, 'qa', question, materials_cache_context(context, materials), prompt)
+        return ai_client.generate(prompt, endpoint='qa')
+    except AIOverloadedError:
+        raise
+    except Exception as e:
+        print(f"Gemini API error: {str(e)}")
+        return generate_fallback_response(question, context)
+
+def generate_ai_response(prompt, context="", history=""):
+    """Generate AI response using Gemini or fallback"""
+    
+    # Check if Gemini API is available
+    if not ai_client.is_configured():
+        return generate_fallback_response(prompt, context)
+    
+    try:
+        full_prompt = build_chat_prompt(prompt, context, history)
+        return ai_client.generate(full_prompt, endpoint='chat')
+    except AIOverloadedError:
+        raise
     except Exception as e:
         print(f"Gemini API error: {str(e)}")
         return generate_fallback_response(prompt, context)
@@ -412,87 +605,13 @@ def get_welcome_message():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def get_student_performance_data(db, user_id):
-    """Get comprehensive performance data for a student"""
+def get_student_performance_data(db, user_id, user=None):
+    """Get comprehensive performance data for a student from their snapshot"""
     try:
-        # Get enrollments with progress
-        enrollments = list(db.enrollments.find({'student_id': user_id}))
-        courses_data = []
-        total_progress = 0
-        
-        for enrollment in enrollments:
-            course = db.courses.find_one({'_id': ObjectId(enrollment['course_id'])})
-            if course:
-                progress = enrollment.get('progress', 0)
-                total_progress += progress
-                courses_data.append({
-                    'title': course['title'],
-                    'progress': progress,
-                    'enrolled_at': enrollment.get('enrolled_at', datetime.utcnow())
-                })
-        
-        avg_progress = total_progress / len(enrollments) if enrollments else 0
-        
-        # Get assignment submissions and grades
-        submissions = list(db.submissions.find({'student_id': user_id}))
-        graded_submissions = [sub for sub in submissions if sub.get('grade') is not None]
-        
-        total_assignments = len(submissions)
-        graded_assignments = len(graded_submissions)
-        
-        grades = [sub['grade'] for sub in graded_submissions]
-        avg_grade = sum(grades) / len(grades) if grades else 0
-        
-        # Get overdue assignments
-        submitted_assignment_ids = [sub['assignment_id'] for sub in submissions]
-        enrolled_course_ids = [enrollment['course_id'] for enrollment in enrollments]
-        
-        overdue_assignments = list(db.assignments.find({
-            'course_id': {'$in': enrolled_course_ids},
-            'due_date': {'$lt': datetime.utcnow()},
-            '_id': {'$nin': [ObjectId(aid) for aid in submitted_assignment_ids]}
-        }))
-        
-        # Get achievements
-        user = db.users.find_one({'_id': ObjectId(user_id)})
-        total_points = user.get('total_points', 0)
-        achievements = user.get('achievements', [])
-        
-        # Get recent activity
-        recent_submissions = [sub for sub in submissions 
-                            if sub.get('submitted_at') and 
-                            (datetime.utcnow() - sub['submitted_at']).days <= 7]
-        
-        # Calculate performance score
-        performance_score = 0
-        if graded_assignments > 0:
-            performance_score = (avg_grade * 0.6) + (avg_progress * 0.4)
-        else:
-            performance_score = avg_progress
-        
-        # Determine learning pace
-        learning_pace = 'normal'
-        if avg_progress > 70 and len(recent_submissions) > 2:
-            learning_pace = 'fast'
-        elif avg_progress < 30 and len(recent_submissions) < 1:
-            learning_pace = 'slow'
-        
-        return {
-            'courses': courses_data,
-            'total_courses': len(enrollments),
-            'avg_progress': round(avg_progress, 1),
-            'total_assignments': total_assignments,
-            'graded_assignments': graded_assignments,
-            'avg_grade': round(avg_grade, 1),
-            'overdue_count': len(overdue_assignments),
-            'total_points': total_points,
-            'achievements_count': len(achievements),
-            'recent_activity': len(recent_submissions),
-            'performance_score': round(performance_score, 1),
-            'learning_pace': learning_pace,
-            'highest_grade': max(grades) if grades else 0,
-            'lowest_grade': min(grades) if grades else 0
-        }
+        snapshot = performance_snapshots.get_snapshot(db, user_id)
+        if user is None:
+            user = db.users.find_one({'_id': ObjectId(user_id)})
+        return performance_snapshots.summarize_snapshot(snapshot, user)
     except Exception as e:
         print(f"Error getting performance data: {str(e)}")
         return None
@@ -662,6 +781,7 @@ def generate_performance_response(performance_data, user_name):
 
 @ai_bp.route('/chat', methods=['POST'])
 @jwt_required()
+@ai_admission(cost=1)
 def ai_chat():
     try:
         user_id = get_jwt_identity()
@@ -670,6 +790,7 @@ def ai_chat():
         data = request.get_json()
         message = data.get('message', '').strip()
         chat_type = data.get('type', 'general')  # general, explain, summarize, qa
+        stream = bool(data.get('stream')) or 'text/event-stream' in request.headers.get('Accept', '')
         
         if not message:
             return jsonify({'error': 'Message is required'}), 400
@@ -677,51 +798,83 @@ def ai_chat():
         # Get user context for personalized responses
         user = db.users.find_one({'_id': ObjectId(user_id)})
         
-        # Build comprehensive context
-        context_parts = [f"User: {user['name']}", f"Role: {user['role']}"]
+        # Name and role for history records (the performance report needs nothing else)
+        context = f"User: {user['name']}; Role: {user['role']}"
         
         # Check if this is a performance query for students
         if user['role'] == 'student' and is_performance_query(message):
             # Get comprehensive performance data
-            performance_data = get_student_performance_data(db, user_id)
+            performance_data = get_student_performance_data(db, user_id, user)
             if performance_data:
                 ai_response = generate_performance_response(performance_data, user['name'])
             else:
                 ai_response = "I'm having trouble fetching your performance data right now. Please try again in a moment."
         else:
-            # Regular chat flow
-            if user['role'] == 'student':
-                # Get enrolled courses
-                enrollments = list(db.enrollments.find({'student_id': user_id}))
-                if enrollments:
-                    course_ids = [enrollment['course_id'] for enrollment in enrollments]
-                    courses = list(db.courses.find({'_id': {'$in': [ObjectId(cid) for cid in course_ids]}}))
-                    course_titles = [course['title'] for course in courses]
-                    context_parts.append(f"Enrolled courses: {', '.join(course_titles)}")
+            # Regular chat flow: cached course context, plus recent turns for general chat
+            is_general = chat_type not in ('explain', 'summarize', 'qa')
+            chat_ctx = chat_context.build_chat_context(db, user, include_history=is_general)
+            context = chat_ctx['context']
+            history = chat_ctx['history']
+            prompt_message = chat_context.trim_message(message)
+            
+            # Explain/summarize/QA answers are cached and shared between users,
+            # so they are generated without the student's name in the context
+            role_context = f"Role: {user['role']}"
+            course_context = chat_ctx['course_context']
+            
+            # Passages from the course materials, searched locally
+            materials = ""
+            if chat_type in ('explain', 'qa'):
+                materials = material_index.retrieve_context(chat_context.get_course_ids(db, user), prompt_message)
             
-            context = "; ".join(context_parts)
+            if stream and ai_client.is_configured():
+                if chat_type == 'explain':
+                    endpoint, prompt_context, shareable = 'explain', role_context, True
+                    build_prompt = lambda prompt, ctx: build_explanation_prompt(prompt, ctx, materials)
+                elif chat_type == 'summarize':
+                    endpoint, build_prompt, prompt_context, shareable = 'summary', build_summary_prompt, role_context, True
+                elif chat_type == 'qa':
+                    endpoint, prompt_context, shareable = 'qa', course_context, True
+                    build_prompt = lambda prompt, ctx: build_qa_prompt(prompt, ctx, materials)
+                else:
+                    endpoint, prompt_context, shareable = 'chat', context, False
+                    build_prompt = lambda prompt, ctx: build_chat_prompt(prompt, ctx, history)
+                
+                on_complete = None
+                if shareable:
+                    model = ai_client.DEFAULT_MODEL
+                    cache_key = ai_cache.build_cache_key(
+                        prompt_message, endpoint, model, materials_cache_context(prompt_context, materials)
+                    )
+                    cached = ai_cache.lookup(db, cache_key, endpoint)
+                    if cached is not None:
+                        return sse_response(single_event_stream(db, user_id, message, chat_type, cached, context))
+                    on_complete = lambda response: ai_cache.store(db, cache_key, response, endpoint, model)
+                
+                chunks = ai_client.generate_stream(build_prompt(prompt_message, prompt_context), endpoint=endpoint)
+                return sse_response(stream_chat_events(
+                    db, user_id, message, chat_type, chunks, context,
+                    fallback=lambda: generate_fallback_response(message, prompt_context),
+                    on_complete=on_complete
+                ))
             
             # Generate AI response based on type
             if chat_type == 'explain':
-                ai_response = generate_explanation(message, context)
+                ai_response = generate_explanation(prompt_message, role_context, shareable=True, materials=materials)
             elif chat_type == 'summarize':
-                ai_response = generate_summary(message, context)
+                ai_response = generate_summary(prompt_message, role_context, shareable=True)
             elif chat_type == 'qa':
-                ai_response = generate_qa_response(message, context)
+                ai_response = generate_qa_response(prompt_message, course_context, shareable=True, materials=materials)
             else:
-                ai_response = generate_ai_response(message, context)
+                ai_response = generate_ai_response(prompt_message, context, history)
         
-        # Save chat history
-        chat_data = {
-            'user_id': user_id,
-            'message': message,
-            'response': ai_response,
-            'type': chat_type,
-            'timestamp': datetime.utcnow(),
-            'context': "; ".join(context_parts)
-        }
+        if stream:
+            return sse_response(single_event_stream(
+                db, user_id, message, chat_type, ai_response, context
+            ))
         
-        db.chat_history.insert_one(chat_data)
+        # Save chat history
+        save_chat_history(db, user_id, message, ai_response, chat_type, context)
         
         return jsonify({
             'response': ai_response,
@@ -729,14 +882,46 @@ def ai_chat():
             'type': chat_type
         }), 200
         
+    except AIOverloadedError as e:
+        return ai_overloaded_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def run_summarize_job(db, job):
+    """Job handler: summarize the whole document (map-reduce over chunks) and return the fields to store"""
+    payload = job['payload']
+    content = payload['content']
+    content_type = payload.get('content_type', 'text')
+    
+    # Extract text page by page; plain text is treated as a single page
+    if content_type == 'pdf':
+        # Content is a base64 encoded PDF
+        pages = document_summarizer.iter_pdf_pages(base64.b64decode(content))
+    else:
+        pages = [content]
+    
+    outcome = document_summarizer.summarize_pages(db, pages)
+    summary = outcome['summary']
+    
+    return {
+        'original_content': outcome['excerpt'],  # Store first 1000 chars
+        'summary': summary,
+        'result': {
+            'summary': summary,
+            'word_count_original': outcome['word_count_original'],
+            'word_count_summary': len(summary.split()),
+            'chunk_count': outcome['chunk_count']
+        }
+    }
+
 @ai_bp.route('/summarize', methods=['POST'])
 @jwt_required()
+@ai_admission(cost=2)
 def summarize_content():
+    """Queue a summary job; poll /api/ai/jobs/<job_id> for the result"""
     try:
         user_id = get_jwt_identity()
+        db = current_app.db
         data = request.get_json()
         
         content = data.get('content', '').strip()
@@ -745,61 +930,69 @@ def summarize_content():
         if not content:
             return jsonify({'error': 'Content is required'}), 400
         
-        # Extract text based on content type
         if content_type == 'pdf':
-            # Assuming content is base64 encoded PDF
-            import base64
+            # Reject undecodable uploads now rather than after the job is queued
             try:
-                pdf_content = base64.b64decode(content)
-                text_content = extract_text_from_pdf(pdf_content)
+                base64.b64decode(content, validate=True)
             except Exception as e:
                 return jsonify({'error': f'Failed to process PDF: {str(e)}'}), 400
-        else:
-            text_content = content
-        
-        # Limit content length for API
-        if len(text_content) > 10000:
-            text_content = text_content[:10000] + "..."
-        
-        # Generate summary using AI
-        prompt = f"""
-        Please provide a concise summary of the following educational content. 
-        Focus on key concepts, main points, and important details that students should remember.
         
-        Content:
-        {text_content}
-        
-        Summary:
-        """
+        job_id = ai_jobs.submit_job(
+            db, user_id, 'summarize',
+            payload={'content': content, 'content_type': content_type},
+            extra={'content_type': content_type}
+        )
         
-        try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            response = model.generate_content(prompt)
-            summary = response.text
-        except Exception as e:
-            return jsonify({'error': f'Failed to generate summary: {str(e)}'}), 500
+        return jsonify({
+            'message': 'Summary is being generated',
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/ai/jobs/{job_id}'
+        }), 202
+        
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_ai_job(job_id):
+    """Status and, once completed, result of a summary or learning-path job"""
+    try:
+        user_id = get_jwt_identity()
+        db = current_app.db
         
-        # Save summary
-        summary_data = {
-            'user_id': user_id,
-            'original_content': text_content[:1000],  # Store first 1000 chars
-            'summary': summary,
-            'content_type': content_type,
-            'created_at': datetime.utcnow()
-        }
+        job = ai_jobs.get_job(db, job_id, user_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
         
-        db.summaries.insert_one(summary_data)
-        
-        return jsonify({
-            'summary': summary,
-            'word_count_original': len(text_content.split()),
-            'word_count_summary': len(summary.split())
-        }), 200
+        return jsonify(ai_jobs.serialize_job(job)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def explain_recommendations(db, enrolled_titles, recommendations):
+    """One cached LLM paragraph on why the courses fit; None when AI is unavailable.
+
+    Callers hold an AI admission (ai_call_admission) around it.
+    """
+    if not ai_client.is_configured():
+        return None
+    titles = [course['title'] for course in recommendations]
+    context = f"Enrolled courses: {', '.join(sorted(enrolled_titles))}"
+    prompt = f"""
+        A student is enrolled in these courses: {', '.join(enrolled_titles) or 'none yet'}.
+        We recommend: {', '.join(titles)}.
+        In 2-3 friendly sentences, explain how the recommended courses build on what they are studying.
+        Do not list the courses again one by one.
+        """
+    try:
+        return cached_generation(db, 'recommendation', ', '.join(titles), context, prompt)
+    except Exception as e:
+        print(f"Recommendation explanation failed: {str(e)}")
+        return None
 
 @ai_bp.route('/recommendations', methods=['GET'])
 @jwt_required()
@@ -814,50 +1007,59 @@ def get_recommendations():
             return jsonify({'error': 'Recommendations are only available for students'}), 403
         
         # Get user's learning data
-        enrollments = list(db.enrollments.find({'student_id': user_id}))
-        enrolled_course_ids = [enrollment['course_id'] for enrollment in enrollments]
+        enrolled_course_ids = [
+            enrollment['course_id']
+            for enrollment in db.enrollments.find({'student_id': user_id}, {'course_id': 1})
+        ]
         
         # Get enrolled courses
-        enrolled_courses = list(db.courses.find({
-            '_id': {'$in': [ObjectId(cid) for cid in enrolled_course_ids]}
-        }))
+        enrolled_courses = list(db.courses.find(
+            {'_id': {'$in': [ObjectId(cid) for cid in enrolled_course_ids]}},
+            {'title': 1}
+        ))
+        enrolled_titles = [course['title'] for course in enrolled_courses]
         
-
-        
-        # Get assignment submissions
-        submissions = list(db.submissions.find({'student_id': user_id}))
+        submissions_count = db.submissions.count_documents({'student_id': user_id})
         
         # Analyze performance
         weak_areas = []
         strong_areas = []
         
-
-        
-        # Get available courses for recommendations
-        available_courses = list(db.courses.find({
-            '_id': {'$nin': [ObjectId(cid) for cid in enrolled_course_ids]},
-            'is_active': True
-        }))
-        
-        # Generate AI-powered recommendations
-        context = f"""
-        Student Profile:
-        - Department: {user.get('department', 'Not specified')}
-        - Year: {user.get('year', 'Not specified')}
-        - Enrolled Courses: {[course['title'] for course in enrolled_courses]}
-        - Strong Areas: {strong_areas}
-        - Areas for Improvement: {weak_areas}
-        - Total Points: {user.get('total_points', 0)}
-        """
+        # Content-based recommendations from the local TF-IDF model
+        matches = course_recommender.get_recommender().recommend(
+            db, enrolled_course_ids, fallback_text=user.get('department', ''), k=5
+        )
         
-        # Get course recommendations
         course_recommendations = []
-        if available_courses:
-            # Simple recommendation based on department and category
-            for course in available_courses[:5]:  # Limit to 5 recommendations
+        if matches:
+            by_id = {
+                str(course['_id']): course
+                for course in db.courses.find({'_id': {'$in': [ObjectId(cid) for cid, _, _ in matches]}})
+            }
+            for course_id, score, shared_terms in matches:
+                course = by_id.get(course_id)
+                if course:
+                    course['_id'] = course_id
+                    course['score'] = score
+                    course['reason'] = course_recommender.build_reason(shared_terms, enrolled_titles)
+                    course_recommendations.append(course)
+        else:
+            # Nothing to compare against yet: newest active courses
+            for course in db.courses.find({
+                '_id': {'$nin': [ObjectId(cid) for cid in enrolled_course_ids]},
+                'is_active': True
+            }).sort('created_at', -1).limit(5):
                 course['_id'] = str(course['_id'])
                 course_recommendations.append(course)
         
+        # The explanation is an LLM call, so it goes through the same admission as AI endpoints;
+        # when refused the recommendations are returned without it
+        explanation = None
+        if request.args.get('explain') == 'true' and course_recommendations:
+            with ai_call_admission(db, user_id) as admitted:
+                if admitted:
+                    explanation = explain_recommendations(db, enrolled_titles, course_recommendations)
+        
         # Generate study tips
         study_tips = [
             "Review your assignment results to identify knowledge gaps",
@@ -872,87 +1074,192 @@ def get_recommendations():
         
         return jsonify({
             'course_recommendations': course_recommendations,
+            'explanation': explanation,
             'study_tips': study_tips,
             'performance_summary': {
                 'strong_areas': strong_areas,
                 'weak_areas': weak_areas,
                 'total_points': user.get('total_points', 0),
                 'courses_enrolled': len(enrolled_courses),
-
-                'assignments_submitted': len(submissions)
+                'assignments_submitted': submissions_count
             }
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@ai_bp.route('/recommendations/blended', methods=['GET'])
+@jwt_required()
+def get_blended_recommendations():
+    """"Students also took" neighbours blended with content similarity"""
+    try:
+        user_id = get_jwt_identity()
+        db = current_app.db
+        
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1, 'department': 1})
+        if not user or user['role'] != 'student':
+            return jsonify({'error': 'Recommendations are only available for students'}), 403
+        
+        limit = min(max(int(request.args.get('limit', 5)), 1), 20)
+        enrolled_ids = [
+            enrollment['course_id']
+            for enrollment in db.enrollments.find({'student_id': user_id}, {'course_id': 1})
+        ]
+        
+        # Collaborative signal: one read of the precomputed neighbours
+        neighbor_docs = db.course_neighbors.find({'_id': {'$in': enrolled_ids}}, {'neighbors': 1})
+        collaborative = course_neighbors.collaborative_scores(neighbor_docs, set(enrolled_ids))
+        
+        # Content signal from the in-memory TF-IDF model
+        content = {
+            course_id: score
+            for course_id, score, _ in course_recommender.get_recommender().recommend(
+                db, enrolled_ids, fallback_text=user.get('department', ''), k=limit * 4
+            )
+        }
+        
+        # Over-fetch so inactive courses can be dropped
+        blended = course_neighbors.blend_scores(collaborative, content, k=limit * 2)
+        courses = {
+            str(course['_id']): course
+            for course in db.courses.find(
+                {'_id': {'$in': [ObjectId(cid) for cid, _, _ in blended if ObjectId.is_valid(cid)]}, 'is_active': True},
+                {'title': 1, 'description': 1, 'category': 1, 'difficulty': 1, 'thumbnail': 1, 'teacher_id': 1}
+            )
+        }
+        
+        recommendations = []
+        for course_id, score, source in blended:
+            course = courses.get(course_id)
+            if course:
+                course['_id'] = course_id
+                course['score'] = score
+                course['source'] = source
+                recommendations.append(course)
+            if len(recommendations) == limit:
+                break
+        
+        return jsonify({'recommendations': recommendations}), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+CHAT_HISTORY_PREVIEW_CHARS = 200
+CHAT_HISTORY_MAX_LIMIT = 100
+
+def encode_history_cursor(chat):
+    """Opaque cursor pointing just past a chat_history entry"""
+    raw = f"{chat['timestamp'].isoformat()}|{chat['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor):
+    """Inverse of encode_history_cursor(); raises ValueError on bad input"""
+    try:
+        timestamp, chat_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), ObjectId(chat_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def build_history_page_pipeline(user_id, limit, after=None, full=False):
+    """Newest-first page of chat history using the (user_id, timestamp, _id) index.
+
+    One extra entry is fetched to tell whether another page exists. In preview
+    mode the message and response are truncated inside MongoDB, so large
+    markdown answers are never sent over the wire.
+    """
+    match = {'user_id': user_id}
+    if after:
+        timestamp, chat_id = after
+        match['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$lt': chat_id}}
+        ]
+    
+    if full:
+        projection = {'message': 1, 'response': 1, 'type': 1, 'timestamp': 1}
+    else:
+        projection = {
+            'type': 1,
+            'timestamp': 1,
+            'message': {'$substrCP': [{'$ifNull': ['$message', '']}, 0, CHAT_HISTORY_PREVIEW_CHARS]},
+            'response_preview': {'$substrCP': [{'$ifNull': ['$response', '']}, 0, CHAT_HISTORY_PREVIEW_CHARS]},
+            'response_length': {'$strLenCP': {'$ifNull': ['$response', '']}}
+        }
+    
+    return [
+        {'$match': match},
+        {'$sort': {'timestamp': -1, '_id': -1}},
+        {'$limit': limit + 1},
+        {'$project': projection}
+    ]
+
 @ai_bp.route('/chat-history', methods=['GET'])
 @jwt_required()
 def get_chat_history():
+    """Cursor-paginated chat history; previews by default, ?view=full for whole responses"""
     try:
         user_id = get_jwt_identity()
         db = current_app.db
         
         # Get pagination parameters
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 20))
+        limit = min(max(int(request.args.get('limit', 20)), 1), CHAT_HISTORY_MAX_LIMIT)
+        full = request.args.get('view', 'preview') == 'full'
+        cursor = request.args.get('cursor')
+        try:
+            after = decode_history_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Get chat history
-        chat_history = list(db.chat_history.find({'user_id': user_id})
-                           .sort('timestamp', -1)
-                           .skip((page - 1) * limit)
-                           .limit(limit))
+        chat_history = list(db.chat_history.aggregate(
+            build_history_page_pipeline(user_id, limit, after, full)
+        ))
+        has_more = len(chat_history) > limit
+        chat_history = chat_history[:limit]
+        next_cursor = encode_history_cursor(chat_history[-1]) if has_more else None
         
         # Convert ObjectId to string
         for chat in chat_history:
             chat['_id'] = str(chat['_id'])
-        
-        total = db.chat_history.count_documents({'user_id': user_id})
+            if not full:
+                chat['truncated'] = chat['response_length'] > CHAT_HISTORY_PREVIEW_CHARS
         
         return jsonify({
             'chat_history': chat_history,
-            'total': total,
-            'page': page,
             'limit': limit,
-            'total_pages': (total + limit - 1) // limit
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@ai_bp.route('/learning-path', methods=['POST'])
+@ai_bp.route('/chat-history/<chat_id>', methods=['GET'])
 @jwt_required()
-def generate_learning_path():
+def get_chat_history_entry(chat_id):
+    """Full message and response of one chat history entry"""
     try:
         user_id = get_jwt_identity()
         db = current_app.db
         
-        # Check if user is student
-        user = db.users.find_one({'_id': ObjectId(user_id)})
-        if user['role'] != 'student':
-            return jsonify({'error': 'Learning paths are only available for students'}), 403
+        if not ObjectId.is_valid(chat_id):
+            return jsonify({'error': 'Chat entry not found'}), 404
         
-        data = request.get_json()
-        goal = data.get('goal', '').strip()
-        timeframe = data.get('timeframe', 'month')  # week, month, semester
+        chat = db.chat_history.find_one(
+            {'_id': ObjectId(chat_id), 'user_id': user_id},
+            {'message': 1, 'response': 1, 'type': 1, 'timestamp': 1}
+        )
+        if not chat:
+            return jsonify({'error': 'Chat entry not found'}), 404
         
-        if not goal:
-            return jsonify({'error': 'Learning goal is required'}), 400
+        chat['_id'] = str(chat['_id'])
+        return jsonify({'chat': chat}), 200
         
-        # Get user's current progress
-        enrollments = list(db.enrollments.find({'student_id': user_id}))
-        enrolled_courses = []
-        for enrollment in enrollments:
-            course = db.courses.find_one({'_id': ObjectId(enrollment['course_id'])})
-            if course:
-                enrolled_courses.append({
-                    'title': course['title'],
-                    'progress': enrollment.get('progress', 0)
-                })
-        
-        # Generate learning path using AI or fallback
-        if GEMINI_API_KEY:
-            prompt = f"""
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def build_learning_path_prompt(goal, timeframe, enrolled_courses, user):
+    """Prompt for personalized learning paths"""
+    return f"""
             Create a personalized learning path for a student with the following profile:
             
             Goal: {goal}
@@ -968,34 +1275,127 @@ def generate_learning_path():
             
             Format as a practical, actionable plan using markdown formatting.
             """
-            
-            try:
-                model = genai.GenerativeModel('gemini-2.5-flash')
-                response = model.generate_content(prompt)
-                learning_path = response.text
-            except Exception as e:
-                print(f"Gemini API error in learning path: {str(e)}")
-                learning_path = generate_fallback_learning_path(goal, timeframe, enrolled_courses, user)
-        else:
+
+def run_learning_path_job(db, job):
+    """Job handler: build the learning path, save it and return the fields to store"""
+    user_id = job['user_id']
+    goal = job['payload']['goal']
+    timeframe = job['payload']['timeframe']
+    user = db.users.find_one({'_id': ObjectId(user_id)}, {'department': 1})
+    
+    # Get user's current progress
+    enrollments = list(db.enrollments.find({'student_id': user_id}, {'course_id': 1, 'progress': 1}))
+    progress_by_course = {enrollment['course_id']: enrollment.get('progress', 0) for enrollment in enrollments}
+    courses = db.courses.find(
+        {'_id': {'$in': [ObjectId(cid) for cid in progress_by_course]}},
+        {'title': 1}
+    )
+    enrolled_courses = [
+        {'title': course['title'], 'progress': progress_by_course.get(str(course['_id']), 0)}
+        for course in courses
+    ]
+    
+    # Generate learning path using AI or fallback
+    if ai_client.is_configured():
+        prompt = build_learning_path_prompt(goal, timeframe, enrolled_courses, user)
+        try:
+            learning_path = ai_client.generate(prompt, endpoint='learning_path')
+        except Exception as e:
+            # Let the queue retry; only the last attempt falls back
+            if job.get('attempts', 1) < job.get('max_attempts', ai_jobs.AI_JOBS_MAX_ATTEMPTS):
+                raise
+            print(f"Gemini API error in learning path: {str(e)}")
             learning_path = generate_fallback_learning_path(goal, timeframe, enrolled_courses, user)
+    else:
+        learning_path = generate_fallback_learning_path(goal, timeframe, enrolled_courses, user)
+    
+    # Save learning path
+    path_data = {
+        'user_id': user_id,
+        'goal': goal,
+        'timeframe': timeframe,
+        'learning_path': learning_path,
+        'created_at': datetime.utcnow(),
+        'is_active': True
+    }
+    
+    result = db.learning_paths.insert_one(path_data)
+    path_data['_id'] = str(result.inserted_id)
+    path_data['created_at'] = path_data['created_at'].isoformat()
+    
+    return {
+        'learning_path_id': path_data['_id'],
+        'result': {'learning_path': path_data}
+    }
+
+@ai_bp.route('/learning-path', methods=['POST'])
+@jwt_required()
+@ai_admission(cost=2)
+def generate_learning_path():
+    """Queue a learning-path job; poll /api/ai/jobs/<job_id> for the result"""
+    try:
+        user_id = get_jwt_identity()
+        db = current_app.db
         
-        # Save learning path
-        path_data = {
-            'user_id': user_id,
-            'goal': goal,
-            'timeframe': timeframe,
-            'learning_path': learning_path,
-            'created_at': datetime.utcnow(),
-            'is_active': True
-        }
+        # Check if user is student
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
+        if user['role'] != 'student':
+            return jsonify({'error': 'Learning paths are only available for students'}), 403
+        
+        data = request.get_json()
+        goal = data.get('goal', '').strip()
+        timeframe = data.get('timeframe', 'month')  # week, month, semester
         
-        result = db.learning_paths.insert_one(path_data)
-        path_data['_id'] = str(result.inserted_id)
+        if not goal:
+            return jsonify({'error': 'Learning goal is required'}), 400
+        
+        job_id = ai_jobs.submit_job(
+            db, user_id, 'learning_path',
+            payload={'goal': goal, 'timeframe': timeframe}
+        )
         
         return jsonify({
-            'message': 'Learning path generated successfully',
-            'learning_path': path_data
-        }), 201
+            'message': 'Learning path is being generated',
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/ai/jobs/{job_id}'
+        }), 202
+        
+    except JobLimitError as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@ai_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def get_ai_metrics():
+    """AI latency, token and cache metrics (admin only).
+
+    Returns this worker's live counters, plus daily rollups across all
+    workers for the last ``days`` days (optionally one ``endpoint``).
+    """
+    try:
+        user_id = get_jwt_identity()
+        db = current_app.db
+        
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
+        if not user or user.get('role') not in ['admin', 'super_admin']:
+            return jsonify({'error': 'Access denied'}), 403
+        
+        days = min(max(int(request.args.get('days', 7)), 1), ai_metrics.AI_METRICS_RETENTION_DAYS)
+        endpoint = request.args.get('endpoint')
+        
+        ai_metrics.flush(db)
+        
+        return jsonify({
+            'provider': ai_client.get_provider().name,
+            'in_flight': ai_client.get_in_flight(),
+            'max_concurrent_calls': ai_client.AI_MAX_CONCURRENT_CALLS,
+            'latency_buckets_ms': list(ai_metrics.LATENCY_BUCKETS_MS),
+            'worker': ai_metrics.snapshot(),
+            'cache': ai_cache.get_stats(),
+            'daily': ai_metrics.get_daily(db, days, endpoint)
+        }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
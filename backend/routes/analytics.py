@@ -3,9 +3,94 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from datetime import datetime, timedelta
 from collections import defaultdict
+import os
+
+from services.ai_cache import LRUCache
+from services import admin_overview, counters, course_stats, daily_rollups, distributions
 
 analytics_bp = Blueprint('analytics', __name__)
 
+# The teacher landing page reloads these often; a minute of staleness is fine
+TEACHER_DASHBOARD_CACHE_SECONDS = int(os.getenv('TEACHER_DASHBOARD_CACHE_SECONDS', '60'))
+_teacher_dashboard_cache = LRUCache(max_entries=1024, ttl_seconds=TEACHER_DASHBOARD_CACHE_SECONDS)
+
+def build_teacher_enrollment_pipeline(course_ids, since):
+    """Enrollment totals, recent enrollments and per-course average progress in one pass"""
+    return [
+        {'$match': {'course_id': {'$in': course_ids}}},
+        {'$facet': {
+            'totals': [
+                {'$group': {
+                    '_id': None,
+                    'students': {'$sum': 1},
+                    'recent': {'$sum': {'$cond': [{'$gte': ['$enrolled_at', since]}, 1, 0]}}
+                }}
+            ],
+            'course_progress': [
+                {'$group': {'_id': '$course_id', 'avg_progress': {'$avg': {'$ifNull': ['$progress', 0]}}}}
+            ]
+        }}
+    ]
+
+def build_teacher_submission_pipeline(course_ids, since):
+    """Ungraded and recent submission counts in one pass"""
+    return [
+        {'$match': {'course_id': {'$in': course_ids}}},
+        {'$facet': {
+            'pending': [{'$match': {'grade': None}}, {'$count': 'count'}],
+            'recent': [{'$match': {'submitted_at': {'$gte': since}}}, {'$count': 'count'}]
+        }}
+    ]
+
+def facet_count(facets, name):
+    """Value of a {'$count': 'count'} facet branch (0 when it matched nothing)"""
+    branch = facets.get(name) or []
+    return branch[0]['count'] if branch else 0
+
+def compute_teacher_dashboard_stats(db, teacher_id):
+    """Dashboard numbers from one courses read and one aggregation each over enrollments and submissions"""
+    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    
+    courses = list(db.courses.find({'teacher_id': teacher_id}, {'is_active': 1, 'created_at': 1}))
+    course_ids = [str(course['_id']) for course in courses]
+    active_courses = len([c for c in courses if c.get('is_active', True)])
+    recent_courses = len([c for c in courses if isinstance(c.get('created_at'), datetime) and c['created_at'] >= thirty_days_ago])
+    
+    total_students = 0
+    recent_enrollments = 0
+    pending_grades = 0
+    recent_submissions = 0
+    course_rating = 0.0
+    
+    if course_ids:
+        enrollment_facets = next(db.enrollments.aggregate(build_teacher_enrollment_pipeline(course_ids, thirty_days_ago)), {})
+        totals = (enrollment_facets.get('totals') or [{}])[0]
+        total_students = totals.get('students', 0)
+        recent_enrollments = totals.get('recent', 0)
+        
+        # Average completion across courses with enrollments, as a 0-5 rating proxy
+        course_progress = enrollment_facets.get('course_progress') or []
+        if course_progress:
+            average_completion = sum(c['avg_progress'] for c in course_progress) / len(course_progress)
+            course_rating = average_completion * 5 / 100
+        
+        submission_facets = next(db.submissions.aggregate(build_teacher_submission_pipeline(course_ids, thirty_days_ago)), {})
+        pending_grades = facet_count(submission_facets, 'pending')
+        recent_submissions = facet_count(submission_facets, 'recent')
+    
+    return {
+        'active_courses': active_courses,
+        'total_students': total_students,
+        'pending_grades': pending_grades,
+        'course_rating': round(course_rating, 2),
+        'monthly_growth': {
+            'courses': recent_courses,
+            'students': recent_enrollments,
+            'submissions': recent_submissions,
+            'rating_change': 0.0  # Would need historical ratings
+        }
+    }
+
 @analytics_bp.route('/teacher/dashboard', methods=['GET'])
 @jwt_required()
 def get_teacher_dashboard_stats():
@@ -14,89 +99,134 @@ def get_teacher_dashboard_stats():
         db = current_app.db
         
         # Get user and verify teacher role
-        user = db.users.find_one({'_id': ObjectId(user_id)})
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
         if not user or user['role'] != 'teacher':
             return jsonify({'error': 'Teacher access required'}), 403
         
-        # Get teacher's courses
-        courses = list(db.courses.find({'teacher_id': user_id}))
-        course_ids = [str(course['_id']) for course in courses]
-        
-        # Calculate active courses count
-        active_courses = len([c for c in courses if c.get('is_active', True)])
+        dashboard_stats = _teacher_dashboard_cache.get(user_id)
+        if dashboard_stats is None:
+            dashboard_stats = compute_teacher_dashboard_stats(db, user_id)
+            _teacher_dashboard_cache.set(user_id, dashboard_stats)
         
-        # Calculate total enrolled students across all courses
-        total_students = 0
-        if course_ids:
-            total_students = db.enrollments.count_documents({'course_id': {'$in': course_ids}})
+        return jsonify({'dashboard_stats': dashboard_stats}), 200
         
-        # Get assignments created by teacher
-        assignments = list(db.assignments.find({'course_id': {'$in': course_ids}}))
-        assignment_ids = [str(assignment['_id']) for assignment in assignments]
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def build_assignment_submission_pipeline(assignment_ids):
+    """Submission, graded and grade-sum counts per assignment"""
+    return [
+        {'$match': {'assignment_id': {'$in': assignment_ids}}},
+        {'$group': {
+            '_id': '$assignment_id',
+            'total': {'$sum': 1},
+            'graded': {'$sum': {'$cond': [{'$eq': [{'$ifNull': ['$grade', None]}, None]}, 0, 1]}},
+            'grade_sum': {'$sum': {'$ifNull': ['$grade', 0]}}
+        }}
+    ]
+
+def build_course_enrollment_pipeline(course_ids):
+    """Enrollment count per course"""
+    return [
+        {'$match': {'course_id': {'$in': course_ids}}},
+        {'$group': {'_id': '$course_id', 'count': {'$sum': 1}}}
+    ]
+
+def compute_teacher_assignment_stats(db, teacher_id):
+    """Assignment statistics from one $group over submissions and one over enrollments"""
+    courses = list(db.courses.find({'teacher_id': teacher_id}, {'title': 1}))
+    course_titles = {str(course['_id']): course.get('title', 'Unknown Course') for course in courses}
+    course_ids = list(course_titles)
+    
+    if not course_ids:
+        return {
+            'total_assignments': 0,
+            'pending_submissions': 0,
+            'graded_submissions': 0,
+            'completion_rate': 0,
+            'average_grade': 0,
+            'grading_workload': [],
+            'assignment_performance': []
+        }
+    
+    assignments = list(db.assignments.find(
+        {'course_id': {'$in': course_ids}},
+        {'title': 1, 'course_id': 1, 'due_date': 1, 'created_at': 1, 'max_points': 1}
+    ))
+    assignment_ids = [str(assignment['_id']) for assignment in assignments]
+    
+    submission_counts = {
+        group['_id']: group
+        for group in db.submissions.aggregate(build_assignment_submission_pipeline(assignment_ids))
+    } if assignment_ids else {}
+    enrollment_counts = {
+        group['_id']: group['count']
+        for group in db.enrollments.aggregate(build_course_enrollment_pipeline(course_ids))
+    }
+    
+    empty = {'total': 0, 'graded': 0, 'grade_sum': 0}
+    total_submissions = sum(group['total'] for group in submission_counts.values())
+    graded_submissions = sum(group['graded'] for group in submission_counts.values())
+    pending_submissions = total_submissions - graded_submissions
+    grade_sum = sum(group['grade_sum'] for group in submission_counts.values())
+    
+    # Every enrolled student could submit every assignment in their course
+    total_possible_submissions = sum(enrollment_counts.get(a['course_id'], 0) for a in assignments)
+    completion_rate = (total_submissions / total_possible_submissions * 100) if total_possible_submissions > 0 else 0
+    average_grade = grade_sum / graded_submissions if graded_submissions else 0
+    
+    grading_workload = []
+    assignment_performance = []
+    for assignment in assignments:
+        assignment_id = str(assignment['_id'])
+        counts = submission_counts.get(assignment_id, empty)
+        pending_count = counts['total'] - counts['graded']
+        course_title = course_titles.get(assignment['course_id'], 'Unknown Course')
+        max_points = assignment.get('max_points', 100)
         
-        # Calculate pending assignments (submissions without grades)
-        pending_grades = 0
-        if assignment_ids:
-            pending_grades = db.submissions.count_documents({
-                'assignment_id': {'$in': assignment_ids},
-                'grade': None
+        # Grading workload - assignments with pending submissions
+        if pending_count > 0:
+            grading_workload.append({
+                'assignment_id': assignment_id,
+                'assignment_title': assignment['title'],
+                'course_title': course_title,
+                'due_date': assignment.get('due_date'),
+                'pending_submissions': pending_count,
+                'total_submissions': counts['total'],
+                'priority': 'high' if pending_count > 10 else 'medium' if pending_count > 5 else 'low'
             })
         
-        # Calculate average course ratings (placeholder - would need rating system)
-        # For now, we'll calculate based on course completion rates as a proxy
-        course_rating = 0.0
-        if courses and course_ids:
-            # Calculate average completion rate across courses as rating proxy
-            total_completion = 0
-            rated_courses = 0
-            
-            for course_id in course_ids:
-                enrollments = list(db.enrollments.find({'course_id': course_id}))
-                if enrollments:
-                    avg_progress = sum([e.get('progress', 0) for e in enrollments]) / len(enrollments)
-                    total_completion += avg_progress
-                    rated_courses += 1
-            
-            if rated_courses > 0:
-                # Convert completion percentage to 5-star rating (0-100% -> 0-5 stars)
-                course_rating = (total_completion / rated_courses) * 5 / 100
-        
-        # Get recent activity data for monthly growth calculation
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        # Monthly growth in courses
-        recent_courses = db.courses.count_documents({
-            'teacher_id': user_id,
-            'created_at': {'$gte': thirty_days_ago}
+        course_enrollments = enrollment_counts.get(assignment['course_id'], 0)
+        submission_rate = (counts['total'] / course_enrollments * 100) if course_enrollments > 0 else 0
+        avg_assignment_grade = counts['grade_sum'] / counts['graded'] if counts['graded'] else 0
+        
+        assignment_performance.append({
+            'assignment_id': assignment_id,
+            'assignment_title': assignment['title'],
+            'course_title': course_title,
+            'max_points': max_points,
+            'total_submissions': counts['total'],
+            'graded_submissions': counts['graded'],
+            'submission_rate': round(submission_rate, 2),
+            'average_grade': round(avg_assignment_grade, 2),
+            'grade_percentage': round((avg_assignment_grade / max_points) * 100, 2) if max_points > 0 else 0,
+            'due_date': assignment.get('due_date'),
+            'created_at': assignment.get('created_at')
         })
-        
-        # Monthly growth in students (new enrollments)
-        recent_enrollments = 0
-        if course_ids:
-            recent_enrollments = db.enrollments.count_documents({
-                'course_id': {'$in': course_ids},
-                'enrolled_at': {'$gte': thirty_days_ago}
-            })
-        
-        # Calculate rating change (placeholder - would need historical data)
-        rating_change = 0.0  # Would calculate from previous period's rating
-        
-        dashboard_stats = {
-            'active_courses': active_courses,
-            'total_students': total_students,
-            'pending_grades': pending_grades,
-            'course_rating': round(course_rating, 2),
-            'monthly_growth': {
-                'courses': recent_courses,
-                'students': recent_enrollments,
-                'rating_change': rating_change
-            }
-        }
-        
-        return jsonify({'dashboard_stats': dashboard_stats}), 200
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    
+    # Highest pending first; newest assignments first
+    grading_workload.sort(key=lambda x: x['pending_submissions'], reverse=True)
+    assignment_performance.sort(key=lambda x: x['created_at'] or datetime.min, reverse=True)
+    
+    return {
+        'total_assignments': len(assignments),
+        'pending_submissions': pending_submissions,
+        'graded_submissions': graded_submissions,
+        'completion_rate': round(completion_rate, 2),
+        'average_grade': round(average_grade, 2),
+        'grading_workload': grading_workload[:10],  # Top 10 assignments needing attention
+        'assignment_performance': assignment_performance
+    }
 
 @analytics_bp.route('/teacher/assignments', methods=['GET'])
 @jwt_required()
@@ -106,118 +236,69 @@ def get_teacher_assignment_stats():
         db = current_app.db
         
         # Get user and verify teacher role
-        user = db.users.find_one({'_id': ObjectId(user_id)})
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
         if not user or user['role'] != 'teacher':
             return jsonify({'error': 'Teacher access required'}), 403
         
-        # Get teacher's courses
-        courses = list(db.courses.find({'teacher_id': user_id}))
-        course_ids = [str(course['_id']) for course in courses]
-        
-        if not course_ids:
-            return jsonify({
-                'assignment_stats': {
-                    'total_assignments': 0,
-                    'pending_submissions': 0,
-                    'graded_submissions': 0,
-                    'completion_rate': 0,
-                    'average_grade': 0,
-                    'grading_workload': [],
-                    'assignment_performance': []
-                }
-            }), 200
-        
-        # Get all assignments for teacher's courses
-        assignments = list(db.assignments.find({'course_id': {'$in': course_ids}}))
-        assignment_ids = [str(assignment['_id']) for assignment in assignments]
-        
-        # Get all submissions for these assignments
-        submissions = list(db.submissions.find({'assignment_id': {'$in': assignment_ids}}))
-        
-        # Calculate basic statistics
-        total_assignments = len(assignments)
-        total_submissions = len(submissions)
-        pending_submissions = len([s for s in submissions if s.get('grade') is None])
-        graded_submissions = len([s for s in submissions if s.get('grade') is not None])
-        
-        # Calculate completion rate
-        total_possible_submissions = 0
-        for assignment in assignments:
-            course_enrollments = db.enrollments.count_documents({'course_id': assignment['course_id']})
-            total_possible_submissions += course_enrollments
-        
-        completion_rate = (total_submissions / total_possible_submissions * 100) if total_possible_submissions > 0 else 0
-        
-        # Calculate average grade
-        graded_subs = [s for s in submissions if s.get('grade') is not None]
-        average_grade = sum([s['grade'] for s in graded_subs]) / len(graded_subs) if graded_subs else 0
-        
-        # Grading workload - assignments with pending submissions
-        grading_workload = []
-        for assignment in assignments:
-            assignment_submissions = [s for s in submissions if s['assignment_id'] == str(assignment['_id'])]
-            pending_count = len([s for s in assignment_submissions if s.get('grade') is None])
-            
-            if pending_count > 0:
-                course = db.courses.find_one({'_id': ObjectId(assignment['course_id'])})
-                grading_workload.append({
-                    'assignment_id': str(assignment['_id']),
-                    'assignment_title': assignment['title'],
-                    'course_title': course['title'] if course else 'Unknown Course',
-                    'due_date': assignment['due_date'],
-                    'pending_submissions': pending_count,
-                    'total_submissions': len(assignment_submissions),
-                    'priority': 'high' if pending_count > 10 else 'medium' if pending_count > 5 else 'low'
-                })
-        
-        # Sort by pending submissions (highest first)
-        grading_workload.sort(key=lambda x: x['pending_submissions'], reverse=True)
-        
-        # Assignment performance analysis
-        assignment_performance = []
-        for assignment in assignments:
-            assignment_submissions = [s for s in submissions if s['assignment_id'] == str(assignment['_id'])]
-            graded_assignment_subs = [s for s in assignment_submissions if s.get('grade') is not None]
-            
-            course = db.courses.find_one({'_id': ObjectId(assignment['course_id'])})
-            course_enrollments = db.enrollments.count_documents({'course_id': assignment['course_id']})
-            
-            # Calculate assignment statistics
-            submission_rate = (len(assignment_submissions) / course_enrollments * 100) if course_enrollments > 0 else 0
-            avg_assignment_grade = sum([s['grade'] for s in graded_assignment_subs]) / len(graded_assignment_subs) if graded_assignment_subs else 0
-            
-            assignment_performance.append({
-                'assignment_id': str(assignment['_id']),
-                'assignment_title': assignment['title'],
-                'course_title': course['title'] if course else 'Unknown Course',
-                'max_points': assignment.get('max_points', 100),
-                'total_submissions': len(assignment_submissions),
-                'graded_submissions': len(graded_assignment_subs),
-                'submission_rate': round(submission_rate, 2),
-                'average_grade': round(avg_assignment_grade, 2),
-                'grade_percentage': round((avg_assignment_grade / assignment.get('max_points', 100)) * 100, 2) if assignment.get('max_points', 100) > 0 else 0,
-                'due_date': assignment['due_date'],
-                'created_at': assignment['created_at']
-            })
-        
-        # Sort by creation date (newest first)
-        assignment_performance.sort(key=lambda x: x['created_at'], reverse=True)
-        
-        assignment_stats = {
-            'total_assignments': total_assignments,
-            'pending_submissions': pending_submissions,
-            'graded_submissions': graded_submissions,
-            'completion_rate': round(completion_rate, 2),
-            'average_grade': round(average_grade, 2),
-            'grading_workload': grading_workload[:10],  # Top 10 assignments needing attention
-            'assignment_performance': assignment_performance
-        }
-        
-        return jsonify({'assignment_stats': assignment_stats}), 200
+        return jsonify({'assignment_stats': compute_teacher_assignment_stats(db, user_id)}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def titles_by_id(collection, ids):
+    """_id string -> title for the given ids, in one $in query"""
+    object_ids = list({ObjectId(i) for i in ids if ObjectId.is_valid(str(i))})
+    if not object_ids:
+        return {}
+    return {str(doc['_id']): doc.get('title') for doc in collection.find({'_id': {'$in': object_ids}}, {'title': 1})}
+
+def compute_student_dashboard(db, student_id, user):
+    """Student dashboard from enrollments + courses and submissions + assignments (four queries)"""
+    enrollments = list(db.enrollments.find({'student_id': student_id}, {'course_id': 1, 'progress': 1}))
+    course_titles = titles_by_id(db.courses, [e['course_id'] for e in enrollments])
+
+    # Course progress
+    course_progress = []
+    total_progress = 0
+    for enrollment in enrollments:
+        title = course_titles.get(str(enrollment['course_id']))
+        if title is not None:
+            progress = enrollment.get('progress', 0)
+            course_progress.append({'course_title': title, 'progress': progress})
+            total_progress += progress
+    avg_progress = total_progress / len(enrollments) if enrollments else 0
+
+    # Assignment submissions
+    submissions = list(db.submissions.find(
+        {'student_id': student_id}, {'assignment_id': 1, 'grade': 1, 'status': 1, 'submitted_at': 1}
+    ))
+    assignment_grades = [s['grade'] for s in submissions if s.get('grade') is not None]
+    avg_assignment_grade = sum(assignment_grades) / len(assignment_grades) if assignment_grades else 0
+
+    # Recent submissions
+    recent_submissions = sorted(submissions, key=lambda x: x['submitted_at'], reverse=True)[:5]
+    assignment_titles = titles_by_id(db.assignments, [s['assignment_id'] for s in recent_submissions])
+    recent_activities = []
+    for submission in recent_submissions:
+        title = assignment_titles.get(str(submission['assignment_id']))
+        if title is not None:
+            recent_activities.append({
+                'type': 'assignment',
+                'title': f"Submitted: {title}",
+                'status': submission.get('status', 'submitted'),
+                'date': submission['submitted_at']
+            })
+
+    return {
+        'enrolled_courses': len(enrollments),
+        'average_progress': round(avg_progress, 2),
+        'total_points': user.get('total_points', 0),
+        'assignments_submitted': len(submissions),
+        'average_assignment_grade': round(avg_assignment_grade, 2),
+        'course_progress': course_progress,
+        'recent_activities': recent_activities
+    }
+
 @analytics_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 def get_dashboard_analytics():
@@ -233,86 +314,34 @@ def get_dashboard_analytics():
         analytics_data = {}
         
         if user['role'] == 'student':
-            # Student analytics
-            enrollments = list(db.enrollments.find({'student_id': user_id}))
-            
-            # Course progress
-            course_progress = []
-            total_progress = 0
-            for enrollment in enrollments:
-                course = db.courses.find_one({'_id': ObjectId(enrollment['course_id'])})
-                if course:
-                    progress = enrollment.get('progress', 0)
-                    course_progress.append({
-                        'course_title': course['title'],
-                        'progress': progress
-                    })
-                    total_progress += progress
-            
-            avg_progress = total_progress / len(enrollments) if enrollments else 0
-            
-
-            
-            # Assignment submissions
-            submissions = list(db.submissions.find({'student_id': user_id}))
-            graded_submissions = [s for s in submissions if s.get('grade') is not None]
-            assignment_grades = [s.get('grade', 0) for s in graded_submissions]
-            avg_assignment_grade = sum(assignment_grades) / len(assignment_grades) if assignment_grades else 0
-            
-            # Recent activity
-            recent_activities = []
-            
-
-            
-            # Recent submissions
-            recent_submissions = sorted(submissions, key=lambda x: x['submitted_at'], reverse=True)[:5]
-            for submission in recent_submissions:
-                assignment = db.assignments.find_one({'_id': ObjectId(submission['assignment_id'])})
-                if assignment:
-                    recent_activities.append({
-                        'type': 'assignment',
-                        'title': f"Submitted: {assignment['title']}",
-                        'status': submission.get('status', 'submitted'),
-                        'date': submission['submitted_at']
-                    })
-            
-            # Sort recent activities by date
-            recent_activities.sort(key=lambda x: x['date'], reverse=True)
-            recent_activities = recent_activities[:10]
-            
-            analytics_data = {
-                'enrolled_courses': len(enrollments),
-                'average_progress': round(avg_progress, 2),
-                'total_points': user.get('total_points', 0),
-
-                'assignments_submitted': len(submissions),
-                'average_assignment_grade': round(avg_assignment_grade, 2),
-                'course_progress': course_progress,
-                'recent_activities': recent_activities
-            }
+            analytics_data = compute_student_dashboard(db, user_id, user)
             
         elif user['role'] == 'teacher':
             # Teacher analytics
             courses = list(db.courses.find({'teacher_id': user_id}))
             course_ids = [str(course['_id']) for course in courses]
             
-            # Total enrollments across all courses
-            total_enrollments = db.enrollments.count_documents({'course_id': {'$in': course_ids}})
+            # Total enrollments across all courses (counters on the course documents)
+            for course in courses:
+                counters.ensure_course_counters(db, course, ('enrollment_count',))
+            total_enrollments = sum(course['enrollment_count'] for course in courses)
             
             # Assignments and submissions
-            assignments = list(db.assignments.find({'course_id': {'$in': course_ids}}))
+            assignments = list(db.assignments.find({'course_id': {'$in': course_ids}}, {'submission_count': 1}))
             assignment_ids = [str(assignment['_id']) for assignment in assignments]
-            total_submissions = db.submissions.count_documents({'assignment_id': {'$in': assignment_ids}})
+            total_submissions = sum(
+                counters.ensure_assignment_counters(db, assignment, ('submission_count',))['submission_count']
+                for assignment in assignments
+            )
             
 
             
             # Course-wise enrollment
             course_enrollments = []
             for course in courses:
-                enrollment_count = db.enrollments.count_documents({'course_id': str(course['_id'])})
                 course_enrollments.append({
                     'course_title': course['title'],
-                    'enrollments': enrollment_count
+                    'enrollments': course['enrollment_count']
                 })
             
             # Recent student activity
@@ -343,53 +372,17 @@ def get_dashboard_analytics():
             }
             
         elif user['role'] == 'admin':
-            # Admin analytics
-            total_users = db.users.count_documents({})
-            total_students = db.users.count_documents({'role': 'student'})
-            total_teachers = db.users.count_documents({'role': 'teacher'})
-            total_courses = db.courses.count_documents({})
-            total_enrollments = db.enrollments.count_documents({})
-            
-            # Recent registrations (last 30 days)
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            recent_registrations = db.users.count_documents({
-                'created_at': {'$gte': thirty_days_ago}
-            })
-            
-            # Course popularity
-            pipeline = [
-                {'$group': {'_id': '$course_id', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}},
-                {'$limit': 10}
-            ]
-            popular_courses_data = list(db.enrollments.aggregate(pipeline))
-            
-            popular_courses = []
-            for item in popular_courses_data:
-                course = db.courses.find_one({'_id': ObjectId(item['_id'])})
-                if course:
-                    popular_courses.append({
-                        'course_title': course['title'],
-                        'enrollments': item['count']
-                    })
-            
-            # Department distribution
-            dept_pipeline = [
-                {'$match': {'role': {'$in': ['student', 'teacher']}}},
-                {'$group': {'_id': '$department', 'count': {'$sum': 1}}},
-                {'$sort': {'count': -1}}
-            ]
-            department_stats = list(db.users.aggregate(dept_pipeline))
-            
+            # Admin analytics (shared, briefly cached overview)
+            overview = admin_overview.get_overview(db)
             analytics_data = {
-                'total_users': total_users,
-                'total_students': total_students,
-                'total_teachers': total_teachers,
-                'total_courses': total_courses,
-                'total_enrollments': total_enrollments,
-                'recent_registrations': recent_registrations,
-                'popular_courses': popular_courses,
-                'department_distribution': department_stats
+                'total_users': overview['total_users'],
+                'total_students': overview['students'],
+                'total_teachers': overview['teachers'],
+                'total_courses': overview['total_courses'],
+                'total_enrollments': overview['total_enrollments'],
+                'recent_registrations': overview['recent_registrations'],
+                'popular_courses': overview['popular_courses'],
+                'department_distribution': overview['department_distribution']
             }
         
         return jsonify({'analytics': analytics_data}), 200
@@ -397,117 +390,145 @@ def get_dashboard_analytics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+COURSE_STUDENT_SORT_FIELDS = {
+    'performance': 'overall_performance',
+    'progress': 'progress',
+    'submitted': 'assignments_submitted',
+    'on_time': 'on_time_rate',
+    'name': 'student_name'
+}
+COURSE_STUDENTS_MAX_PER_PAGE = 100
+
+def course_student_row(entry, total_assignments):
+    """Table figures for one enrolled student from their stored course_stats counters"""
+    average = entry['grade_sum'] / entry['graded'] if entry['graded'] else 0
+    return {
+        'student_id': entry['student_id'],
+        'progress': entry.get('progress', 0),
+        'assignments_submitted': entry['submitted'],
+        'average_assignment_grade': round(average, 2),
+        'on_time_rate': round(entry['on_time'] / entry['submitted'] * 100, 2) if entry['submitted'] else 0,
+        'completion_rate': round(entry['submitted'] / total_assignments * 100, 2) if total_assignments else 0,
+        'overall_performance': round(average, 2)
+    }
+
+def page_rows(rows, sort_key, descending, page, per_page):
+    """Sort rows by one field and return the requested page"""
+    rows = sorted(rows, key=lambda row: (row[sort_key] is None, row[sort_key]), reverse=descending)
+    start = (page - 1) * per_page
+    return rows[start:start + per_page]
+
+def course_student_table(db, figures, sort, descending, page, per_page):
+    """
+    One page of the course's student table plus the top ten, from stored rows.
+
+    Sorting by name pages in the users query; other sorts page the stored
+    rows. Names come from one users query for the rows shown.
+
+    Returns:
+        (page items, top students, total rows)
+    """
+    rows = {
+        entry['student_id']: course_student_row(entry, figures['total_assignments'])
+        for entry in figures.get('students', [])
+    }
+    top_rows = page_rows(list(rows.values()), 'overall_performance', True, 1, 10)
+    users = {}
+    if sort == 'name':
+        cursor = db.users.find(
+            {'_id': {'$in': [ObjectId(student_id) for student_id in rows if ObjectId.is_valid(student_id)]}},
+            {'name': 1, 'roll_no': 1}
+        ).sort('name', -1 if descending else 1).skip((page - 1) * per_page).limit(per_page)
+        for user in cursor:
+            users[str(user['_id'])] = user
+        page_items = [rows[student_id] for student_id in users if student_id in rows]
+    else:
+        page_items = page_rows(list(rows.values()), COURSE_STUDENT_SORT_FIELDS[sort], descending, page, per_page)
+    
+    wanted = [row['student_id'] for row in page_items + top_rows if row['student_id'] not in users]
+    if wanted:
+        for user in db.users.find(
+            {'_id': {'$in': [ObjectId(student_id) for student_id in wanted if ObjectId.is_valid(student_id)]}},
+            {'name': 1, 'roll_no': 1}
+        ):
+            users[str(user['_id'])] = user
+    
+    def named(selected):
+        return [
+            {'student_id': row['student_id'], 'student_name': users[row['student_id']]['name'],
+             'roll_no': users[row['student_id']].get('roll_no', ''), **row}
+            for row in selected if row['student_id'] in users
+        ]
+    
+    return named(page_items), named(top_rows), len(rows)
+
 @analytics_bp.route('/course/<course_id>', methods=['GET'])
 @jwt_required()
 def get_course_analytics(course_id):
+    """Course analytics with a paged, sortable student table.
+
+    Query params: page (1), per_page (20, max 100), sort (performance,
+    progress, submitted, on_time, name) and order (desc/asc).
+
+    All numbers come from the course's course_stats document (see
+    stats_freshness), so the totals, distributions and student rows agree.
+    """
     try:
         user_id = get_jwt_identity()
         db = current_app.db
         
         # Get course and check permissions
-        course = db.courses.find_one({'_id': ObjectId(course_id)})
+        course = db.courses.find_one({'_id': ObjectId(course_id)}, {'title': 1, 'teacher_id': 1})
         if not course:
             return jsonify({'error': 'Course not found'}), 404
         
-        user = db.users.find_one({'_id': ObjectId(user_id)})
+        user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
         if user['role'] not in ['admin', 'teacher'] or (user['role'] == 'teacher' and course['teacher_id'] != user_id):
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get enrollments
-        enrollments = list(db.enrollments.find({'course_id': course_id}))
-        total_students = len(enrollments)
-        
-        # Get assignments
-        assignments = list(db.assignments.find({'course_id': course_id}))
-        assignment_ids = [str(assignment['_id']) for assignment in assignments]
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 20)), 1), COURSE_STUDENTS_MAX_PER_PAGE)
+        sort = request.args.get('sort', 'performance')
+        if sort not in COURSE_STUDENT_SORT_FIELDS:
+            return jsonify({'error': f"sort must be one of: {', '.join(COURSE_STUDENT_SORT_FIELDS)}"}), 400
+        descending = request.args.get('order', 'asc' if sort == 'name' else 'desc') != 'asc'
         
-        # Get submissions
-        submissions = list(db.submissions.find({'assignment_id': {'$in': assignment_ids}}))
-        
-
-        
-
-        
-        # Calculate engagement metrics
-        active_students = len(set([s['student_id'] for s in submissions]))
-        engagement_rate = (active_students / total_students * 100) if total_students > 0 else 0
+        # Every figure, including the student rows, comes from one course_stats snapshot
+        figures = course_stats.get_stats(db, [course_id], include_students=True)[course_id]
         
         # Assignment performance
         assignment_performance = []
-        for assignment in assignments:
-            assignment_submissions = [s for s in submissions if s['assignment_id'] == str(assignment['_id'])]
-            graded_submissions = [s for s in assignment_submissions if s.get('grade') is not None]
-            
-            if graded_submissions:
-                grades = [s['grade'] for s in graded_submissions]
-                avg_grade = sum(grades) / len(grades)
+        for assignment in db.assignments.find({'course_id': course_id}, {'title': 1}):
+            counts = figures.get('assignments', {}).get(str(assignment['_id']))
+            if counts and counts['graded']:
                 assignment_performance.append({
                     'assignment_title': assignment['title'],
-                    'submissions': len(assignment_submissions),
-                    'average_grade': round(avg_grade, 2),
-                    'submission_rate': round(len(assignment_submissions) / total_students * 100, 2) if total_students > 0 else 0
+                    'submissions': counts['submitted'],
+                    'average_grade': round(counts['grade_sum'] / counts['graded'], 2),
+                    'submission_rate': round(counts['submitted'] / figures['enrolled_students'] * 100, 2) if figures['enrolled_students'] else 0
                 })
         
-
-        
-        # Student progress distribution
-        progress_distribution = {
-            '0-25%': 0,
-            '26-50%': 0,
-            '51-75%': 0,
-            '76-100%': 0
-        }
-        
-        for enrollment in enrollments:
-            progress = enrollment.get('progress', 0)
-            if progress <= 25:
-                progress_distribution['0-25%'] += 1
-            elif progress <= 50:
-                progress_distribution['26-50%'] += 1
-            elif progress <= 75:
-                progress_distribution['51-75%'] += 1
-            else:
-                progress_distribution['76-100%'] += 1
-        
-        # Top performing students
-        student_performance = []
-        for enrollment in enrollments:
-            student = db.users.find_one({'_id': ObjectId(enrollment['student_id'])})
-            if student:
-                # Calculate student's performance in this course
-                student_submissions = [s for s in submissions if s['student_id'] == enrollment['student_id']]
-
-                
-                graded_submissions = [s for s in student_submissions if s.get('grade') is not None]
-                avg_assignment_grade = sum([s['grade'] for s in graded_submissions]) / len(graded_submissions) if graded_submissions else 0
-                
-                overall_score = avg_assignment_grade if graded_submissions else 0
-                
-                student_performance.append({
-                    'student_name': student['name'],
-                    'roll_no': student.get('roll_no', ''),
-                    'progress': enrollment.get('progress', 0),
-                    'assignments_submitted': len(student_submissions),
-
-                    'average_assignment_grade': round(avg_assignment_grade, 2),
-
-                    'overall_performance': round(overall_score, 2)
-                })
-        
-        # Sort by overall performance
-        student_performance.sort(key=lambda x: x['overall_performance'], reverse=True)
-        top_students = student_performance[:10]
+        items, top_students, total = course_student_table(db, figures, sort, descending, page, per_page)
         
         analytics_data = {
             'course_title': course['title'],
-            'total_students': total_students,
-            'active_students': active_students,
-            'engagement_rate': round(engagement_rate, 2),
-            'total_assignments': len(assignments),
+            'total_students': figures['enrolled_students'],
+            'active_students': figures['participating_students'],
+            'engagement_rate': figures['participation_rate'],
+            'total_assignments': figures['total_assignments'],
             'assignment_performance': assignment_performance,
-
-            'progress_distribution': progress_distribution,
-            'top_students': top_students
+            'progress_distribution': figures['progress_distribution'],
+            'distributions': figures['distributions'],
+            'top_students': top_students,
+            'students': {
+                'items': items,
+                'page': page,
+                'per_page': per_page,
+                'total': total,
+                'sort': sort,
+                'order': 'desc' if descending else 'asc'
+            },
+            'stats_freshness': course_stats.freshness(figures)
         }
         
         return jsonify({'analytics': analytics_data}), 200
@@ -550,10 +571,7 @@ def get_student_analytics(student_id):
                     'student_id': student_id
                 }))
                 
-                graded_submissions = [s for s in submissions if s.get('grade') is not None]
-                avg_assignment_grade = sum([s['grade'] for s in graded_submissions]) / len(graded_submissions) if graded_submissions else 0
-                
-
+                avg_assignment_grade = distributions.mean(s.get('grade') for s in submissions)
                 
                 course_performance.append({
                     'course_title': course['title'],
@@ -564,14 +582,17 @@ def get_student_analytics(student_id):
 
                 })
         
-        # Overall statistics
-        all_submissions = list(db.submissions.find({'student_id': student_id}))
-
-        
-        graded_submissions = [s for s in all_submissions if s.get('grade') is not None]
-        overall_assignment_avg = sum([s['grade'] for s in graded_submissions]) / len(graded_submissions) if graded_submissions else 0
-        
-
+        # Overall statistics (the distribution is in percent of each assignment's max_points)
+        all_submissions = list(db.submissions.find({'student_id': student_id}, {'grade': 1, 'assignment_id': 1, '_id': 0}))
+        grades = distributions.to_array(s.get('grade') for s in all_submissions)
+        graded_assignment_ids = {s['assignment_id'] for s in all_submissions if s.get('grade') is not None}
+        max_points = {
+            str(assignment['_id']): assignment.get('max_points')
+            for assignment in db.assignments.find(
+                {'_id': {'$in': [ObjectId(a) for a in graded_assignment_ids if ObjectId.is_valid(str(a))]}},
+                {'max_points': 1}
+            )
+        } if graded_assignment_ids else {}
         
         # Learning progress over time
         progress_timeline = []
@@ -594,8 +615,8 @@ def get_student_analytics(student_id):
             'courses_enrolled': len(enrollments),
             'assignments_submitted': len(all_submissions),
 
-            'overall_assignment_average': round(overall_assignment_avg, 2),
-
+            'overall_assignment_average': round(distributions.mean(grades), 2),
+            'grade_distribution': distributions.describe(distributions.grade_percentages(all_submissions, max_points)),
             'course_performance': course_performance,
             'progress_timeline': progress_timeline
         }
@@ -617,72 +638,18 @@ def get_system_analytics():
         if user['role'] != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
         
-        # Get date range
+        # Trends come from the daily_rollups collection (scripts/rollup_daily_stats.py)
         days = int(request.args.get('days', 30))
-        start_date = datetime.utcnow() - timedelta(days=days)
-        
-        # User registration trends
-        registration_pipeline = [
-            {'$match': {'created_at': {'$gte': start_date}}},
-            {'$group': {
-                '_id': {
-                    'year': {'$year': '$created_at'},
-                    'month': {'$month': '$created_at'},
-                    'day': {'$dayOfMonth': '$created_at'}
-                },
-                'count': {'$sum': 1}
-            }},
-            {'$sort': {'_id': 1}}
-        ]
-        
-        registration_trends = list(db.users.aggregate(registration_pipeline))
-        
-        # Course creation trends
-        course_pipeline = [
-            {'$match': {'created_at': {'$gte': start_date}}},
-            {'$group': {
-                '_id': {
-                    'year': {'$year': '$created_at'},
-                    'month': {'$month': '$created_at'},
-                    'day': {'$dayOfMonth': '$created_at'}
-                },
-                'count': {'$sum': 1}
-            }},
-            {'$sort': {'_id': 1}}
-        ]
-        
-        course_trends = list(db.courses.aggregate(course_pipeline))
-        
-        # Activity trends (submissions)
-        submission_pipeline = [
-            {'$match': {'submitted_at': {'$gte': start_date}}},
-            {'$group': {
-                '_id': {
-                    'year': {'$year': '$submitted_at'},
-                    'month': {'$month': '$submitted_at'},
-                    'day': {'$dayOfMonth': '$submitted_at'}
-                },
-                'count': {'$sum': 1}
-            }},
-            {'$sort': {'_id': 1}}
-        ]
-        
-        submission_trends = list(db.submissions.aggregate(submission_pipeline))
-        
-
+        rollups = daily_rollups.get_rollups(db, days)
         
         # System totals
         total_users = db.users.count_documents({})
         total_courses = db.courses.count_documents({})
         total_enrollments = db.enrollments.count_documents({})
         total_assignments = db.assignments.count_documents({})
-
         
-        # Active users (users who have activity in the last 7 days)
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        active_users = len(set(
-            [s['student_id'] for s in db.submissions.find({'submitted_at': {'$gte': seven_days_ago}})]
-        ))
+        # Active users (distinct submitters in the last 7 days) as of the latest rollup
+        active_users = rollups[-1]['active_users_7d'] if rollups else 0
         
         analytics_data = {
             'system_totals': {
@@ -690,15 +657,16 @@ def get_system_analytics():
                 'total_courses': total_courses,
                 'total_enrollments': total_enrollments,
                 'total_assignments': total_assignments,
-                'total_quizzes': total_quizzes,
                 'active_users_7_days': active_users
             },
             'trends': {
-                'user_registrations': registration_trends,
-                'course_creations': course_trends,
-                'assignment_submissions': submission_trends,
-                'quiz_attempts': quiz_trends
-            }
+                'user_registrations': daily_rollups.trend(rollups, 'registrations'),
+                'course_creations': daily_rollups.trend(rollups, 'course_creations'),
+                'assignment_submissions': daily_rollups.trend(rollups, 'submissions'),
+                'enrollments': daily_rollups.trend(rollups, 'enrollments'),
+                'active_users': daily_rollups.trend(rollups, 'active_users')
+            },
+            'rolled_up_through': daily_rollups.day_key(rollups[-1]['day']) if rollups else None
         }
         
         return jsonify({'analytics': analytics_data}), 200
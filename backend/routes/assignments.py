@@ -6,6 +6,7 @@ from werkzeug.utils import secure_filename
 import os
 
 from routes.notifications import create_notification
+from services import counters, course_stats, performance_snapshots
 from utils.validation import (
     validate_assignment_data,
     validate_grade_data,
@@ -74,13 +75,10 @@ def get_assignments():
             course_ids = [str(course['_id']) for course in courses]
             assignments = list(db.assignments.find({'course_id': {'$in': course_ids}}))
             
-            # Add submission count for each assignment
+            # Submission counts are maintained on the assignment document
             for assignment in assignments:
+                counters.ensure_assignment_counters(db, assignment)
                 assignment['_id'] = str(assignment['_id'])
-                submission_count = db.submissions.count_documents({
-                    'assignment_id': str(assignment['_id'])
-                })
-                assignment['submission_count'] = submission_count
                 
                 # Get course info
                 course = db.courses.find_one({'_id': ObjectId(assignment['course_id'])})
@@ -205,6 +203,7 @@ def create_assignment():
             'allowed_file_types': validated_data.get('allowed_file_types', []),
             'max_file_size': validated_data.get('max_file_size', 10),
             'is_active': True,
+            **counters.initial_assignment_counters(),
             'created_by': user_id,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
@@ -212,6 +211,8 @@ def create_assignment():
         
         result = db.assignments.insert_one(assignment_data)
         assignment_data['_id'] = str(result.inserted_id)
+        performance_snapshots.mark_course_stale(db, validated_data['course_id'])
+        course_stats.mark_dirty(db, validated_data['course_id'])
         
         # Send email notification to enrolled students (async, don't block)
         try:
@@ -290,6 +291,8 @@ def update_assignment(assignment_id):
             {'_id': ObjectId(assignment_id)},
             {'$set': update_data}
         )
+        if due_date_changed:
+            performance_snapshots.mark_course_stale(db, assignment['course_id'])
         
         # Get updated assignment
         updated_assignment = db.assignments.find_one({'_id': ObjectId(assignment_id)})
@@ -394,6 +397,9 @@ def submit_assignment(assignment_id):
         
         result = db.submissions.insert_one(submission_data)
         submission_data['_id'] = str(result.inserted_id)
+        performance_snapshots.record_submission(db, user_id, assignment_id, submission_data['submitted_at'])
+        counters.record_submission(db, assignment_id)
+        course_stats.mark_dirty(db, assignment['course_id'])
         
         # Send notification to teacher
         try:
@@ -458,6 +464,8 @@ def delete_assignment(assignment_id):
         
         # Delete the assignment
         db.assignments.delete_one({'_id': ObjectId(assignment_id)})
+        performance_snapshots.mark_course_stale(db, assignment['course_id'])
+        course_stats.mark_dirty(db, assignment['course_id'])
         
         # Send notification to course participants (async, don't block on failure)
         try:
@@ -541,10 +549,16 @@ def grade_submission(submission_id):
             'graded_by': user_id
         }
         
-        db.submissions.update_one(
+        previous = db.submissions.find_one_and_update(
             {'_id': ObjectId(submission_id)},
-            {'$set': update_data}
+            {'$set': update_data},
+            projection={'grade': 1}
+        )
+        performance_snapshots.record_grade(
+            db, submission['student_id'], submission['assignment_id'], validated_data['grade']
         )
+        counters.record_grade(db, submission['assignment_id'], (previous or {}).get('grade'))
+        course_stats.mark_dirty(db, assignment['course_id'])
         
         # Update student's total points
         db.users.update_one(
@@ -6,6 +6,7 @@ import os
 import uuid
 from werkzeug.utils import secure_filename
 from routes.notifications import create_notification
+from services import chat_context, counters, course_recommender, course_stats, material_index, performance_snapshots
 from utils.validation import (
     validate_course_data,
     validate_material_data,
@@ -61,6 +62,7 @@ def get_courses():
         
         # Get courses
         courses = list(db.courses.find(query))
+        all_stats = course_stats.get_stats(db, [course['_id'] for course in courses])
         
         # Convert ObjectId to string and add teacher info
         for course in courses:
@@ -77,81 +79,18 @@ def get_courses():
                 course['teacher_name'] = teacher['name']
                 course['teacher_email'] = teacher['email']
             
-            # Get enrollment statistics
-            enrollments = list(db.enrollments.find({'course_id': str(course['_id'])}))
-            course['enrolled_students'] = len(enrollments)
+            # Enrollments come from the course's counter, other statistics from the course_stats store
+            course['enrolled_students'] = counters.ensure_course_counters(
+                db, course, ('enrollment_count',)
+            )['enrollment_count']
+            stats = all_stats.get(course['_id'], {})
+            course['stats_freshness'] = course_stats.freshness(stats)
             
-            # Calculate enrollment statistics and student progress data
-            if user['role'] == 'teacher' and enrollments:
-                # Calculate average progress
-                total_progress = sum([e.get('progress', 0) for e in enrollments])
-                course['average_progress'] = round(total_progress / len(enrollments), 2) if enrollments else 0
-                
-                # Calculate active students (students with recent activity)
-                seven_days_ago = datetime.utcnow() - timedelta(days=7)
-                active_students = 0
-                
-                # Get assignments for this course
-                assignments = list(db.assignments.find({'course_id': str(course['_id'])}))
-                assignment_ids = [str(a['_id']) for a in assignments]
-                
-                if assignment_ids:
-                    # Count students with recent submissions
-                    recent_submissions = db.submissions.find({
-                        'assignment_id': {'$in': assignment_ids},
-                        'submitted_at': {'$gte': seven_days_ago}
-                    })
-                    active_student_ids = set([s['student_id'] for s in recent_submissions])
-                    active_students = len(active_student_ids)
-                
-                course['active_students'] = active_students
-                course['engagement_rate'] = round((active_students / len(enrollments)) * 100, 2) if enrollments else 0
-                
-                # Calculate completion rate
-                completed_students = len([e for e in enrollments if e.get('progress', 0) >= 100])
-                course['completion_rate'] = round((completed_students / len(enrollments)) * 100, 2) if enrollments else 0
-                
-                # Get assignment statistics
-                course['total_assignments'] = len(assignments)
-                
-                if assignment_ids:
-                    total_submissions = db.submissions.count_documents({'assignment_id': {'$in': assignment_ids}})
-                    graded_submissions = db.submissions.count_documents({
-                        'assignment_id': {'$in': assignment_ids},
-                        'grade': {'$ne': None}
-                    })
-                    pending_submissions = db.submissions.count_documents({
-                        'assignment_id': {'$in': assignment_ids},
-                        'grade': None
-                    })
-                    
-                    course['total_submissions'] = total_submissions
-                    course['graded_submissions'] = graded_submissions
-                    course['pending_submissions'] = pending_submissions
-                    
-                    # Calculate average grade
-                    graded_subs = list(db.submissions.find({
-                        'assignment_id': {'$in': assignment_ids},
-                        'grade': {'$ne': None}
-                    }))
-                    if graded_subs:
-                        avg_grade = sum([s['grade'] for s in graded_subs]) / len(graded_subs)
-                        course['average_grade'] = round(avg_grade, 2)
-                    else:
-                        course['average_grade'] = 0
-                else:
-                    course['total_submissions'] = 0
-                    course['graded_submissions'] = 0
-                    course['pending_submissions'] = 0
-                    course['average_grade'] = 0
-                
-                # Student engagement metrics
-                course['student_performance'] = {
-                    'excellent': len([e for e in enrollments if e.get('progress', 0) >= 90]),
-                    'good': len([e for e in enrollments if 70 <= e.get('progress', 0) < 90]),
-                    'average': len([e for e in enrollments if 50 <= e.get('progress', 0) < 70]),
-                    'needs_improvement': len([e for e in enrollments if e.get('progress', 0) < 50])
-                }
+            if user['role'] == 'teacher' and course['enrolled_students']:
+                for field in ('average_progress', 'active_students', 'engagement_rate', 'completion_rate',
+                              'total_assignments', 'total_submissions', 'graded_submissions',
+                              'pending_submissions', 'average_grade', 'student_performance'):
+                    course[field] = stats.get(field, 0)
             
             # Check if current user is enrolled (for students)
             if user['role'] == 'student':
@@ -296,18 +235,21 @@ def create_course():
             'is_active': True,
             'is_public': validated_data.get('is_public', True),
             'max_students': validated_data.get('max_students', 0),  # 0 means unlimited
+            **counters.initial_course_counters(),
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow()
         }
         
         result = db.courses.insert_one(course_data)
         course_id = str(result.inserted_id)
+        course_recommender.get_recommender().mark_dirty()
         
         # Process modules and create materials
         # Requirement 5.2: Store module metadata (title, order, description) to the database
         # Requirement 5.3: Store material metadata (type, filename, file_path, title) to the database
         # Requirement 3.4: Store video_id in content field and set type to 'video'
         modules = data.get('modules', [])
+        materials_added = required_added = 0
         for module_index, module in enumerate(modules):
             # Create module record with metadata
             module_data = {
@@ -345,6 +287,11 @@ def create_course():
                         'created_at': datetime.utcnow()
                     }
                     db.materials.insert_one(material_data)
+                    materials_added += 1
+                    required_added += 1 if material_data['is_required'] else 0
+        if modules:
+            material_index.mark_stale(course_id)
+        counters.record_materials(db, course_id, materials_added, required_added)
         
         # Update teacher's courses_created list
         db.users.update_one(
@@ -398,6 +345,7 @@ def update_course(course_id):
             {'_id': ObjectId(course_id)},
             {'$set': update_data}
         )
+        course_recommender.get_recommender().mark_dirty()
         
         # Get updated course
         updated_course = db.courses.find_one({'_id': ObjectId(course_id)})
@@ -441,8 +389,8 @@ def enroll_course(course_id):
         
         # Check max students limit
         if course.get('max_students', 0) > 0:
-            current_enrollments = db.enrollments.count_documents({'course_id': course_id})
-            if current_enrollments >= course['max_students']:
+            enrolled = counters.ensure_course_counters(db, course, ('enrollment_count',))['enrollment_count']
+            if enrolled >= course['max_students']:
                 return jsonify({'error': 'Course is full'}), 400
         
         # Create enrollment
@@ -458,6 +406,12 @@ def enroll_course(course_id):
         }
         
         db.enrollments.insert_one(enrollment_data)
+        performance_snapshots.record_enrollment(
+            db, user_id, course_id, course.get('title'), enrollment_data['enrolled_at']
+        )
+        counters.record_enrollment(db, course_id)
+        course_stats.mark_dirty(db, course_id)
+        chat_context.invalidate_course_context(user_id)
         
         # Update user's enrolled courses
         db.users.update_one(
@@ -503,6 +457,10 @@ def unenroll_course(course_id):
             'course_id': course_id,
             'student_id': user_id
         })
+        performance_snapshots.record_unenrollment(db, user_id, course_id)
+        counters.record_enrollment(db, course_id, -1)
+        course_stats.mark_dirty(db, course_id)
+        chat_context.invalidate_course_context(user_id)
         
         # Update user's enrolled courses
         db.users.update_one(
@@ -580,6 +538,8 @@ def upload_video(course_id):
         result = db.materials.insert_one(video_data)
         video_data['_id'] = str(result.inserted_id)
         video_data['material_id'] = str(result.inserted_id)
+        material_index.mark_stale(course_id)
+        counters.record_material(db, course_id, video_data['is_required'])
         
         # Notify enrolled students
         enrollments = db.enrollments.find({'course_id': course_id})
@@ -880,6 +840,8 @@ def upload_material(course_id):
         
         result = db.materials.insert_one(material_data)
         material_data['_id'] = str(result.inserted_id)
+        material_index.mark_stale(course_id)
+        counters.record_material(db, course_id, material_data['is_required'])
         
         return jsonify({
             'message': 'Material uploaded successfully',
@@ -929,7 +891,12 @@ def update_progress(course_id):
             )
         
         # Calculate overall progress
-        total_materials = db.materials.count_documents({'course_id': course_id, 'is_required': True})
+        course = db.courses.find_one({'_id': ObjectId(course_id)}, {'required_material_count': 1})
+        total_materials = 0
+        if course:
+            total_materials = counters.ensure_course_counters(
+                db, course, ('required_material_count',)
+            )['required_material_count']
         completed_materials = len(enrollment.get('completed_materials', []))
         
         if total_materials > 0:
@@ -938,6 +905,8 @@ def update_progress(course_id):
                 {'_id': enrollment['_id']},
                 {'$set': {'progress': round(progress, 2)}}
             )
+            performance_snapshots.record_progress(db, user_id, course_id, round(progress, 2))
+            course_stats.mark_dirty(db, course_id)
         
         # Track video watch time
         if watch_time > 0:
@@ -982,6 +951,7 @@ def delete_course(course_id):
             {'_id': ObjectId(course_id)},
             {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}}
         )
+        course_recommender.get_recommender().mark_dirty()
         
         # Notify enrolled students about course deletion
         enrollments = list(db.enrollments.find({'course_id': course_id}))
@@ -1127,6 +1097,8 @@ def add_youtube_video(course_id):
         result = db.materials.insert_one(video_data)
         video_data['_id'] = str(result.inserted_id)
         video_data['material_id'] = str(result.inserted_id)
+        material_index.mark_stale(course_id)
+        counters.record_material(db, course_id, video_data['is_required'])
         
         # Notify enrolled students
         enrollments = db.enrollments.find({'course_id': course_id})
@@ -11,6 +11,7 @@ import threading
 from typing import Dict, List, Optional
 
 from routes.notifications import create_notification
+from services import counters, course_stats, performance_snapshots
 from utils.validation import ValidationError
 
 grading_bp = Blueprint('grading', __name__)
@@ -216,10 +217,16 @@ def grade_submission_enhanced(submission_id):
         previous_grade = submission.get('grade')
         
         # Update submission
-        db.submissions.update_one(
+        previous = db.submissions.find_one_and_update(
             {'_id': ObjectId(submission_id)},
-            {'$set': update_data}
+            {'$set': update_data},
+            projection={'grade': 1}
+        )
+        performance_snapshots.record_grade(
+            db, submission['student_id'], submission['assignment_id'], final_grade
         )
+        counters.record_grade(db, submission['assignment_id'], (previous or {}).get('grade'))
+        course_stats.mark_dirty(db, assignment['course_id'])
         
         # Create audit log
         audit_details = {
@@ -2,7 +2,8 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from datetime import datetime, timedelta
-import statistics
+
+from services import distributions
 
 learner_analytics_bp = Blueprint('learner_analytics', __name__)
 
@@ -17,29 +18,25 @@ def calculate_student_performance_score(student_data, course_id=None):
     student_id = str(student_data['_id'])
     
     # Assignment performance (60% weight)
-    assignment_scores = []
-    assignment_filter = {'student_id': student_id}
+    assignment_filter = {'student_id': student_id, 'grade': {'$ne': None}}
     if course_id:
         assignment_filter['course_id'] = course_id
     
-    submissions = list(current_app.db.submissions.find(assignment_filter))
-    if submissions:
-        graded_submissions = [sub for sub in submissions if sub.get('grade') is not None]
-        if graded_submissions:
-            assignment_scores = [sub['grade'] for sub in graded_submissions]
-            avg_assignment_score = statistics.mean(assignment_scores)
-            score_components.append(('assignment', avg_assignment_score, 0.6))
+    assignment_scores = distributions.load_column(current_app.db.submissions, assignment_filter, 'grade')
+    if assignment_scores.size:
+        score_components.append(('assignment', distributions.mean(assignment_scores), 0.6))
     
     # Course progress (40% weight)
     enrollment_filter = {'student_id': student_id}
     if course_id:
         enrollment_filter['course_id'] = course_id
     
-    enrollments = list(current_app.db.enrollments.find(enrollment_filter))
-    if enrollments:
-        progress_scores = [enrollment.get('progress', 0) for enrollment in enrollments]
-        avg_progress = statistics.mean(progress_scores)
-        score_components.append(('progress', avg_progress, 0.4))
+    progress_scores = [
+        enrollment.get('progress', 0) or 0
+        for enrollment in current_app.db.enrollments.find(enrollment_filter, {'progress': 1, '_id': 0})
+    ]
+    if progress_scores:
+        score_components.append(('progress', distributions.mean(progress_scores), 0.4))
     
     # Calculate weighted average
     if not score_components:
@@ -83,7 +80,7 @@ def get_learning_pace(student_data, course_id=None):
     if not progress_rates:
         return 'unknown'
     
-    avg_progress_rate = statistics.mean(progress_rates)
+    avg_progress_rate = distributions.mean(progress_rates)
     avg_progress = total_progress / len(enrollments)
     
     # Get submission frequency and performance
@@ -94,10 +91,10 @@ def get_learning_pace(student_data, course_id=None):
     
     submission_frequency = len(recent_submissions) / 30  # submissions per day
     
-    # Get all submissions for grade analysis
-    all_submissions = list(db.submissions.find({'student_id': student_id}))
-    graded_submissions = [sub for sub in all_submissions if sub.get('grade') is not None]
-    avg_grade = statistics.mean([sub['grade'] for sub in graded_submissions]) if graded_submissions else 0
+    # Grades of all graded submissions
+    avg_grade = distributions.mean(
+        distributions.load_column(db.submissions, {'student_id': student_id, 'grade': {'$ne': None}}, 'grade')
+    )
     
     # More balanced classification logic
     # Fast learners: High progress OR good grades with activity OR high submission rate
@@ -279,11 +276,13 @@ def get_performance_analysis():
         
         # Generate summary statistics
         total_students = len(student_analysis)
+        performance = distributions.describe([s['performance_score'] for s in student_analysis])
         summary = {
             'total_students': total_students,
             'slow_learners_count': len(slow_learners),
             'fast_learners_count': len(fast_learners),
-            'average_performance': round(statistics.mean([s['performance_score'] for s in student_analysis]) if student_analysis else 0, 2),
+            'average_performance': performance['summary']['mean'],
+            'performance_distribution': performance,
             'students_at_risk': len([s for s in student_analysis if s['risk_level'] == 'high']),
             'inactive_students': len([s for s in student_analysis if s['days_since_login'] > 7])
         }
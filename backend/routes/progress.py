@@ -4,6 +4,7 @@ from bson import ObjectId
 from datetime import datetime
 from utils.api_response import error_response, success_response, prepare_api_response
 from utils.case_converter import convert_dict_keys_to_camel
+from services import counters, course_stats, performance_snapshots
 
 progress_bp = Blueprint('progress', __name__)
 
@@ -141,6 +142,8 @@ def start_course(course_id):
                     }
                 }
             )
+            performance_snapshots.record_progress(db, user_id, course_id, 0)
+            course_stats.mark_dirty(db, course_id)
             
             return success_response('Progress initialized', {'progress': progress_data}, 201)
         
@@ -176,7 +179,7 @@ def get_course_video_statistics(course_id):
         }))
         
         # Get enrolled students count
-        enrolled_students = db.enrollments.count_documents({'course_id': course_id})
+        enrolled_students = counters.ensure_course_counters(db, course, ('enrollment_count',))['enrollment_count']
         
         # Calculate statistics for each video
         video_stats = []
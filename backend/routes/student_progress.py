@@ -3,6 +3,8 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson import ObjectId
 from datetime import datetime, timedelta
 
+from services import counters, course_stats, distributions
+
 student_progress_bp = Blueprint('student_progress', __name__)
 
 @student_progress_bp.route('/teacher/students', methods=['GET'])
@@ -84,7 +86,7 @@ def get_teacher_students_progress():
                 'enrolled_at': enrollment['enrolled_at'],
                 'progress': enrollment.get('progress', 0),
                 'completed_materials': len(enrollment.get('completed_materials', [])),
-                'total_materials': db.materials.count_documents({'course_id': enrollment['course_id']}),
+                'total_materials': counters.ensure_course_counters(db, course, ('material_count',))['material_count'],
                 'assignments_submitted': len(submissions),
                 'total_assignments': len(assignments),
                 'average_grade': round(avg_grade, 2),
@@ -259,6 +261,28 @@ def get_student_detailed_progress(student_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def course_progress_row(entry, student, figures):
+    """Progress row for one enrolled student from their stored course_stats counters"""
+    total_materials = figures.get('total_materials', 0)
+    total_assignments = figures.get('total_assignments', 0)
+    average_grade = entry['grade_sum'] / entry['graded'] if entry['graded'] else 0
+    return {
+        'student_id': entry['student_id'],
+        'student_name': student['name'],
+        'student_email': student['email'],
+        'roll_no': student.get('roll_no', ''),
+        'enrolled_at': entry.get('enrolled_at'),
+        'overall_progress': entry.get('progress', 0),
+        'material_completion': round(entry['completed_materials'] / total_materials * 100, 2) if total_materials else 0,
+        'assignment_completion': round(entry['submitted'] / total_assignments * 100, 2) if total_assignments else 0,
+        'assignments_submitted': entry['submitted'],
+        'assignments_graded': entry['graded'],
+        'average_grade': round(average_grade, 2),
+        'recent_activity_count': entry['recent'],
+        'last_activity': entry.get('last_submitted_at') or entry.get('enrolled_at'),
+        'is_active': entry.get('is_active', True)
+    }
+
 @student_progress_bp.route('/teacher/course/<course_id>/progress', methods=['GET'])
 @jwt_required()
 def get_course_students_progress(course_id):
@@ -279,75 +303,47 @@ def get_course_students_progress(course_id):
         if course['teacher_id'] != user_id:
             return jsonify({'error': 'Access denied'}), 403
         
-        # Get all enrollments for this course
-        enrollments = list(db.enrollments.find({'course_id': course_id}))
-        
-        # Get course materials and assignments
-        materials = list(db.materials.find({'course_id': course_id}))
-        assignments = list(db.assignments.find({'course_id': course_id}))
-        assignment_ids = [str(a['_id']) for a in assignments]
-        
-        # Build student progress data
-        students_progress = []
-        
-        for enrollment in enrollments:
-            student_id = enrollment['student_id']
-            student = db.users.find_one({'_id': ObjectId(student_id)})
-            
-            if not student:
-                continue
-            
-            # Get student's submissions
-            submissions = list(db.submissions.find({
-                'assignment_id': {'$in': assignment_ids},
-                'student_id': student_id
-            }))
-            
-            # Calculate metrics
-            graded_submissions = [s for s in submissions if s.get('grade') is not None]
-            avg_grade = sum([s['grade'] for s in graded_submissions]) / len(graded_submissions) if graded_submissions else 0
-            
-            # Get recent activity
-            seven_days_ago = datetime.utcnow() - timedelta(days=7)
-            recent_activity = len([s for s in submissions if s.get('submitted_at', datetime.min) >= seven_days_ago])
-            
-            # Calculate engagement metrics
-            material_completion = (len(enrollment.get('completed_materials', [])) / len(materials) * 100) if materials else 0
-            assignment_completion = (len(submissions) / len(assignments) * 100) if assignments else 0
-            
-            students_progress.append({
-                'student_id': student_id,
-                'student_name': student['name'],
-                'student_email': student['email'],
-                'roll_no': student.get('roll_no', ''),
-                'enrolled_at': enrollment['enrolled_at'],
-                'overall_progress': enrollment.get('progress', 0),
-                'material_completion': round(material_completion, 2),
-                'assignment_completion': round(assignment_completion, 2),
-                'assignments_submitted': len(submissions),
-                'assignments_graded': len(graded_submissions),
-                'average_grade': round(avg_grade, 2),
-                'recent_activity_count': recent_activity,
-                'last_activity': submissions[-1]['submitted_at'] if submissions else enrollment.get('enrolled_at'),
-                'is_active': enrollment.get('is_active', True)
-            })
-        
+        # Course figures and per-student rows come from the same course_stats snapshot
+        figures = course_stats.get_stats(db, [course_id], include_students=True)[course_id]
+        entries = figures.get('students', [])
+        students = {
+            str(student['_id']): student
+            for student in db.users.find(
+                {'_id': {'$in': [ObjectId(entry['student_id']) for entry in entries if ObjectId.is_valid(entry['student_id'])]}},
+                {'name': 1, 'email': 1, 'roll_no': 1}
+            )
+        }
+        students_progress = [
+            course_progress_row(entry, students[entry['student_id']], figures)
+            for entry in entries if entry['student_id'] in students
+        ]
         students_progress.sort(key=lambda x: x['overall_progress'])
         
-        # Calculate course-wide statistics
-        course_stats = {
-            'total_students': len(students_progress),
-            'average_progress': round(sum([s['overall_progress'] for s in students_progress]) / len(students_progress), 2) if students_progress else 0,
-            'average_grade': round(sum([s['average_grade'] for s in students_progress if s['average_grade'] > 0]) / len([s for s in students_progress if s['average_grade'] > 0]), 2) if any(s['average_grade'] > 0 for s in students_progress) else 0,
-            'active_students': len([s for s in students_progress if s['recent_activity_count'] > 0]),
-            'struggling_students': len([s for s in students_progress if s['overall_progress'] < 30]),
-            'excelling_students': len([s for s in students_progress if s['overall_progress'] >= 80])
+        statistics = {
+            'total_students': figures['enrolled_students'],
+            'average_progress': figures['average_progress'],
+            'average_grade': figures['average_student_grade'],
+            'active_students': figures['active_students'],
+            'struggling_students': figures['struggling_students'],
+            'excelling_students': figures['excelling_students']
+        }
+        
+        # Stored spread of progress and grades (percent of max_points), live total watch time per student
+        watch_totals = db.video_progress.aggregate([
+            {'$match': {'course_id': course_id}},
+            {'$group': {'_id': '$student_id', 'total': {'$sum': '$watch_time'}}}
+        ])
+        course_distributions = {
+            **figures['distributions'],
+            'watch_time': distributions.describe((group['total'] for group in watch_totals), edges=None)
         }
         
         return jsonify({
             'course_id': course_id,
             'course_title': course['title'],
-            'statistics': course_stats,
+            'statistics': statistics,
+            'distributions': course_distributions,
+            'stats_freshness': course_stats.freshness(figures),
             'students': students_progress
         }), 200
         
@@ -7,6 +7,7 @@ from datetime import datetime
 from typing import Any, Dict
 from utils.api_response import error_response, success_response, prepare_api_response
 from utils.case_converter import convert_dict_keys_to_camel
+from services import admin_overview, counters
 
 users_bp = Blueprint('users', __name__)
 
@@ -133,7 +134,7 @@ def get_user(target_user_id):
             courses = list(db.courses.find({'teacher_id': target_user_id}))
             created_courses = []
             for c in courses:
-                enrollment_count = db.enrollments.count_documents({'course_id': str(c['_id'])})
+                enrollment_count = counters.ensure_course_counters(db, c, ('enrollment_count',))['enrollment_count']
                 created_courses.append({
                     'course_id': str(c['_id']),
                     'title': c.get('title'),
@@ -196,6 +197,7 @@ def update_user(target_user_id):
         update_data['updated_at'] = datetime.utcnow()
 
         db.users.update_one({'_id': target_oid}, {'$set': update_data})
+        admin_overview.invalidate()
 
         updated = db.users.find_one({'_id': target_oid})
         return jsonify({'message': 'User updated successfully', 'user': serialize_user(updated)}), 200
@@ -226,6 +228,7 @@ def deactivate_user(target_user_id):
             return jsonify({'error': 'User not found'}), 404
 
         db.users.update_one({'_id': target_oid}, {'$set': {'is_active': False, 'updated_at': datetime.utcnow()}})
+        admin_overview.invalidate()
         return jsonify({'message': 'User deactivated successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -251,6 +254,7 @@ def activate_user(target_user_id):
             return jsonify({'error': 'User not found'}), 404
 
         db.users.update_one({'_id': target_oid}, {'$set': {'is_active': True, 'updated_at': datetime.utcnow()}})
+        admin_overview.invalidate()
         return jsonify({'message': 'User activated successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -362,6 +366,7 @@ def create_user():
             })
 
         result = db.users.insert_one(new_user)
+        admin_overview.invalidate()
         new_user['_id'] = str(result.inserted_id)
         new_user.pop('password', None)
 
@@ -453,6 +458,8 @@ def bulk_import_users():
                 errors.append(f'Row {i}: {str(e)}')
                 continue
 
+        if created_users:
+            admin_overview.invalidate()
         return jsonify({
             'message': f'Bulk import completed. {len(created_users)} users created.',
             'created_users': created_users,
@@ -473,32 +480,17 @@ def get_user_statistics():
         if not me or me.get('role') != 'admin':
             return jsonify({'error': 'Admin access required'}), 403
 
-        total_users = db.users.count_documents({})
-        active_users = db.users.count_documents({'is_active': True})
-        students = db.users.count_documents({'role': 'student'})
-        teachers = db.users.count_documents({'role': 'teacher'})
-        admins = db.users.count_documents({'role': 'admin'})
-
-        # Recent registrations (from month start)
-        month_start = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        recent_registrations = db.users.count_documents({'created_at': {'$gte': month_start}})
-
-        pipeline = [
-            {'$match': {'role': {'$in': ['student', 'teacher']}}},
-            {'$group': {'_id': '$department', 'count': {'$sum': 1}}},
-            {'$sort': {'count': -1}},
-        ]
-        department_stats = list(db.users.aggregate(pipeline))
-
+        overview = admin_overview.get_overview(db)
         return jsonify({
-            'total_users': total_users,
-            'active_users': active_users,
-            'inactive_users': total_users - active_users,
-            'students': students,
-            'teachers': teachers,
-            'admins': admins,
-            'recent_registrations': recent_registrations,
-            'department_distribution': department_stats,
+            'total_users': overview['total_users'],
+            'active_users': overview['active_users'],
+            'inactive_users': overview['inactive_users'],
+            'students': overview['students'],
+            'teachers': overview['teachers'],
+            'admins': overview['admins'],
+            # Counted from the start of the month
+            'recent_registrations': overview['registrations_this_month'],
+            'department_distribution': overview['department_distribution'],
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -528,6 +520,7 @@ def delete_user(target_user_id):
 
         result = db.users.delete_one({'_id': target_oid})
         if result.deleted_count == 1:
+            admin_overview.invalidate()
             return jsonify({'message': 'User deleted successfully'}), 200
         return jsonify({'error': 'Failed to delete user'}), 500
     except Exception as e:
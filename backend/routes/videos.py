@@ -15,6 +15,7 @@ from utils.file_logger import (
 )
 from utils.case_converter import convert_dict_keys_to_camel
 from utils.api_response import error_response, success_response
+from services import counters, course_stats, material_index, performance_snapshots
 
 videos_bp = Blueprint('videos', __name__)
 
@@ -540,7 +541,15 @@ def delete_video(video_id):
         db.videos.delete_one({'_id': ObjectId(video_id)})
         
         # Remove references from materials collection
+        removed = list(db.materials.find({'content': video_id, 'type': 'video'}, {'course_id': 1, 'is_required': 1}))
         db.materials.delete_many({'content': video_id, 'type': 'video'})
+        for course_id in {material['course_id'] for material in removed}:
+            material_index.mark_stale(course_id)
+            course_materials = [material for material in removed if material['course_id'] == course_id]
+            counters.record_materials(
+                db, course_id, -len(course_materials),
+                -sum(1 for material in course_materials if material.get('is_required'))
+            )
         
         return success_response('Video deleted successfully', status_code=200)
         
@@ -801,6 +810,8 @@ def _update_course_progress(db, student_id, course_id):
                 }
             }
         )
+        performance_snapshots.record_progress(db, student_id, course_id, round(overall_progress, 2))
+        course_stats.mark_dirty(db, course_id)
         
     except Exception as e:
         current_app.logger.error(f"Error updating course progress: {str(e)}")
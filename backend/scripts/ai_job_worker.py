@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Background worker for queued AI jobs (document summaries and learning paths).
+
+Claims jobs from the summaries collection and runs them on a process pool,
+retrying failed attempts with backoff. Run one or more of these next to the
+web workers.
+
+Usage:
+    python backend/scripts/ai_job_worker.py
+    python backend/scripts/ai_job_worker.py --processes 4
+    python backend/scripts/ai_job_worker.py --once      # drain the queue and exit
+"""
+
+import argparse
+import os
+import sys
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.ai_jobs import run_worker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Run queued AI jobs')
+    parser.add_argument('--processes', type=int, default=int(os.getenv('AI_JOB_WORKER_PROCESSES', '2')),
+                        help='Number of worker processes (jobs in flight)')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds to wait when the queue is empty')
+    parser.add_argument('--once', action='store_true', help='Exit once the queue is drained')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  AI Job Worker")
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+    print(f"Processes: {args.processes}")
+
+    try:
+        run_worker(db, mongo_uri, db.name, processes=args.processes,
+                   poll_interval=args.poll_interval, once=args.once)
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Worker stopped by user")
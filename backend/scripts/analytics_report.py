@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Run a group-by report over the Parquet analytics export (no database access).
+
+Usage:
+    python backend/scripts/analytics_report.py submissions --group-by course_id \\
+        --agg grade:mean --agg grade:count --where status==graded
+    python backend/scripts/analytics_report.py video_progress --group-by student_id \\
+        --agg watch_time:sum --date 2024-05-01
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.analytics_export import TABLES
+from services.analytics_query import group_by
+
+CONDITION = re.compile(r'^(\w+)(==|!=|<=|>=|<|>)(.*)$')
+
+
+def parse_condition(text):
+    """'column<op>value' -> (column, op, value); numeric values become floats"""
+    match = CONDITION.match(text)
+    if not match:
+        raise argparse.ArgumentTypeError(f"Invalid condition {text!r}; expected column<op>value")
+    column, op, value = match.groups()
+    try:
+        value = float(value)
+    except ValueError:
+        pass
+    return column, op, value
+
+
+def parse_aggregation(text):
+    column, _, function = text.partition(':')
+    if not column or not function:
+        raise argparse.ArgumentTypeError(f"Invalid aggregation {text!r}; expected column:function")
+    return column, function
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Group-by report over the analytics export')
+    parser.add_argument('collection', choices=sorted(TABLES))
+    parser.add_argument('--group-by', action='append', required=True, help='Grouping column (repeatable)')
+    parser.add_argument('--agg', action='append', type=parse_aggregation, required=True,
+                        help='column:function, e.g. grade:mean (repeatable)')
+    parser.add_argument('--where', action='append', type=parse_condition, default=[],
+                        help='Filter column<op>value, e.g. status==graded (repeatable)')
+    parser.add_argument('--date', help='Export snapshot to read (default: latest)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    aggregations = {}
+    for column, function in args.agg:
+        aggregations.setdefault(column, []).append(function)
+
+    try:
+        rows = group_by(args.collection, args.group_by, aggregations, filters=args.where, export_date=args.date)
+        print(json.dumps(rows, indent=2, default=str))
+        return 0
+    except Exception as e:
+        print(f"❌ Error running report: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Report interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark for the AI endpoints.
+
+Drives /api/ai/chat, /api/ai/summarize and /api/ai/learning-path through the
+Flask app in-process with many concurrent clients, and reports p50/p95/p99
+latency, status codes and how saturated the AI client was. By default it
+uses the offline fake provider, so no network access or API key is needed
+and results are repeatable:
+
+    python backend/scripts/benchmark_ai.py --requests 300 --concurrency 16
+    python backend/scripts/benchmark_ai.py --endpoints chat --stream --latency-ms 800
+    python backend/scripts/benchmark_ai.py --provider gemini --requests 20
+
+Summary and learning-path jobs are claimed and run by in-process job
+threads (--job-workers), and their latency is measured from submission to
+completion. Benchmark users are named benchmark.student<N>@edunexa.local;
+their chat history and jobs are removed afterwards unless --keep-data is given.
+Point MONGO_URI at a development database: benchmark traffic goes through the
+real routes and writes to the same collections.
+"""
+
+import argparse
+import os
+import sys
+import time
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+ENDPOINTS = ['chat', 'summarize', 'learning-path']
+CHAT_TYPES = ['general', 'explain', 'qa', 'summarize']
+TOPICS = [
+    'recursion', 'binary search', 'normalization', 'gradient descent', 'TCP handshake',
+    'linked lists', 'big O notation', 'SQL joins', 'photosynthesis', 'supply and demand'
+]
+BENCH_EMAIL = 'benchmark.student{index}@edunexa.local'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the AI endpoints')
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS),
+                        help='Comma-separated subset of: ' + ', '.join(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--users', type=int, default=0,
+                        help='Distinct benchmark users (default: one per client)')
+    parser.add_argument('--stream', action='store_true', help='Request streamed chat answers')
+    parser.add_argument('--distinct', type=int, default=len(TOPICS),
+                        help='Distinct topics per chat type (lower = more cache hits)')
+    parser.add_argument('--doc-words', type=int, default=3000, help='Words per document to summarize')
+    parser.add_argument('--job-workers', type=int, default=4, help='In-process job runner threads')
+    parser.add_argument('--job-timeout', type=float, default=120.0, help='Seconds to wait for a job')
+    parser.add_argument('--provider', choices=['fake', 'gemini'], default='fake')
+    parser.add_argument('--latency-ms', type=float, help='Fake provider time to first token')
+    parser.add_argument('--ms-per-token', type=float, help='Fake provider generation speed')
+    parser.add_argument('--error-rate', type=float, help='Fake provider failure probability')
+    parser.add_argument('--rate-limit', action='store_true',
+                        help='Keep per-user AI rate limits on (429s show up in the status counts)')
+    parser.add_argument('--keep-data', action='store_true', help='Keep benchmark chat history and jobs')
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Select the provider and rate limiting before the AI services are imported"""
+    os.environ['AI_PROVIDER'] = args.provider
+    os.environ['AI_RATE_LIMIT_ENABLED'] = 'true' if args.rate_limit else 'false'
+    for option, variable in [('latency_ms', 'FAKE_AI_LATENCY_MS'),
+                             ('ms_per_token', 'FAKE_AI_MS_PER_TOKEN'),
+                             ('error_rate', 'FAKE_AI_ERROR_RATE')]:
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[variable] = str(value)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class Recorder:
+    """Thread-safe latency and status collection per endpoint"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lock = threading.Lock()
+
+    def add(self, name, status, latency_ms=None):
+        with self.lock:
+            self.statuses[name][status] += 1
+            if latency_ms is not None:
+                self.latencies[name].append(latency_ms)
+
+
+class SaturationSampler(threading.Thread):
+    """Samples AI client slots and busy job runners while the benchmark runs"""
+
+    def __init__(self, ai_client, job_runner, interval=0.05):
+        super().__init__(daemon=True)
+        self.ai_client = ai_client
+        self.job_runner = job_runner
+        self.interval = interval
+        self.samples = []
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.samples.append((self.ai_client.get_in_flight(), self.job_runner.busy))
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+
+
+class JobRunner:
+    """Runs the benchmark users' queued AI jobs on threads in this process"""
+
+    def __init__(self, db, ai_jobs, workers, user_ids):
+        self.db = db
+        self.ai_jobs = ai_jobs
+        self.user_ids = user_ids
+        self.workers = workers
+        self.busy = 0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(workers)]
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+
+    def _loop(self):
+        while not self.stop_event.is_set():
+            job = self.ai_jobs.claim_next_job(self.db, only_users=self.user_ids)
+            if job is None:
+                time.sleep(0.05)
+                continue
+            with self.lock:
+                self.busy += 1
+            try:
+                handler = self.ai_jobs._resolve_handler(job['job_type'])
+                self.ai_jobs.complete_job(self.db, job, handler(self.db, job))
+            except Exception as e:
+                self.ai_jobs.fail_job(self.db, job, str(e))
+            finally:
+                with self.lock:
+                    self.busy -= 1
+
+
+def make_document(words):
+    vocabulary = ' '.join(TOPICS).split()
+    paragraphs = []
+    for start in range(0, words, 120):
+        paragraphs.append(' '.join(vocabulary[(start + i) % len(vocabulary)] for i in range(min(120, words - start))))
+    return '\n\n'.join(paragraphs)
+
+
+def ensure_users(db, count):
+    """Find or create the benchmark student accounts"""
+    user_ids = []
+    for index in range(count):
+        email = BENCH_EMAIL.format(index=index)
+        user = db.users.find_one({'email': email}, {'_id': 1})
+        if user is None:
+            user = {'_id': db.users.insert_one({
+                'email': email,
+                'name': f'Benchmark Student {index}',
+                'role': 'student',
+                'is_active': True,
+                'created_at': datetime.utcnow()
+            }).inserted_id}
+        user_ids.append(str(user['_id']))
+    return user_ids
+
+
+def wait_for_job(client, headers, job_id, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        response = client.get(f'/api/ai/jobs/{job_id}', headers=headers)
+        status = response.get_json().get('status')
+        if status in ('completed', 'failed'):
+            return status
+        time.sleep(0.05)
+    return 'timeout'
+
+
+def run_request(app, recorder, args, endpoint, index, token, document):
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    started = time.monotonic()
+
+    if endpoint == 'chat':
+        chat_type = CHAT_TYPES[index % len(CHAT_TYPES)]
+        topic = TOPICS[(index // len(CHAT_TYPES)) % max(args.distinct, 1) % len(TOPICS)]
+        body = {'message': f'Can you help me understand {topic}?', 'type': chat_type, 'stream': args.stream}
+        response = client.post('/api/ai/chat', json=body, headers=headers, buffered=not args.stream)
+        if args.stream and response.status_code == 200:
+            first_token = None
+            for part in response.response:
+                if first_token is None and b'event: token' in part:
+                    first_token = (time.monotonic() - started) * 1000
+            if first_token is not None:
+                recorder.add('chat (first token)', 'token', first_token)
+            response.close()
+        recorder.add('chat', response.status_code, (time.monotonic() - started) * 1000)
+        return
+
+    if endpoint == 'summarize':
+        response = client.post('/api/ai/summarize', json={'content': document, 'type': 'text'}, headers=headers)
+    else:
+        goal = f'Master {TOPICS[index % len(TOPICS)]}'
+        response = client.post('/api/ai/learning-path', json={'goal': goal, 'timeframe': 'month'}, headers=headers)
+
+    recorder.add(f'{endpoint} (submit)', response.status_code, (time.monotonic() - started) * 1000)
+    if response.status_code != 202:
+        return
+    outcome = wait_for_job(client, headers, response.get_json()['job_id'], args.job_timeout)
+    recorder.add(endpoint, outcome, (time.monotonic() - started) * 1000 if outcome == 'completed' else None)
+
+
+def print_report(recorder, sampler, ai_client, ai_cache, args, elapsed):
+    print("\n" + "=" * 60)
+    print("  Results")
+    print("=" * 60)
+    print(f"{'endpoint':<26}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for name in sorted(recorder.statuses):
+        values = recorder.latencies[name]
+        print(f"{name:<26}{len(values):>6}{percentile(values, 50):>9.0f}{percentile(values, 95):>9.0f}"
+              f"{percentile(values, 99):>9.0f}{max(values or [0]):>9.0f}")
+    print("\nStatus / outcome counts:")
+    for name in sorted(recorder.statuses):
+        counts = ', '.join(f'{status}: {n}' for status, n in sorted(recorder.statuses[name].items(), key=str))
+        print(f"  {name:<24} {counts}")
+
+    slots = ai_client.AI_MAX_CONCURRENT_CALLS
+    if sampler.samples:
+        in_flight = [sample[0] for sample in sampler.samples]
+        busy = [sample[1] for sample in sampler.samples]
+        print("\nSaturation:")
+        print(f"  AI slots in use     mean {sum(in_flight) / len(in_flight):.1f} / {slots}, "
+              f"at cap {100 * sum(1 for n in in_flight if n >= slots) / len(in_flight):.0f}% of the time")
+        print(f"  job runners busy    mean {sum(busy) / len(busy):.1f} / {args.job_workers}")
+
+    rejected = sum(stats['rejected'] for stats in ai_client.get_metrics().values())
+    print(f"  AI calls rejected   {rejected}")
+    print(f"\nCache: {ai_cache.get_stats()}")
+    print(f"Elapsed: {elapsed:.1f}s")
+
+
+def cleanup(db, user_ids):
+    db.chat_history.delete_many({'user_id': {'$in': user_ids}})
+    db.summaries.delete_many({'user_id': {'$in': user_ids}})
+    db.learning_paths.delete_many({'user_id': {'$in': user_ids}})
+    db.ai_rate_limits.delete_many({'_id': {'$in': user_ids}})
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+
+    from flask_jwt_extended import create_access_token
+    from app import app
+    from services import ai_client, ai_cache, ai_jobs
+
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        print(f"❌ Unknown endpoints: {', '.join(sorted(unknown))}")
+        return 1
+
+    print("=" * 60)
+    print("  AI Endpoint Benchmark")
+    print("=" * 60)
+    print(f"Provider: {ai_client.get_provider().name}  Endpoints: {', '.join(endpoints)}")
+    print(f"Requests per endpoint: {args.requests}  Concurrency: {args.concurrency}")
+
+    db = app.db
+    user_ids = ensure_users(db, args.users or args.concurrency)
+    with app.app_context():
+        tokens = [create_access_token(identity=user_id) for user_id in user_ids]
+
+    document = make_document(args.doc_words)
+    recorder = Recorder()
+    job_runner = JobRunner(db, ai_jobs, args.job_workers, user_ids)
+    sampler = SaturationSampler(ai_client, job_runner)
+    ai_client.reset_metrics()
+
+    work = [(endpoint, index) for index in range(args.requests) for endpoint in endpoints]
+    started = time.monotonic()
+    job_runner.start()
+    sampler.start()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [
+                pool.submit(run_request, app, recorder, args, endpoint, index,
+                            tokens[position % len(tokens)], document)
+                for position, (endpoint, index) in enumerate(work)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        sampler.stop()
+        job_runner.stop()
+
+    print_report(recorder, sampler, ai_client, ai_cache, args, time.monotonic() - started)
+
+    if not args.keep_data:
+        cleanup(db, user_ids)
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Benchmark interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Rebuild the course_neighbors collection from enrollments.
+
+Computes "students also took" neighbours for every course with a sparse
+co-enrollment matrix. Run it periodically (e.g. nightly from cron):
+
+Usage:
+    python backend/scripts/build_course_neighbors.py
+    python backend/scripts/build_course_neighbors.py --top-k 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.course_neighbors import rebuild_course_neighbors, COURSE_NEIGHBORS_TOP_K
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Rebuild course co-enrollment neighbours')
+    parser.add_argument('--top-k', type=int, default=COURSE_NEIGHBORS_TOP_K,
+                        help='Neighbours stored per course')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Course Neighbours Builder")
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+
+    try:
+        started = time.monotonic()
+        stats = rebuild_course_neighbors(db, top_k=args.top_k)
+        print(f"\n✅ Processed {stats['enrollments']} enrollments "
+              f"({stats['students']} students, {stats['courses']} courses)")
+        print(f"   Removed {stats['removed']} stale course entries")
+        print(f"   Took {time.monotonic() - started:.1f}s")
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error building course neighbours: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Build interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Build the per-course vector indexes used to ground AI answers in course materials.
+
+By default only courses whose index is missing or marked stale (after a
+material was added or removed) are rebuilt. Run it every few minutes from
+cron, or once with --all after changing the embedder.
+
+Usage:
+    python backend/scripts/build_material_index.py
+    python backend/scripts/build_material_index.py --all
+    python backend/scripts/build_material_index.py --course <course_id>
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services import material_index
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build course material vector indexes')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--all', action='store_true', help='Rebuild every course with materials')
+    group.add_argument('--course', help='Rebuild a single course')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Course Material Index Builder")
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+    print(f"Index directory: {material_index.MATERIAL_INDEX_DIR}")
+    print(f"Embedder: {material_index.get_embedder().name}")
+
+    try:
+        if args.course:
+            course_ids = [args.course]
+        elif args.all:
+            course_ids = [str(course_id) for course_id in db.materials.distinct('course_id')]
+        else:
+            course_ids = material_index.courses_needing_build(db)
+
+        if not course_ids:
+            print("\n✅ All material indexes are up to date")
+            return 0
+
+        print(f"\nBuilding {len(course_ids)} course index(es)...")
+        failed = 0
+        for course_id in course_ids:
+            started = time.monotonic()
+            try:
+                chunks = material_index.build_course_index(db, course_id)
+                print(f"  ✓ {course_id}: {chunks} chunks in {time.monotonic() - started:.1f}s")
+            except Exception as e:
+                failed += 1
+                material_index.mark_stale(course_id)
+                print(f"  ✗ {course_id}: {e}")
+
+        if failed:
+            print(f"\n⚠️  {failed} course(s) failed and stay marked stale")
+            return 1
+        print("\n✅ Material indexes built")
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error building material indexes: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Build interrupted by user")
+        sys.exit(1)
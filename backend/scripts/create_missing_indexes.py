@@ -27,7 +27,7 @@ client = MongoClient(MONGO_URI)
 db = client.edunexa_lms
 
 
-def create_index_safe(collection, index_spec, index_name=None):
+def create_index_safe(collection, index_spec, index_name=None, **options):
     """
     Create an index safely, handling existing indexes.
     
@@ -35,12 +35,13 @@ def create_index_safe(collection, index_spec, index_name=None):
         collection: MongoDB collection
         index_spec: Index specification (field name or list of tuples)
         index_name: Optional custom index name
+        **options: Extra index options (e.g. expireAfterSeconds, unique)
     """
     try:
         if index_name:
-            collection.create_index(index_spec, name=index_name)
+            collection.create_index(index_spec, name=index_name, **options)
         else:
-            collection.create_index(index_spec)
+            collection.create_index(index_spec, **options)
         return True
     except Exception as e:
         if 'IndexKeySpecsConflict' in str(e) or 'already exists' in str(e):
@@ -64,6 +65,10 @@ def create_indexes():
         created_count += 1
     else:
         skipped_count += 1
+    if create_index_safe(db.courses, "updated_at"):
+        created_count += 1
+    else:
+        skipped_count += 1
     
     # Modules collection indexes (Requirement 7.2)
     print("  Creating modules indexes...")
@@ -125,6 +130,70 @@ def create_indexes():
     else:
         skipped_count += 1
     
+    # AI job queue indexes (jobs live in summaries)
+    print("  Creating summaries indexes...")
+    if create_index_safe(db.summaries, [("status", 1), ("next_attempt_at", 1)], "ai_job_queue", sparse=True):
+        created_count += 1
+    else:
+        skipped_count += 1
+    if create_index_safe(db.summaries, [("user_id", 1), ("status", 1)], "ai_job_owner"):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # Submissions per course (teacher dashboard and assignment analytics)
+    print("  Creating submissions indexes...")
+    if create_index_safe(db.submissions, [("course_id", 1), ("grade", 1)], "submissions_course_grade"):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # AI response cache TTL index
+    print("  Creating ai_response_cache indexes...")
+    if create_index_safe(db.ai_response_cache, "expires_at", "ai_cache_expiry", expireAfterSeconds=0):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # AI usage rollups
+    print("  Creating ai_usage_daily indexes...")
+    if create_index_safe(db.ai_usage_daily, [("day", 1), ("endpoint", 1)], "ai_usage_day_endpoint"):
+        created_count += 1
+    else:
+        skipped_count += 1
+    if create_index_safe(db.ai_usage_daily, "expires_at", "ai_usage_expiry", expireAfterSeconds=0):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # AI rate-limit buckets
+    print("  Creating ai_rate_limits indexes...")
+    if create_index_safe(db.ai_rate_limits, "expires_at", "ai_rate_limit_expiry", expireAfterSeconds=0):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # Chat history: latest turns per user (chat context, keyset history paging)
+    print("  Creating chat_history indexes...")
+    if create_index_safe(db.chat_history, [("user_id", 1), ("timestamp", -1), ("_id", -1)], "chat_history_user_keyset"):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # Daily platform rollups (system analytics trends)
+    print("  Creating daily_rollups indexes...")
+    if create_index_safe(db.daily_rollups, "day", "daily_rollups_day"):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
+    # Student performance snapshot index
+    print("  Creating student_performance_snapshots indexes...")
+    if create_index_safe(db.student_performance_snapshots, "course_ids", "performance_snapshot_courses"):
+        created_count += 1
+    else:
+        skipped_count += 1
+    
     print(f"✅ Database indexes processed: {created_count} created, {skipped_count} already existed")
 
 
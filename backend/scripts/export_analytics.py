@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Export the reporting collections to Parquet for offline analytics.
+
+Writes today's snapshot of enrollments, submissions, video_progress, users
+and courses under ANALYTICS_EXPORT_DIR and prunes old snapshots. Schedule it
+nightly (e.g. cron, preferably against a secondary):
+
+Usage:
+    python backend/scripts/export_analytics.py
+    python backend/scripts/export_analytics.py --collection submissions --date 2024-05-01
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.analytics_export import (
+    export_all, prune, TABLES, ANALYTICS_EXPORT_DIR, ANALYTICS_EXPORT_BATCH_SIZE, ANALYTICS_EXPORT_KEEP_DAYS
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Export reporting collections to Parquet')
+    parser.add_argument('--collection', action='append', choices=sorted(TABLES),
+                        help='Collection to export (repeatable; default: all)')
+    parser.add_argument('--date', help='Export date label YYYY-MM-DD (default: today, UTC)')
+    parser.add_argument('--batch-size', type=int, default=ANALYTICS_EXPORT_BATCH_SIZE,
+                        help='Documents per cursor batch / Parquet row group')
+    parser.add_argument('--keep-days', type=int, default=ANALYTICS_EXPORT_KEEP_DAYS,
+                        help='Delete snapshots older than this many days')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Analytics Export")
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+    print(f"Writing to: {ANALYTICS_EXPORT_DIR}")
+
+    try:
+        started = time.monotonic()
+        counts = export_all(db, export_date=args.date, collections=args.collection, batch_size=args.batch_size)
+        for collection, rows in counts.items():
+            print(f"  {collection}: {rows} rows")
+        removed = prune(args.keep_days)
+        print(f"\n✅ Export finished in {time.monotonic() - started:.1f}s ({removed} old snapshots removed)")
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error exporting analytics: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Export interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Recompute the course_stats store for dirty, missing and old courses.
+
+Run once per invocation (cron, e.g. every 5 minutes) or keep it running
+with --interval:
+
+Usage:
+    python backend/scripts/refresh_course_stats.py
+    python backend/scripts/refresh_course_stats.py --interval 120
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.course_stats import refresh, COURSE_STATS_BATCH_SIZE
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Refresh precomputed course statistics')
+    parser.add_argument('--batch-size', type=int, default=COURSE_STATS_BATCH_SIZE,
+                        help='Courses recomputed per batch')
+    parser.add_argument('--interval', type=int, default=0,
+                        help='Keep running, refreshing every N seconds')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Course Stats Refresh")
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+
+    try:
+        while True:
+            started = time.monotonic()
+            stats = refresh(db, batch_size=args.batch_size)
+            print(f"\n✅ Refreshed {stats['refreshed']} courses, removed {stats['removed']} "
+                  f"({time.monotonic() - started:.1f}s)")
+            if not args.interval:
+                return 0
+            time.sleep(args.interval)
+    except Exception as e:
+        print(f"\n❌ Error refreshing course stats: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Refresh interrupted by user")
+        sys.exit(1)
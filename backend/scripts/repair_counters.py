@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Verify (and optionally repair) the denormalized counters on courses and assignments.
+
+Recomputes enrollment, material and submission counts from the source
+collections and compares them with the counters stored on each document.
+Run it once after deploying the counters, and whenever the numbers look off.
+
+Usage:
+    python backend/scripts/repair_counters.py            # report mismatches only
+    python backend/scripts/repair_counters.py --repair   # overwrite mismatched counters
+"""
+
+import argparse
+import os
+import sys
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.counters import verify_counters
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Verify and repair course/assignment counters')
+    parser.add_argument('--repair', action='store_true',
+                        help='Overwrite mismatched counters with recomputed values')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Counter Verification" + (" and Repair" if args.repair else ""))
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+
+    try:
+        results = verify_counters(db, repair=args.repair)
+        for collection, stats in results.items():
+            print(f"\n  {collection}: {stats['checked']} checked, {stats['mismatched']} mismatched"
+                  + (f", {stats['fixed']} fixed" if args.repair else ""))
+
+        mismatched = sum(stats['mismatched'] for stats in results.values())
+        if mismatched and not args.repair:
+            print("\n⚠️  Counters are out of sync; run with --repair to fix them")
+            return 1
+        print("\n✅ Done")
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error verifying counters: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Verification interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Fill the daily_rollups collection behind the system analytics trends.
+
+Only complete days after the last rolled-up one are processed, so it is
+cheap to run often; schedule it shortly after midnight UTC (e.g. cron).
+
+Usage:
+    python backend/scripts/rollup_daily_stats.py
+    python backend/scripts/rollup_daily_stats.py --rebuild --backfill-days 90
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from services.daily_rollups import roll_up, DAILY_ROLLUP_BACKFILL_DAYS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Roll up daily platform counters')
+    parser.add_argument('--backfill-days', type=int, default=DAILY_ROLLUP_BACKFILL_DAYS,
+                        help='Days to cover when nothing is rolled up yet (or with --rebuild)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recompute every day in the backfill window')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Daily Rollups")
+    print("=" * 60)
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    print(f"\nConnected to database: {db.name}")
+
+    try:
+        started = time.monotonic()
+        stats = roll_up(db, backfill_days=args.backfill_days, rebuild=args.rebuild)
+        if stats['days']:
+            print(f"\n✅ Rolled up {stats['days']} days ({stats['from']} .. {stats['through']})")
+        else:
+            print(f"\n✅ Already up to date (through {stats['through']})")
+        print(f"   Took {time.monotonic() - started:.1f}s")
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error rolling up daily stats: {e}")
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Rollup interrupted by user")
+        sys.exit(1)
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Orphaned upload garbage collector.
+
+Reports (and optionally quarantines) files under backend/uploads/ that no
+videos, documents, materials, submissions or courses record points to, and
+purges quarantined files once they pass the retention window.
+
+Usage:
+    python backend/scripts/upload_gc.py                 # dry-run report
+    python backend/scripts/upload_gc.py --apply         # quarantine orphans
+    python backend/scripts/upload_gc.py --purge --apply # delete old quarantine batches
+"""
+
+import argparse
+import os
+import sys
+
+# Add backend directory to path
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+from utils.upload_gc import (
+    UPLOAD_ROOT,
+    DEFAULT_WORKERS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MIN_AGE_HOURS,
+    DEFAULT_RETENTION_DAYS,
+    collect_orphans,
+    purge_quarantine,
+    format_bytes
+)
+
+# Load environment variables
+load_dotenv()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Find and quarantine orphaned upload files')
+    parser.add_argument('--apply', action='store_true',
+                        help='Quarantine orphans (or delete quarantine batches with --purge). Default is a dry run.')
+    parser.add_argument('--purge', action='store_true',
+                        help='Delete quarantine batches older than --retention-days instead of scanning')
+    parser.add_argument('--root', default=UPLOAD_ROOT, help='Upload root directory')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='Directory scan threads')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='MongoDB cursor batch size')
+    parser.add_argument('--min-age-hours', type=float, default=DEFAULT_MIN_AGE_HOURS,
+                        help='Ignore files modified more recently than this')
+    parser.add_argument('--retention-days', type=int, default=DEFAULT_RETENTION_DAYS,
+                        help='Days to keep quarantined files before purging')
+    return parser.parse_args()
+
+
+def print_report(report):
+    mode = 'DRY RUN' if report['dry_run'] else 'APPLIED'
+    print(f"\n📂 Upload root: {report['upload_root']} ({mode})")
+    print(f"   - Files scanned: {report['scanned_files']} ({format_bytes(report['scanned_bytes'])})")
+    print(f"   - Skipped (too recent): {report['skipped_recent']}")
+    print(f"   - Database references: {report['references']}")
+    print(f"   - Orphans: {report['orphan_count']}")
+    print(f"   - Reclaimable: {format_bytes(report['reclaimable_bytes'])}")
+
+    for directory, bucket in sorted(report['by_directory'].items()):
+        print(f"     • {directory}: {bucket['files']} files, {format_bytes(bucket['bytes'])}")
+
+    if report['sample']:
+        print("\n   Sample orphans:")
+        for path in report['sample']:
+            print(f"     - {path}")
+
+    if not report['dry_run']:
+        print(f"\n   Quarantined: {report['quarantined']}")
+    for error in report['errors']:
+        print(f"   ❌ {error}")
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("  Upload Garbage Collector")
+    print("=" * 60)
+
+    if args.purge:
+        result = purge_quarantine(args.root, args.retention_days, dry_run=not args.apply)
+        action = 'Would delete' if result['dry_run'] else 'Deleted'
+        print(f"\n🗑️  {action} {len(result['batches'])} quarantine batches: "
+              f"{result['files']} files, {format_bytes(result['bytes'])}")
+        return 0
+
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/edunexa_lms')
+    client = MongoClient(mongo_uri)
+    db = client.edunexa_lms
+
+    try:
+        report = collect_orphans(
+            db,
+            root=args.root,
+            dry_run=not args.apply,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            min_age_hours=args.min_age_hours
+        )
+        print_report(report)
+        return 1 if report['errors'] else 0
+    finally:
+        client.close()
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        print("\n\n⚠️  Garbage collection interrupted by user")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Unexpected error: {str(e)}")
+        sys.exit(1)
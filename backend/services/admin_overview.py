@@ -0,0 +1,143 @@
+"""
+Institution-wide figures for the admin dashboard and user statistics.
+
+Both admin endpoints used to issue one ``count_documents`` per figure plus
+separate aggregations for popular courses and departments. Here the users
+collection is read once through a ``$facet`` pipeline (role counts, active
+users, recent registrations and the department breakdown), enrollments
+through one pipeline that also resolves course titles, and the plain
+collection totals come from ``estimated_document_count`` (collection
+metadata, no scan). The three round trips run concurrently on a small
+thread pool.
+
+The result is shared by every admin for ADMIN_OVERVIEW_CACHE_SECONDS, since
+admin dashboards load on every admin login and the numbers only need to be
+roughly current. The user-management endpoints drop the worker's copy
+after they change users.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from services.ai_cache import LRUCache
+
+ADMIN_OVERVIEW_CACHE_SECONDS = int(os.getenv("ADMIN_OVERVIEW_CACHE_SECONDS", "60"))
+
+RECENT_DAYS = 30
+POPULAR_COURSES_LIMIT = 10
+CACHE_KEY = "overview"
+
+_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="admin-overview")
+_cache = LRUCache(max_entries=1, ttl_seconds=ADMIN_OVERVIEW_CACHE_SECONDS)
+
+
+def _since(field: str, start: datetime) -> Dict[str, Any]:
+    return {"$sum": {"$cond": [{"$gte": [field, start]}, 1, 0]}}
+
+
+def build_user_pipeline(recent_since: datetime, month_start: datetime) -> List[Dict[str, Any]]:
+    """Role counts, activity, registrations and departments in one pass over users"""
+    return [
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "users": {"$sum": 1},
+                    "active": {"$sum": {"$cond": [{"$eq": ["$is_active", True]}, 1, 0]}},
+                    "recent": _since("$created_at", recent_since),
+                    "this_month": _since("$created_at", month_start),
+                }}
+            ],
+            "roles": [
+                {"$group": {"_id": "$role", "count": {"$sum": 1}}}
+            ],
+            "departments": [
+                {"$match": {"role": {"$in": ["student", "teacher"]}}},
+                {"$group": {"_id": "$department", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}}
+            ],
+        }}
+    ]
+
+
+def build_popular_courses_pipeline(limit: int = POPULAR_COURSES_LIMIT) -> List[Dict[str, Any]]:
+    """Most-enrolled courses with their titles (enrollments store course_id as a string)"""
+    return [
+        {"$group": {"_id": "$course_id", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "courses",
+            "let": {"course_id": {"$convert": {
+                "input": "$_id", "to": "objectId", "onError": None, "onNull": None
+            }}},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$course_id"]}}},
+                {"$project": {"title": 1}}
+            ],
+            "as": "course"
+        }},
+        {"$unwind": "$course"},
+        {"$project": {"_id": 0, "course_title": "$course.title", "enrollments": "$count"}},
+    ]
+
+
+def _user_figures(db, recent_since: datetime, month_start: datetime) -> Dict[str, Any]:
+    facets = next(iter(db.users.aggregate(build_user_pipeline(recent_since, month_start))), {}) or {}
+    totals = (facets.get("totals") or [{}])[0]
+    roles = {item["_id"]: item["count"] for item in facets.get("roles", [])}
+    return {
+        "total_users": totals.get("users", 0),
+        "active_users": totals.get("active", 0),
+        "students": roles.get("student", 0),
+        "teachers": roles.get("teacher", 0),
+        "admins": roles.get("admin", 0),
+        "recent_registrations": totals.get("recent", 0),
+        "registrations_this_month": totals.get("this_month", 0),
+        "department_distribution": facets.get("departments", []),
+    }
+
+
+def _collection_totals(db) -> Dict[str, int]:
+    return {
+        "total_courses": db.courses.estimated_document_count(),
+        "total_enrollments": db.enrollments.estimated_document_count(),
+    }
+
+
+def compute_overview(db, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Admin figures from three concurrent round trips.
+
+    ``recent_registrations`` covers the last RECENT_DAYS days and
+    ``registrations_this_month`` starts at the first of the month.
+    """
+    now = now or datetime.utcnow()
+    recent_since = now - timedelta(days=RECENT_DAYS)
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    users = _executor.submit(_user_figures, db, recent_since, month_start)
+    popular = _executor.submit(lambda: list(db.enrollments.aggregate(build_popular_courses_pipeline())))
+    totals = _executor.submit(_collection_totals, db)
+
+    overview = users.result()
+    overview.update(totals.result())
+    overview["inactive_users"] = overview["total_users"] - overview["active_users"]
+    overview["popular_courses"] = popular.result()
+    return overview
+
+
+def get_overview(db) -> Dict[str, Any]:
+    """Cached admin overview, recomputed at most every ADMIN_OVERVIEW_CACHE_SECONDS"""
+    overview = _cache.get(CACHE_KEY)
+    if overview is None:
+        overview = compute_overview(db)
+        _cache.set(CACHE_KEY, overview)
+    return overview
+
+
+def invalidate() -> None:
+    """Drop this worker's cached overview (after admins change users)"""
+    _cache.clear()
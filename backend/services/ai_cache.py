@@ -0,0 +1,339 @@
+"""
+Two-tier cache for AI generations.
+
+Tier 1 is a per-worker LRU; tier 2 is the ``ai_response_cache`` MongoDB
+collection, expired by a TTL index on ``expires_at``. Keys hash the
+normalized prompt, chat type, model and a context fingerprint; the user ID
+is only part of the key when a response is personalized.
+
+Concurrent identical requests are coalesced: threads in one worker share a
+single in-flight call, and workers coordinate through a short ``pending``
+lease document so only one of them calls the model while the rest wait for
+its result.
+"""
+
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Dict, Any
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from services import ai_metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+AI_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("AI_CACHE_LOCAL_MAX_ENTRIES", "512"))
+AI_CACHE_LOCAL_TTL_SECONDS = int(os.getenv("AI_CACHE_LOCAL_TTL_SECONDS", "600"))
+AI_CACHE_WAIT_SECONDS = float(os.getenv("AI_CACHE_WAIT_SECONDS", "35"))
+
+COLLECTION = "ai_response_cache"
+POLL_INTERVAL_SECONDS = 0.2
+
+
+def normalize_prompt(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return text.rstrip(" ?!.")
+
+
+def context_fingerprint(context: str) -> str:
+    """Short stable hash of the context the prompt was built with"""
+    return hashlib.sha256(normalize_prompt(context).encode("utf-8")).hexdigest()[:16]
+
+
+def build_cache_key(prompt: str, chat_type: str, model: str, context: str = "",
+                    user_id: Optional[str] = None) -> str:
+    """
+    Build a cache key for a generation.
+
+    Args:
+        prompt: The user's message or content
+        chat_type: explain, summarize, qa, ...
+        model: Model name the response comes from
+        context: Context string passed to the prompt
+        user_id: Include only when the response is personalized to the user
+
+    Returns:
+        Hex digest key
+    """
+    parts = [
+        chat_type or "",
+        model or "",
+        context_fingerprint(context),
+        user_id or "*",
+        normalize_prompt(prompt)
+    ]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Flight:
+    """A generation in progress inside this worker"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+_local = LRUCache(AI_CACHE_LOCAL_MAX_ENTRIES, AI_CACHE_LOCAL_TTL_SECONDS)
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+_stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, chat_type: str = "") -> None:
+    with _stats_lock:
+        _stats[name] += 1
+    ai_metrics.record_cache(chat_type, name)
+
+
+def _shared_lookup(db, key: str) -> Optional[Dict[str, Any]]:
+    try:
+        return db[COLLECTION].find_one({"_id": key}, {"status": 1, "response": 1, "expires_at": 1})
+    except PyMongoError as e:
+        logger.warning(f"AI cache lookup failed: {e}")
+        return None
+
+
+def _is_ready(entry: Optional[Dict[str, Any]]) -> bool:
+    return bool(entry) and entry.get("status") == "ready" and entry.get("expires_at", datetime.min) > datetime.utcnow()
+
+
+def _claim(db, key: str, lease_seconds: float) -> bool:
+    """Try to become the worker that generates ``key``; False if another holds the lease"""
+    now = datetime.utcnow()
+    lease = {"status": "pending", "expires_at": now + timedelta(seconds=lease_seconds)}
+    try:
+        db[COLLECTION].insert_one({"_id": key, **lease})
+        return True
+    except DuplicateKeyError:
+        result = db[COLLECTION].update_one(
+            {"_id": key, "expires_at": {"$lt": now}},
+            {"$set": lease, "$unset": {"response": ""}}
+        )
+        return result.modified_count == 1
+    except PyMongoError as e:
+        logger.warning(f"AI cache claim failed: {e}")
+        return True
+
+
+def _wait_for_shared(db, key: str, wait_seconds: float) -> Optional[str]:
+    """Poll the shared tier until another worker finishes ``key`` or its lease lapses"""
+    deadline = time.monotonic() + wait_seconds
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL_SECONDS)
+        entry = _shared_lookup(db, key)
+        if _is_ready(entry):
+            return entry["response"]
+        if entry is None or entry.get("expires_at", datetime.min) <= datetime.utcnow():
+            return None
+    return None
+
+
+def _store(db, key: str, response: str, chat_type: str, model: str) -> None:
+    now = datetime.utcnow()
+    try:
+        db[COLLECTION].update_one(
+            {"_id": key},
+            {"$set": {
+                "status": "ready",
+                "response": response,
+                "chat_type": chat_type,
+                "model": model,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=AI_CACHE_TTL_SECONDS)
+            }},
+            upsert=True
+        )
+    except PyMongoError as e:
+        logger.warning(f"AI cache store failed: {e}")
+
+
+def _release(db, key: str) -> None:
+    try:
+        db[COLLECTION].delete_one({"_id": key, "status": "pending"})
+    except PyMongoError as e:
+        logger.warning(f"AI cache release failed: {e}")
+
+
+def _generate_shared(db, key: str, generate_fn: Callable[[], str], chat_type: str, model: str) -> str:
+    entry = _shared_lookup(db, key)
+    if _is_ready(entry):
+        _count("shared_hits", chat_type)
+        return entry["response"]
+
+    if not _claim(db, key, AI_CACHE_WAIT_SECONDS):
+        response = _wait_for_shared(db, key, AI_CACHE_WAIT_SECONDS)
+        if response is not None:
+            _count("coalesced", chat_type)
+            return response
+        _claim(db, key, AI_CACHE_WAIT_SECONDS)
+
+    _count("misses", chat_type)
+    try:
+        response = generate_fn()
+    except BaseException:
+        _release(db, key)
+        raise
+    _store(db, key, response, chat_type, model)
+    return response
+
+
+def get_or_generate(db, key: str, generate_fn: Callable[[], str], chat_type: str = "", model: str = "") -> str:
+    """
+    Return a cached response for ``key`` or generate, cache and return it.
+
+    Errors from ``generate_fn`` propagate and nothing is cached, so callers
+    keep their own fallback handling.
+
+    Args:
+        db: MongoDB database instance (shared tier), or None for local only
+        key: Key from build_cache_key()
+        generate_fn: Zero-argument callable performing the upstream call
+        chat_type: Stored alongside the entry for inspection
+        model: Stored alongside the entry for inspection
+
+    Returns:
+        Response text
+    """
+    if not AI_CACHE_ENABLED:
+        return generate_fn()
+
+    cached = _local.get(key)
+    if cached is not None:
+        _count("local_hits", chat_type)
+        return cached
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight()
+            _flights[key] = flight
+
+    if not leader:
+        if flight.event.wait(AI_CACHE_WAIT_SECONDS) and flight.error is None:
+            _count("coalesced", chat_type)
+            return flight.result
+        if flight.error is not None:
+            raise flight.error
+        return generate_fn()
+
+    try:
+        if db is not None:
+            response = _generate_shared(db, key, generate_fn, chat_type, model)
+        else:
+            _count("misses", chat_type)
+            response = generate_fn()
+        _local.set(key, response)
+        flight.result = response
+        return response
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        flight.event.set()
+        with _flights_lock:
+            _flights.pop(key, None)
+
+
+def lookup(db, key: str, chat_type: str = "") -> Optional[str]:
+    """
+    Return a cached response without generating (used by streamed answers).
+
+    Args:
+        db: MongoDB database instance, or None for local only
+        key: Key from build_cache_key()
+        chat_type: Feature label for hit/miss metrics
+    """
+    if not AI_CACHE_ENABLED:
+        return None
+    cached = _local.get(key)
+    if cached is not None:
+        _count("local_hits", chat_type)
+        return cached
+    if db is not None:
+        entry = _shared_lookup(db, key)
+        if _is_ready(entry):
+            _count("shared_hits", chat_type)
+            _local.set(key, entry["response"])
+            return entry["response"]
+    return None
+
+
+def store(db, key: str, response: str, chat_type: str = "", model: str = "") -> None:
+    """Store a response generated outside get_or_generate() in both tiers"""
+    if not AI_CACHE_ENABLED:
+        return
+    _count("misses", chat_type)
+    _local.set(key, response)
+    if db is not None:
+        _store(db, key, response, chat_type, model)
+
+
+def get_stats() -> Dict[str, int]:
+    """Hit/miss counters for this worker"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["local_entries"] = len(_local)
+    return stats
+
+
+def clear_local() -> None:
+    """Drop the in-process tier and reset counters (used by tests)"""
+    _local.clear()
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
@@ -0,0 +1,320 @@
+"""
+Shared AI client for the AI routes.
+
+Runs each generation call on a bounded thread pool so the request thread
+can give up at a deadline, and rejects new calls immediately once the
+per-worker in-flight cap is reached. Every call's outcome, latency and
+token counts (and time-to-first-token for streamed calls) are reported to
+services/ai_metrics, the single store behind get_metrics() and
+/api/ai/metrics.
+
+Calls go to a provider (services/ai_providers.py) chosen by AI_PROVIDER:
+``gemini`` (default, one GenerativeModel per model name for the lifetime
+of the worker) or ``fake`` for offline tests and benchmarks.
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, Iterator
+
+import google.generativeai as genai
+
+from services import ai_metrics
+from services.ai_providers import AIProvider, FakeProvider
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# AI configuration from environment variables
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+DEFAULT_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+AI_CALL_TIMEOUT = float(os.getenv("AI_CALL_TIMEOUT_SECONDS", "30"))
+AI_MAX_CONCURRENT_CALLS = int(os.getenv("AI_MAX_CONCURRENT_CALLS", "4"))
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini").lower()
+
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+elif AI_PROVIDER == "gemini":
+    logger.warning("GEMINI_API_KEY not found. AI features will use fallback responses.")
+
+
+class AIClientError(Exception):
+    """Base class for AI client failures"""
+
+
+class AINotConfiguredError(AIClientError):
+    """Raised when no Gemini API key is configured"""
+
+
+class AIOverloadedError(AIClientError):
+    """Raised when the worker already has the maximum number of calls in flight"""
+
+
+class AITimeoutError(AIClientError):
+    """Raised when a generation call does not finish before its deadline"""
+
+
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+_slots = threading.BoundedSemaphore(AI_MAX_CONCURRENT_CALLS)
+_executor = ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENT_CALLS, thread_name_prefix="gemini")
+
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+_provider: Optional[AIProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_model(model_name: Optional[str] = None):
+    """
+    Get the shared GenerativeModel instance for a model name.
+
+    Args:
+        model_name: Gemini model name (defaults to GEMINI_MODEL)
+
+    Returns:
+        Cached genai.GenerativeModel
+    """
+    name = model_name or DEFAULT_MODEL
+    model = _models.get(name)
+    if model is None:
+        with _models_lock:
+            model = _models.get(name)
+            if model is None:
+                model = genai.GenerativeModel(name)
+                _models[name] = model
+    return model
+
+
+class GeminiProvider(AIProvider):
+    """Google Gemini through the shared GenerativeModel instances"""
+
+    name = "gemini"
+
+    def is_configured(self) -> bool:
+        return bool(GEMINI_API_KEY)
+
+    def generate(self, prompt: str, model_name: Optional[str] = None) -> str:
+        return get_model(model_name).generate_content(prompt).text
+
+    def stream(self, prompt: str, model_name: Optional[str] = None) -> Iterator[str]:
+        for chunk in get_model(model_name).generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+def _create_provider(name: str) -> AIProvider:
+    if name == "fake":
+        return FakeProvider.from_env()
+    if name != "gemini":
+        logger.warning(f"Unknown AI_PROVIDER '{name}', using gemini")
+    return GeminiProvider()
+
+
+def get_provider() -> AIProvider:
+    """The provider selected by AI_PROVIDER (created on first use)"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = _create_provider(AI_PROVIDER)
+    return _provider
+
+
+def set_provider(provider: Optional[AIProvider]) -> None:
+    """Replace the provider (tests and benchmarks); None restores AI_PROVIDER"""
+    global _provider
+    with _provider_lock:
+        _provider = provider
+
+
+def is_configured() -> bool:
+    """Return True when the provider can serve calls (e.g. a Gemini API key is set)"""
+    return get_provider().is_configured()
+
+
+def get_in_flight() -> int:
+    """Calls currently holding an in-flight slot in this worker"""
+    return _in_flight
+
+
+def _record(endpoint: str, outcome: str, latency_ms: float = 0.0,
+            prompt_tokens: int = 0, response_tokens: int = 0) -> None:
+    ai_metrics.record_call(endpoint, outcome, latency_ms, prompt_tokens, response_tokens)
+
+
+def _record_first_token(endpoint: str, latency_ms: float) -> None:
+    ai_metrics.record_first_token(endpoint, latency_ms)
+
+
+def _acquire_slot() -> bool:
+    global _in_flight
+    if not _slots.acquire(blocking=False):
+        return False
+    with _in_flight_lock:
+        _in_flight += 1
+    return True
+
+
+def _release_slot(_future=None) -> None:
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+    _slots.release()
+
+
+def generate(prompt: str, endpoint: str = "default", timeout: Optional[float] = None,
+             model_name: Optional[str] = None) -> str:
+    """
+    Run a single generation call with a deadline and concurrency cap.
+
+    The in-flight slot is held until the upstream call actually returns, so
+    calls abandoned at their deadline still count against the cap.
+
+    Args:
+        prompt: Prompt text
+        endpoint: Metrics label for the calling feature (e.g. 'chat', 'summarize')
+        timeout: Deadline in seconds (defaults to AI_CALL_TIMEOUT_SECONDS)
+        model_name: Model name (defaults to GEMINI_MODEL)
+
+    Returns:
+        Generated text
+
+    Raises:
+        AINotConfiguredError: No API key is configured
+        AIOverloadedError: The in-flight cap is reached
+        AITimeoutError: The call did not finish before the deadline
+    """
+    provider = get_provider()
+    if not provider.is_configured():
+        raise AINotConfiguredError("GEMINI_API_KEY is not configured")
+
+    if not _acquire_slot():
+        _record(endpoint, "rejected")
+        raise AIOverloadedError("Too many AI requests in progress, please retry shortly")
+
+    deadline = AI_CALL_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+
+    try:
+        future = _executor.submit(provider.generate, prompt, model_name)
+    except Exception:
+        _release_slot()
+        raise
+    future.add_done_callback(_release_slot)
+
+    try:
+        text = future.result(timeout=deadline)
+    except FutureTimeoutError:
+        _record(endpoint, "timeouts", (time.monotonic() - started) * 1000)
+        logger.warning(f"{provider.name} call for '{endpoint}' exceeded {deadline}s deadline")
+        raise AITimeoutError(f"AI response timed out after {deadline} seconds")
+    except Exception:
+        _record(endpoint, "errors", (time.monotonic() - started) * 1000)
+        raise
+
+    _record(endpoint, "successes", (time.monotonic() - started) * 1000,
+            provider.count_tokens(prompt), provider.count_tokens(text))
+    return text
+
+
+def generate_stream(prompt: str, endpoint: str = "default", timeout: Optional[float] = None,
+                    model_name: Optional[str] = None) -> Iterator[str]:
+    """
+    Start a streamed generation and return an iterator of text chunks.
+
+    Configuration and capacity are checked before returning, so callers can
+    still answer with a normal error response. The upstream stream is read on
+    the shared pool; the deadline covers the whole stream. Closing the
+    iterator early stops reading further chunks.
+
+    Raises:
+        AINotConfiguredError: No API key is configured
+        AIOverloadedError: The in-flight cap is reached
+        AITimeoutError: (while iterating) the stream exceeded its deadline
+    """
+    provider = get_provider()
+    if not provider.is_configured():
+        raise AINotConfiguredError("GEMINI_API_KEY is not configured")
+
+    if not _acquire_slot():
+        _record(endpoint, "rejected")
+        raise AIOverloadedError("Too many AI requests in progress, please retry shortly")
+
+    deadline = AI_CALL_TIMEOUT if timeout is None else timeout
+    chunks: "queue.Queue" = queue.Queue()
+    cancelled = threading.Event()
+    started = time.monotonic()
+
+    def produce():
+        try:
+            for text in provider.stream(prompt, model_name):
+                if cancelled.is_set():
+                    break
+                if text:
+                    chunks.put(("chunk", text))
+            chunks.put(("end", None))
+        except Exception as e:
+            chunks.put(("error", e))
+
+    try:
+        future = _executor.submit(produce)
+    except Exception:
+        _release_slot()
+        raise
+    future.add_done_callback(_release_slot)
+
+    def consume():
+        outcome = "errors"
+        first_token = True
+        response_tokens = 0
+        try:
+            while True:
+                remaining = deadline - (time.monotonic() - started)
+                try:
+                    kind, value = chunks.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    outcome = "timeouts"
+                    logger.warning(f"{provider.name} stream for '{endpoint}' exceeded {deadline}s deadline")
+                    raise AITimeoutError(f"AI response timed out after {deadline} seconds")
+                if kind == "chunk":
+                    if first_token:
+                        first_token = False
+                        _record_first_token(endpoint, (time.monotonic() - started) * 1000)
+                    response_tokens += provider.count_tokens(value)
+                    yield value
+                elif kind == "end":
+                    outcome = "successes"
+                    return
+                else:
+                    raise value
+        except GeneratorExit:
+            outcome = "cancelled"
+            raise
+        finally:
+            cancelled.set()
+            _record(endpoint, outcome, (time.monotonic() - started) * 1000,
+                    provider.count_tokens(prompt), response_tokens)
+
+    return consume()
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Snapshot of per-endpoint counters for this worker (from services/ai_metrics).
+
+    Returns:
+        Dict keyed by endpoint with call counts, tokens and average/percentile latency
+    """
+    return ai_metrics.snapshot()
+
+
+def reset_metrics() -> None:
+    """Clear all counters (used by tests)"""
+    ai_metrics.reset()
@@ -0,0 +1,376 @@
+"""
+Background job queue for slow AI features (summaries and learning paths).
+
+Jobs are documents in the ``summaries`` collection, so each result ends up
+next to the summaries the API already stores. A job moves through
+queued -> running -> completed | failed:
+
+- ``submit_job`` is called from the request and returns immediately.
+- ``run_worker`` (started by scripts/ai_job_worker.py) claims queued jobs
+  atomically and runs their handlers in a process pool. Failed attempts are
+  retried with exponential backoff, and a crashed worker's lease expires so
+  another worker can pick the job up. While a job runs, its worker renews
+  the lease every AI_JOBS_HEARTBEAT_SECONDS, so long jobs are not reclaimed.
+- Completion and failure only apply to the claim that is still current
+  (same status and attempt number), so a worker whose lease was taken over
+  cannot overwrite the newer attempt.
+
+Per-user limits apply twice: on submission (queued + running jobs) and on
+claiming (running jobs), so one user cannot fill the pool.
+"""
+
+import os
+import time
+import logging
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+
+from services import ai_metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AI_JOBS_MAX_PENDING_PER_USER = int(os.getenv("AI_JOBS_MAX_PENDING_PER_USER", "3"))
+AI_JOBS_MAX_RUNNING_PER_USER = int(os.getenv("AI_JOBS_MAX_RUNNING_PER_USER", "1"))
+AI_JOBS_MAX_ATTEMPTS = int(os.getenv("AI_JOBS_MAX_ATTEMPTS", "3"))
+AI_JOBS_RETRY_BASE_SECONDS = int(os.getenv("AI_JOBS_RETRY_BASE_SECONDS", "10"))
+AI_JOBS_LEASE_SECONDS = int(os.getenv("AI_JOBS_LEASE_SECONDS", "300"))
+AI_JOBS_HEARTBEAT_SECONDS = int(os.getenv("AI_JOBS_HEARTBEAT_SECONDS", str(max(1, AI_JOBS_LEASE_SECONDS // 3))))
+
+COLLECTION = "summaries"
+ACTIVE_STATUSES = ["queued", "running"]
+
+# job type -> "module:function" executed inside a worker process
+JOB_HANDLERS = {
+    "summarize": "routes.ai:run_summarize_job",
+    "learning_path": "routes.ai:run_learning_path_job",
+}
+
+
+class JobLimitError(Exception):
+    """Raised when a user already has the maximum number of pending jobs"""
+
+
+def submit_job(db, user_id: str, job_type: str, payload: Dict[str, Any],
+               extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Queue a job for a user.
+
+    Args:
+        db: MongoDB database instance
+        user_id: Owner of the job
+        job_type: Key of JOB_HANDLERS
+        payload: Handler input (removed from the document once the job finishes)
+        extra: Additional fields stored on the document (e.g. content_type)
+
+    Returns:
+        Job ID string
+
+    Raises:
+        JobLimitError: The user has AI_JOBS_MAX_PENDING_PER_USER jobs queued or running
+        ValueError: Unknown job type
+    """
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    active = db[COLLECTION].count_documents({
+        "user_id": user_id,
+        "status": {"$in": ACTIVE_STATUSES}
+    })
+    if active >= AI_JOBS_MAX_PENDING_PER_USER:
+        raise JobLimitError(
+            f"You already have {active} AI requests in progress. Please wait for them to finish."
+        )
+
+    now = datetime.utcnow()
+    job = {
+        "user_id": user_id,
+        "job_type": job_type,
+        "status": "queued",
+        "payload": payload,
+        "attempts": 0,
+        "max_attempts": AI_JOBS_MAX_ATTEMPTS,
+        "next_attempt_at": now,
+        "created_at": now,
+        "updated_at": now
+    }
+    if extra:
+        job.update(extra)
+
+    result = db[COLLECTION].insert_one(job)
+    return str(result.inserted_id)
+
+
+def get_job(db, job_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a job owned by ``user_id`` without its (possibly large) payload"""
+    try:
+        object_id = ObjectId(job_id)
+    except Exception:
+        return None
+    return db[COLLECTION].find_one(
+        {"_id": object_id, "user_id": user_id, "job_type": {"$exists": True}},
+        {"payload": 0}
+    )
+
+
+def serialize_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape a job document for API responses"""
+    data = {
+        "job_id": str(job["_id"]),
+        "job_type": job.get("job_type"),
+        "status": job.get("status"),
+        "attempts": job.get("attempts", 0),
+        "created_at": job["created_at"].isoformat() if job.get("created_at") else None,
+        "finished_at": job["finished_at"].isoformat() if job.get("finished_at") else None,
+    }
+    if job.get("status") == "completed":
+        data["result"] = job.get("result", {})
+    elif job.get("error"):
+        data["error"] = job["error"]
+    return data
+
+
+def _busy_users(db) -> List[str]:
+    """Users already running the maximum number of jobs"""
+    pipeline = [
+        {"$match": {"status": "running", "lease_until": {"$gt": datetime.utcnow()}}},
+        {"$group": {"_id": "$user_id", "running": {"$sum": 1}}},
+        {"$match": {"running": {"$gte": AI_JOBS_MAX_RUNNING_PER_USER}}}
+    ]
+    return [row["_id"] for row in db[COLLECTION].aggregate(pipeline)]
+
+
+def claim_next_job(db, exclude_users: Optional[List[str]] = None,
+                   only_users: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Atomically move the oldest runnable job to ``running``.
+
+    Runnable means queued and due, or running with an expired lease (its
+    worker died). Users at their running cap are skipped; ``only_users``
+    restricts claiming to the given users (used by the benchmark).
+    """
+    now = datetime.utcnow()
+    busy = set(_busy_users(db)) | set(exclude_users or [])
+    query = {
+        "job_type": {"$exists": True},
+        "$or": [
+            {"status": "queued", "next_attempt_at": {"$lte": now}},
+            {"status": "running", "lease_until": {"$lt": now}, "attempts": {"$lt": AI_JOBS_MAX_ATTEMPTS}}
+        ]
+    }
+    user_filter = {}
+    if busy:
+        user_filter["$nin"] = list(busy)
+    if only_users is not None:
+        user_filter["$in"] = list(only_users)
+    if user_filter:
+        query["user_id"] = user_filter
+
+    return db[COLLECTION].find_one_and_update(
+        query,
+        {
+            "$set": {
+                "status": "running",
+                "started_at": now,
+                "lease_until": now + timedelta(seconds=AI_JOBS_LEASE_SECONDS),
+                "updated_at": now
+            },
+            "$inc": {"attempts": 1}
+        },
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def claim_filter(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Matches the job only while this claim (attempt) is still the running one"""
+    return {"_id": job["_id"], "status": "running", "attempts": job.get("attempts", 1)}
+
+
+def renew_leases(db, jobs: List[Dict[str, Any]]) -> int:
+    """
+    Extend the lease of jobs this worker is still running (heartbeat).
+
+    Returns:
+        Number of leases renewed; jobs that were reclaimed elsewhere are skipped
+    """
+    if not jobs:
+        return 0
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=AI_JOBS_LEASE_SECONDS)
+    result = db[COLLECTION].bulk_write([
+        UpdateOne(claim_filter(job), {"$set": {"lease_until": lease_until, "updated_at": now}})
+        for job in jobs
+    ], ordered=False)
+    return result.matched_count
+
+
+def complete_job(db, job: Dict[str, Any], result: Dict[str, Any]) -> bool:
+    """
+    Store a job's result and drop its payload.
+
+    Returns:
+        False when the claim is no longer current (the result is discarded)
+    """
+    now = datetime.utcnow()
+    outcome = db[COLLECTION].update_one(
+        claim_filter(job),
+        {
+            "$set": {"status": "completed", "finished_at": now, "updated_at": now, **result},
+            "$unset": {"payload": "", "lease_until": "", "error": ""}
+        }
+    )
+    return outcome.matched_count == 1
+
+
+def fail_job(db, job: Dict[str, Any], error: str) -> str:
+    """
+    Record a failed attempt; requeue with backoff or mark the job failed.
+
+    Returns:
+        The job's new status, or "superseded" when the claim is no longer current
+    """
+    now = datetime.utcnow()
+    attempts = job.get("attempts", 1)
+    if attempts < job.get("max_attempts", AI_JOBS_MAX_ATTEMPTS):
+        delay = AI_JOBS_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+        outcome = db[COLLECTION].update_one(
+            claim_filter(job),
+            {
+                "$set": {
+                    "status": "queued",
+                    "error": error,
+                    "next_attempt_at": now + timedelta(seconds=delay),
+                    "updated_at": now
+                },
+                "$unset": {"lease_until": ""}
+            }
+        )
+        return "queued" if outcome.matched_count == 1 else "superseded"
+
+    outcome = db[COLLECTION].update_one(
+        claim_filter(job),
+        {
+            "$set": {"status": "failed", "error": error, "finished_at": now, "updated_at": now},
+            "$unset": {"payload": "", "lease_until": ""}
+        }
+    )
+    return "failed" if outcome.matched_count == 1 else "superseded"
+
+
+def expire_abandoned_jobs(db) -> int:
+    """Fail running jobs whose lease lapsed after their last allowed attempt"""
+    now = datetime.utcnow()
+    result = db[COLLECTION].update_many(
+        {
+            "job_type": {"$exists": True},
+            "status": "running",
+            "lease_until": {"$lt": now},
+            "attempts": {"$gte": AI_JOBS_MAX_ATTEMPTS}
+        },
+        {
+            "$set": {"status": "failed", "error": "Job did not finish in time", "finished_at": now, "updated_at": now},
+            "$unset": {"payload": "", "lease_until": ""}
+        }
+    )
+    return result.modified_count
+
+
+# --- Worker process side -------------------------------------------------
+
+_worker_db = None
+
+
+def _init_worker_process(mongo_uri: str, db_name: str) -> None:
+    """Open one MongoDB connection per pool process"""
+    global _worker_db
+    from pymongo import MongoClient
+    _worker_db = MongoClient(mongo_uri)[db_name]
+
+
+def _resolve_handler(job_type: str):
+    module_name, function_name = JOB_HANDLERS[job_type].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def execute_job(job_type: str, job_id: str) -> Dict[str, Any]:
+    """Run a job's handler inside a pool process and return the fields to store"""
+    job = _worker_db[COLLECTION].find_one({"_id": ObjectId(job_id)})
+    handler = _resolve_handler(job_type)
+    try:
+        return handler(_worker_db, job)
+    finally:
+        # Pool processes serve no requests, so write their AI usage here
+        ai_metrics.flush(_worker_db)
+
+
+def run_worker(db, mongo_uri: str, db_name: str, processes: int = 2,
+               poll_interval: float = 1.0, once: bool = False) -> None:
+    """
+    Claim jobs and run them on a process pool until interrupted.
+
+    Args:
+        db: MongoDB database instance used for claiming and status updates
+        mongo_uri: Connection string for pool processes
+        db_name: Database name for pool processes
+        processes: Number of pool processes (max jobs in flight)
+        poll_interval: Seconds to sleep when no job is runnable
+        once: Stop as soon as the queue is drained (used by tests/cron)
+    """
+    context = multiprocessing.get_context("spawn")
+    in_flight = {}
+    last_heartbeat = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context,
+                             initializer=_init_worker_process,
+                             initargs=(mongo_uri, db_name)) as pool:
+        while True:
+            claimed = False
+            while len(in_flight) < processes:
+                running_users = [job["user_id"] for job in in_flight.values()]
+                over_cap = [
+                    user for user in set(running_users)
+                    if running_users.count(user) >= AI_JOBS_MAX_RUNNING_PER_USER
+                ]
+                job = claim_next_job(db, exclude_users=over_cap)
+                if job is None:
+                    break
+                claimed = True
+                logger.info(f"Running {job['job_type']} job {job['_id']} (attempt {job['attempts']})")
+                future = pool.submit(execute_job, job["job_type"], str(job["_id"]))
+                in_flight[future] = job
+
+            for future in [f for f in in_flight if f.done()]:
+                job = in_flight.pop(future)
+                try:
+                    if complete_job(db, job, future.result()):
+                        logger.info(f"Completed job {job['_id']}")
+                    else:
+                        logger.warning(f"Discarded result of job {job['_id']}: its lease was taken over")
+                except Exception as e:
+                    status = fail_job(db, job, str(e))
+                    logger.warning(f"Job {job['_id']} failed ({status}): {e}")
+
+            if in_flight and time.monotonic() - last_heartbeat >= AI_JOBS_HEARTBEAT_SECONDS:
+                renewed = renew_leases(db, list(in_flight.values()))
+                if renewed < len(in_flight):
+                    logger.warning(f"{len(in_flight) - renewed} running jobs were reclaimed by another worker")
+                last_heartbeat = time.monotonic()
+
+            if once and not in_flight and not claimed:
+                return
+            if claimed:
+                continue
+            expire_abandoned_jobs(db)
+            if in_flight:
+                wait(list(in_flight), timeout=min(poll_interval, AI_JOBS_HEARTBEAT_SECONDS),
+                     return_when=FIRST_COMPLETED)
+            else:
+                time.sleep(poll_interval)
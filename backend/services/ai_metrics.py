@@ -0,0 +1,270 @@
+"""
+Per-feature AI usage metrics: latency histograms, token counts, outcomes
+and cache effectiveness.
+
+ai_client reports every provider call (and time to first token for streamed
+calls) and ai_cache every lookup, labelled
+with the calling feature ('chat', 'explain', 'summary', ...). Each worker
+keeps the numbers in fixed latency buckets, which are cheap to update and
+can be added across workers and days. The same deltas are periodically
+``$inc``-ed into one document per feature and day in ``ai_usage_daily``
+(kept for AI_METRICS_RETENTION_DAYS), so the numbers survive restarts and
+cover every worker.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AI_METRICS_FLUSH_SECONDS = float(os.getenv("AI_METRICS_FLUSH_SECONDS", "60"))
+AI_METRICS_RETENTION_DAYS = int(os.getenv("AI_METRICS_RETENTION_DAYS", "90"))
+
+COLLECTION = "ai_usage_daily"
+
+# Upper bounds (ms) of the latency buckets; slower calls land in the overflow bucket
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+BUCKET_NAMES = tuple(f"le_{bound}" for bound in LATENCY_BUCKETS_MS) + (f"gt_{LATENCY_BUCKETS_MS[-1]}",)
+
+OUTCOMES = ("successes", "errors", "timeouts", "rejected", "cancelled")
+CACHE_EVENTS = ("local_hits", "shared_hits", "coalesced", "misses")
+# Plain counters summed across workers and days
+COUNTERS = (
+    "calls", "total_latency_ms", "prompt_tokens", "response_tokens",
+    "first_token_count", "total_first_token_ms"
+) + OUTCOMES
+
+_totals: Dict[str, Dict[str, Any]] = {}
+_pending: Dict[Tuple[datetime, str], Dict[str, Any]] = {}
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flushed_at = time.monotonic()
+
+
+def _empty() -> Dict[str, Any]:
+    stats = {counter: 0 for counter in COUNTERS}
+    stats["total_latency_ms"] = 0.0
+    stats["total_first_token_ms"] = 0.0
+    stats["latency"] = {name: 0 for name in BUCKET_NAMES}
+    stats["cache"] = {event: 0 for event in CACHE_EVENTS}
+    return stats
+
+
+def _today() -> datetime:
+    now = datetime.utcnow()
+    return datetime(now.year, now.month, now.day)
+
+
+def _targets(endpoint: str) -> List[Dict[str, Any]]:
+    """Lifetime and pending-rollup counters for an endpoint; caller must hold _lock"""
+    return [
+        _totals.setdefault(endpoint, _empty()),
+        _pending.setdefault((_today(), endpoint), _empty())
+    ]
+
+
+def bucket_for(latency_ms: float) -> str:
+    """Name of the histogram bucket a latency falls into"""
+    return BUCKET_NAMES[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)]
+
+
+def record_call(endpoint: str, outcome: str, latency_ms: float = 0.0,
+                prompt_tokens: int = 0, response_tokens: int = 0) -> None:
+    """
+    Count one provider call.
+
+    Args:
+        endpoint: Feature label passed to ai_client
+        outcome: One of OUTCOMES
+        latency_ms: Wall time until the call finished or was abandoned
+        prompt_tokens: Estimated prompt tokens
+        response_tokens: Estimated response tokens (0 unless text came back)
+    """
+    bucket = bucket_for(latency_ms) if outcome != "rejected" else None
+    with _lock:
+        for stats in _targets(endpoint):
+            stats["calls"] += 1
+            stats[outcome] += 1
+            stats["prompt_tokens"] += prompt_tokens
+            stats["response_tokens"] += response_tokens
+            if bucket:
+                stats["total_latency_ms"] += latency_ms
+                stats["latency"][bucket] += 1
+
+
+def record_first_token(endpoint: str, latency_ms: float) -> None:
+    """Count the time until a streamed call produced its first chunk"""
+    with _lock:
+        for stats in _targets(endpoint):
+            stats["first_token_count"] += 1
+            stats["total_first_token_ms"] += latency_ms
+
+
+def record_cache(endpoint: str, event: str) -> None:
+    """Count one response-cache hit or miss (event is one of CACHE_EVENTS)"""
+    with _lock:
+        for stats in _targets(endpoint or "default"):
+            stats["cache"][event] += 1
+
+
+def percentile(histogram: Dict[str, int], fraction: float) -> Optional[float]:
+    """
+    Upper bound of the bucket holding the given fraction of calls.
+
+    Returns None without data; calls over the last bound report that bound.
+    """
+    total = sum(histogram.get(name, 0) for name in BUCKET_NAMES)
+    if not total:
+        return None
+    threshold = fraction * total
+    seen = 0
+    for name, bound in zip(BUCKET_NAMES, LATENCY_BUCKETS_MS + (LATENCY_BUCKETS_MS[-1],)):
+        seen += histogram.get(name, 0)
+        if seen >= threshold:
+            return float(bound)
+    return float(LATENCY_BUCKETS_MS[-1])
+
+
+def summarize(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Add averages, percentiles and cache hit rate to raw counters"""
+    histogram = stats.get("latency", {})
+    timed = sum(histogram.get(name, 0) for name in BUCKET_NAMES)
+    cache = stats.get("cache", {})
+    hits = sum(cache.get(event, 0) for event in CACHE_EVENTS if event != "misses")
+    lookups = hits + cache.get("misses", 0)
+
+    summary = {key: value for key, value in stats.items() if key not in ("latency", "cache")}
+    summary.update({
+        "avg_latency_ms": round(stats.get("total_latency_ms", 0.0) / timed, 1) if timed else 0.0,
+        "avg_first_token_ms": (
+            round(stats.get("total_first_token_ms", 0.0) / stats["first_token_count"], 1)
+            if stats.get("first_token_count") else 0.0
+        ),
+        "p50_latency_ms": percentile(histogram, 0.50),
+        "p95_latency_ms": percentile(histogram, 0.95),
+        "p99_latency_ms": percentile(histogram, 0.99),
+        "latency_histogram": {name: histogram.get(name, 0) for name in BUCKET_NAMES},
+        "cache": {event: cache.get(event, 0) for event in CACHE_EVENTS},
+        "cache_hit_rate": round(hits / lookups, 3) if lookups else None
+    })
+    summary["total_latency_ms"] = round(summary.get("total_latency_ms", 0.0), 1)
+    summary["total_first_token_ms"] = round(summary.get("total_first_token_ms", 0.0), 1)
+    return summary
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Per-endpoint metrics for this worker since it started"""
+    with _lock:
+        raw = {endpoint: {**stats, "latency": dict(stats["latency"]), "cache": dict(stats["cache"])}
+               for endpoint, stats in _totals.items()}
+    return {endpoint: summarize(stats) for endpoint, stats in raw.items()}
+
+
+def _increments(stats: Dict[str, Any]) -> Dict[str, Any]:
+    increments = {key: stats[key] for key in COUNTERS}
+    increments.update({f"latency.{name}": count for name, count in stats["latency"].items()})
+    increments.update({f"cache.{event}": count for event, count in stats["cache"].items()})
+    return {key: value for key, value in increments.items() if value}
+
+
+def _merge(target: Dict[str, Any], stats: Dict[str, Any]) -> None:
+    for key in COUNTERS:
+        target[key] += stats[key]
+    for name, count in stats["latency"].items():
+        target["latency"][name] += count
+    for event, count in stats["cache"].items():
+        target["cache"][event] += count
+
+
+def flush(db) -> int:
+    """
+    Add pending counters to the daily rollups.
+
+    Counters that fail to write are kept for the next flush.
+
+    Returns:
+        Number of rollup documents updated
+    """
+    global _flushed_at
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _flushed_at = time.monotonic()
+
+    written = 0
+    for (day, endpoint), stats in pending.items():
+        increments = _increments(stats)
+        if not increments:
+            continue
+        try:
+            db[COLLECTION].update_one(
+                {"_id": f"{day:%Y-%m-%d}:{endpoint}"},
+                {
+                    "$inc": increments,
+                    "$set": {"updated_at": datetime.utcnow()},
+                    "$setOnInsert": {
+                        "day": day,
+                        "endpoint": endpoint,
+                        "expires_at": day + timedelta(days=AI_METRICS_RETENTION_DAYS)
+                    }
+                },
+                upsert=True
+            )
+            written += 1
+        except Exception as e:
+            logger.warning(f"Could not write AI usage rollup for {endpoint}: {e}")
+            with _lock:
+                _merge(_pending.setdefault((day, endpoint), _empty()), stats)
+    return written
+
+
+def maybe_flush(db) -> None:
+    """Flush at most every AI_METRICS_FLUSH_SECONDS (cheap to call per request)"""
+    if time.monotonic() - _flushed_at < AI_METRICS_FLUSH_SECONDS:
+        return
+    if not _flush_lock.acquire(blocking=False):
+        return
+    try:
+        flush(db)
+    finally:
+        _flush_lock.release()
+
+
+def get_daily(db, days: int = 7, endpoint: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Daily rollups across all workers, oldest first.
+
+    Args:
+        db: MongoDB database instance
+        days: How many days back to include (today counts as one)
+        endpoint: Only this feature when given
+    """
+    query: Dict[str, Any] = {"day": {"$gte": _today() - timedelta(days=max(days, 1) - 1)}}
+    if endpoint:
+        query["endpoint"] = endpoint
+
+    rollups = []
+    for doc in db[COLLECTION].find(query, {"_id": 0, "expires_at": 0}).sort([("day", 1), ("endpoint", 1)]):
+        stats = _empty()
+        stats.update({key: doc.get(key, 0) for key in COUNTERS})
+        stats["latency"].update(doc.get("latency", {}))
+        stats["cache"].update(doc.get("cache", {}))
+        summary = summarize(stats)
+        summary["day"] = doc["day"].strftime("%Y-%m-%d")
+        summary["endpoint"] = doc["endpoint"]
+        rollups.append(summary)
+    return rollups
+
+
+def reset() -> None:
+    """Clear all in-process counters (used by tests)"""
+    with _lock:
+        _totals.clear()
+        _pending.clear()
@@ -0,0 +1,156 @@
+"""
+Provider interface behind services/ai_client.py.
+
+ai_client owns deadlines, the in-flight cap and metrics; a provider only
+turns a prompt into text (whole or streamed). The Gemini provider lives in
+ai_client next to its model cache. This module holds the interface and a
+local fake for tests and load testing:
+
+    AI_PROVIDER=fake FAKE_AI_LATENCY_MS=800 FAKE_AI_ERROR_RATE=0.02 ...
+
+The fake is deterministic: the same prompt produces the same text, and
+latency and failures come from a seeded generator, so two benchmark runs
+with the same settings see the same workload.
+"""
+
+import os
+import time
+import random
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+# Rough English average, shared with the token budgets elsewhere
+CHARS_PER_TOKEN = 4
+
+_VOCABULARY = (
+    "concept example practice review module lesson summary key idea step "
+    "definition formula result method student course topic note detail skill"
+).split()
+
+
+class AIProvider(ABC):
+    """
+    Turns prompts into text.
+
+    Subclasses must implement generate(); stream() falls back to a single
+    chunk holding the whole response.
+    """
+
+    name = "base"
+
+    def is_configured(self) -> bool:
+        return True
+
+    @abstractmethod
+    def generate(self, prompt: str, model_name: Optional[str] = None) -> str:
+        """Complete response text for the prompt"""
+
+    def stream(self, prompt: str, model_name: Optional[str] = None) -> Iterator[str]:
+        yield self.generate(prompt, model_name)
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate token count (providers with a tokenizer may override)"""
+        return (len(text or "") + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class FakeProviderError(RuntimeError):
+    """Simulated upstream failure raised by FakeProvider"""
+
+
+class FakeProvider(AIProvider):
+    """
+    Offline provider with configurable latency, streaming pace and error rate.
+
+    Args:
+        latency_ms: Time before the first token
+        jitter_ms: Uniform +/- jitter added to latency_ms
+        ms_per_token: Generation time per response token
+        response_tokens: Length of each response
+        chunk_tokens: Tokens per streamed chunk
+        error_rate: Probability (0-1) that a call fails
+        seed: Seed for latency jitter and failures
+        max_tracked_prompts: Prompts whose send count is remembered (least
+            recently sent ones are forgotten and start over at attempt 0)
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms: float = 200, jitter_ms: float = 50, ms_per_token: float = 2,
+                 response_tokens: int = 150, chunk_tokens: int = 20, error_rate: float = 0.0,
+                 seed: int = 0, max_tracked_prompts: int = 4096):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.ms_per_token = ms_per_token
+        self.response_tokens = response_tokens
+        self.chunk_tokens = max(chunk_tokens, 1)
+        self.error_rate = error_rate
+        self.seed = seed
+        self.max_tracked_prompts = max(max_tracked_prompts, 1)
+        self._calls: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "FakeProvider":
+        return cls(
+            latency_ms=float(os.getenv("FAKE_AI_LATENCY_MS", "200")),
+            jitter_ms=float(os.getenv("FAKE_AI_JITTER_MS", "50")),
+            ms_per_token=float(os.getenv("FAKE_AI_MS_PER_TOKEN", "2")),
+            response_tokens=int(os.getenv("FAKE_AI_RESPONSE_TOKENS", "150")),
+            chunk_tokens=int(os.getenv("FAKE_AI_CHUNK_TOKENS", "20")),
+            error_rate=float(os.getenv("FAKE_AI_ERROR_RATE", "0")),
+            seed=int(os.getenv("FAKE_AI_SEED", "0")),
+        )
+
+    def _rng(self, prompt: str) -> random.Random:
+        """Generator seeded by the prompt and how often it has been sent"""
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._calls.pop(digest, 0)
+            self._calls[digest] = attempt + 1
+            while len(self._calls) > self.max_tracked_prompts:
+                self._calls.popitem(last=False)
+        return random.Random(f"{self.seed}:{digest}:{attempt}")
+
+    def reset(self) -> None:
+        """Forget how often each prompt was sent (e.g. between tests)"""
+        with self._lock:
+            self._calls.clear()
+
+    def _start(self, prompt: str) -> random.Random:
+        rng = self._rng(prompt)
+        delay = max(self.latency_ms + rng.uniform(-self.jitter_ms, self.jitter_ms), 0)
+        time.sleep(delay / 1000)
+        if rng.random() < self.error_rate:
+            raise FakeProviderError("Simulated AI provider failure")
+        return rng
+
+    def _tokens(self, prompt: str):
+        words = [word for word in prompt.split() if word.isalpha()][:8] or ["topic"]
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+        for index in range(self.response_tokens):
+            if index < len(words):
+                yield words[index]
+            else:
+                yield _VOCABULARY[(digest + index) % len(_VOCABULARY)]
+
+    def generate(self, prompt: str, model_name: Optional[str] = None) -> str:
+        self._start(prompt)
+        time.sleep(self.response_tokens * self.ms_per_token / 1000)
+        return "## Answer\n\n" + " ".join(self._tokens(prompt))
+
+    def stream(self, prompt: str, model_name: Optional[str] = None) -> Iterator[str]:
+        self._start(prompt)
+        yield "## Answer\n\n"
+        chunk = []
+        for token in self._tokens(prompt):
+            chunk.append(token)
+            if len(chunk) == self.chunk_tokens:
+                time.sleep(len(chunk) * self.ms_per_token / 1000)
+                yield " ".join(chunk) + " "
+                chunk = []
+        if chunk:
+            time.sleep(len(chunk) * self.ms_per_token / 1000)
+            yield " ".join(chunk)
@@ -0,0 +1,200 @@
+"""
+Admission control for the AI endpoints.
+
+Two checks run before an AI request does any work:
+
+- a token bucket per user: each role gets a burst size and a refill rate
+  (requests per minute), and each request spends ``cost`` tokens. Buckets
+  live in MongoDB (``ai_rate_limits``, updated atomically with one
+  pipeline update, so every worker sees the same state) or, with
+  AI_RATE_LIMIT_BACKEND=local, in process memory;
+- an in-flight cap per worker (AI_MAX_INFLIGHT_REQUESTS), held until the
+  response, including a streamed one, is closed.
+
+Both fail fast: the caller answers 429 with Retry-After instead of letting
+the request wait behind a busy worker. If the shared store is unreachable
+the limiter lets requests through rather than taking the AI features down.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, NamedTuple
+
+from pymongo import ReturnDocument
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AI_RATE_LIMIT_ENABLED = os.getenv("AI_RATE_LIMIT_ENABLED", "true").lower() == "true"
+AI_RATE_LIMIT_BACKEND = os.getenv("AI_RATE_LIMIT_BACKEND", "mongo").lower()
+AI_MAX_INFLIGHT_REQUESTS = int(os.getenv("AI_MAX_INFLIGHT_REQUESTS", "8"))
+
+COLLECTION = "ai_rate_limits"
+
+
+class Limit(NamedTuple):
+    """Bucket size and refill rate for one role"""
+    burst: float
+    per_minute: float
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+def _role_limit(role: str, burst: str, per_minute: str) -> Limit:
+    prefix = f"AI_RATE_LIMIT_{role.upper()}"
+    return Limit(
+        burst=float(os.getenv(f"{prefix}_BURST", burst)),
+        per_minute=float(os.getenv(f"{prefix}_PER_MINUTE", per_minute))
+    )
+
+
+ROLE_LIMITS: Dict[str, Limit] = {
+    "student": _role_limit("student", "5", "10"),
+    "teacher": _role_limit("teacher", "10", "30"),
+    "admin": _role_limit("admin", "20", "60"),
+    "super_admin": _role_limit("admin", "20", "60"),
+}
+
+
+def limit_for(role: Optional[str]) -> Limit:
+    """Limit for a role; unknown roles get the student limit"""
+    return ROLE_LIMITS.get(role or "", ROLE_LIMITS["student"])
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: float
+    retry_after: int
+
+
+def _decide(tokens: float, limit: Limit) -> Decision:
+    """Decision from the balance after spending; negative means refused"""
+    if tokens >= 0:
+        return Decision(True, tokens, 0)
+    # Seconds until the missing tokens have refilled
+    return Decision(False, 0.0, max(1, math.ceil(-tokens / limit.per_second)) if limit.per_second else 60)
+
+
+class LocalBucketStore:
+    """Buckets in process memory (single worker, tests)"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._buckets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, limit: Limit) -> Decision:
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + max(now - updated, 0) * limit.per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+        return _decide(tokens if allowed else tokens - cost, limit)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class MongoBucketStore:
+    """Buckets shared by all workers, one document per user"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def take(self, key: str, cost: float, limit: Limit) -> Decision:
+        now = datetime.utcnow()
+        elapsed = {"$max": [0, {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}]}
+        refilled = {"$min": [
+            limit.burst,
+            {"$add": [{"$ifNull": ["$tokens", limit.burst]}, {"$multiply": [elapsed, limit.per_second]}]}
+        ]}
+        doc = self.db[COLLECTION].find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled}},
+                {"$set": {
+                    "allowed": {"$gte": ["$tokens", cost]},
+                    "tokens": {"$cond": [{"$gte": ["$tokens", cost]}, {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    "updated_at": now,
+                    # An idle bucket is full again after burst / rate seconds
+                    "expires_at": now + timedelta(seconds=limit.burst / limit.per_second if limit.per_second else 3600)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return _decide(doc["tokens"] if doc["allowed"] else doc["tokens"] - cost, limit)
+
+
+class InFlightLimiter:
+    """Non-blocking cap on concurrent AI requests in this worker"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self._count >= self.limit:
+                return False
+            self._count += 1
+            return True
+
+    def leave(self) -> None:
+        with self._lock:
+            self._count = max(self._count - 1, 0)
+
+    @property
+    def in_flight(self) -> int:
+        return self._count
+
+
+_local_store = LocalBucketStore()
+_in_flight = InFlightLimiter(AI_MAX_INFLIGHT_REQUESTS)
+
+
+def get_store(db):
+    """Bucket store selected by AI_RATE_LIMIT_BACKEND"""
+    if AI_RATE_LIMIT_BACKEND == "local" or db is None:
+        return _local_store
+    return MongoBucketStore(db)
+
+
+def check_rate_limit(db, user_id: str, role: Optional[str], cost: float = 1) -> Decision:
+    """
+    Spend ``cost`` tokens from the user's bucket.
+
+    Args:
+        db: MongoDB database instance (shared backend)
+        user_id: Bucket owner
+        role: User role, selects the limit
+        cost: Tokens this request spends
+
+    Returns:
+        Decision with remaining tokens, or the seconds to wait when refused
+    """
+    if not AI_RATE_LIMIT_ENABLED:
+        return Decision(True, float("inf"), 0)
+    limit = limit_for(role)
+    try:
+        return get_store(db).take(user_id, cost, limit)
+    except Exception as e:
+        logger.warning(f"AI rate limiter unavailable, admitting request: {e}")
+        return Decision(True, 0.0, 0)
+
+
+def get_in_flight_limiter() -> InFlightLimiter:
+    """The worker's in-flight request cap"""
+    return _in_flight
@@ -0,0 +1,171 @@
+"""
+Nightly columnar export of the reporting collections.
+
+``enrollments``, ``submissions``, ``video_progress``, ``users`` and
+``courses`` are streamed through batched cursors into Parquet files, one
+snapshot per export date:
+
+    ANALYTICS_EXPORT_DIR/<collection>/export_date=YYYY-MM-DD/part-0.parquet
+
+Each batch becomes a row group, so memory stays bounded by the batch size
+whatever the collection size. A partition is written to a temporary
+directory and renamed into place, so readers never see a half-written
+snapshot. Only the columns listed in TABLES are exported (no emails or
+password hashes); ObjectIds become strings and non-numeric values in
+numeric columns become nulls.
+
+services/analytics_query.py runs reports over these files, so heavy
+institution-wide reports never touch the primary database.
+"""
+
+import os
+import shutil
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ANALYTICS_EXPORT_DIR = os.getenv(
+    "ANALYTICS_EXPORT_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "exports", "analytics")
+)
+ANALYTICS_EXPORT_BATCH_SIZE = int(os.getenv("ANALYTICS_EXPORT_BATCH_SIZE", "5000"))
+ANALYTICS_EXPORT_KEEP_DAYS = int(os.getenv("ANALYTICS_EXPORT_KEEP_DAYS", "7"))
+
+PARTITION_KEY = "export_date"
+STAGING_DIR = ".staging"
+TIMESTAMP = pa.timestamp("ms")
+
+# collection -> exported columns and their Arrow types
+TABLES: Dict[str, pa.Schema] = {
+    "enrollments": pa.schema([
+        ("_id", pa.string()), ("student_id", pa.string()), ("course_id", pa.string()),
+        ("enrolled_at", TIMESTAMP), ("progress", pa.float64()), ("is_active", pa.bool_())
+    ]),
+    "submissions": pa.schema([
+        ("_id", pa.string()), ("assignment_id", pa.string()), ("student_id", pa.string()),
+        ("course_id", pa.string()), ("submitted_at", TIMESTAMP), ("status", pa.string()),
+        ("grade", pa.float64()), ("graded_at", TIMESTAMP)
+    ]),
+    "video_progress": pa.schema([
+        ("_id", pa.string()), ("student_id", pa.string()), ("video_id", pa.string()),
+        ("course_id", pa.string()), ("watch_time", pa.float64()), ("completed", pa.bool_()),
+        ("last_watched", TIMESTAMP)
+    ]),
+    "users": pa.schema([
+        ("_id", pa.string()), ("name", pa.string()), ("role", pa.string()), ("department", pa.string()),
+        ("is_active", pa.bool_()), ("created_at", TIMESTAMP), ("last_login", TIMESTAMP)
+    ]),
+    "courses": pa.schema([
+        ("_id", pa.string()), ("title", pa.string()), ("category", pa.string()),
+        ("teacher_id", pa.string()), ("difficulty", pa.string()), ("is_active", pa.bool_()),
+        ("created_at", TIMESTAMP), ("enrollment_count", pa.int64())
+    ]),
+}
+
+
+def _coerce(value: Any, arrow_type: pa.DataType) -> Any:
+    """A MongoDB value as something Arrow accepts for the column type, or None"""
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_type):
+        return str(value)
+    if pa.types.is_timestamp(arrow_type):
+        return value if isinstance(value, datetime) else None
+    if pa.types.is_boolean(arrow_type):
+        return value if isinstance(value, bool) else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value) if pa.types.is_integer(arrow_type) else float(value)
+
+
+def to_record_batch(docs: List[Dict[str, Any]], schema: pa.Schema) -> pa.RecordBatch:
+    """Documents as one Arrow record batch with the table's columns"""
+    columns = [
+        pa.array([_coerce(doc.get(field.name), field.type) for doc in docs], type=field.type)
+        for field in schema
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def _batches(cursor: Iterable[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    batch = []
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def partition_dir(collection: str, export_date: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or ANALYTICS_EXPORT_DIR, collection, f"{PARTITION_KEY}={export_date}")
+
+
+def export_collection(db, collection: str, export_date: str, batch_size: int = ANALYTICS_EXPORT_BATCH_SIZE,
+                      root: Optional[str] = None) -> int:
+    """
+    Stream one collection into its Parquet partition for ``export_date``.
+
+    Returns:
+        Number of rows written
+    """
+    schema = TABLES[collection]
+    target = partition_dir(collection, export_date, root)
+    staging = os.path.join(root or ANALYTICS_EXPORT_DIR, STAGING_DIR, f"{collection}-{export_date}")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    rows = 0
+    cursor = db[collection].find({}, {field.name: 1 for field in schema}, batch_size=batch_size)
+    with pq.ParquetWriter(os.path.join(staging, "part-0.parquet"), schema) as writer:
+        for docs in _batches(cursor, batch_size):
+            writer.write_batch(to_record_batch(docs, schema))
+            rows += len(docs)
+
+    # Swap the finished partition in (re-running a date replaces it)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    return rows
+
+
+def prune(keep_days: int = ANALYTICS_EXPORT_KEEP_DAYS, root: Optional[str] = None,
+          today: Optional[datetime] = None) -> int:
+    """Delete export partitions older than ``keep_days``; returns how many were removed"""
+    root = root or ANALYTICS_EXPORT_DIR
+    cutoff = ((today or datetime.utcnow()) - timedelta(days=keep_days)).strftime("%Y-%m-%d")
+    removed = 0
+    for collection in TABLES:
+        directory = os.path.join(root, collection)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            key, _, value = name.partition("=")
+            if key == PARTITION_KEY and value < cutoff:
+                shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def export_all(db, export_date: Optional[str] = None, collections: Optional[List[str]] = None,
+               batch_size: int = ANALYTICS_EXPORT_BATCH_SIZE, root: Optional[str] = None) -> Dict[str, int]:
+    """
+    Export every reporting collection (or the given ones) for one date.
+
+    Returns:
+        collection -> rows written
+    """
+    export_date = export_date or datetime.utcnow().strftime("%Y-%m-%d")
+    counts = {}
+    for collection in collections or list(TABLES):
+        counts[collection] = export_collection(db, collection, export_date, batch_size, root)
+        logger.info(f"Exported {counts[collection]} {collection} rows for {export_date}")
+    return counts
@@ -0,0 +1,112 @@
+"""
+Local reports over the columnar analytics export.
+
+Reads one snapshot (the latest by default) of an exported collection with
+pyarrow.dataset, pushing column selection and filters down to the Parquet
+reader, and runs group-bys and joins in Arrow. Nothing here talks to
+MongoDB, so institution-wide reports put no load on the primary database.
+
+    from services import analytics_query
+
+    # Average grade and graded submissions per course
+    analytics_query.group_by(
+        "submissions", ["course_id"], {"grade": ["mean", "count"]},
+        filters=[("status", "==", "graded")]
+    )
+
+    # Enrollments joined with submissions
+    enrollments = analytics_query.load("enrollments", ["student_id", "course_id", "progress"])
+    submissions = analytics_query.load("submissions", ["student_id", "course_id", "grade"])
+    joined = enrollments.join(submissions, ["student_id", "course_id"], join_type="left outer")
+"""
+
+import os
+import operator
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from services.analytics_export import ANALYTICS_EXPORT_DIR, PARTITION_KEY, TABLES, partition_dir
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda field, values: field.isin(list(values)),
+}
+
+Filter = Tuple[str, str, Any]
+
+
+def export_dates(collection: str, root: Optional[str] = None) -> List[str]:
+    """Export dates available for a collection, oldest first"""
+    directory = os.path.join(root or ANALYTICS_EXPORT_DIR, collection)
+    if not os.path.isdir(directory):
+        return []
+    dates = []
+    for name in os.listdir(directory):
+        key, _, value = name.partition("=")
+        if key == PARTITION_KEY:
+            dates.append(value)
+    return sorted(dates)
+
+
+def latest_export_date(collection: str, root: Optional[str] = None) -> Optional[str]:
+    dates = export_dates(collection, root)
+    return dates[-1] if dates else None
+
+
+def build_filter(filters: Sequence[Filter]) -> Optional[ds.Expression]:
+    """(column, operator, value) triples as one AND-ed dataset expression"""
+    expression = None
+    for column, op, value in filters:
+        if op not in OPERATORS:
+            raise ValueError(f"Unsupported operator {op!r}; use one of {', '.join(OPERATORS)}")
+        condition = OPERATORS[op](ds.field(column), value)
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def load(collection: str, columns: Optional[List[str]] = None, filters: Sequence[Filter] = (),
+         export_date: Optional[str] = None, root: Optional[str] = None) -> pa.Table:
+    """
+    Rows of one export snapshot as an Arrow table.
+
+    Args:
+        collection: One of the exported collections
+        columns: Columns to read (all by default)
+        filters: (column, operator, value) conditions, all of which must hold
+        export_date: Snapshot to read (latest by default)
+    """
+    if collection not in TABLES:
+        raise ValueError(f"Unknown collection {collection!r}; exported: {', '.join(TABLES)}")
+    export_date = export_date or latest_export_date(collection, root)
+    if export_date is None:
+        raise FileNotFoundError(f"No export of {collection} found; run scripts/export_analytics.py")
+    dataset = ds.dataset(partition_dir(collection, export_date, root), format="parquet")
+    return dataset.to_table(columns=columns, filter=build_filter(filters))
+
+
+def group_by(collection: str, keys: List[str], aggregations: Dict[str, List[str]],
+             filters: Sequence[Filter] = (), export_date: Optional[str] = None,
+             root: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Filtered group-by over one export snapshot.
+
+    Args:
+        keys: Columns to group by
+        aggregations: column -> Arrow aggregate names (mean, sum, min, max, count, count_distinct, ...)
+
+    Returns:
+        One dict per group with the keys and '<column>_<aggregate>' values
+    """
+    columns = list(dict.fromkeys([*keys, *aggregations]))
+    table = load(collection, columns, filters, export_date, root)
+    result = table.group_by(keys).aggregate([
+        (column, function) for column, functions in aggregations.items() for function in functions
+    ])
+    return result.to_pylist()
@@ -0,0 +1,191 @@
+"""
+Context assembly for /api/ai/chat prompts.
+
+Builds the "Student Context" and recent-conversation sections of a chat
+prompt within a fixed token budget:
+
+- the enrolled-course line is cached per user for a few minutes instead of
+  re-reading enrollments and courses on every message;
+- prior turns come from one projected query on chat_history, served by the
+  (user_id, timestamp, _id) index, newest first until the budget is used up;
+- the student's message and each prior turn are trimmed, so pasted
+  documents cannot blow up the prompt.
+"""
+
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+from bson import ObjectId
+
+from services.ai_cache import LRUCache
+from services.document_summarizer import estimate_tokens, CHARS_PER_TOKEN
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+AI_CHAT_CONTEXT_TOKENS = int(os.getenv("AI_CHAT_CONTEXT_TOKENS", "1200"))
+AI_CHAT_MESSAGE_TOKENS = int(os.getenv("AI_CHAT_MESSAGE_TOKENS", "4000"))
+AI_CHAT_HISTORY_TURNS = int(os.getenv("AI_CHAT_HISTORY_TURNS", "6"))
+AI_CHAT_TURN_TOKENS = int(os.getenv("AI_CHAT_TURN_TOKENS", "200"))
+AI_CHAT_COURSE_CONTEXT_SECONDS = int(os.getenv("AI_CHAT_COURSE_CONTEXT_SECONDS", "300"))
+
+TRUNCATION_MARKER = " ..."
+
+_course_context = LRUCache(max_entries=2048, ttl_seconds=AI_CHAT_COURSE_CONTEXT_SECONDS)
+_course_ids = LRUCache(max_entries=2048, ttl_seconds=AI_CHAT_COURSE_CONTEXT_SECONDS)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly ``max_tokens`` on a word boundary"""
+    text = (text or "").strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(max_tokens * CHARS_PER_TOKEN - len(TRUNCATION_MARKER), 0)
+    cut = text[:max_chars]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut + TRUNCATION_MARKER
+
+
+def trim_message(message: str) -> str:
+    """The student's message as it may appear in a prompt"""
+    return trim_to_tokens(message, AI_CHAT_MESSAGE_TOKENS)
+
+
+def get_course_context(db, user: Dict[str, Any]) -> str:
+    """
+    "Enrolled courses: ..." for a student, cached per user.
+
+    Returns an empty string for other roles or students without courses.
+    """
+    if user.get("role") != "student":
+        return ""
+
+    user_id = str(user["_id"])
+    cached = _course_context.get(user_id)
+    if cached is not None:
+        return cached
+
+    course_ids = get_course_ids(db, user)
+    line = ""
+    if course_ids:
+        titles = [
+            course["title"]
+            for course in db.courses.find(
+                {"_id": {"$in": [ObjectId(cid) for cid in course_ids if ObjectId.is_valid(cid)]}},
+                {"title": 1}
+            )
+        ]
+        if titles:
+            line = f"Enrolled courses: {', '.join(titles)}"
+
+    _course_context.set(user_id, line)
+    return line
+
+
+def get_course_ids(db, user: Dict[str, Any]) -> List[str]:
+    """Courses a student is enrolled in or a teacher teaches, cached per user"""
+    user_id = str(user["_id"])
+    cached = _course_ids.get(user_id)
+    if cached is not None:
+        return list(cached)
+
+    if user.get("role") == "student":
+        course_ids = [
+            enrollment["course_id"]
+            for enrollment in db.enrollments.find({"student_id": user_id}, {"course_id": 1, "_id": 0})
+        ]
+    elif user.get("role") == "teacher":
+        course_ids = [str(course["_id"]) for course in db.courses.find({"teacher_id": user_id}, {"_id": 1})]
+    else:
+        course_ids = []
+
+    _course_ids.set(user_id, tuple(course_ids))
+    return course_ids
+
+
+def invalidate_course_context(user_id: str) -> None:
+    """Drop this worker's cached course line for a user (e.g. after enrolling)"""
+    _course_context.delete(user_id)
+    _course_ids.delete(user_id)
+
+
+def get_recent_turns(db, user_id: str, limit: int = AI_CHAT_HISTORY_TURNS) -> List[Dict[str, str]]:
+    """Last ``limit`` exchanges for a user, oldest first (message and response only)"""
+    if limit <= 0:
+        return []
+    turns = list(
+        db.chat_history.find({"user_id": user_id}, {"message": 1, "response": 1, "_id": 0})
+        .sort("timestamp", -1)
+        .limit(limit)
+    )
+    turns.reverse()
+    return turns
+
+
+def format_history(turns: List[Dict[str, str]], max_tokens: int) -> str:
+    """
+    Render prior turns newest-first into the budget, then restore chronological order.
+
+    Each turn is trimmed to AI_CHAT_TURN_TOKENS; turns that no longer fit are dropped.
+    """
+    lines: List[str] = []
+    used = 0
+    for turn in reversed(turns):
+        student = trim_to_tokens(turn.get("message", ""), AI_CHAT_TURN_TOKENS // 2)
+        assistant = trim_to_tokens(turn.get("response", ""), AI_CHAT_TURN_TOKENS)
+        block = f"Student: {student}\nAssistant: {assistant}"
+        tokens = estimate_tokens(block)
+        if used + tokens > max_tokens:
+            break
+        lines.append(block)
+        used += tokens
+    lines.reverse()
+    return "\n\n".join(lines)
+
+
+def build_chat_context(db, user: Dict[str, Any], include_history: bool = False,
+                       budget: Optional[int] = None) -> Dict[str, str]:
+    """
+    Assemble the context sections for a chat prompt.
+
+    Args:
+        db: MongoDB database instance
+        user: The requesting user's document
+        include_history: Add recent turns (only for personal, uncached answers)
+        budget: Token budget for everything except the message
+
+    Returns:
+        Dict with 'context' (name, role and courses), 'course_context'
+        (role and courses, no personal details - safe for shared cache keys)
+        and 'history' (may be empty)
+    """
+    budget = AI_CHAT_CONTEXT_TOKENS if budget is None else budget
+
+    profile = f"User: {user['name']}; Role: {user['role']}"
+    parts = [profile]
+    courses = get_course_context(db, user)
+    if courses:
+        # Course titles may take at most half of what the profile leaves over
+        parts.append(trim_to_tokens(courses, max((budget - estimate_tokens(profile)) // 2, 0)))
+    context = "; ".join(parts)
+
+    history = ""
+    if include_history:
+        remaining = budget - estimate_tokens(context)
+        if remaining > 0:
+            history = format_history(get_recent_turns(db, str(user["_id"])), remaining)
+
+    return {
+        "context": context,
+        "course_context": "; ".join([f"Role: {user['role']}"] + parts[1:]),
+        "history": history
+    }
+
+
+def clear_cache() -> None:
+    """Drop cached course context (used by tests)"""
+    _course_context.clear()
+    _course_ids.clear()
@@ -0,0 +1,243 @@
+"""
+Denormalized counters on courses and assignments.
+
+Courses carry ``enrollment_count``, ``material_count`` and
+``required_material_count``; assignments carry ``submission_count``,
+``graded_count`` and ``pending_count``. The write paths that create or
+remove the counted documents adjust them with an atomic ``$inc``, so
+listing pages read counts off the parent document instead of running a
+count per row.
+
+Documents created before the counters existed have no counter fields.
+Increments skip them (an ``$inc`` would create a count starting from the
+delta), and readers go through ``ensure_course_counters`` /
+``ensure_assignment_counters``, which count a missing field from the source
+collection once and write it back. ``backfill_missing_counters`` does the
+same for every such document at startup.
+
+Counter updates never break the write that triggered them; failures are
+logged and scripts/repair_counters.py recomputes every counter from the
+source collections.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COURSE_COUNTERS = ("enrollment_count", "material_count", "required_material_count")
+ASSIGNMENT_COUNTERS = ("submission_count", "graded_count", "pending_count")
+
+
+def initial_course_counters() -> Dict[str, int]:
+    """Counter fields for a new course document"""
+    return {field: 0 for field in COURSE_COUNTERS}
+
+
+def initial_assignment_counters() -> Dict[str, int]:
+    """Counter fields for a new assignment document"""
+    return {field: 0 for field in ASSIGNMENT_COUNTERS}
+
+
+def _increment(db, collection: str, doc_id: str, deltas: Dict[str, int]) -> None:
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or not ObjectId.is_valid(str(doc_id)):
+        return
+    try:
+        # Documents without the fields yet are counted on first read instead
+        query = {"_id": ObjectId(str(doc_id)), **{field: {"$ne": None} for field in deltas}}
+        db[collection].update_one(query, {"$inc": deltas})
+    except Exception as e:
+        logger.warning(f"Failed to update {collection} counters for {doc_id}: {e}")
+
+
+def record_enrollment(db, course_id: str, delta: int = 1) -> None:
+    """A student enrolled (1) or unenrolled (-1)"""
+    _increment(db, "courses", course_id, {"enrollment_count": delta})
+
+
+def record_materials(db, course_id: str, count: int, required: int) -> None:
+    """Materials added (positive) or removed (negative), ``required`` of them required"""
+    _increment(db, "courses", course_id, {"material_count": count, "required_material_count": required})
+
+
+def record_material(db, course_id: str, is_required: bool, delta: int = 1) -> None:
+    """A material was added (1) or removed (-1)"""
+    record_materials(db, course_id, delta, delta if is_required else 0)
+
+
+def record_submission(db, assignment_id: str) -> None:
+    """A new, ungraded submission"""
+    _increment(db, "assignments", assignment_id, {"submission_count": 1, "pending_count": 1})
+
+
+def record_grade(db, assignment_id: str, previous_grade: Optional[float]) -> None:
+    """A submission was graded; re-grades leave the counters alone"""
+    if previous_grade is None:
+        _increment(db, "assignments", assignment_id, {"graded_count": 1, "pending_count": -1})
+
+
+# --- Missing counters ----------------------------------------------------
+
+def count_course(db, course_id: str, fields: Iterable[str] = COURSE_COUNTERS) -> Dict[str, int]:
+    """Counters of one course counted from enrollments and materials"""
+    counts = {}
+    if "enrollment_count" in fields:
+        counts["enrollment_count"] = db.enrollments.count_documents({"course_id": course_id})
+    if "material_count" in fields:
+        counts["material_count"] = db.materials.count_documents({"course_id": course_id})
+    if "required_material_count" in fields:
+        counts["required_material_count"] = db.materials.count_documents({"course_id": course_id, "is_required": True})
+    return counts
+
+
+def count_assignment(db, assignment_id: str, fields: Iterable[str] = ASSIGNMENT_COUNTERS) -> Dict[str, int]:
+    """Counters of one assignment counted from its submissions"""
+    submitted = db.submissions.count_documents({"assignment_id": assignment_id})
+    graded = db.submissions.count_documents({"assignment_id": assignment_id, "grade": {"$ne": None}})
+    counts = {"submission_count": submitted, "graded_count": graded, "pending_count": submitted - graded}
+    return {field: counts[field] for field in fields}
+
+
+def _ensure(db, collection: str, doc: Dict[str, Any], fields: Iterable[str],
+            count: Callable[..., Dict[str, int]]) -> Dict[str, int]:
+    missing = [field for field in fields if doc.get(field) is None]
+    if missing:
+        doc_id = ObjectId(str(doc["_id"]))
+        counted = count(db, str(doc_id), missing)
+        try:
+            # Another reader may have filled the fields in the meantime
+            db[collection].update_one(
+                {"_id": doc_id, **{field: None for field in missing}},
+                {"$set": counted}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store {collection} counters for {doc_id}: {e}")
+        doc.update(counted)
+    return {field: doc[field] for field in fields}
+
+
+def ensure_course_counters(db, course: Dict[str, Any], fields: Iterable[str] = COURSE_COUNTERS) -> Dict[str, int]:
+    """
+    The course's counters, counting and storing any the document lacks.
+
+    ``course`` must include ``_id`` and the requested fields (when stored);
+    it is updated in place.
+    """
+    return _ensure(db, "courses", course, fields, count_course)
+
+
+def ensure_assignment_counters(db, assignment: Dict[str, Any],
+                               fields: Iterable[str] = ASSIGNMENT_COUNTERS) -> Dict[str, int]:
+    """The assignment's counters, counting and storing any the document lacks"""
+    return _ensure(db, "assignments", assignment, fields, count_assignment)
+
+
+def _missing_any(fields: Iterable[str]) -> Dict[str, Any]:
+    # {field: None} matches both absent and null fields
+    return {"$or": [{field: None} for field in fields]}
+
+
+def backfill_missing_counters(db) -> Dict[str, int]:
+    """
+    Count and store the counters of every document that lacks them.
+
+    Once every document has its counters this is one ``find`` per collection
+    that matches nothing, so it runs at database initialization.
+
+    Returns:
+        {'courses': n, 'assignments': n} documents filled in
+    """
+    filled = {}
+    for collection, fields, ensure in (
+        ("courses", COURSE_COUNTERS, ensure_course_counters),
+        ("assignments", ASSIGNMENT_COUNTERS, ensure_assignment_counters),
+    ):
+        filled[collection] = 0
+        for doc in db[collection].find(_missing_any(fields), {field: 1 for field in fields}):
+            ensure(db, doc)
+            filled[collection] += 1
+    if any(filled.values()):
+        logger.info(f"Backfilled missing counters: {filled}")
+    return filled
+
+
+# --- Verification and repair ----------------------------------------------
+
+def expected_course_counters(db) -> Dict[str, Dict[str, int]]:
+    """course_id -> counters recomputed from enrollments and materials"""
+    counters = defaultdict(initial_course_counters)
+    for group in db.enrollments.aggregate([
+        {"$group": {"_id": "$course_id", "count": {"$sum": 1}}}
+    ]):
+        counters[str(group["_id"])]["enrollment_count"] = group["count"]
+    for group in db.materials.aggregate([
+        {"$group": {
+            "_id": "$course_id",
+            "count": {"$sum": 1},
+            "required": {"$sum": {"$cond": [{"$eq": ["$is_required", True]}, 1, 0]}}
+        }}
+    ]):
+        counters[str(group["_id"])]["material_count"] = group["count"]
+        counters[str(group["_id"])]["required_material_count"] = group["required"]
+    return counters
+
+
+def expected_assignment_counters(db) -> Dict[str, Dict[str, int]]:
+    """assignment_id -> counters recomputed from submissions"""
+    counters = defaultdict(initial_assignment_counters)
+    for group in db.submissions.aggregate([
+        {"$group": {
+            "_id": "$assignment_id",
+            "count": {"$sum": 1},
+            "graded": {"$sum": {"$cond": [{"$ne": [{"$ifNull": ["$grade", None]}, None]}, 1, 0]}}
+        }}
+    ]):
+        counters[str(group["_id"])].update({
+            "submission_count": group["count"],
+            "graded_count": group["graded"],
+            "pending_count": group["count"] - group["graded"]
+        })
+    return counters
+
+
+def _verify(db, collection: str, fields, expected: Dict[str, Dict[str, int]], repair: bool) -> Dict[str, int]:
+    operations = []
+    checked = 0
+    for doc in db[collection].find({}, {field: 1 for field in fields}):
+        checked += 1
+        stored = {field: doc.get(field) for field in fields}
+        wanted = expected.get(str(doc["_id"])) or {field: 0 for field in fields}
+        if stored != wanted:
+            # Only overwrite if nothing changed the counters since they were read
+            operations.append(UpdateOne({"_id": doc["_id"], **stored}, {"$set": wanted}))
+
+    fixed = 0
+    if repair and operations:
+        fixed = db[collection].bulk_write(operations, ordered=False).modified_count
+    return {"checked": checked, "mismatched": len(operations), "fixed": fixed}
+
+
+def verify_counters(db, repair: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Compare every stored counter with the source collections.
+
+    Args:
+        db: MongoDB database instance
+        repair: Overwrite mismatched counters with the recomputed values
+
+    Returns:
+        {'courses': {...}, 'assignments': {...}} with checked, mismatched and fixed counts
+    """
+    results = {
+        "courses": _verify(db, "courses", COURSE_COUNTERS, expected_course_counters(db), repair),
+        "assignments": _verify(db, "assignments", ASSIGNMENT_COUNTERS, expected_assignment_counters(db), repair)
+    }
+    logger.info(f"Counter verification: {results}")
+    return results
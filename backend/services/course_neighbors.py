@@ -0,0 +1,180 @@
+"""
+"Students also took" neighbours from co-enrollment.
+
+A periodic job (scripts/build_course_neighbors.py) streams the enrollments
+collection into a sparse binary student x course matrix X. Item-item
+co-occurrence is X.T @ X; dividing by sqrt(n_i * n_j) plus a shrink term gives
+a cosine similarity that does not over-reward tiny courses. The top-K
+neighbours of every course are written to ``course_neighbors`` (one document
+per course, keyed by course ID), so serving them is a single ``$in`` read.
+"""
+
+import os
+import logging
+from array import array
+from datetime import datetime
+from typing import Dict, List, Tuple, Any, Iterable
+
+import numpy as np
+from scipy import sparse
+from pymongo import ReplaceOne
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COURSE_NEIGHBORS_TOP_K = int(os.getenv("COURSE_NEIGHBORS_TOP_K", "20"))
+COURSE_NEIGHBORS_MIN_CO_ENROLLMENTS = int(os.getenv("COURSE_NEIGHBORS_MIN_CO_ENROLLMENTS", "2"))
+COURSE_NEIGHBORS_SHRINK = float(os.getenv("COURSE_NEIGHBORS_SHRINK", "10"))
+RECOMMENDER_COLLAB_WEIGHT = float(os.getenv("RECOMMENDER_COLLAB_WEIGHT", "0.6"))
+
+COLLECTION = "course_neighbors"
+WRITE_BATCH_SIZE = 500
+
+
+def build_enrollment_matrix(pairs: Iterable[Tuple[str, str]]) -> Tuple[sparse.csr_matrix, List[str]]:
+    """
+    Binary student x course CSR matrix from (student_id, course_id) pairs.
+
+    Returns:
+        (matrix, course_ids) where column j is course_ids[j]
+    """
+    student_index: Dict[str, int] = {}
+    course_index: Dict[str, int] = {}
+    rows, cols = array("i"), array("i")
+    for student_id, course_id in pairs:
+        rows.append(student_index.setdefault(student_id, len(student_index)))
+        cols.append(course_index.setdefault(course_id, len(course_index)))
+
+    data = np.ones(len(rows), dtype=np.float32)
+    matrix = sparse.csr_matrix(
+        (data, (np.frombuffer(rows, dtype=np.int32), np.frombuffer(cols, dtype=np.int32))),
+        shape=(len(student_index), len(course_index))
+    )
+    # Duplicate enrollments collapse to 1
+    matrix.data[:] = 1.0
+    course_ids = [None] * len(course_index)
+    for course_id, column in course_index.items():
+        course_ids[column] = course_id
+    return matrix, course_ids
+
+
+def compute_neighbors(matrix: sparse.csr_matrix, course_ids: List[str],
+                      top_k: int = COURSE_NEIGHBORS_TOP_K,
+                      min_co_enrollments: int = COURSE_NEIGHBORS_MIN_CO_ENROLLMENTS,
+                      shrink: float = COURSE_NEIGHBORS_SHRINK) -> Dict[str, Dict[str, Any]]:
+    """
+    Top-K shrunk-cosine neighbours per course.
+
+    Returns:
+        course_id -> {'enrolled_count': n, 'neighbors': [{course_id, score, co_enrollments}, ...]}
+    """
+    co_occurrence = (matrix.T @ matrix).tocsr()
+    counts = np.asarray(co_occurrence.diagonal()).ravel()
+    co_occurrence.setdiag(0)
+    co_occurrence.eliminate_zeros()
+    if min_co_enrollments > 1:
+        co_occurrence.data[co_occurrence.data < min_co_enrollments] = 0
+        co_occurrence.eliminate_zeros()
+
+    results = {}
+    for column, course_id in enumerate(course_ids):
+        start, end = co_occurrence.indptr[column], co_occurrence.indptr[column + 1]
+        neighbors_at = co_occurrence.indices[start:end]
+        together = co_occurrence.data[start:end]
+        neighbors = []
+        if len(neighbors_at):
+            scores = together / (np.sqrt(counts[column] * counts[neighbors_at]) + shrink)
+            keep = min(top_k, len(scores))
+            best = np.argpartition(-scores, keep - 1)[:keep]
+            best = best[np.argsort(-scores[best])]
+            neighbors = [
+                {
+                    "course_id": course_ids[neighbors_at[i]],
+                    "score": round(float(scores[i]), 4),
+                    "co_enrollments": int(together[i])
+                }
+                for i in best
+            ]
+        results[course_id] = {"enrolled_count": int(counts[column]), "neighbors": neighbors}
+    return results
+
+
+def iter_enrollment_pairs(db, batch_size: int = 5000) -> Iterable[Tuple[str, str]]:
+    """Stream (student_id, course_id) for active enrollments"""
+    cursor = db.enrollments.find(
+        {"is_active": {"$ne": False}},
+        {"student_id": 1, "course_id": 1, "_id": 0}
+    ).batch_size(batch_size)
+    for enrollment in cursor:
+        if enrollment.get("student_id") and enrollment.get("course_id"):
+            yield enrollment["student_id"], enrollment["course_id"]
+
+
+def rebuild_course_neighbors(db, top_k: int = COURSE_NEIGHBORS_TOP_K) -> Dict[str, int]:
+    """
+    Recompute and store neighbours for every course with enrollments.
+
+    Courses that no longer have enrollments lose their document.
+
+    Returns:
+        Counts of students, courses and enrollments processed
+    """
+    started = datetime.utcnow()
+    matrix, course_ids = build_enrollment_matrix(iter_enrollment_pairs(db))
+    neighbors = compute_neighbors(matrix, course_ids, top_k=top_k)
+
+    operations = []
+    for course_id, entry in neighbors.items():
+        operations.append(ReplaceOne(
+            {"_id": course_id},
+            {"_id": course_id, **entry, "computed_at": started},
+            upsert=True
+        ))
+        if len(operations) >= WRITE_BATCH_SIZE:
+            db[COLLECTION].bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        db[COLLECTION].bulk_write(operations, ordered=False)
+
+    removed = db[COLLECTION].delete_many({"computed_at": {"$lt": started}}).deleted_count
+    return {
+        "students": matrix.shape[0],
+        "courses": matrix.shape[1],
+        "enrollments": int(matrix.nnz),
+        "removed": removed
+    }
+
+
+def collaborative_scores(neighbor_docs: Iterable[Dict[str, Any]], exclude: set) -> Dict[str, float]:
+    """Sum neighbour scores across a student's courses"""
+    scores: Dict[str, float] = {}
+    for doc in neighbor_docs:
+        for neighbor in doc.get("neighbors", []):
+            course_id = neighbor["course_id"]
+            if course_id not in exclude:
+                scores[course_id] = scores.get(course_id, 0.0) + neighbor["score"]
+    return scores
+
+
+def blend_scores(collaborative: Dict[str, float], content: Dict[str, float],
+                 weight: float = RECOMMENDER_COLLAB_WEIGHT, k: int = 5) -> List[Tuple[str, float, str]]:
+    """
+    Combine collaborative and content scores, each scaled to [0, 1].
+
+    Returns:
+        (course_id, blended score, main source) tuples, best first
+    """
+    def scaled(scores):
+        top = max(scores.values(), default=0.0)
+        return {course_id: score / top for course_id, score in scores.items()} if top > 0 else {}
+
+    collaborative, content = scaled(collaborative), scaled(content)
+    blended = []
+    for course_id in set(collaborative) | set(content):
+        collab = weight * collaborative.get(course_id, 0.0)
+        similar = (1 - weight) * content.get(course_id, 0.0)
+        source = "also_took" if collab >= similar else "similar_content"
+        blended.append((course_id, round(collab + similar, 4), source))
+    blended.sort(key=lambda item: (-item[1], item[0]))
+    return blended[:k]
@@ -0,0 +1,248 @@
+"""
+Content-based course recommendations with a local TF-IDF model.
+
+Each active course is turned into a bag of words from its title, category,
+description, learning objectives and tags. The model keeps the term counts
+per course and a row-normalized TF-IDF matrix (NumPy, float32). A student's
+profile is the mean of their enrolled courses' rows; recommendations are the
+unenrolled courses with the highest cosine similarity to it.
+
+The model lives in each worker and is refreshed incrementally: only courses
+whose ``updated_at`` moved past the last sync are re-tokenized, then the IDF
+weights and matrix are recomputed from the cached counts. A full rebuild runs
+every RECOMMENDER_FULL_REBUILD_SECONDS to pick up hard-deleted courses.
+"""
+
+import os
+import re
+import math
+import time
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RECOMMENDER_REFRESH_SECONDS = int(os.getenv("RECOMMENDER_REFRESH_SECONDS", "300"))
+RECOMMENDER_FULL_REBUILD_SECONDS = int(os.getenv("RECOMMENDER_FULL_REBUILD_SECONDS", "3600"))
+RECOMMENDER_MAX_FEATURES = int(os.getenv("RECOMMENDER_MAX_FEATURES", "5000"))
+
+# Field -> repeat count; titles and categories say more about a course than prose
+FIELD_WEIGHTS = {"title": 3, "category": 2, "learning_objectives": 2, "tags": 2, "description": 1}
+COURSE_FIELDS = {field: 1 for field in FIELD_WEIGHTS}
+COURSE_FIELDS.update({"is_active": 1, "updated_at": 1})
+
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have how in into is it its of on or
+    that the this to was were will with you your we our their they this these
+    those can learn learning course courses student students introduction basics
+""".split())
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words or single characters"""
+    return [
+        token for token in _TOKEN_PATTERN.findall((text or "").lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def course_terms(course: Dict[str, Any]) -> Counter:
+    """Weighted term counts for one course document"""
+    counts: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = course.get(field)
+        if isinstance(value, (list, tuple)):
+            value = " ".join(str(item) for item in value)
+        for token in tokenize(value if isinstance(value, str) else ""):
+            counts[token] += weight
+    return counts
+
+
+class TfidfModel:
+    """TF-IDF matrix over the active course catalogue"""
+
+    def __init__(self, max_features: int = RECOMMENDER_MAX_FEATURES):
+        self.max_features = max_features
+        self.course_counts: Dict[str, Counter] = {}
+        self.course_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.vocabulary: Dict[str, int] = {}
+        self.terms: List[str] = []
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def update(self, courses: List[Dict[str, Any]]) -> int:
+        """Add, replace or drop courses; returns how many changed"""
+        for course in courses:
+            course_id = str(course["_id"])
+            if course.get("is_active", True):
+                self.course_counts[course_id] = course_terms(course)
+            else:
+                self.course_counts.pop(course_id, None)
+        return len(courses)
+
+    def remove_missing(self, existing_ids: set) -> None:
+        for course_id in list(self.course_counts):
+            if course_id not in existing_ids:
+                del self.course_counts[course_id]
+
+    def rebuild(self) -> None:
+        """Recompute vocabulary, IDF and the normalized matrix from cached counts"""
+        document_frequency: Counter = Counter()
+        for counts in self.course_counts.values():
+            document_frequency.update(counts.keys())
+
+        # Keep the most widespread terms when the vocabulary is capped
+        terms = [term for term, _ in document_frequency.most_common(self.max_features)]
+        terms.sort()
+        vocabulary = {term: index for index, term in enumerate(terms)}
+        course_ids = sorted(self.course_counts)
+
+        matrix = np.zeros((len(course_ids), len(terms)), dtype=np.float32)
+        for row, course_id in enumerate(course_ids):
+            for term, count in self.course_counts[course_id].items():
+                column = vocabulary.get(term)
+                if column is not None:
+                    # Sublinear term frequency
+                    matrix[row, column] = 1.0 + math.log(count)
+
+        total = len(course_ids)
+        df = np.array([document_frequency[term] for term in terms], dtype=np.float32)
+        idf = (np.log((1.0 + total) / (1.0 + df)) + 1.0).astype(np.float32)
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        self.terms, self.vocabulary, self.idf = terms, vocabulary, idf
+        self.course_ids = course_ids
+        self.row_of = {course_id: row for row, course_id in enumerate(course_ids)}
+        self.matrix = matrix
+
+    def vectorize(self, text: str) -> np.ndarray:
+        """TF-IDF vector for free text (e.g. a department name)"""
+        vector = np.zeros(len(self.terms), dtype=np.float32)
+        for term, count in Counter(tokenize(text)).items():
+            column = self.vocabulary.get(term)
+            if column is not None:
+                vector[column] = (1.0 + math.log(count)) * self.idf[column]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def profile(self, course_ids: List[str]) -> np.ndarray:
+        """Normalized mean of the given courses' rows"""
+        rows = [self.row_of[course_id] for course_id in course_ids if course_id in self.row_of]
+        if not rows:
+            return np.zeros(len(self.terms), dtype=np.float32)
+        vector = self.matrix[rows].mean(axis=0)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def top_k(self, profile: np.ndarray, exclude: set, k: int) -> List[Tuple[str, float, List[str]]]:
+        """
+        Most similar courses to a profile vector.
+
+        Returns:
+            (course_id, cosine score, up to three shared terms) tuples, best first
+        """
+        if not self.course_ids or not profile.any():
+            return []
+        scores = self.matrix @ profile
+        for course_id in exclude:
+            row = self.row_of.get(course_id)
+            if row is not None:
+                scores[row] = -1.0
+
+        count = min(k, len(scores))
+        candidates = np.argpartition(-scores, count - 1)[:count]
+        ranked = candidates[np.argsort(-scores[candidates])]
+
+        results = []
+        for row in ranked:
+            score = float(scores[row])
+            if score <= 0:
+                break
+            overlap = self.matrix[row] * profile
+            shared = [self.terms[column] for column in np.argsort(-overlap)[:3] if overlap[column] > 0]
+            results.append((self.course_ids[row], round(score, 4), shared))
+        return results
+
+
+class CourseRecommender:
+    """Per-worker model with throttled incremental refresh from MongoDB"""
+
+    def __init__(self):
+        self.model = TfidfModel()
+        self.synced_at: Optional[datetime] = None
+        self.checked_at = 0.0
+        self.rebuilt_at = 0.0
+        self.dirty = True
+        self.lock = threading.Lock()
+
+    def mark_dirty(self) -> None:
+        """Refresh on the next request (called after course writes in this worker)"""
+        self.dirty = True
+
+    def refresh(self, db, force_full: bool = False) -> None:
+        now = time.monotonic()
+        if not (self.dirty or force_full or now - self.checked_at >= RECOMMENDER_REFRESH_SECONDS):
+            return
+
+        with self.lock:
+            full = force_full or self.synced_at is None or now - self.rebuilt_at >= RECOMMENDER_FULL_REBUILD_SECONDS
+            sync_started = datetime.utcnow()
+
+            if full:
+                courses = list(db.courses.find({"is_active": True}, COURSE_FIELDS))
+                self.model = TfidfModel()
+                self.model.update(courses)
+                changed = len(courses)
+                self.rebuilt_at = now
+            else:
+                courses = list(db.courses.find({"updated_at": {"$gt": self.synced_at}}, COURSE_FIELDS))
+                changed = self.model.update(courses)
+
+            if changed or full:
+                self.model.rebuild()
+                logger.info(f"Course recommender {'rebuilt' if full else 'updated'}: "
+                            f"{changed} courses changed, {len(self.model.course_ids)} indexed")
+
+            self.synced_at = sync_started
+            self.checked_at = now
+            self.dirty = False
+
+    def recommend(self, db, enrolled_ids: List[str], fallback_text: str = "",
+                  k: int = 5) -> List[Tuple[str, float, List[str]]]:
+        """Top ``k`` unenrolled courses for a student"""
+        self.refresh(db)
+        model = self.model
+        profile = model.profile(enrolled_ids)
+        if not profile.any() and fallback_text:
+            profile = model.vectorize(fallback_text)
+        return model.top_k(profile, set(enrolled_ids), k)
+
+
+_recommender = CourseRecommender()
+
+
+def get_recommender() -> CourseRecommender:
+    """The worker's shared recommender"""
+    return _recommender
+
+
+def build_reason(shared_terms: List[str], enrolled_titles: List[str]) -> str:
+    """Short template explanation for a recommendation"""
+    if shared_terms and enrolled_titles:
+        return f"Builds on topics from your courses ({', '.join(shared_terms)})"
+    if shared_terms:
+        return f"Matches your interests: {', '.join(shared_terms)}"
+    return "Popular with students like you"
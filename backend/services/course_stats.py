@@ -0,0 +1,335 @@
+"""
+Precomputed per-course statistics.
+
+One document per course in ``course_stats`` holds the course-level numbers
+the course list, course analytics and student progress pages show:
+enrollment and progress figures, performance buckets, submission and grade
+totals, per-assignment submission counts, progress and grade distributions,
+and one row of counters per enrolled student (read by course analytics and
+the student progress page together with the course figures, so the totals
+and the rows on a page always come from the same snapshot).
+
+Write paths (enrollments, progress, submissions, grading, assignment
+changes) call mark_dirty, which only stamps ``dirtied_at``. A document is
+dirty while ``dirtied_at`` is newer than ``computed_at``;
+scripts/refresh_course_stats.py recomputes dirty, missing and old courses
+in batches (one query per collection per batch, submissions are streamed
+through a single pass). A write that lands during
+a refresh leaves the course dirty, because ``computed_at`` is the time the
+refresh started reading.
+
+Reads never recompute dirty courses; they return the stored numbers with
+freshness metadata. Only courses that have never been computed are built
+on first read. Documents written by an older version of this module
+(``version`` below STATS_VERSION) count as never computed.
+"""
+
+import os
+import numbers
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterable
+
+from pymongo import UpdateOne
+
+from services import distributions
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Activity figures are relative to now, so clean stats still expire
+COURSE_STATS_MAX_AGE_MINUTES = int(os.getenv("COURSE_STATS_MAX_AGE_MINUTES", "60"))
+COURSE_STATS_BATCH_SIZE = int(os.getenv("COURSE_STATS_BATCH_SIZE", "100"))
+
+COLLECTION = "course_stats"
+ACTIVE_DAYS = 7
+# Bump when the document shape changes so old documents are rebuilt
+STATS_VERSION = 3
+
+SUBMISSION_FIELDS = {"course_id": 1, "assignment_id": 1, "student_id": 1, "grade": 1, "submitted_at": 1, "_id": 0}
+
+
+def _rate(part: int, whole: int) -> float:
+    return round(part / whole * 100, 2) if whole else 0
+
+
+def _average(total: float, count: int) -> float:
+    return round(total / count, 2) if count else 0
+
+
+def _counts() -> Dict[str, Any]:
+    return {"submitted": 0, "graded": 0, "grade_sum": 0, "on_time": 0, "recent": 0}
+
+
+def tally_submissions(submissions: Iterable[Dict[str, Any]], assignments: Dict[str, Dict[str, Any]],
+                      since: datetime) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-student and per-assignment counters from one pass over submissions.
+
+    Args:
+        submissions: Submissions (course_id, assignment_id, student_id, grade, submitted_at)
+        assignments: assignment_id -> assignment (due_date, max_points)
+        since: Submissions from this time on count as recent
+
+    Returns:
+        course_id -> {'students': {student_id: counts}, 'assignments': {assignment_id: counts},
+        'grade_percentages': [...], 'last_submitted': {student_id: datetime}}, where counts
+        are submitted, graded, grade_sum, on_time (submitted by the due date, or no due
+        date) and recent
+    """
+    courses = defaultdict(lambda: {
+        "students": defaultdict(_counts), "assignments": defaultdict(_counts), "grade_percentages": [],
+        "last_submitted": {}
+    })
+    for submission in submissions:
+        course = courses[submission.get("course_id")]
+        assignment = assignments.get(submission.get("assignment_id")) or {}
+        due_date = assignment.get("due_date")
+        submitted_at = submission.get("submitted_at")
+        on_time = not isinstance(due_date, datetime) or (isinstance(submitted_at, datetime) and submitted_at <= due_date)
+        recent = isinstance(submitted_at, datetime) and submitted_at >= since
+        if isinstance(submitted_at, datetime):
+            last = course["last_submitted"].get(submission.get("student_id"))
+            if last is None or submitted_at > last:
+                course["last_submitted"][submission.get("student_id")] = submitted_at
+        grade = submission.get("grade")
+        for counts in (course["students"][submission.get("student_id")],
+                       course["assignments"][submission.get("assignment_id")]):
+            counts["submitted"] += 1
+            counts["on_time"] += int(on_time)
+            counts["recent"] += int(recent)
+            if grade is not None:
+                counts["graded"] += 1
+                if isinstance(grade, numbers.Real) and not isinstance(grade, bool):
+                    counts["grade_sum"] += grade
+        if grade is not None:
+            percentage = distributions.grade_percentage(grade, assignment.get("max_points"))
+            if percentage is not None:
+                course["grade_percentages"].append(percentage)
+    return courses
+
+
+def _student_row(enrollment: Dict[str, Any], counts: Optional[Dict[str, Any]],
+                 last_submitted: Optional[datetime]) -> Dict[str, Any]:
+    """Stored counters of one enrolled student"""
+    counts = counts or _counts()
+    return {
+        "student_id": enrollment.get("student_id"),
+        "progress": enrollment.get("progress", 0) or 0,
+        "enrolled_at": enrollment.get("enrolled_at"),
+        "is_active": enrollment.get("is_active", True),
+        "completed_materials": len(enrollment.get("completed_materials") or []),
+        "last_submitted_at": last_submitted,
+        **{key: counts[key] for key in ("submitted", "graded", "grade_sum", "on_time", "recent")}
+    }
+
+
+def summarize_course(enrollments: List[Dict[str, Any]], assignment_ids: List[str],
+                     tally: Dict[str, Any], total_materials: int = 0) -> Dict[str, Any]:
+    """
+    Course figures from its enrollments and its tally_submissions() entry.
+
+    Args:
+        enrollments: The course's enrollments (student_id, progress, enrolled_at,
+            is_active, completed_materials)
+        assignment_ids: The course's assignments
+        tally: {'students', 'assignments', 'grade_percentages', 'last_submitted'} for the course
+        total_materials: Number of materials in the course
+    """
+    progress = [enrollment.get("progress", 0) or 0 for enrollment in enrollments]
+    by_student = tally.get("students", {})
+    by_assignment = tally.get("assignments", {})
+    enrolled = len(progress)
+    active = sum(1 for counts in by_student.values() if counts["recent"])
+    submitted = sum(counts["submitted"] for counts in by_assignment.values())
+    graded = sum(counts["graded"] for counts in by_assignment.values())
+    grade_sum = sum(counts["grade_sum"] for counts in by_assignment.values())
+    student_averages = [counts["grade_sum"] / counts["graded"] for counts in by_student.values() if counts["graded"]]
+
+    return {
+        "version": STATS_VERSION,
+        "enrolled_students": enrolled,
+        "average_progress": _average(sum(progress), enrolled),
+        "completion_rate": _rate(sum(1 for value in progress if value >= 100), enrolled),
+        "active_students": active,
+        "engagement_rate": _rate(active, enrolled),
+        "participating_students": len(by_student),
+        "participation_rate": _rate(len(by_student), enrolled),
+        "total_assignments": len(assignment_ids),
+        "total_materials": total_materials,
+        "total_submissions": submitted,
+        "graded_submissions": graded,
+        "pending_submissions": submitted - graded,
+        "average_grade": _average(grade_sum, graded),
+        "average_student_grade": _average(sum(student_averages), len(student_averages)),
+        "student_performance": {
+            "excellent": sum(1 for value in progress if value >= 90),
+            "good": sum(1 for value in progress if 70 <= value < 90),
+            "average": sum(1 for value in progress if 50 <= value < 70),
+            "needs_improvement": sum(1 for value in progress if value < 50)
+        },
+        "progress_distribution": {
+            "0-25%": sum(1 for value in progress if value <= 25),
+            "26-50%": sum(1 for value in progress if 25 < value <= 50),
+            "51-75%": sum(1 for value in progress if 50 < value <= 75),
+            "76-100%": sum(1 for value in progress if value > 75)
+        },
+        "struggling_students": sum(1 for value in progress if value < 30),
+        "excelling_students": sum(1 for value in progress if value >= 80),
+        "assignments": {
+            assignment_id: {key: counts[key] for key in ("submitted", "graded", "grade_sum")}
+            for assignment_id, counts in by_assignment.items() if assignment_id in assignment_ids
+        },
+        # Grades as percentages of each assignment's max_points
+        "distributions": {
+            "progress": distributions.describe(progress),
+            "grades": distributions.describe(tally.get("grade_percentages", []))
+        },
+        "students": [
+            _student_row(enrollment, by_student.get(enrollment.get("student_id")),
+                         tally.get("last_submitted", {}).get(enrollment.get("student_id")))
+            for enrollment in enrollments
+        ]
+    }
+
+
+def compute_stats(db, course_ids: Iterable[str], now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Recompute stats for a batch of courses and store them.
+
+    Uses one query per collection for the whole batch.
+
+    Returns:
+        course_id -> stats document
+    """
+    course_ids = [str(course_id) for course_id in course_ids]
+    if not course_ids:
+        return {}
+    started = now or datetime.utcnow()
+
+    enrollments = defaultdict(list)
+    for enrollment in db.enrollments.find(
+        {"course_id": {"$in": course_ids}},
+        {"course_id": 1, "student_id": 1, "progress": 1, "enrolled_at": 1, "is_active": 1, "completed_materials": 1}
+    ):
+        enrollments[enrollment["course_id"]].append(enrollment)
+
+    materials = defaultdict(int)
+    for material in db.materials.find({"course_id": {"$in": course_ids}}, {"course_id": 1, "_id": 0}):
+        materials[material["course_id"]] += 1
+
+    assignments = {}
+    assignment_ids = defaultdict(list)
+    for assignment in db.assignments.find(
+        {"course_id": {"$in": course_ids}}, {"course_id": 1, "due_date": 1, "max_points": 1}
+    ):
+        assignments[str(assignment["_id"])] = assignment
+        assignment_ids[assignment["course_id"]].append(str(assignment["_id"]))
+
+    tallies = tally_submissions(
+        db.submissions.find({"course_id": {"$in": course_ids}}, SUBMISSION_FIELDS),
+        assignments, started - timedelta(days=ACTIVE_DAYS)
+    )
+
+    results = {}
+    operations = []
+    for course_id in course_ids:
+        stats = summarize_course(enrollments[course_id], assignment_ids[course_id], tallies.get(course_id, {}),
+                                 materials[course_id])
+        stats["computed_at"] = started
+        operations.append(UpdateOne({"_id": course_id}, {"$set": stats}, upsert=True))
+        results[course_id] = {"_id": course_id, **stats}
+    db[COLLECTION].bulk_write(operations, ordered=False)
+    return results
+
+
+def mark_dirty(db, course_id: str) -> None:
+    """Flag a course for the next refresh; never breaks the write that called it"""
+    if not course_id:
+        return
+    try:
+        db[COLLECTION].update_one(
+            {"_id": str(course_id)}, {"$set": {"dirtied_at": datetime.utcnow()}}, upsert=True
+        )
+    except Exception as e:
+        logger.warning(f"Failed to mark course stats dirty for {course_id}: {e}")
+
+
+def is_current(stats: Dict[str, Any]) -> bool:
+    """Computed at least once, by this version of the module"""
+    return stats.get("computed_at") is not None and stats.get("version") == STATS_VERSION
+
+
+def is_stale(stats: Dict[str, Any], now: Optional[datetime] = None) -> bool:
+    if not is_current(stats):
+        return True
+    computed_at = stats["computed_at"]
+    dirtied_at = stats.get("dirtied_at")
+    max_age = timedelta(minutes=COURSE_STATS_MAX_AGE_MINUTES)
+    return (dirtied_at is not None and dirtied_at > computed_at) or computed_at < (now or datetime.utcnow()) - max_age
+
+
+def freshness(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Response metadata: when the numbers were computed and whether a refresh is due"""
+    computed_at = stats.get("computed_at")
+    return {
+        "computed_at": computed_at.isoformat() if computed_at else None,
+        "stale": is_stale(stats)
+    }
+
+
+def get_stats(db, course_ids: Iterable[str], include_students: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Stored stats for the given courses, building any never computed.
+
+    Dirty or old stats are returned as they are; check freshness() and
+    leave recomputation to the refresh job. The per-student rows are only
+    loaded when ``include_students`` is set.
+    """
+    course_ids = [str(course_id) for course_id in course_ids]
+    projection = None if include_students else {"students": 0}
+    stats = {
+        doc["_id"]: doc
+        for doc in db[COLLECTION].find({"_id": {"$in": course_ids}}, projection)
+        if is_current(doc)
+    }
+    missing = [course_id for course_id in course_ids if course_id not in stats]
+    if missing:
+        for course_id, computed in compute_stats(db, missing).items():
+            if not include_students:
+                computed.pop("students", None)
+            stats[course_id] = computed
+    return stats
+
+
+def courses_needing_refresh(db, now: Optional[datetime] = None) -> List[str]:
+    """Courses whose stats are dirty, too old or missing"""
+    stored = {doc["_id"]: doc for doc in db[COLLECTION].find({}, {"computed_at": 1, "dirtied_at": 1, "version": 1})}
+    needed = []
+    for course in db.courses.find({}, {"_id": 1}):
+        course_id = str(course["_id"])
+        if course_id not in stored or is_stale(stored[course_id], now):
+            needed.append(course_id)
+    return needed
+
+
+def refresh(db, batch_size: int = COURSE_STATS_BATCH_SIZE, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Recompute every course that needs it and drop stats of deleted courses.
+
+    Returns:
+        {'refreshed': courses recomputed, 'removed': orphaned documents deleted}
+    """
+    course_ids = courses_needing_refresh(db, now)
+    for start in range(0, len(course_ids), batch_size):
+        compute_stats(db, course_ids[start:start + batch_size], now)
+
+    existing = {str(course["_id"]) for course in db.courses.find({}, {"_id": 1})}
+    orphaned = [doc["_id"] for doc in db[COLLECTION].find({}, {"_id": 1}) if doc["_id"] not in existing]
+    if orphaned:
+        db[COLLECTION].delete_many({"_id": {"$in": orphaned}})
+
+    logger.info(f"Refreshed stats for {len(course_ids)} courses, removed {len(orphaned)}")
+    return {"refreshed": len(course_ids), "removed": len(orphaned)}
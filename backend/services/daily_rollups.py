@@ -0,0 +1,168 @@
+"""
+Per-day platform counters for the system analytics trend charts.
+
+One document per UTC day in ``daily_rollups`` (``_id`` = 'YYYY-MM-DD'):
+
+    registrations, course_creations, enrollments, submissions,
+    chat_messages, active_users, active_users_7d
+
+``active_users`` counts distinct students who submitted work that day and
+``active_users_7d`` the distinct ones over the 7 days ending that day (sets
+cannot be added up from daily counts, so the window is stored as well).
+
+scripts/rollup_daily_stats.py fills the collection incrementally: it only
+processes complete days after the last one rolled up, with one grouped
+aggregation per source collection for the whole pending range. Trend
+endpoints then read at most one small document per day of the window.
+"""
+
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+
+from pymongo import UpdateOne
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DAILY_ROLLUP_BACKFILL_DAYS = int(os.getenv("DAILY_ROLLUP_BACKFILL_DAYS", "365"))
+
+COLLECTION = "daily_rollups"
+ACTIVE_WINDOW_DAYS = 7
+
+# Counter -> (source collection, timestamp field)
+COUNTERS = {
+    "registrations": ("users", "created_at"),
+    "course_creations": ("courses", "created_at"),
+    "enrollments": ("enrollments", "enrolled_at"),
+    "submissions": ("submissions", "submitted_at"),
+    "chat_messages": ("chat_history", "timestamp"),
+}
+FIELDS = tuple(COUNTERS) + ("active_users", "active_users_7d")
+
+
+def day_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, moment.day)
+
+
+def day_key(day: datetime) -> str:
+    return day.strftime("%Y-%m-%d")
+
+
+def _day_expression(field: str) -> Dict[str, Any]:
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": f"${field}"}}
+
+
+def count_by_day(db, collection: str, field: str, start: datetime, end: datetime) -> Dict[str, int]:
+    """Documents per day with ``field`` in [start, end)"""
+    pipeline = [
+        {"$match": {field: {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": _day_expression(field), "count": {"$sum": 1}}}
+    ]
+    return {group["_id"]: group["count"] for group in db[collection].aggregate(pipeline)}
+
+
+def active_students_by_day(db, start: datetime, end: datetime) -> Dict[str, set]:
+    """Distinct submitting students per day in [start, end)"""
+    pipeline = [
+        {"$match": {"submitted_at": {"$gte": start, "$lt": end}}},
+        {"$group": {"_id": {"day": _day_expression("submitted_at"), "student": "$student_id"}}}
+    ]
+    active: Dict[str, set] = defaultdict(set)
+    for group in db.submissions.aggregate(pipeline):
+        active[group["_id"]["day"]].add(group["_id"]["student"])
+    return active
+
+
+def compute_rollups(db, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """
+    Rollup documents for every day in [start, end).
+
+    Args:
+        db: MongoDB database instance
+        start: First day (midnight UTC)
+        end: Day after the last one (midnight UTC)
+    """
+    counts = {
+        name: count_by_day(db, collection, field, start, end)
+        for name, (collection, field) in COUNTERS.items()
+    }
+    # The trailing window needs the six days before the range as well
+    active = active_students_by_day(db, start - timedelta(days=ACTIVE_WINDOW_DAYS - 1), end)
+
+    rollups = []
+    day = start
+    while day < end:
+        key = day_key(day)
+        window = set()
+        for offset in range(ACTIVE_WINDOW_DAYS):
+            window |= active.get(day_key(day - timedelta(days=offset)), set())
+        rollup = {"_id": key, "day": day}
+        rollup.update({name: counts[name].get(key, 0) for name in COUNTERS})
+        rollup["active_users"] = len(active.get(key, ()))
+        rollup["active_users_7d"] = len(window)
+        rollups.append(rollup)
+        day += timedelta(days=1)
+    return rollups
+
+
+def last_rolled_up_day(db) -> Optional[datetime]:
+    latest = db[COLLECTION].find_one({}, {"day": 1}, sort=[("day", -1)])
+    return latest["day"] if latest else None
+
+
+def roll_up(db, now: Optional[datetime] = None, backfill_days: int = DAILY_ROLLUP_BACKFILL_DAYS,
+            rebuild: bool = False) -> Dict[str, Any]:
+    """
+    Roll up every complete day not yet in the collection.
+
+    Args:
+        db: MongoDB database instance
+        now: Current time (defaults to utcnow)
+        backfill_days: How far back to start when nothing is rolled up yet (or on rebuild)
+        rebuild: Recompute the whole backfill window
+
+    Returns:
+        {'days': number of days written, 'from': first day, 'through': last day}
+    """
+    today = day_start(now or datetime.utcnow())
+    last = None if rebuild else last_rolled_up_day(db)
+    start = last + timedelta(days=1) if last else today - timedelta(days=backfill_days)
+    if start >= today:
+        return {"days": 0, "from": None, "through": day_key(last) if last else None}
+
+    rollups = compute_rollups(db, start, today)
+    now_written = datetime.utcnow()
+    db[COLLECTION].bulk_write([
+        UpdateOne({"_id": rollup["_id"]}, {"$set": {**rollup, "rolled_up_at": now_written}}, upsert=True)
+        for rollup in rollups
+    ], ordered=False)
+    logger.info(f"Rolled up {len(rollups)} days ({day_key(start)} .. {day_key(today - timedelta(days=1))})")
+    return {"days": len(rollups), "from": day_key(start), "through": day_key(today - timedelta(days=1))}
+
+
+def get_rollups(db, days: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """Rolled-up days in the last ``days`` days, oldest first"""
+    since = day_start(now or datetime.utcnow()) - timedelta(days=days)
+    projection = {"_id": 0, "day": 1, **{field: 1 for field in FIELDS}}
+    return list(db[COLLECTION].find({"day": {"$gte": since}}, projection).sort("day", 1))
+
+
+def trend(rollups: List[Dict[str, Any]], field: str) -> List[Dict[str, Any]]:
+    """
+    One counter as a chart series.
+
+    Keeps the shape of the former $group-by-day output
+    ({'_id': {'year', 'month', 'day'}, 'count'}) and skips empty days.
+    """
+    return [
+        {
+            "_id": {"year": rollup["day"].year, "month": rollup["day"].month, "day": rollup["day"].day},
+            "count": rollup.get(field, 0)
+        }
+        for rollup in rollups
+        if rollup.get(field)
+    ]
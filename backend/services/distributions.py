@@ -0,0 +1,136 @@
+"""
+Vectorized distribution statistics for grades, progress and watch time.
+
+Numeric columns are pulled with a projected query straight into float64
+NumPy arrays (missing, non-numeric and NaN values are dropped) and then
+summarized without Python-level loops: count, mean, standard deviation,
+min/max, median and percentiles, plus fixed-bin histograms so charts of
+different courses and students line up.
+
+The functions here are the API analytics routes use; they accept any
+iterable of numbers, so callers that already hold the values (e.g. from a
+list of rows) don't need a second query. Submission grades are raw points
+out of the assignment's ``max_points``; convert them with
+grade_percentages() before describing them on the percent bins.
+"""
+
+import numbers
+from typing import Dict, List, Any, Iterable, Sequence, Optional
+
+import numpy as np
+
+PERCENTILES = (10, 25, 75, 90)
+# 0-10, 10-20, ..., 90-100; grades and progress are percentages
+PERCENT_BINS = tuple(range(0, 101, 10))
+# Assignments created without max_points are graded out of 100
+DEFAULT_MAX_POINTS = 100
+
+
+def to_array(values: Iterable[Any]) -> np.ndarray:
+    """Numeric values as a float64 array, skipping None, booleans, strings and NaN"""
+    if isinstance(values, np.ndarray):
+        array = values.astype(np.float64, copy=False)
+    else:
+        array = np.fromiter(
+            (value for value in values if isinstance(value, numbers.Real) and not isinstance(value, bool)),
+            dtype=np.float64
+        )
+    return array[~np.isnan(array)]
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, numbers.Real) and not isinstance(value, bool) and value == value
+
+
+def grade_percentage(grade: Any, maximum: Any) -> Optional[float]:
+    """One grade as a percentage of ``maximum`` (DEFAULT_MAX_POINTS when None); None if unusable"""
+    if maximum is None:
+        maximum = DEFAULT_MAX_POINTS
+    if _is_number(grade) and _is_number(maximum) and maximum > 0:
+        return grade / maximum * 100
+    return None
+
+
+def grade_percentages(submissions: Iterable[Dict[str, Any]], max_points: Dict[str, Any]) -> np.ndarray:
+    """
+    Submission grades as percentages of their assignment's maximum.
+
+    Args:
+        submissions: Documents with 'assignment_id' and 'grade' (raw points)
+        max_points: assignment_id -> max_points; unknown assignments use DEFAULT_MAX_POINTS
+
+    Ungraded submissions and assignments without a positive maximum are skipped.
+    """
+    return to_array(
+        grade_percentage(submission.get("grade"), max_points.get(str(submission.get("assignment_id"))))
+        for submission in submissions
+    )
+
+
+def load_column(collection, query: Dict[str, Any], field: str) -> np.ndarray:
+    """
+    One numeric field of the matching documents as an array.
+
+    Only ``field`` is projected, so documents are never loaded whole.
+    """
+    cursor = collection.find(query, {field: 1, "_id": 0})
+    return to_array(doc.get(field) for doc in cursor)
+
+
+def mean(values: Iterable[Any]) -> float:
+    """Mean of the numeric values (0 for none)"""
+    array = to_array(values)
+    return float(array.mean()) if array.size else 0.0
+
+
+def _round(value: float) -> float:
+    return round(float(value), 2)
+
+
+def summarize(values: Iterable[Any], percentiles: Sequence[int] = PERCENTILES) -> Dict[str, Any]:
+    """
+    Distribution summary of a numeric column.
+
+    Returns:
+        {'count', 'mean', 'median', 'std', 'min', 'max', 'p10', 'p25', ...}
+        (population standard deviation; all zeros for an empty column)
+    """
+    array = to_array(values)
+    keys = [f"p{p}" for p in percentiles]
+    if array.size == 0:
+        return {"count": 0, "mean": 0, "median": 0, "std": 0, "min": 0, "max": 0, **{key: 0 for key in keys}}
+
+    quantiles = np.percentile(array, [50, *percentiles])
+    return {
+        "count": int(array.size),
+        "mean": _round(array.mean()),
+        "median": _round(quantiles[0]),
+        "std": _round(array.std()),
+        "min": _round(array.min()),
+        "max": _round(array.max()),
+        **{key: _round(value) for key, value in zip(keys, quantiles[1:])}
+    }
+
+
+def histogram(values: Iterable[Any], edges: Sequence[float] = PERCENT_BINS) -> List[Dict[str, Any]]:
+    """
+    Counts per fixed bin; values outside the edges go to the first/last bin.
+
+    Bins are half-open except the last, which includes its upper edge
+    (so 100% lands in 90-100).
+    """
+    array = np.clip(to_array(values), edges[0], edges[-1])
+    counts, _ = np.histogram(array, bins=np.asarray(edges, dtype=np.float64))
+    return [
+        {"min": low, "max": high, "label": f"{low:g}-{high:g}", "count": int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ]
+
+
+def describe(values: Iterable[Any], edges: Optional[Sequence[float]] = PERCENT_BINS) -> Dict[str, Any]:
+    """summarize() plus histogram() (omitted when ``edges`` is None) of one column"""
+    array = to_array(values)
+    result = {"summary": summarize(array)}
+    if edges is not None:
+        result["histogram"] = histogram(array, edges)
+    return result
@@ -0,0 +1,220 @@
+"""
+Map-reduce summarization for long documents.
+
+PDF text is read page by page and split into chunks that fit a token
+budget. Chunks are summarized in parallel (map), then the chunk summaries
+are merged - in rounds if they are still too long - into one summary
+(reduce). Every call goes through the AI response cache keyed by the text
+it summarizes, so re-summarizing an edited document only re-runs the
+chunks that changed, plus the reduce step.
+"""
+
+import io
+import os
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Dict, Any
+
+import PyPDF2
+
+from services import ai_client, ai_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_CHUNK_TOKENS = int(os.getenv("AI_SUMMARY_CHUNK_TOKENS", "3000"))
+SUMMARY_REDUCE_TOKENS = int(os.getenv("AI_SUMMARY_REDUCE_TOKENS", "6000"))
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("AI_SUMMARY_MAP_CONCURRENCY", "3"))
+
+# Rough English average; good enough to keep prompts under the budget
+CHARS_PER_TOKEN = 4
+EXCERPT_CHARS = 1000
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count for a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def iter_pdf_pages(pdf_content: bytes) -> Iterator[str]:
+    """Yield the text of each PDF page without building one large string"""
+    reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+def _iter_paragraphs(pages: Iterable[str]) -> Iterator[str]:
+    for page in pages:
+        for paragraph in re.split(r"\n\s*\n", page):
+            paragraph = paragraph.strip()
+            if paragraph:
+                yield paragraph
+
+
+def _split_oversized(paragraph: str, max_tokens: int) -> Iterator[str]:
+    """Split a paragraph longer than the budget on word boundaries"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    words, length = [], 0
+    for word in paragraph.split():
+        if words and length + len(word) + 1 > max_chars:
+            yield " ".join(words)
+            words, length = [], 0
+        words.append(word)
+        length += len(word) + 1
+    if words:
+        yield " ".join(words)
+
+
+def chunk_text(pages: Iterable[str], max_tokens: int = SUMMARY_CHUNK_TOKENS) -> Iterator[str]:
+    """
+    Group paragraphs into chunks of at most ``max_tokens`` (estimated).
+
+    Paragraph boundaries are kept where possible, so an edit to one part of a
+    document leaves the other chunks - and their cache keys - unchanged.
+    """
+    current: List[str] = []
+    size = 0
+    for paragraph in _iter_paragraphs(pages):
+        pieces = _split_oversized(paragraph, max_tokens) if estimate_tokens(paragraph) > max_tokens else [paragraph]
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and size + tokens > max_tokens:
+                yield "\n\n".join(current)
+                current, size = [], 0
+            current.append(piece)
+            size += tokens
+    if current:
+        yield "\n\n".join(current)
+
+
+def build_document_summary_prompt(text_content: str) -> str:
+    """Prompt for summarizing a whole document (or the merged chunk summaries)"""
+    return f"""
+        Please provide a concise summary of the following educational content.
+        Focus on key concepts, main points, and important details that students should remember.
+
+        Content:
+        {text_content}
+
+        Summary:
+        """
+
+
+def build_chunk_summary_prompt(chunk: str) -> str:
+    """Prompt for the map step: one section of a longer document"""
+    return f"""
+        The following text is one section of a longer educational document.
+        Summarize this section in concise bullet points, keeping every key concept,
+        definition, formula and example a student would need. Do not add an introduction.
+
+        Section:
+        {chunk}
+
+        Section summary:
+        """
+
+
+def build_merge_prompt(summaries: str) -> str:
+    """Prompt for intermediate reduce rounds"""
+    return f"""
+        The following are summaries of consecutive sections of one educational document.
+        Merge them into a single set of concise bullet points, removing repetition
+        while keeping every distinct key concept.
+
+        Section summaries:
+        {summaries}
+
+        Merged summary:
+        """
+
+
+def _cached_call(db, kind: str, text: str, prompt: str) -> str:
+    model = ai_client.DEFAULT_MODEL
+    key = ai_cache.build_cache_key(text, kind, model)
+    return ai_cache.get_or_generate(
+        db, key,
+        lambda: ai_client.generate(prompt, endpoint=kind),
+        chat_type=kind,
+        model=model
+    )
+
+
+def _parallel(db, kind: str, texts: List[str], build_prompt, concurrency: int) -> List[str]:
+    """Run cached calls for ``texts`` with at most ``concurrency`` in flight, keeping order"""
+    workers = max(1, min(concurrency, ai_client.AI_MAX_CONCURRENT_CALLS, len(texts)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=kind) as executor:
+        futures = [executor.submit(_cached_call, db, kind, text, build_prompt(text)) for text in texts]
+        return [future.result() for future in futures]
+
+
+def _group_by_budget(texts: List[str], max_tokens: int) -> List[str]:
+    groups, current, size = [], [], 0
+    for text in texts:
+        tokens = estimate_tokens(text)
+        if current and size + tokens > max_tokens:
+            groups.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+
+def summarize_pages(db, pages: Iterable[str], concurrency: int = SUMMARY_MAP_CONCURRENCY) -> Dict[str, Any]:
+    """
+    Summarize a document given as an iterable of page texts.
+
+    Args:
+        db: MongoDB database instance for the shared cache tier (or None)
+        pages: Page texts (a generator is fine; it is consumed once)
+        concurrency: Maximum parallel map/reduce calls
+
+    Returns:
+        Dict with summary, chunk_count, reduce_rounds, word_count_original and
+        an excerpt of the original text
+    """
+    stats = {"words": 0, "excerpt": []}
+    excerpt_length = [0]
+
+    def counted(source):
+        for page in source:
+            stats["words"] += len(page.split())
+            if excerpt_length[0] < EXCERPT_CHARS:
+                stats["excerpt"].append(page[:EXCERPT_CHARS - excerpt_length[0]])
+                excerpt_length[0] += len(stats["excerpt"][-1])
+            yield page
+
+    chunks = list(chunk_text(counted(pages)))
+    reduce_rounds = 0
+
+    if not chunks:
+        summary = ""
+    elif len(chunks) == 1:
+        summary = _cached_call(db, "summarize", chunks[0], build_document_summary_prompt(chunks[0]))
+    else:
+        # Map: summarize every chunk in parallel
+        partials = _parallel(db, "summary_map", chunks, build_chunk_summary_prompt, concurrency)
+
+        # Reduce: merge in rounds until the summaries fit one final prompt
+        while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > SUMMARY_REDUCE_TOKENS:
+            groups = _group_by_budget(partials, SUMMARY_REDUCE_TOKENS)
+            if len(groups) == len(partials):
+                # Each summary alone fills the budget; merge pairwise to make progress
+                groups = ["\n\n".join(partials[i:i + 2]) for i in range(0, len(partials), 2)]
+            partials = _parallel(db, "summary_merge", groups, build_merge_prompt, concurrency)
+            reduce_rounds += 1
+
+        merged = "\n\n".join(partials)
+        summary = _cached_call(db, "summarize", merged, build_document_summary_prompt(merged))
+        reduce_rounds += 1
+
+    return {
+        "summary": summary,
+        "chunk_count": len(chunks),
+        "reduce_rounds": reduce_rounds,
+        "word_count_original": stats["words"],
+        "excerpt": "".join(stats["excerpt"])
+    }
@@ -0,0 +1,342 @@
+"""
+Per-course vector index over course materials for grounded AI answers.
+
+Each material's title, description and (for PDF/TXT documents) extracted
+text is cut into paragraph-aware chunks and embedded. One index per course
+is stored under MATERIAL_INDEX_DIR as a float32 ``.npy`` matrix plus a JSON
+list of chunk records; searches open the matrix with ``mmap_mode='r'``, so
+workers share the pages through the OS cache and never hold whole indexes
+in Python objects.
+
+Embeddings are pluggable (set_embedder); the default is a local hashing
+vectorizer over word unigrams and bigrams, so building and querying need
+no network calls. An index built with a different embedder is ignored
+until it is rebuilt.
+
+Material writes mark the course stale; scripts/build_material_index.py
+rebuilds stale and missing indexes. Searches keep using the previous
+version until the new one is in place.
+"""
+
+import os
+import json
+import math
+import time
+import zlib
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+import numpy as np
+from bson import ObjectId
+
+from services.course_recommender import tokenize
+from services.document_summarizer import chunk_text, estimate_tokens, iter_pdf_pages
+from services.chat_context import trim_to_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MATERIAL_INDEX_DIR = os.getenv(
+    "MATERIAL_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "material_index")
+)
+MATERIAL_INDEX_DIM = int(os.getenv("MATERIAL_INDEX_DIM", "1024"))
+MATERIAL_CHUNK_TOKENS = int(os.getenv("MATERIAL_CHUNK_TOKENS", "250"))
+AI_RETRIEVAL_TOP_K = int(os.getenv("AI_RETRIEVAL_TOP_K", "4"))
+AI_RETRIEVAL_TOKENS = int(os.getenv("AI_RETRIEVAL_TOKENS", "800"))
+AI_RETRIEVAL_MIN_SCORE = float(os.getenv("AI_RETRIEVAL_MIN_SCORE", "0.15"))
+
+CURRENT_FILE = "CURRENT"
+STALE_FILE = "STALE"
+EMBED_BATCH_SIZE = 256
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of word unigrams and bigrams.
+
+    Deterministic across processes (CRC32, not Python's salted hash), so
+    indexes built by the script match queries embedded in web workers.
+    """
+
+    def __init__(self, dim: int = MATERIAL_INDEX_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = Counter(tokens)
+            features.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+            for feature, count in features.items():
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = -1.0 if digest & 0x80000000 else 1.0
+                matrix[row, (digest & 0x7FFFFFFF) % self.dim] += sign * (1.0 + math.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+_embedder = HashingEmbedder()
+
+
+def get_embedder():
+    """The embedding function used for building and querying"""
+    return _embedder
+
+
+def set_embedder(embedder) -> None:
+    """
+    Swap the embedding function.
+
+    Anything with ``name``, ``dim`` and ``embed(texts) -> (n, dim) float32``
+    (rows L2-normalized) works; existing indexes need a rebuild.
+    """
+    global _embedder
+    _embedder = embedder or HashingEmbedder()
+    clear_cache()
+
+
+# --- Building ------------------------------------------------------------
+
+def _course_dir(course_id: str) -> str:
+    return os.path.join(MATERIAL_INDEX_DIR, str(course_id))
+
+
+def _document_id(material: Dict[str, Any]) -> Optional[str]:
+    if material.get("document_id"):
+        return str(material["document_id"])
+    if material.get("type") == "document" and ObjectId.is_valid(str(material.get("content", ""))):
+        return str(material["content"])
+    return None
+
+
+def iter_material_text(db, material: Dict[str, Any]) -> Iterator[str]:
+    """Title and description, then the document text for PDF/TXT materials"""
+    header = "\n\n".join(part for part in (material.get("title"), material.get("description")) if part)
+    if header:
+        yield header
+
+    document_id = _document_id(material)
+    if not document_id:
+        return
+    document = db.documents.find_one({"_id": ObjectId(document_id)}, {"file_path": 1, "mime_type": 1})
+    file_path = (document or {}).get("file_path")
+    if not file_path or not os.path.exists(file_path):
+        return
+    try:
+        if document.get("mime_type") == "application/pdf" or file_path.lower().endswith(".pdf"):
+            with open(file_path, "rb") as handle:
+                yield from iter_pdf_pages(handle.read())
+        elif file_path.lower().endswith(".txt"):
+            with open(file_path, "r", encoding="utf-8", errors="ignore") as handle:
+                yield handle.read()
+    except Exception as e:
+        logger.warning(f"Could not extract text from document {document_id}: {e}")
+
+
+def build_chunks(db, course_id: str) -> List[Dict[str, str]]:
+    """Chunk records (material_id, title, text) for every material of a course"""
+    chunks = []
+    materials = db.materials.find(
+        {"course_id": course_id},
+        {"title": 1, "description": 1, "type": 1, "content": 1, "document_id": 1}
+    )
+    for material in materials:
+        for text in chunk_text(iter_material_text(db, material), MATERIAL_CHUNK_TOKENS):
+            chunks.append({
+                "material_id": str(material["_id"]),
+                "title": material.get("title", ""),
+                "text": text
+            })
+    return chunks
+
+
+def _embed_all(texts: List[str], embedder) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, embedder.dim), dtype=np.float32)
+    return np.vstack([
+        embedder.embed(texts[start:start + EMBED_BATCH_SIZE])
+        for start in range(0, len(texts), EMBED_BATCH_SIZE)
+    ]).astype(np.float32)
+
+
+def write_index(course_id: str, chunks: List[Dict[str, str]], vectors: np.ndarray, embedder) -> str:
+    """
+    Store a new index version and point CURRENT at it.
+
+    Files are versioned so a reader never pairs vectors from one build with
+    chunks from another; older versions are removed afterwards.
+    """
+    directory = _course_dir(course_id)
+    os.makedirs(directory, exist_ok=True)
+    version = f"{int(time.time() * 1000)}"
+
+    np.save(os.path.join(directory, f"{version}.npy"), vectors)
+    with open(os.path.join(directory, f"{version}.json"), "w", encoding="utf-8") as handle:
+        json.dump({"embedder": embedder.name, "dim": embedder.dim, "chunks": chunks}, handle)
+
+    pointer = os.path.join(directory, f"{CURRENT_FILE}.tmp")
+    with open(pointer, "w") as handle:
+        handle.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    for name in os.listdir(directory):
+        stem, extension = os.path.splitext(name)
+        if extension in (".npy", ".json") and stem != version:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+    return version
+
+
+def build_course_index(db, course_id: str, embedder=None) -> int:
+    """
+    Rebuild one course's index from its materials.
+
+    Returns:
+        Number of chunks indexed
+    """
+    embedder = embedder or get_embedder()
+    stale_marker = os.path.join(_course_dir(course_id), STALE_FILE)
+    # Clear the marker first so writes during the build mark it stale again
+    if os.path.exists(stale_marker):
+        os.remove(stale_marker)
+
+    chunks = build_chunks(db, course_id)
+    vectors = _embed_all([chunk["text"] for chunk in chunks], embedder)
+    write_index(course_id, chunks, vectors, embedder)
+    return len(chunks)
+
+
+def mark_stale(course_id: str) -> None:
+    """Flag a course for the next index build (called after material writes)"""
+    try:
+        directory = _course_dir(course_id)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, STALE_FILE), "w") as handle:
+            handle.write(str(time.time()))
+    except OSError as e:
+        logger.warning(f"Could not mark material index for course {course_id} stale: {e}")
+
+
+def courses_needing_build(db) -> List[str]:
+    """Courses with materials whose index is missing or marked stale"""
+    needed = []
+    for course_id in db.materials.distinct("course_id"):
+        directory = _course_dir(course_id)
+        if (not os.path.exists(os.path.join(directory, CURRENT_FILE))
+                or os.path.exists(os.path.join(directory, STALE_FILE))):
+            needed.append(str(course_id))
+    return needed
+
+
+# --- Searching -----------------------------------------------------------
+
+class CourseIndex:
+    """One loaded index version: memory-mapped vectors and chunk records"""
+
+    def __init__(self, version: str, embedder: str, vectors: np.ndarray, chunks: List[Dict[str, str]]):
+        self.version = version
+        self.embedder = embedder
+        self.vectors = vectors
+        self.chunks = chunks
+
+
+_loaded: Dict[str, CourseIndex] = {}
+_loaded_lock = threading.Lock()
+
+
+def load_index(course_id: str) -> Optional[CourseIndex]:
+    """Current index for a course, reloaded only when CURRENT changes"""
+    directory = _course_dir(course_id)
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as handle:
+            version = handle.read().strip()
+    except OSError:
+        return None
+
+    index = _loaded.get(course_id)
+    if index is not None and index.version == version:
+        return index
+
+    try:
+        with open(os.path.join(directory, f"{version}.json"), encoding="utf-8") as handle:
+            meta = json.load(handle)
+        vectors = np.load(os.path.join(directory, f"{version}.npy"), mmap_mode="r")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not load material index for course {course_id}: {e}")
+        return None
+
+    index = CourseIndex(version, meta.get("embedder", ""), vectors, meta.get("chunks", []))
+    with _loaded_lock:
+        _loaded[course_id] = index
+    return index
+
+
+def search(course_ids: Iterable[str], query: str, k: int = AI_RETRIEVAL_TOP_K,
+           min_score: float = AI_RETRIEVAL_MIN_SCORE) -> List[Dict[str, Any]]:
+    """
+    Most similar chunks to a query across the given courses.
+
+    Returns:
+        Chunk records with 'course_id' and cosine 'score', best first
+    """
+    embedder = get_embedder()
+    query_vector = embedder.embed([query])[0]
+    if not query_vector.any():
+        return []
+
+    results = []
+    for course_id in course_ids:
+        index = load_index(course_id)
+        if index is None or index.embedder != embedder.name or not len(index.chunks):
+            continue
+        scores = index.vectors @ query_vector
+        count = min(k, len(scores))
+        best = np.argpartition(-scores, count - 1)[:count]
+        for row in best:
+            score = float(scores[row])
+            if score >= min_score:
+                results.append({**index.chunks[row], "course_id": course_id, "score": round(score, 4)})
+
+    results.sort(key=lambda result: -result["score"])
+    return results[:k]
+
+
+def retrieve_context(course_ids: Iterable[str], query: str, max_tokens: int = AI_RETRIEVAL_TOKENS) -> str:
+    """
+    Relevant material passages for a prompt, within ``max_tokens``.
+
+    Returns an empty string when nothing relevant is indexed.
+    """
+    course_ids = list(course_ids)
+    if not course_ids or max_tokens <= 0:
+        return ""
+    try:
+        passages = search(course_ids, query)
+    except Exception as e:
+        logger.warning(f"Material retrieval failed: {e}")
+        return ""
+
+    blocks = []
+    used = 0
+    for passage in passages:
+        remaining = max_tokens - used
+        if remaining <= 20:
+            break
+        block = trim_to_tokens(f"[{passage['title']}] {passage['text']}", remaining)
+        blocks.append(block)
+        used += estimate_tokens(block)
+    return "\n\n".join(blocks)
+
+
+def clear_cache() -> None:
+    """Forget loaded indexes (used by tests)"""
+    with _loaded_lock:
+        _loaded.clear()
@@ -0,0 +1,254 @@
+"""
+Per-student performance snapshots.
+
+One document per student in ``student_performance_snapshots`` holds what the
+chat performance report needs: course progress, submissions with grades and
+the due dates of assignments in enrolled courses. Enrollment, progress,
+submission and grading writes patch the snapshot in place, so a report is
+a single ``find_one``. Changes that affect many students at once (assignments
+added, edited or removed) only mark the affected snapshots stale; stale,
+missing or old snapshots are rebuilt from source on the next read.
+
+Derived figures (averages, overdue count, recent activity) are computed when
+the snapshot is read, because they depend on the current time.
+"""
+
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+
+from bson import ObjectId
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAX_AGE_HOURS = int(os.getenv("PERFORMANCE_SNAPSHOT_MAX_AGE_HOURS", "24"))
+
+COLLECTION = "student_performance_snapshots"
+RECENT_ACTIVITY_DAYS = 7
+
+
+def _object_ids(ids):
+    return [ObjectId(value) for value in ids if ObjectId.is_valid(value)]
+
+
+def _course_deadlines(db, course_ids) -> Dict[str, Dict[str, Any]]:
+    """course_id -> {assignment_id: due_date} for the given courses"""
+    deadlines = {course_id: {} for course_id in course_ids}
+    if not course_ids:
+        return deadlines
+    for assignment in db.assignments.find(
+        {"course_id": {"$in": list(course_ids)}},
+        {"course_id": 1, "due_date": 1}
+    ):
+        deadlines.setdefault(assignment["course_id"], {})[str(assignment["_id"])] = assignment.get("due_date")
+    return deadlines
+
+
+def build_snapshot(db, student_id: str) -> Dict[str, Any]:
+    """
+    Rebuild a student's snapshot from enrollments, courses, assignments and submissions.
+
+    Uses one query per collection regardless of how many courses the student takes.
+    """
+    enrollments = list(db.enrollments.find(
+        {"student_id": student_id},
+        {"course_id": 1, "progress": 1, "enrolled_at": 1}
+    ))
+    course_ids = [enrollment["course_id"] for enrollment in enrollments]
+
+    titles = {
+        str(course["_id"]): course.get("title")
+        for course in db.courses.find({"_id": {"$in": _object_ids(course_ids)}}, {"title": 1})
+    }
+
+    courses = {}
+    for enrollment in enrollments:
+        courses[enrollment["course_id"]] = {
+            "title": titles.get(enrollment["course_id"]),
+            "progress": enrollment.get("progress", 0),
+            "enrolled_at": enrollment.get("enrolled_at")
+        }
+
+    submissions = {}
+    for submission in db.submissions.find(
+        {"student_id": student_id},
+        {"assignment_id": 1, "grade": 1, "submitted_at": 1}
+    ):
+        submissions[submission["assignment_id"]] = {
+            "grade": submission.get("grade"),
+            "submitted_at": submission.get("submitted_at")
+        }
+
+    now = datetime.utcnow()
+    snapshot = {
+        "_id": student_id,
+        "course_ids": course_ids,
+        "courses": courses,
+        "deadlines": _course_deadlines(db, course_ids),
+        "submissions": submissions,
+        "stale": False,
+        "built_at": now,
+        "updated_at": now
+    }
+    db[COLLECTION].replace_one({"_id": student_id}, snapshot, upsert=True)
+    return snapshot
+
+
+def get_snapshot(db, student_id: str) -> Dict[str, Any]:
+    """Return the student's snapshot, rebuilding it if missing, stale or too old"""
+    snapshot = db[COLLECTION].find_one({"_id": student_id})
+    max_age = timedelta(hours=SNAPSHOT_MAX_AGE_HOURS)
+    if (snapshot is None or snapshot.get("stale")
+            or snapshot.get("built_at", datetime.min) < datetime.utcnow() - max_age):
+        snapshot = build_snapshot(db, student_id)
+    return snapshot
+
+
+def summarize_snapshot(snapshot: Dict[str, Any], user: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Turn a snapshot into the performance report figures.
+
+    Args:
+        snapshot: Document from get_snapshot()
+        user: The student's user document (points and achievements)
+    """
+    now = datetime.utcnow()
+    courses = snapshot.get("courses", {})
+    submissions = snapshot.get("submissions", {})
+
+    total_progress = sum(course.get("progress", 0) or 0 for course in courses.values())
+    avg_progress = total_progress / len(courses) if courses else 0
+    courses_data = [
+        {
+            "title": course["title"],
+            "progress": course.get("progress", 0),
+            "enrolled_at": course.get("enrolled_at") or now
+        }
+        for course in courses.values() if course.get("title")
+    ]
+
+    grades = [entry["grade"] for entry in submissions.values() if entry.get("grade") is not None]
+    avg_grade = sum(grades) / len(grades) if grades else 0
+
+    overdue_count = sum(
+        1
+        for course_deadlines in snapshot.get("deadlines", {}).values()
+        for assignment_id, due_date in course_deadlines.items()
+        if due_date and due_date < now and assignment_id not in submissions
+    )
+
+    recent_cutoff = now - timedelta(days=RECENT_ACTIVITY_DAYS)
+    recent_activity = sum(
+        1 for entry in submissions.values()
+        if entry.get("submitted_at") and entry["submitted_at"] >= recent_cutoff
+    )
+
+    if grades:
+        performance_score = (avg_grade * 0.6) + (avg_progress * 0.4)
+    else:
+        performance_score = avg_progress
+
+    learning_pace = "normal"
+    if avg_progress > 70 and recent_activity > 2:
+        learning_pace = "fast"
+    elif avg_progress < 30 and recent_activity < 1:
+        learning_pace = "slow"
+
+    user = user or {}
+    return {
+        "courses": courses_data,
+        "total_courses": len(courses),
+        "avg_progress": round(avg_progress, 1),
+        "total_assignments": len(submissions),
+        "graded_assignments": len(grades),
+        "avg_grade": round(avg_grade, 1),
+        "overdue_count": overdue_count,
+        "total_points": user.get("total_points", 0),
+        "achievements_count": len(user.get("achievements", [])),
+        "recent_activity": recent_activity,
+        "performance_score": round(performance_score, 1),
+        "learning_pace": learning_pace,
+        "highest_grade": max(grades) if grades else 0,
+        "lowest_grade": min(grades) if grades else 0
+    }
+
+
+# --- Incremental updates -------------------------------------------------
+#
+# Each hook only touches an existing snapshot (no upsert): a student without a
+# snapshot gets a full one on their first report. Failures are logged and
+# never break the write that triggered them; the max-age rebuild repairs drift.
+
+def _patch(db, student_id: str, update: Dict[str, Any], query: Optional[Dict[str, Any]] = None) -> None:
+    update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+    try:
+        db[COLLECTION].update_one({"_id": student_id, **(query or {})}, update)
+    except Exception as e:
+        logger.warning(f"Failed to update performance snapshot for {student_id}: {e}")
+
+
+def record_enrollment(db, student_id: str, course_id: str, title: Optional[str] = None,
+                      enrolled_at: Optional[datetime] = None) -> None:
+    """Add a course (and its assignment due dates) to the student's snapshot"""
+    try:
+        deadlines = _course_deadlines(db, [course_id])[course_id]
+    except Exception as e:
+        logger.warning(f"Failed to load deadlines for course {course_id}: {e}")
+        return
+    _patch(db, student_id, {
+        "$set": {
+            f"courses.{course_id}": {
+                "title": title,
+                "progress": 0,
+                "enrolled_at": enrolled_at or datetime.utcnow()
+            },
+            f"deadlines.{course_id}": deadlines
+        },
+        "$addToSet": {"course_ids": course_id}
+    })
+
+
+def record_unenrollment(db, student_id: str, course_id: str) -> None:
+    """Remove a course from the student's snapshot"""
+    _patch(db, student_id, {
+        "$unset": {f"courses.{course_id}": "", f"deadlines.{course_id}": ""},
+        "$pull": {"course_ids": course_id}
+    })
+
+
+def record_progress(db, student_id: str, course_id: str, progress: float) -> None:
+    """Update course progress in the student's snapshot"""
+    _patch(
+        db, student_id,
+        {"$set": {f"courses.{course_id}.progress": progress}},
+        query={f"courses.{course_id}": {"$exists": True}}
+    )
+
+
+def record_submission(db, student_id: str, assignment_id: str,
+                      submitted_at: Optional[datetime] = None) -> None:
+    """Add a new (ungraded) submission to the student's snapshot"""
+    _patch(db, student_id, {
+        "$set": {
+            f"submissions.{assignment_id}": {
+                "grade": None,
+                "submitted_at": submitted_at or datetime.utcnow()
+            }
+        }
+    })
+
+
+def record_grade(db, student_id: str, assignment_id: str, grade: float) -> None:
+    """Set the grade of a submission in the student's snapshot"""
+    _patch(db, student_id, {"$set": {f"submissions.{assignment_id}.grade": grade}})
+
+
+def mark_course_stale(db, course_id: str) -> None:
+    """Flag every enrolled student's snapshot for rebuild (assignment added, edited or removed)"""
+    try:
+        db[COLLECTION].update_many({"course_ids": course_id}, {"$set": {"stale": True}})
+    except Exception as e:
+        logger.warning(f"Failed to mark performance snapshots stale for course {course_id}: {e}")
@@ -0,0 +1,80 @@
+"""
+Unit tests for the cached admin overview
+"""
+import threading
+from datetime import datetime
+
+from services import admin_overview
+
+
+class FakeCollection:
+    def __init__(self, results=(), estimated=0):
+        self.results = list(results)
+        self.estimated = estimated
+        self.pipelines = []
+        self.threads = set()
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        self.threads.add(threading.current_thread().name)
+        return iter(self.results)
+
+    def estimated_document_count(self):
+        return self.estimated
+
+    def count_documents(self, query):
+        raise AssertionError('exact counts are not needed for the overview')
+
+
+class FakeDB:
+    def __init__(self):
+        self.users = FakeCollection([{
+            'totals': [{'_id': None, 'users': 10, 'active': 8, 'recent': 3, 'this_month': 2}],
+            'roles': [{'_id': 'student', 'count': 7}, {'_id': 'teacher', 'count': 2}, {'_id': 'admin', 'count': 1}],
+            'departments': [{'_id': 'CS', 'count': 6}, {'_id': 'Math', 'count': 3}],
+        }])
+        self.enrollments = FakeCollection([{'course_title': 'Algorithms', 'enrollments': 5}], estimated=40)
+        self.courses = FakeCollection(estimated=4)
+
+
+def test_overview_from_one_pipeline_per_collection():
+    db = FakeDB()
+
+    overview = admin_overview.compute_overview(db, now=datetime(2024, 5, 15, 12, 30))
+
+    assert overview == {
+        'total_users': 10, 'active_users': 8, 'inactive_users': 2,
+        'students': 7, 'teachers': 2, 'admins': 1,
+        'recent_registrations': 3, 'registrations_this_month': 2,
+        'department_distribution': [{'_id': 'CS', 'count': 6}, {'_id': 'Math', 'count': 3}],
+        'total_courses': 4, 'total_enrollments': 40,
+        'popular_courses': [{'course_title': 'Algorithms', 'enrollments': 5}],
+    }
+    assert len(db.users.pipelines) == 1 and len(db.enrollments.pipelines) == 1
+    totals = db.users.pipelines[0][0]['$facet']['totals'][0]['$group']
+    assert totals['this_month']['$sum']['$cond'][0] == {'$gte': ['$created_at', datetime(2024, 5, 1)]}
+    assert totals['recent']['$sum']['$cond'][0] == {'$gte': ['$created_at', datetime(2024, 4, 15, 12, 30)]}
+    # Round trips run on the pool, not the request thread
+    assert all(name.startswith('admin-overview') for name in db.users.threads | db.enrollments.threads)
+
+
+def test_popular_courses_resolve_titles_in_the_pipeline():
+    pipeline = admin_overview.build_popular_courses_pipeline(limit=3)
+
+    assert {'$limit': 3} in pipeline
+    lookup = next(stage['$lookup'] for stage in pipeline if '$lookup' in stage)
+    assert lookup['from'] == 'courses'
+
+
+def test_overview_is_cached_until_invalidated():
+    admin_overview.invalidate()
+    db = FakeDB()
+
+    first = admin_overview.get_overview(db)
+    assert admin_overview.get_overview(db) is first
+    assert len(db.users.pipelines) == 1
+
+    admin_overview.invalidate()
+    admin_overview.get_overview(db)
+    assert len(db.users.pipelines) == 2
+    admin_overview.invalidate()
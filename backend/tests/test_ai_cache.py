@@ -0,0 +1,79 @@
+"""
+Unit tests for the two-tier AI response cache (in-process tier)
+"""
+import threading
+import time
+
+import pytest
+
+from services import ai_cache
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    ai_cache.clear_local()
+    yield
+    ai_cache.clear_local()
+
+
+def test_cache_key_normalizes_prompt():
+    """Case, whitespace and trailing punctuation do not change the key"""
+    key = ai_cache.build_cache_key('Explain   Recursion?', 'explain', 'm', 'Role: student')
+    assert key == ai_cache.build_cache_key('explain recursion', 'explain', 'm', 'role:  student')
+    assert key != ai_cache.build_cache_key('explain recursion', 'qa', 'm', 'Role: student')
+    assert key != ai_cache.build_cache_key('explain recursion', 'explain', 'm', 'Role: teacher')
+    assert key != ai_cache.build_cache_key('explain recursion', 'explain', 'm', 'Role: student', user_id='u1')
+
+
+def test_lru_evicts_least_recently_used():
+    """The oldest untouched entry is evicted once the cache is full"""
+    cache = ai_cache.LRUCache(max_entries=2, ttl_seconds=60)
+    cache.set('a', '1')
+    cache.set('b', '2')
+    assert cache.get('a') == '1'
+    cache.set('c', '3')
+    assert cache.get('b') is None
+    assert cache.get('a') == '1' and cache.get('c') == '3'
+
+
+def test_errors_are_not_cached():
+    """A failed generation propagates and the next call retries upstream"""
+    calls = []
+
+    def failing():
+        calls.append(1)
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        ai_cache.get_or_generate(None, 'k', failing)
+    assert ai_cache.get_or_generate(None, 'k', lambda: 'ok') == 'ok'
+    assert ai_cache.get_or_generate(None, 'k', failing) == 'ok'
+    assert len(calls) == 1
+
+
+def test_concurrent_identical_requests_call_upstream_once():
+    """Threads asking for the same key share one in-flight generation"""
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.1)
+        return 'answer'
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(ai_cache.get_or_generate(None, 'same', slow)))
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait(1)
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ['answer'] * 5
+    assert len(calls) == 1
+    assert ai_cache.get_stats()['coalesced'] == 4
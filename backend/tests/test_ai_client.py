@@ -0,0 +1,87 @@
+"""
+Unit tests for the shared Gemini client: model reuse, deadlines and the
+in-flight cap. The upstream model is replaced with a local fake.
+"""
+import threading
+
+import pytest
+
+from services import ai_client, ai_metrics
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, name, release=None):
+        self.name = name
+        self.release = release
+
+    def generate_content(self, prompt, stream=False):
+        if self.release is not None:
+            self.release.wait(5)
+        if stream:
+            return iter([FakeResponse('echo: '), FakeResponse(prompt)])
+        return FakeResponse(f"echo: {prompt}")
+
+
+@pytest.fixture
+def configured(monkeypatch):
+    monkeypatch.setattr(ai_client, 'GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(ai_client, '_models', {})
+    monkeypatch.setattr(ai_client.genai, 'GenerativeModel', FakeModel)
+    ai_client.reset_metrics()
+    yield
+    ai_client.reset_metrics()
+
+
+def test_model_instances_are_reused(configured):
+    """The same GenerativeModel is returned for repeated lookups"""
+    assert ai_client.get_model('m1') is ai_client.get_model('m1')
+    assert ai_client.get_model('m1') is not ai_client.get_model('m2')
+
+
+def test_generate_records_success(configured):
+    """Successful calls return the text and count toward the endpoint"""
+    assert ai_client.generate('hi', endpoint='qa') == 'echo: hi'
+    stats = ai_client.get_metrics()['qa']
+    assert stats['calls'] == 1 and stats['successes'] == 1
+
+
+def test_generate_stream_yields_chunks_and_first_token_time(configured):
+    """Streamed calls yield chunks in order and record time-to-first-token"""
+    assert list(ai_client.generate_stream('hi', endpoint='chat')) == ['echo: ', 'hi']
+    stats = ai_client.get_metrics()['chat']
+    assert stats['successes'] == 1 and stats['first_token_count'] == 1
+    # One store: the client's view is the ai_metrics snapshot
+    assert ai_client.get_metrics() == ai_metrics.snapshot()
+
+
+def test_generate_times_out_and_rejects_when_full(configured, monkeypatch):
+    """Slow calls hit the deadline; calls beyond the cap are rejected fast"""
+    release = threading.Event()
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(ai_client, '_slots', slots)
+    ai_client._models[ai_client.DEFAULT_MODEL] = FakeModel('slow', release)
+
+    with pytest.raises(ai_client.AITimeoutError):
+        ai_client.generate('slow', endpoint='chat', timeout=0.05)
+
+    # The abandoned call still holds the only slot
+    with pytest.raises(ai_client.AIOverloadedError):
+        ai_client.generate('next', endpoint='chat')
+
+    release.set()
+    assert slots.acquire(timeout=5)
+    slots.release()
+    stats = ai_client.get_metrics()['chat']
+    assert stats['timeouts'] == 1 and stats['rejected'] == 1
+
+
+def test_generate_requires_api_key(monkeypatch):
+    """Calls fail fast without a configured key"""
+    monkeypatch.setattr(ai_client, 'GEMINI_API_KEY', None)
+    with pytest.raises(ai_client.AINotConfiguredError):
+        ai_client.generate('hi')
@@ -0,0 +1,113 @@
+"""
+Unit tests for the AI job queue state transitions
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from services import ai_jobs
+
+
+class Result:
+    def __init__(self, matched_count):
+        self.matched_count = matched_count
+
+
+class RecordingCollection:
+    """Applies $set updates to documents whose fields all match the query"""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.updates = []
+
+    def _matches(self, doc, query):
+        return all(doc.get(k) == v for k, v in query.items())
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+        for doc in self.docs:
+            if self._matches(doc, query):
+                doc.update(update.get('$set', {}))
+                return Result(1)
+        return Result(0 if self.docs else 1)
+
+    def bulk_write(self, requests, ordered=True):
+        matched = sum(self.update_one(r._filter, r._doc).matched_count for r in requests)
+        return Result(matched)
+
+
+def make_db(collection):
+    return {ai_jobs.COLLECTION: collection}
+
+
+def test_serialize_completed_job_includes_result():
+    """Completed jobs expose their result; payloads never leak"""
+    job = {
+        '_id': ObjectId(),
+        'job_type': 'summarize',
+        'status': 'completed',
+        'attempts': 1,
+        'created_at': datetime(2024, 1, 1),
+        'finished_at': datetime(2024, 1, 1, 0, 1),
+        'payload': {'content': 'secret'},
+        'result': {'summary': 'short'}
+    }
+    data = ai_jobs.serialize_job(job)
+    assert data['status'] == 'completed'
+    assert data['result'] == {'summary': 'short'}
+    assert 'payload' not in data
+
+
+def test_failed_attempt_is_requeued_with_backoff():
+    """Attempts below the limit go back to the queue with exponential delay"""
+    collection = RecordingCollection()
+    job = {'_id': ObjectId(), 'attempts': 2, 'max_attempts': 3}
+
+    before = datetime.utcnow()
+    assert ai_jobs.fail_job(make_db(collection), job, 'boom') == 'queued'
+
+    update = collection.updates[0][1]['$set']
+    assert update['status'] == 'queued' and update['error'] == 'boom'
+    expected_delay = timedelta(seconds=ai_jobs.AI_JOBS_RETRY_BASE_SECONDS * 2)
+    assert update['next_attempt_at'] >= before + expected_delay
+
+
+def test_last_attempt_marks_job_failed():
+    """The final failed attempt marks the job failed and drops its payload"""
+    collection = RecordingCollection()
+    job = {'_id': ObjectId(), 'attempts': 3, 'max_attempts': 3}
+
+    assert ai_jobs.fail_job(make_db(collection), job, 'boom') == 'failed'
+    update = collection.updates[0][1]
+    assert update['$set']['status'] == 'failed'
+    assert 'payload' in update['$unset']
+
+
+def test_stale_claim_cannot_complete_or_fail_the_job():
+    """A worker whose lease was taken over does not overwrite the newer attempt"""
+    job_id = ObjectId()
+    current = {'_id': job_id, 'status': 'running', 'attempts': 2}
+    collection = RecordingCollection([current])
+    stale = {'_id': job_id, 'attempts': 1, 'max_attempts': 3}
+
+    assert ai_jobs.complete_job(make_db(collection), stale, {'result': {'summary': 'old'}}) is False
+    assert ai_jobs.fail_job(make_db(collection), stale, 'boom') == 'superseded'
+    assert current['status'] == 'running' and 'result' not in current
+
+    assert ai_jobs.complete_job(make_db(collection), current, {'result': {'summary': 'new'}}) is True
+    assert current['status'] == 'completed' and current['result'] == {'summary': 'new'}
+
+
+def test_heartbeat_renews_only_current_claims():
+    """Leases are extended for jobs this worker still owns"""
+    owned = {'_id': ObjectId(), 'status': 'running', 'attempts': 1, 'lease_until': datetime(2024, 1, 1)}
+    reclaimed = {'_id': ObjectId(), 'status': 'running', 'attempts': 2, 'lease_until': datetime(2024, 1, 1)}
+    collection = RecordingCollection([owned, reclaimed])
+
+    renewed = ai_jobs.renew_leases(make_db(collection), [
+        {'_id': owned['_id'], 'attempts': 1}, {'_id': reclaimed['_id'], 'attempts': 1}
+    ])
+
+    assert renewed == 1
+    assert owned['lease_until'] > datetime.utcnow() + timedelta(seconds=ai_jobs.AI_JOBS_LEASE_SECONDS - 5)
+    assert reclaimed['lease_until'] == datetime(2024, 1, 1)
@@ -0,0 +1,148 @@
+"""
+Unit tests for AI usage metrics: histograms, cache counters and daily rollups
+"""
+from datetime import datetime
+
+import pytest
+
+from services import ai_cache, ai_client, ai_metrics
+from services.ai_providers import FakeProvider
+
+
+class FakeCollection:
+    """update_one/find with $inc upserts, enough for the rollup documents"""
+
+    def __init__(self):
+        self.docs = {}
+        self.fail = False
+
+    def update_one(self, query, update, upsert=False):
+        if self.fail:
+            raise RuntimeError('database unavailable')
+        doc = self.docs.get(query['_id'])
+        if doc is None:
+            doc = {'_id': query['_id'], **update.get('$setOnInsert', {})}
+            self.docs[query['_id']] = doc
+        doc.update(update.get('$set', {}))
+        for path, amount in update['$inc'].items():
+            target = doc
+            *parents, leaf = path.split('.')
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = target.get(leaf, 0) + amount
+
+    def find(self, query, projection=None):
+        return FakeCursor([
+            {k: v for k, v in doc.items() if k not in ('_id', 'expires_at')}
+            for doc in self.docs.values()
+            if doc['day'] >= query['day']['$gte']
+            and ('endpoint' not in query or doc['endpoint'] == query['endpoint'])
+        ])
+
+
+class FakeCursor(list):
+    def sort(self, keys):
+        return FakeCursor(sorted(self, key=lambda doc: tuple(doc[k] for k, _ in keys)))
+
+
+class FakeDB:
+    def __init__(self):
+        self.ai_usage_daily = FakeCollection()
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    ai_metrics.reset()
+    yield
+    ai_metrics.reset()
+
+
+def test_bucket_boundaries():
+    assert ai_metrics.bucket_for(10) == 'le_50'
+    assert ai_metrics.bucket_for(50) == 'le_50'
+    assert ai_metrics.bucket_for(51) == 'le_100'
+    assert ai_metrics.bucket_for(45000) == 'gt_30000'
+
+
+def test_snapshot_percentiles_and_tokens():
+    for _ in range(90):
+        ai_metrics.record_call('chat', 'successes', 80, prompt_tokens=100, response_tokens=20)
+    for _ in range(10):
+        ai_metrics.record_call('chat', 'timeouts', 3000, prompt_tokens=100)
+    ai_metrics.record_call('chat', 'rejected')
+
+    chat = ai_metrics.snapshot()['chat']
+    assert chat['calls'] == 101
+    assert chat['successes'] == 90 and chat['timeouts'] == 10 and chat['rejected'] == 1
+    assert chat['prompt_tokens'] == 10000
+    assert chat['response_tokens'] == 1800
+    assert chat['p50_latency_ms'] == 100.0
+    assert chat['p95_latency_ms'] == 5000.0
+    # Rejected calls never reached the provider and are not timed
+    assert sum(chat['latency_histogram'].values()) == 100
+    assert chat['avg_latency_ms'] == 372.0
+
+
+def test_cache_hit_rate_per_feature():
+    ai_metrics.record_cache('explain', 'local_hits')
+    ai_metrics.record_cache('explain', 'shared_hits')
+    ai_metrics.record_cache('explain', 'misses')
+    ai_metrics.record_cache('explain', 'misses')
+
+    explain = ai_metrics.snapshot()['explain']
+    assert explain['cache']['misses'] == 2
+    assert explain['cache_hit_rate'] == 0.5
+    assert explain['p50_latency_ms'] is None
+
+
+def test_ai_client_and_cache_report_metrics():
+    ai_client.set_provider(FakeProvider(latency_ms=0, jitter_ms=0, ms_per_token=0, response_tokens=5))
+    ai_cache.clear_local()
+    try:
+        key = ai_cache.build_cache_key('what is recursion', 'explain', 'model')
+        for _ in range(2):
+            ai_cache.get_or_generate(
+                None, key, lambda: ai_client.generate('what is recursion', endpoint='explain'),
+                chat_type='explain'
+            )
+        explain = ai_metrics.snapshot()['explain']
+    finally:
+        ai_client.set_provider(None)
+        ai_cache.clear_local()
+        ai_client.reset_metrics()
+
+    assert explain['calls'] == 1
+    assert explain['successes'] == 1
+    assert explain['prompt_tokens'] == 5
+    assert explain['latency_histogram']['le_50'] == 1
+    assert explain['cache']['misses'] == 1
+    assert explain['cache']['local_hits'] == 1
+    assert explain['cache_hit_rate'] == 0.5
+
+
+def test_flush_writes_daily_rollups_and_keeps_failures():
+    db = FakeDB()
+    ai_metrics.record_call('summary', 'successes', 1200, prompt_tokens=3000, response_tokens=400)
+    ai_metrics.record_cache('summary', 'misses')
+
+    db.ai_usage_daily.fail = True
+    assert ai_metrics.flush(db) == 0
+    db.ai_usage_daily.fail = False
+
+    ai_metrics.record_call('summary', 'errors', 200, prompt_tokens=3000)
+    assert ai_metrics.flush(db) == 1
+    assert ai_metrics.flush(db) == 0
+
+    daily = ai_metrics.get_daily(db, days=1)
+    assert len(daily) == 1
+    summary = daily[0]
+    assert summary['endpoint'] == 'summary'
+    assert summary['day'] == datetime.utcnow().strftime('%Y-%m-%d')
+    assert summary['calls'] == 2
+    assert summary['prompt_tokens'] == 6000
+    assert summary['latency_histogram']['le_2500'] == 1
+    assert summary['latency_histogram']['le_250'] == 1
+    assert summary['cache']['misses'] == 1
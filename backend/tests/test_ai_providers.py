@@ -0,0 +1,85 @@
+"""
+Unit tests for the pluggable AI provider and the offline fake
+"""
+import time
+
+import pytest
+
+from services import ai_client
+from services.ai_providers import AIProvider, FakeProvider, FakeProviderError
+
+
+@pytest.fixture
+def fake_provider():
+    provider = FakeProvider(latency_ms=0, jitter_ms=0, ms_per_token=0, response_tokens=30, chunk_tokens=10)
+    ai_client.set_provider(provider)
+    ai_client.reset_metrics()
+    yield provider
+    provider.reset()
+    ai_client.set_provider(None)
+    ai_client.reset_metrics()
+
+
+def test_fake_responses_are_deterministic():
+    """The same prompt always produces the same text, whole or streamed"""
+    first = FakeProvider(latency_ms=0, jitter_ms=0, ms_per_token=0)
+    second = FakeProvider(latency_ms=0, jitter_ms=0, ms_per_token=0)
+    assert first.generate('explain recursion') == second.generate('explain recursion')
+    assert ''.join(first.stream('explain recursion')).strip() == first.generate('explain recursion')
+
+
+def test_incomplete_provider_fails_on_creation():
+    """A provider without generate() cannot be instantiated"""
+    class Incomplete(AIProvider):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_fake_call_history_is_bounded():
+    """Only the most recently sent prompts keep their attempt counters"""
+    provider = FakeProvider(latency_ms=0, jitter_ms=0, ms_per_token=0, max_tracked_prompts=3)
+    for index in range(10):
+        provider.generate(f'prompt {index}')
+    assert len(provider._calls) == 3
+
+    provider.reset()
+    assert len(provider._calls) == 0
+
+
+def test_fake_error_rate_is_seeded():
+    """Failures follow the seed, so reruns see the same failures"""
+    def outcomes(seed):
+        provider = FakeProvider(latency_ms=0, jitter_ms=0, ms_per_token=0, error_rate=0.5, seed=seed)
+        results = []
+        for index in range(20):
+            try:
+                provider.generate(f'prompt {index}')
+                results.append(True)
+            except FakeProviderError:
+                results.append(False)
+        return results
+
+    assert outcomes(7) == outcomes(7)
+    assert 0 < outcomes(7).count(False) < 20
+
+
+def test_client_uses_provider_and_counts_tokens(fake_provider):
+    """ai_client routes calls to the configured provider and records token counts"""
+    text = ai_client.generate('what is a linked list', endpoint='qa')
+    assert text.startswith('## Answer')
+
+    chunks = list(ai_client.generate_stream('what is a linked list', endpoint='chat'))
+    assert len(chunks) == 4  # heading + 30 tokens in chunks of 10
+
+    metrics = ai_client.get_metrics()
+    assert metrics['qa']['prompt_tokens'] == fake_provider.count_tokens('what is a linked list')
+    assert metrics['qa']['response_tokens'] == fake_provider.count_tokens(text)
+    assert metrics['chat']['response_tokens'] > 0
+
+    # Slots are released once the upstream call returns
+    deadline = time.monotonic() + 2
+    while ai_client.get_in_flight() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert ai_client.get_in_flight() == 0
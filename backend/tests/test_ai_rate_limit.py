@@ -0,0 +1,105 @@
+"""
+Unit tests for AI admission control: token buckets and the in-flight cap
+"""
+import pytest
+
+from services import ai_rate_limit
+from services.ai_rate_limit import InFlightLimiter, Limit, LocalBucketStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store():
+    return LocalBucketStore(clock=FakeClock())
+
+
+def test_burst_then_refusal_with_retry_after(store):
+    limit = Limit(burst=3, per_minute=6)  # one token every 10 seconds
+
+    assert [store.take('u1', 1, limit).allowed for _ in range(3)] == [True, True, True]
+    refused = store.take('u1', 1, limit)
+    assert not refused.allowed
+    assert refused.retry_after == 10
+
+
+def test_tokens_refill_over_time_up_to_burst(store):
+    limit = Limit(burst=2, per_minute=60)
+    store.take('u1', 2, limit)
+    assert not store.take('u1', 1, limit).allowed
+
+    store.clock.now += 1.5
+    decision = store.take('u1', 1, limit)
+    assert decision.allowed
+    assert decision.remaining == pytest.approx(0.5)
+
+    store.clock.now += 3600
+    assert store.take('u1', 1, limit).remaining == pytest.approx(1)
+
+
+def test_refused_request_does_not_spend(store):
+    limit = Limit(burst=2, per_minute=60)
+    assert store.take('u1', 2, limit).allowed
+    store.clock.now += 1
+    assert not store.take('u1', 2, limit).allowed
+    store.clock.now += 1
+    assert store.take('u1', 2, limit).allowed
+
+
+def test_buckets_are_per_user(store):
+    limit = Limit(burst=1, per_minute=1)
+    assert store.take('u1', 1, limit).allowed
+    assert not store.take('u1', 1, limit).allowed
+    assert store.take('u2', 1, limit).allowed
+
+
+def test_roles_select_limits():
+    assert ai_rate_limit.limit_for('teacher') == ai_rate_limit.ROLE_LIMITS['teacher']
+    assert ai_rate_limit.limit_for('unknown') == ai_rate_limit.ROLE_LIMITS['student']
+    assert ai_rate_limit.limit_for(None) == ai_rate_limit.ROLE_LIMITS['student']
+
+
+def test_store_failure_admits_request(monkeypatch):
+    class BrokenStore:
+        def take(self, key, cost, limit):
+            raise RuntimeError('mongo down')
+
+    monkeypatch.setattr(ai_rate_limit, 'AI_RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(ai_rate_limit, 'get_store', lambda db: BrokenStore())
+    assert ai_rate_limit.check_rate_limit(object(), 'u1', 'student').allowed
+
+
+def test_in_flight_cap():
+    limiter = InFlightLimiter(2)
+    assert limiter.try_enter() and limiter.try_enter()
+    assert not limiter.try_enter()
+    limiter.leave()
+    assert limiter.try_enter()
+    assert limiter.in_flight == 2
+
+
+def test_optional_ai_call_holds_a_slot_and_skips_when_refused(monkeypatch):
+    from routes import ai as ai_routes
+
+    limiter = InFlightLimiter(1)
+    monkeypatch.setattr(ai_rate_limit, 'get_in_flight_limiter', lambda: limiter)
+    monkeypatch.setattr(ai_routes._user_roles, 'get', lambda user_id: 'student')
+    decisions = [ai_rate_limit.Decision(True, 4, 0), ai_rate_limit.Decision(False, 0.0, 6)]
+    monkeypatch.setattr(ai_rate_limit, 'check_rate_limit', lambda db, user_id, role, cost: decisions.pop(0))
+
+    with ai_routes.ai_call_admission(None, 'u1') as admitted:
+        assert admitted and limiter.in_flight == 1
+        # The worker's only slot is taken, so a second call is refused
+        with ai_routes.ai_call_admission(None, 'u2') as nested:
+            assert not nested
+    assert limiter.in_flight == 0
+
+    with ai_routes.ai_call_admission(None, 'u1') as admitted:
+        assert not admitted
+    assert limiter.in_flight == 0 and decisions == []
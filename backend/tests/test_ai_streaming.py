@@ -0,0 +1,84 @@
+"""
+Unit tests for server-sent-event streaming of AI chat responses
+"""
+import json
+
+from bson import ObjectId
+
+from routes.ai import sse_event, stream_chat_events
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = []
+
+    def insert_one(self, document):
+        document['_id'] = ObjectId()
+        self.documents.append(document)
+        return type('InsertResult', (), {'inserted_id': document['_id']})()
+
+
+class FakeDB:
+    def __init__(self):
+        self.chat_history = FakeCollection()
+
+
+def parse_events(raw_events):
+    events = []
+    for raw in raw_events:
+        lines = raw.strip().split('\n')
+        events.append((lines[0][len('event: '):], json.loads(lines[1][len('data: '):])))
+    return events
+
+
+def test_sse_event_format():
+    """Events use the text/event-stream wire format"""
+    assert sse_event('token', {'text': 'hi'}) == 'event: token\ndata: {"text": "hi"}\n\n'
+
+
+def test_stream_forwards_tokens_and_saves_exchange():
+    """Each chunk becomes a token event; the full answer is saved once complete"""
+    db = FakeDB()
+    completed = []
+    events = parse_events(stream_chat_events(
+        db, 'u1', 'question', 'general', iter(['Hel', 'lo']), 'Role: student',
+        fallback=lambda: 'fallback', on_complete=completed.append
+    ))
+
+    assert events[:2] == [('token', {'text': 'Hel'}), ('token', {'text': 'lo'})]
+    assert events[2][0] == 'done'
+    assert completed == ['Hello']
+    saved = db.chat_history.documents[0]
+    assert saved['response'] == 'Hello' and saved['message'] == 'question'
+    assert events[2][1]['id'] == str(saved['_id'])
+
+
+def test_stream_failure_before_first_token_uses_fallback():
+    """An upstream error before any output is answered with the fallback text"""
+    def failing():
+        raise RuntimeError('upstream down')
+        yield
+
+    db = FakeDB()
+    events = parse_events(stream_chat_events(
+        db, 'u1', 'question', 'general', failing(), 'ctx', fallback=lambda: 'fallback'
+    ))
+
+    assert events[0] == ('token', {'text': 'fallback'})
+    assert events[1][0] == 'done'
+    assert db.chat_history.documents[0]['response'] == 'fallback'
+
+
+def test_stream_interrupted_midway_is_not_saved():
+    """A stream that breaks after partial output ends with an error event"""
+    def partial():
+        yield 'Hel'
+        raise RuntimeError('connection reset')
+
+    db = FakeDB()
+    events = parse_events(stream_chat_events(
+        db, 'u1', 'question', 'general', partial(), 'ctx', fallback=lambda: 'fallback'
+    ))
+
+    assert [name for name, _ in events] == ['token', 'error']
+    assert db.chat_history.documents == []
@@ -0,0 +1,100 @@
+"""
+Unit tests for the Parquet analytics export and the local query module
+"""
+import os
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from services import analytics_export, analytics_query
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = []
+
+    def find(self, query, projection=None, batch_size=None):
+        self.finds.append((projection, batch_size))
+        return iter(self.docs)
+
+
+def _db():
+    return {
+        'submissions': FakeCollection([
+            {'_id': ObjectId(), 'course_id': 'c1', 'student_id': 's1', 'grade': 80, 'status': 'graded',
+             'submitted_at': datetime(2024, 5, 1)},
+            {'_id': ObjectId(), 'course_id': 'c1', 'student_id': 's2', 'grade': 60, 'status': 'graded',
+             'submitted_at': datetime(2024, 5, 3)},
+            {'_id': ObjectId(), 'course_id': 'c2', 'student_id': 's1', 'grade': None, 'status': 'submitted',
+             'submitted_at': datetime(2024, 5, 4)},
+            {'_id': ObjectId(), 'course_id': 'c2', 'student_id': 's3', 'grade': 'A', 'status': 'graded',
+             'submitted_at': 'yesterday'},
+        ]),
+        'users': FakeCollection([
+            {'_id': ObjectId(), 'name': 'Asha', 'email': 'asha@example.com', 'password': 'hash', 'role': 'student'},
+        ]),
+    }
+
+
+def test_export_streams_batches_into_a_dated_partition(tmp_path):
+    db = _db()
+
+    counts = analytics_export.export_all(db, '2024-05-05', ['submissions', 'users'], batch_size=3, root=str(tmp_path))
+
+    assert counts == {'submissions': 4, 'users': 1}
+    partition = analytics_export.partition_dir('submissions', '2024-05-05', str(tmp_path))
+    assert os.listdir(partition) == ['part-0.parquet']
+    projection, batch_size = db['submissions'].finds[0]
+    assert batch_size == 3 and 'grade' in projection and 'text_content' not in projection
+    # Private fields are never exported
+    assert 'email' not in db['users'].finds[0][0] and 'password' not in db['users'].finds[0][0]
+
+
+def test_group_by_with_filters_reads_latest_snapshot(tmp_path):
+    root = str(tmp_path)
+    analytics_export.export_all(_db(), '2024-05-04', ['submissions'], root=root)
+    analytics_export.export_all(_db(), '2024-05-05', ['submissions'], root=root)
+
+    assert analytics_query.export_dates('submissions', root) == ['2024-05-04', '2024-05-05']
+    rows = analytics_query.group_by(
+        'submissions', ['course_id'], {'grade': ['mean', 'count']},
+        filters=[('status', '==', 'graded')], root=root
+    )
+
+    by_course = {row['course_id']: row for row in rows}
+    assert by_course['c1'] == {'course_id': 'c1', 'grade_mean': 70.0, 'grade_count': 2}
+    # Non-numeric grades are exported as nulls
+    assert by_course['c2']['grade_count'] == 0
+
+
+def test_load_pushes_down_columns_and_filters(tmp_path):
+    root = str(tmp_path)
+    analytics_export.export_all(_db(), '2024-05-05', ['submissions'], root=root)
+
+    table = analytics_query.load(
+        'submissions', ['student_id', 'submitted_at'],
+        filters=[('submitted_at', '>=', datetime(2024, 5, 2)), ('student_id', 'in', ['s1', 's2'])], root=root
+    )
+
+    assert table.column_names == ['student_id', 'submitted_at']
+    assert sorted(table.column('student_id').to_pylist()) == ['s1', 's2']
+
+
+def test_missing_export_and_bad_operator_raise(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        analytics_query.load('enrollments', root=str(tmp_path))
+    with pytest.raises(ValueError):
+        analytics_query.build_filter([('grade', '~', 1)])
+
+
+def test_prune_drops_old_snapshots(tmp_path):
+    root = str(tmp_path)
+    for date in ('2024-04-01', '2024-05-04'):
+        analytics_export.export_all(_db(), date, ['submissions'], root=root)
+
+    removed = analytics_export.prune(keep_days=7, root=root, today=datetime(2024, 5, 5))
+
+    assert removed == 1
+    assert analytics_query.export_dates('submissions', root) == ['2024-05-04']
@@ -0,0 +1,117 @@
+"""
+Unit tests for token-budgeted chat context assembly
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from services import chat_context
+from services.document_summarizer import estimate_tokens
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, field, direction):
+        self.documents = sorted(self.documents, key=lambda d: d[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class FakeCollection:
+    def __init__(self, documents=()):
+        self.documents = list(documents)
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append((query, projection))
+        return FakeCursor(list(self.documents))
+
+
+class FakeDB:
+    def __init__(self, course_titles=(), turns=()):
+        courses = [{'_id': ObjectId(), 'title': title} for title in course_titles]
+        self.courses = FakeCollection(courses)
+        self.enrollments = FakeCollection({'course_id': str(c['_id'])} for c in courses)
+        self.chat_history = FakeCollection(turns)
+
+
+STUDENT = {'_id': ObjectId(), 'name': 'Asha', 'role': 'student'}
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    chat_context.clear_cache()
+    yield
+    chat_context.clear_cache()
+
+
+def make_turns(count, response_words=20):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            'message': f'question {i}',
+            'response': ' '.join(['answer'] * response_words),
+            'timestamp': start + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+def test_course_context_is_cached_per_user():
+    """Enrollments and courses are read once per user, not once per message"""
+    db = FakeDB(course_titles=['Algorithms', 'Databases'])
+
+    first = chat_context.build_chat_context(db, STUDENT)
+    second = chat_context.build_chat_context(db, STUDENT)
+
+    assert first['context'] == 'User: Asha; Role: student; Enrolled courses: Algorithms, Databases'
+    assert first['course_context'] == 'Role: student; Enrolled courses: Algorithms, Databases'
+    assert second == first
+    assert len(db.enrollments.queries) == 1 and len(db.courses.queries) == 1
+
+    chat_context.invalidate_course_context(str(STUDENT['_id']))
+    chat_context.build_chat_context(db, STUDENT)
+    assert len(db.enrollments.queries) == 2
+
+
+def test_history_uses_projected_recent_turns_in_order():
+    """Only message/response of the newest turns are fetched, rendered oldest first"""
+    db = FakeDB(turns=make_turns(10))
+
+    history = chat_context.build_chat_context(db, STUDENT, include_history=True)['history']
+
+    query, projection = db.chat_history.queries[0]
+    assert query == {'user_id': str(STUDENT['_id'])}
+    assert projection == {'message': 1, 'response': 1, '_id': 0}
+    assert 'question 9' in history and 'question 3' not in history
+    assert history.index('question 4') < history.index('question 9')
+
+
+def test_history_stays_within_budget():
+    """Older turns are dropped and long answers trimmed to fit the token budget"""
+    db = FakeDB(course_titles=['Algorithms'], turns=make_turns(6, response_words=2000))
+
+    result = chat_context.build_chat_context(db, STUDENT, include_history=True, budget=300)
+
+    total = estimate_tokens(result['context']) + estimate_tokens(result['history'])
+    assert total <= 300
+    assert 'question 5' in result['history']
+    assert chat_context.TRUNCATION_MARKER in result['history']
+
+
+def test_long_messages_are_trimmed_on_word_boundary():
+    """Pasted text is cut to the message budget"""
+    message = ' '.join(['word'] * 10000)
+    trimmed = chat_context.trim_message(message)
+    assert estimate_tokens(trimmed) <= chat_context.AI_CHAT_MESSAGE_TOKENS
+    assert trimmed.endswith('word' + chat_context.TRUNCATION_MARKER)
+    assert chat_context.trim_message('short question') == 'short question'
@@ -0,0 +1,51 @@
+"""
+Unit tests for keyset pagination of /api/ai/chat-history
+"""
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from routes.ai import (
+    build_history_page_pipeline,
+    decode_history_cursor,
+    encode_history_cursor,
+    CHAT_HISTORY_PREVIEW_CHARS,
+)
+
+
+def test_cursor_round_trip():
+    """A cursor decodes back to the entry's (timestamp, _id) position"""
+    chat = {'_id': ObjectId(), 'timestamp': datetime(2024, 5, 1, 12, 30, 15, 123000)}
+    assert decode_history_cursor(encode_history_cursor(chat)) == (chat['timestamp'], chat['_id'])
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        decode_history_cursor('not-a-cursor')
+
+
+def test_pipeline_seeks_past_cursor_instead_of_skipping():
+    """Later pages filter on (timestamp, _id) in index order and fetch one extra entry"""
+    position = (datetime(2024, 5, 1), ObjectId())
+    pipeline = build_history_page_pipeline('u1', 20, after=position)
+
+    match = pipeline[0]['$match']
+    assert match['user_id'] == 'u1'
+    assert match['$or'] == [
+        {'timestamp': {'$lt': position[0]}},
+        {'timestamp': position[0], '_id': {'$lt': position[1]}}
+    ]
+    assert pipeline[1] == {'$sort': {'timestamp': -1, '_id': -1}}
+    assert pipeline[2] == {'$limit': 21}
+    assert not any('$skip' in stage for stage in pipeline)
+
+
+def test_preview_projection_truncates_in_database():
+    """List mode never projects the full response body"""
+    preview = build_history_page_pipeline('u1', 20)[-1]['$project']
+    assert 'response' not in preview
+    assert preview['response_preview']['$substrCP'][2] == CHAT_HISTORY_PREVIEW_CHARS
+
+    full = build_history_page_pipeline('u1', 20, full=True)[-1]['$project']
+    assert full['response'] == 1
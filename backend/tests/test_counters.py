@@ -0,0 +1,145 @@
+"""
+Unit tests for the denormalized course and assignment counters
+"""
+from bson import ObjectId
+
+from services import counters
+
+
+class FakeCollection:
+    def __init__(self, docs=(), groups=(), counts=None):
+        self.docs = [dict(doc) for doc in docs]
+        self.groups = list(groups)
+        self.counts = counts or {}
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+        for doc in self.docs:
+            if doc['_id'] == query['_id'] and all(doc.get(key) is None for key, value in query.items() if value is None):
+                doc.update(update.get('$set', {}))
+
+    def count_documents(self, query):
+        return self.counts.get(tuple(sorted(query)), 0)
+
+    def aggregate(self, pipeline):
+        return iter(self.groups)
+
+    def find(self, query, projection=None):
+        if '$or' in query:
+            fields = [next(iter(clause)) for clause in query['$or']]
+            return [dict(doc) for doc in self.docs if any(doc.get(field) is None for field in fields)]
+        return [dict(doc) for doc in self.docs]
+
+    def bulk_write(self, operations, ordered=True):
+        modified = 0
+        for operation in operations:
+            for doc in self.docs:
+                if all(doc.get(key) == value for key, value in operation._filter.items()):
+                    doc.update(operation._doc['$set'])
+                    modified += 1
+        return type('BulkWriteResult', (), {'modified_count': modified})()
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+def test_write_hooks_use_atomic_increments():
+    db = FakeDB()
+    course_id, assignment_id = str(ObjectId()), str(ObjectId())
+
+    counters.record_enrollment(db, course_id)
+    counters.record_enrollment(db, course_id, -1)
+    counters.record_material(db, course_id, is_required=False)
+    counters.record_submission(db, assignment_id)
+    counters.record_grade(db, assignment_id, previous_grade=None)
+
+    assert [update for _, update in db.courses.updates] == [
+        {'$inc': {'enrollment_count': 1}},
+        {'$inc': {'enrollment_count': -1}},
+        {'$inc': {'material_count': 1}},
+    ]
+    assert [update for _, update in db.assignments.updates] == [
+        {'$inc': {'submission_count': 1, 'pending_count': 1}},
+        {'$inc': {'graded_count': 1, 'pending_count': -1}},
+    ]
+    # Documents without the counter yet are left for ensure_course_counters
+    assert db.courses.updates[0][0] == {'_id': ObjectId(course_id), 'enrollment_count': {'$ne': None}}
+
+
+def test_regrade_and_invalid_ids_leave_counters_alone():
+    db = FakeDB()
+
+    counters.record_grade(db, str(ObjectId()), previous_grade=72)
+    counters.record_enrollment(db, 'not-an-id')
+    counters.record_materials(db, str(ObjectId()), 0, 0)
+
+    assert db.courses.updates == [] and db.assignments.updates == []
+
+
+def test_verify_reports_and_repairs_drift():
+    c1, c2, a1 = ObjectId(), ObjectId(), ObjectId()
+    db = FakeDB(
+        courses=FakeCollection([
+            {'_id': c1, 'enrollment_count': 2, 'material_count': 3, 'required_material_count': 1},
+            {'_id': c2},  # created before the counters existed
+        ]),
+        assignments=FakeCollection([{'_id': a1, 'submission_count': 1, 'graded_count': 0, 'pending_count': 1}]),
+        enrollments=FakeCollection(groups=[{'_id': str(c1), 'count': 2}, {'_id': str(c2), 'count': 5}]),
+        materials=FakeCollection(groups=[{'_id': str(c1), 'count': 3, 'required': 1}]),
+        submissions=FakeCollection(groups=[{'_id': str(a1), 'count': 2, 'graded': 1}]),
+    )
+
+    report = counters.verify_counters(db)
+    assert report['courses'] == {'checked': 2, 'mismatched': 1, 'fixed': 0}
+    assert report['assignments'] == {'checked': 1, 'mismatched': 1, 'fixed': 0}
+    assert 'enrollment_count' not in db.courses.docs[1]
+
+    repaired = counters.verify_counters(db, repair=True)
+    assert repaired['courses']['fixed'] == 1 and repaired['assignments']['fixed'] == 1
+    assert db.courses.docs[1] == {'_id': c2, 'enrollment_count': 5, 'material_count': 0, 'required_material_count': 0}
+    assert db.assignments.docs[0]['submission_count'] == 2
+    assert db.assignments.docs[0]['pending_count'] == 1
+    assert counters.verify_counters(db)['courses']['mismatched'] == 0
+
+
+def test_missing_counters_are_counted_once_and_stored():
+    c1, c2 = ObjectId(), ObjectId()
+    db = FakeDB(
+        courses=FakeCollection([{'_id': c1, 'enrollment_count': 3}, {'_id': c2}]),
+        enrollments=FakeCollection(counts={('course_id',): 7}),
+    )
+
+    stored = {'_id': c1, 'enrollment_count': 3}
+    assert counters.ensure_course_counters(db, stored, ('enrollment_count',)) == {'enrollment_count': 3}
+    assert db.courses.updates == []
+
+    legacy = {'_id': c2}
+    assert counters.ensure_course_counters(db, legacy, ('enrollment_count',)) == {'enrollment_count': 7}
+    assert legacy['enrollment_count'] == 7
+    assert db.courses.updates == [({'_id': c2, 'enrollment_count': None}, {'$set': {'enrollment_count': 7}})]
+    assert db.courses.docs[1]['enrollment_count'] == 7
+
+
+def test_backfill_fills_only_documents_missing_counters():
+    c1, c2, a1 = ObjectId(), ObjectId(), ObjectId()
+    db = FakeDB(
+        courses=FakeCollection([{'_id': c1, **counters.initial_course_counters()}, {'_id': c2}]),
+        assignments=FakeCollection([{'_id': a1, 'submission_count': 2}]),
+        enrollments=FakeCollection(counts={('course_id',): 4}),
+        materials=FakeCollection(counts={('course_id',): 5, ('course_id', 'is_required'): 2}),
+        submissions=FakeCollection(counts={('assignment_id',): 2, ('assignment_id', 'grade'): 1}),
+    )
+
+    assert counters.backfill_missing_counters(db) == {'courses': 1, 'assignments': 1}
+    assert db.courses.docs[1] == {'_id': c2, 'enrollment_count': 4, 'material_count': 5, 'required_material_count': 2}
+    assert db.assignments.docs[0] == {'_id': a1, 'submission_count': 2, 'graded_count': 1, 'pending_count': 1}
+    assert counters.backfill_missing_counters(db) == {'courses': 0, 'assignments': 0}
@@ -0,0 +1,137 @@
+"""
+Unit tests for the single-pass per-student course analytics breakdown
+"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from routes.analytics import course_student_table, page_rows
+from routes.student_progress import course_progress_row
+from services.course_stats import tally_submissions
+
+
+ASSIGNMENTS = {
+    'a1': {'due_date': datetime(2024, 3, 1)},
+    'a2': {'due_date': datetime(2024, 4, 1)},
+    'a3': {'due_date': None},
+}
+
+SUBMISSIONS = [
+    {'course_id': 'c1', 'assignment_id': 'a1', 'student_id': 's1', 'grade': 80, 'submitted_at': datetime(2024, 2, 28)},
+    {'course_id': 'c1', 'assignment_id': 'a2', 'student_id': 's1', 'grade': None, 'submitted_at': datetime(2024, 4, 2)},
+    {'course_id': 'c1', 'assignment_id': 'a1', 'student_id': 's2', 'grade': 60, 'submitted_at': datetime(2024, 3, 2)},
+    {'course_id': 'c1', 'assignment_id': 'a3', 'student_id': 's2', 'grade': 0, 'submitted_at': datetime(2024, 5, 1)},
+]
+
+
+def test_submissions_grouped_by_student_and_assignment():
+    tally = tally_submissions(iter(SUBMISSIONS), ASSIGNMENTS, since=datetime(2024, 4, 1))['c1']
+    by_student, by_assignment = tally['students'], tally['assignments']
+
+    assert by_student['s1'] == {'submitted': 2, 'graded': 1, 'grade_sum': 80, 'on_time': 1, 'recent': 1}
+    # A grade of 0 still counts as graded; assignments without a due date are on time
+    assert by_student['s2'] == {'submitted': 2, 'graded': 2, 'grade_sum': 60, 'on_time': 1, 'recent': 1}
+    assert by_assignment['a1'] == {'submitted': 2, 'graded': 2, 'grade_sum': 140, 'on_time': 1, 'recent': 0}
+    assert 's3' not in by_student
+    assert tally['grade_percentages'] == [80.0, 60.0, 0.0]
+
+
+def test_page_rows_sorts_and_slices():
+    rows = [
+        {'student_name': 'Cara', 'overall_performance': 70},
+        {'student_name': 'Ana', 'overall_performance': 90},
+        {'student_name': 'Ben', 'overall_performance': 80},
+    ]
+
+    assert [r['student_name'] for r in page_rows(rows, 'overall_performance', True, 1, 2)] == ['Ana', 'Ben']
+    assert [r['student_name'] for r in page_rows(rows, 'overall_performance', True, 2, 2)] == ['Cara']
+    assert [r['student_name'] for r in page_rows(rows, 'student_name', False, 1, 10)] == ['Ana', 'Ben', 'Cara']
+    assert page_rows(rows, 'student_name', False, 3, 2) == []
+
+
+class FakeCursor(list):
+    def sort(self, key, direction):
+        return FakeCursor(sorted(self, key=lambda doc: doc[key], reverse=direction < 0))
+
+    def skip(self, count):
+        return FakeCursor(self[count:])
+
+    def limit(self, count):
+        return FakeCursor(self[:count])
+
+
+class FakeUsers:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        ids = set(query['_id']['$in'])
+        return FakeCursor(doc for doc in self.docs if doc['_id'] in ids)
+
+
+class FakeDB:
+    def __init__(self, users):
+        self.users = FakeUsers(users)
+
+
+def _table_fixture():
+    ids = [ObjectId() for _ in range(3)]
+    figures = {
+        'total_assignments': 2,
+        'students': [
+            {'student_id': str(ids[0]), 'progress': 40, 'submitted': 2, 'graded': 2, 'grade_sum': 150, 'on_time': 2},
+            {'student_id': str(ids[1]), 'progress': 90, 'submitted': 1, 'graded': 1, 'grade_sum': 90, 'on_time': 0},
+            {'student_id': str(ids[2]), 'progress': 10, 'submitted': 0, 'graded': 0, 'grade_sum': 0, 'on_time': 0},
+        ]
+    }
+    users = [
+        {'_id': ids[0], 'name': 'Cara', 'roll_no': 'R1'},
+        {'_id': ids[1], 'name': 'Ana', 'roll_no': 'R2'},
+        {'_id': ids[2], 'name': 'Ben'},
+    ]
+    return FakeDB(users), figures
+
+
+def test_student_table_pages_stored_rows_and_names_only_shown_students():
+    db, figures = _table_fixture()
+
+    items, top, total = course_student_table(db, figures, 'progress', True, 1, 2)
+
+    assert total == 3
+    assert [row['student_name'] for row in items] == ['Ana', 'Cara']
+    assert items[1] == {
+        'student_id': items[1]['student_id'], 'student_name': 'Cara', 'roll_no': 'R1', 'progress': 40,
+        'assignments_submitted': 2, 'average_assignment_grade': 75.0, 'on_time_rate': 100.0,
+        'completion_rate': 100.0, 'overall_performance': 75.0
+    }
+    assert [row['student_name'] for row in top] == ['Ana', 'Cara', 'Ben']
+    # One users query covers the page and the top students
+    assert len(db.users.queries) == 1
+
+
+def test_student_table_sorted_by_name_pages_in_the_users_query():
+    db, figures = _table_fixture()
+
+    items, _, total = course_student_table(db, figures, 'name', False, 2, 2)
+
+    assert total == 3
+    assert [row['student_name'] for row in items] == ['Cara']
+
+
+def test_progress_row_uses_only_stored_counters():
+    entry = {
+        'student_id': 's1', 'progress': 55, 'enrolled_at': datetime(2024, 1, 1), 'is_active': True,
+        'completed_materials': 3, 'last_submitted_at': datetime(2024, 4, 2),
+        'submitted': 1, 'graded': 1, 'grade_sum': 72, 'on_time': 1, 'recent': 1
+    }
+    student = {'name': 'Ana', 'email': 'ana@example.com'}
+
+    row = course_progress_row(entry, student, {'total_materials': 4, 'total_assignments': 2})
+
+    assert row['material_completion'] == 75.0 and row['assignment_completion'] == 50.0
+    assert row['average_grade'] == 72.0 and row['recent_activity_count'] == 1
+    assert row['last_activity'] == datetime(2024, 4, 2) and row['roll_no'] == ''
+    idle = course_progress_row({**entry, 'last_submitted_at': None}, student, {})
+    assert idle['last_activity'] == datetime(2024, 1, 1) and idle['material_completion'] == 0
@@ -0,0 +1,68 @@
+"""
+Unit tests for co-enrollment course neighbours and score blending
+"""
+from services.course_neighbors import (
+    build_enrollment_matrix, compute_neighbors, collaborative_scores, blend_scores
+)
+
+
+PAIRS = [
+    ('s1', 'py'), ('s1', 'ds'), ('s1', 'algo'),
+    ('s2', 'py'), ('s2', 'ds'),
+    ('s3', 'py'), ('s3', 'ds'), ('s3', 'art'),
+    ('s4', 'py'), ('s4', 'algo'),
+    ('s5', 'art'),
+]
+
+
+def test_matrix_is_binary_and_deduplicated():
+    matrix, course_ids = build_enrollment_matrix(PAIRS + [('s1', 'py'), ('s1', 'py')])
+
+    assert matrix.shape == (5, 4)
+    assert sorted(course_ids) == ['algo', 'art', 'ds', 'py']
+    assert matrix.nnz == len(PAIRS)
+    assert set(matrix.data) == {1.0}
+
+
+def test_neighbors_ranked_by_shrunk_cosine():
+    matrix, course_ids = build_enrollment_matrix(PAIRS)
+    neighbors = compute_neighbors(matrix, course_ids, top_k=5, min_co_enrollments=1, shrink=0)
+
+    py = neighbors['py']
+    assert py['enrolled_count'] == 4
+    assert [n['course_id'] for n in py['neighbors']] == ['ds', 'algo', 'art']
+    assert py['neighbors'][0]['co_enrollments'] == 3
+    # 3 / sqrt(4 * 3)
+    assert abs(py['neighbors'][0]['score'] - 0.866) < 1e-3
+    assert all(n['course_id'] != 'py' for n in py['neighbors'])
+
+
+def test_min_co_enrollments_and_top_k():
+    matrix, course_ids = build_enrollment_matrix(PAIRS)
+    neighbors = compute_neighbors(matrix, course_ids, top_k=1, min_co_enrollments=2, shrink=10)
+
+    assert [n['course_id'] for n in neighbors['py']['neighbors']] == ['ds']
+    # art only shares one student with anything
+    assert neighbors['art']['neighbors'] == []
+
+
+def test_collaborative_scores_sum_and_exclude_enrolled():
+    docs = [
+        {'_id': 'py', 'neighbors': [{'course_id': 'ds', 'score': 0.5}, {'course_id': 'algo', 'score': 0.2}]},
+        {'_id': 'ds', 'neighbors': [{'course_id': 'py', 'score': 0.5}, {'course_id': 'algo', 'score': 0.3}]},
+    ]
+    scores = collaborative_scores(docs, {'py', 'ds'})
+
+    assert scores == {'algo': 0.5}
+
+
+def test_blend_scores_labels_main_source():
+    blended = blend_scores({'algo': 2.0, 'ml': 1.0}, {'stats': 0.9, 'ml': 0.9}, weight=0.6, k=5)
+    by_id = {course_id: (score, source) for course_id, score, source in blended}
+
+    assert [course_id for course_id, _, _ in blended] == ['ml', 'algo', 'stats']
+    assert by_id['algo'] == (0.6, 'also_took')
+    assert by_id['ml'] == (0.7, 'similar_content')
+    assert by_id['stats'] == (0.4, 'similar_content')
+    assert len(blend_scores({'a': 1.0, 'b': 0.5}, {}, k=1)) == 1
+    assert blend_scores({}, {}) == []
@@ -0,0 +1,102 @@
+"""
+Unit tests for the TF-IDF course recommender
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from services import course_recommender
+from services.course_recommender import CourseRecommender, TfidfModel
+
+
+def make_course(course_id, title, category, description='', objectives=(), active=True, updated_at=None):
+    return {
+        '_id': course_id,
+        'title': title,
+        'category': category,
+        'description': description,
+        'learning_objectives': list(objectives),
+        'is_active': active,
+        'updated_at': updated_at or datetime(2024, 1, 1)
+    }
+
+
+CATALOGUE = [
+    make_course('py', 'Python Programming', 'Programming', 'Variables, loops and functions in Python'),
+    make_course('ds', 'Data Structures in Python', 'Programming', 'Lists, trees and graphs',
+                ['implement linked lists', 'analyze algorithms']),
+    make_course('algo', 'Algorithms', 'Programming', 'Sorting, graphs and dynamic programming',
+                ['analyze algorithms']),
+    make_course('art', 'Watercolor Painting', 'Arts', 'Brushes, color mixing and landscapes'),
+    make_course('hist', 'Modern History', 'Humanities', 'Revolutions and world wars'),
+]
+
+
+class FakeCourses:
+    def __init__(self, courses):
+        self.courses = courses
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        if 'updated_at' in query:
+            since = query['updated_at']['$gt']
+            return [c for c in self.courses if c['updated_at'] > since]
+        return [c for c in self.courses if c.get('is_active', True)]
+
+
+class FakeDB:
+    def __init__(self, courses):
+        self.courses = FakeCourses(courses)
+
+
+def build_model(courses):
+    model = TfidfModel()
+    model.update(courses)
+    model.rebuild()
+    return model
+
+
+def test_rows_are_unit_length():
+    """Cosine similarity reduces to a dot product"""
+    model = build_model(CATALOGUE)
+    norms = np.linalg.norm(model.matrix, axis=1)
+    assert np.allclose(norms, 1.0, atol=1e-5)
+
+
+def test_recommends_related_unenrolled_courses():
+    """A Python student is pointed at other programming courses, not painting"""
+    model = build_model(CATALOGUE)
+    results = model.top_k(model.profile(['py', 'ds']), exclude={'py', 'ds'}, k=3)
+
+    assert results[0][0] == 'algo'
+    assert 'art' not in [course_id for course_id, _, _ in results[:1]]
+    assert all(course_id not in ('py', 'ds') for course_id, _, _ in results)
+    assert results[0][2]  # shared terms explain the match
+
+
+def test_department_text_is_used_without_enrollments():
+    """Students with no courses get matches for their department"""
+    recommender = CourseRecommender()
+    results = recommender.recommend(FakeDB(CATALOGUE), [], fallback_text='History', k=2)
+    assert results[0][0] == 'hist'
+
+
+def test_refresh_only_reloads_changed_courses(monkeypatch):
+    """After the first build, only courses updated since the last sync are fetched"""
+    monkeypatch.setattr(course_recommender, 'RECOMMENDER_REFRESH_SECONDS', 0)
+    catalogue = [dict(course) for course in CATALOGUE]
+    db = FakeDB(catalogue)
+    recommender = CourseRecommender()
+    recommender.refresh(db)
+    assert db.courses.queries[-1] == {'is_active': True}
+
+    # Retire the painting course and add a new one
+    catalogue[3].update(is_active=False, updated_at=datetime.utcnow() + timedelta(seconds=1))
+    catalogue.append(make_course('ml', 'Machine Learning with Python', 'Programming',
+                                 updated_at=datetime.utcnow() + timedelta(seconds=1)))
+    recommender.refresh(db)
+
+    assert 'updated_at' in db.courses.queries[-1]
+    assert 'art' not in recommender.model.row_of
+    assert 'ml' in recommender.model.row_of
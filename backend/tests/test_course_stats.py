@@ -0,0 +1,176 @@
+"""
+Unit tests for the precomputed course statistics store
+"""
+from datetime import datetime, timedelta
+
+from services import course_stats
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = {str(doc.get('_id', index)): dict(doc) for index, doc in enumerate(docs)}
+        self.queries = 0
+        self.projections = []
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        self.projections.append(projection)
+        ids = (query.get('_id') or {}).get('$in')
+        course_ids = (query.get('course_id') or {}).get('$in')
+        docs = list(self.docs.values())
+        if ids is not None:
+            docs = [d for d in docs if str(d['_id']) in ids]
+        if course_ids is not None:
+            docs = [d for d in docs if d.get('course_id') in course_ids]
+        return docs
+
+    def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query['_id'], {'_id': query['_id']})
+        doc.update(update['$set'])
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            self.update_one(operation._filter, operation._doc, upsert=True)
+
+    def delete_many(self, query):
+        for _id in query['_id']['$in']:
+            self.docs.pop(_id, None)
+
+
+class FakeDB:
+    def __init__(self, courses=(), enrollments=(), assignments=(), submissions=(), materials=(), stats=()):
+        self.courses = FakeCollection(courses)
+        self.enrollments = FakeCollection(enrollments)
+        self.materials = FakeCollection(materials)
+        self.assignments = FakeCollection(assignments)
+        self.submissions = FakeCollection(submissions)
+        self.collections = {'course_stats': FakeCollection(stats)}
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+
+RECENT = datetime.utcnow() - timedelta(days=1)
+OLD = datetime.utcnow() - timedelta(days=30)
+
+
+def _submission(student, assignment, grade, submitted_at, course='c1'):
+    return {'course_id': course, 'assignment_id': assignment, 'student_id': student,
+            'grade': grade, 'submitted_at': submitted_at}
+
+
+def _db(**overrides):
+    options = dict(
+        courses=[{'_id': 'c1'}, {'_id': 'c2'}],
+        enrollments=[
+            {'_id': 1, 'course_id': 'c1', 'student_id': 's1', 'progress': 100, 'enrolled_at': OLD,
+             'completed_materials': ['m1', 'm2']},
+            {'_id': 2, 'course_id': 'c1', 'student_id': 's2', 'progress': 60},
+            {'_id': 3, 'course_id': 'c1', 'student_id': 's3', 'progress': 20},
+            {'_id': 4, 'course_id': 'c1', 'student_id': 's4', 'progress': 0},
+            {'_id': 5, 'course_id': 'c2', 'student_id': 's1', 'progress': 50},
+        ],
+        assignments=[
+            {'_id': 'a1', 'course_id': 'c1', 'max_points': 100, 'due_date': OLD + timedelta(days=1)},
+            {'_id': 'a2', 'course_id': 'c1', 'max_points': 160},
+        ],
+        materials=[
+            {'_id': 'm1', 'course_id': 'c1'},
+            {'_id': 'm2', 'course_id': 'c1'},
+            {'_id': 'm3', 'course_id': 'c1'},
+        ],
+        submissions=[
+            _submission('s1', 'a1', 90, RECENT),
+            _submission('s1', 'a2', 80, OLD),
+            _submission('s2', 'a1', 60, OLD),
+        ],
+    )
+    options.update(overrides)
+    return FakeDB(**options)
+
+
+def test_compute_stats_for_a_batch():
+    db = _db()
+
+    stats = course_stats.compute_stats(db, ['c1', 'c2'])
+
+    c1 = stats['c1']
+    assert c1['enrolled_students'] == 4
+    assert c1['average_progress'] == 45.0
+    assert c1['completion_rate'] == 25.0
+    assert c1['active_students'] == 1 and c1['engagement_rate'] == 25.0
+    assert c1['participating_students'] == 2 and c1['participation_rate'] == 50.0
+    assert c1['total_assignments'] == 2 and c1['total_materials'] == 3
+    assert (c1['total_submissions'], c1['graded_submissions'], c1['pending_submissions']) == (3, 3, 0)
+    assert c1['average_grade'] == round(230 / 3, 2)
+    assert c1['average_student_grade'] == 72.5  # (85 + 60) / 2
+    assert c1['student_performance'] == {'excellent': 1, 'good': 0, 'average': 1, 'needs_improvement': 2}
+    assert c1['progress_distribution'] == {'0-25%': 2, '26-50%': 0, '51-75%': 1, '76-100%': 1}
+    assert c1['assignments']['a1'] == {'submitted': 2, 'graded': 2, 'grade_sum': 150}
+    # Grades are described as percentages of each assignment's max_points
+    assert c1['distributions']['grades']['summary']['count'] == 3
+    assert c1['distributions']['grades']['summary']['max'] == 90.0
+    assert c1['distributions']['progress']['summary']['mean'] == 45.0
+    rows = {row['student_id']: row for row in c1['students']}
+    assert rows['s1'] == {
+        'student_id': 's1', 'progress': 100, 'enrolled_at': OLD, 'is_active': True, 'completed_materials': 2,
+        'last_submitted_at': RECENT, 'submitted': 2, 'graded': 2, 'grade_sum': 170, 'on_time': 1, 'recent': 1
+    }
+    assert rows['s2']['on_time'] == 1 and rows['s2']['last_submitted_at'] == OLD
+    assert rows['s4'] == {
+        'student_id': 's4', 'progress': 0, 'enrolled_at': None, 'is_active': True, 'completed_materials': 0,
+        'last_submitted_at': None, 'submitted': 0, 'graded': 0, 'grade_sum': 0, 'on_time': 0, 'recent': 0
+    }
+    assert stats['c2']['enrolled_students'] == 1 and stats['c2']['total_submissions'] == 0
+    # One query per collection for the whole batch
+    assert (db.enrollments.queries, db.assignments.queries, db.submissions.queries, db.materials.queries) == (1, 1, 1, 1)
+    assert set(db['course_stats'].docs) == {'c1', 'c2'}
+
+
+def test_dirty_mark_makes_stats_stale_until_refreshed():
+    now = datetime.utcnow()
+    db = _db()
+    course_stats.compute_stats(db, ['c1', 'c2'], now=now - timedelta(minutes=1))
+    assert course_stats.courses_needing_refresh(db, now) == []
+
+    course_stats.mark_dirty(db, 'c1')
+    assert course_stats.freshness(db['course_stats'].docs['c1'])['stale'] is True
+    assert course_stats.courses_needing_refresh(db, now) == ['c1']
+
+    assert course_stats.refresh(db)['refreshed'] == 1
+    assert course_stats.freshness(db['course_stats'].docs['c1'])['stale'] is False
+
+
+def test_old_stats_and_missing_courses_are_refreshed():
+    now = datetime.utcnow()
+    old = now - timedelta(minutes=course_stats.COURSE_STATS_MAX_AGE_MINUTES + 1)
+    db = _db(stats=[{'_id': 'c1', 'computed_at': old}, {'_id': 'gone', 'computed_at': now}])
+
+    assert course_stats.courses_needing_refresh(db, now) == ['c1', 'c2']
+    assert course_stats.refresh(db, now=now) == {'refreshed': 2, 'removed': 1}
+    assert set(db['course_stats'].docs) == {'c1', 'c2'}
+
+
+def test_get_stats_serves_dirty_stats_and_builds_missing_ones():
+    computed = datetime.utcnow() - timedelta(minutes=5)
+    db = _db(stats=[{'_id': 'c1', 'computed_at': computed, 'dirtied_at': datetime.utcnow(),
+                     'enrolled_students': 9, 'version': course_stats.STATS_VERSION}])
+
+    stats = course_stats.get_stats(db, ['c1', 'c2'])
+
+    assert stats['c1']['enrolled_students'] == 9
+    assert db['course_stats'].projections[-1] == {'students': 0}
+    assert 'students' not in stats['c2']
+    assert course_stats.freshness(stats['c1']) == {'computed_at': computed.isoformat(), 'stale': True}
+    assert stats['c2']['enrolled_students'] == 1
+    assert course_stats.freshness(stats['c2'])['stale'] is False
+
+
+def test_documents_from_an_older_version_are_rebuilt():
+    now = datetime.utcnow()
+    db = _db(stats=[{'_id': 'c1', 'computed_at': now, 'enrolled_students': 9}])
+
+    assert course_stats.courses_needing_refresh(db, now) == ['c1', 'c2']
+    stats = course_stats.get_stats(db, ['c1'], include_students=True)
+    assert stats['c1']['enrolled_students'] == 4
+    assert len(stats['c1']['students']) == 4
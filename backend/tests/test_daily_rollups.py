@@ -0,0 +1,135 @@
+"""
+Unit tests for the daily_rollups materialized collection
+"""
+from datetime import datetime, timedelta
+
+from services import daily_rollups
+
+
+def _day_of(doc, expression):
+    return doc[expression['$dateToString']['date'][1:]].strftime('%Y-%m-%d')
+
+
+class FakeCollection:
+    """Just enough of a collection for the rollup pipelines, reads and bulk upserts"""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.aggregations = 0
+        self.writes = []
+
+    def aggregate(self, pipeline):
+        self.aggregations += 1
+        (field, bounds), = pipeline[0]['$match'].items()
+        docs = [d for d in self.docs if bounds['$gte'] <= d[field] < bounds['$lt']]
+        key = pipeline[1]['$group']['_id']
+        groups = {}
+        for doc in docs:
+            if '$dateToString' in key:
+                group_id = _day_of(doc, key)
+            else:
+                group_id = (_day_of(doc, key['day']), doc[key['student'][1:]])
+            groups[group_id] = groups.get(group_id, 0) + 1
+        if '$dateToString' in key:
+            return iter([{'_id': k, 'count': v} for k, v in groups.items()])
+        return iter([{'_id': {'day': day, 'student': student}} for day, student in groups])
+
+    def find_one(self, query, projection=None, sort=None):
+        docs = sorted(self.docs, key=lambda d: d['day'], reverse=True)
+        return docs[0] if docs else None
+
+    def find(self, query, projection=None):
+        since = query['day']['$gte']
+        return FakeCursor([d for d in self.docs if d['day'] >= since])
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            doc = operation._doc['$set']
+            self.writes.append(doc['_id'])
+            self.docs = [d for d in self.docs if d['_id'] != doc['_id']] + [doc]
+
+
+class FakeCursor(list):
+    def sort(self, field, direction):
+        return FakeCursor(sorted(self, key=lambda d: d[field], reverse=direction < 0))
+
+
+class FakeDB:
+    def __init__(self, **collections):
+        self.collections = collections
+
+    def __getattr__(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+
+NOW = datetime(2024, 3, 10, 15, 30)
+
+
+def _at(days_ago, hour=12):
+    return datetime(2024, 3, 10, hour) - timedelta(days=days_ago)
+
+
+def _db():
+    return FakeDB(
+        users=FakeCollection([{'created_at': _at(1)}, {'created_at': _at(1, 9)}, {'created_at': _at(3)}]),
+        courses=FakeCollection([{'created_at': _at(2)}]),
+        enrollments=FakeCollection([{'enrolled_at': _at(2)}]),
+        submissions=FakeCollection([
+            {'student_id': 's1', 'submitted_at': _at(8)},
+            {'student_id': 's2', 'submitted_at': _at(3)},
+            {'student_id': 's2', 'submitted_at': _at(1)},
+            {'student_id': 's3', 'submitted_at': _at(1)},
+            {'student_id': 's4', 'submitted_at': _at(0)},  # today, not rolled up yet
+        ]),
+        chat_history=FakeCollection([{'timestamp': _at(1)}]),
+    )
+
+
+def test_backfill_rolls_up_complete_days_only():
+    db = _db()
+
+    stats = daily_rollups.roll_up(db, now=NOW, backfill_days=5)
+
+    assert stats == {'days': 5, 'from': '2024-03-05', 'through': '2024-03-09'}
+    by_day = {d['_id']: d for d in db.daily_rollups.docs}
+    assert sorted(by_day) == ['2024-03-05', '2024-03-06', '2024-03-07', '2024-03-08', '2024-03-09']
+    yesterday = by_day['2024-03-09']
+    assert yesterday['registrations'] == 2
+    assert yesterday['submissions'] == 2
+    assert yesterday['chat_messages'] == 1
+    assert yesterday['active_users'] == 2
+    # s1 submitted 8 days ago: outside yesterday's window, inside 2024-03-05's
+    assert yesterday['active_users_7d'] == 2
+    assert by_day['2024-03-05']['active_users_7d'] == 1
+    assert by_day['2024-03-08']['course_creations'] == 1
+
+
+def test_later_runs_only_process_new_days():
+    db = _db()
+    daily_rollups.roll_up(db, now=NOW, backfill_days=5)
+    db.daily_rollups.writes.clear()
+    aggregations = db.users.aggregations
+
+    assert daily_rollups.roll_up(db, now=NOW)['days'] == 0
+    assert db.users.aggregations == aggregations
+
+    stats = daily_rollups.roll_up(db, now=NOW + timedelta(days=2))
+    assert stats['days'] == 2
+    assert db.daily_rollups.writes == ['2024-03-10', '2024-03-11']
+    assert {d['_id']: d for d in db.daily_rollups.docs}['2024-03-10']['submissions'] == 1
+
+
+def test_trend_keeps_chart_shape_and_skips_empty_days():
+    db = _db()
+    daily_rollups.roll_up(db, now=NOW, backfill_days=5)
+
+    rollups = daily_rollups.get_rollups(db, days=3, now=NOW)
+    assert [r['day'].day for r in rollups] == [7, 8, 9]
+
+    assert daily_rollups.trend(rollups, 'registrations') == [
+        {'_id': {'year': 2024, 'month': 3, 'day': 7}, 'count': 1},
+        {'_id': {'year': 2024, 'month': 3, 'day': 9}, 'count': 2},
+    ]
@@ -0,0 +1,87 @@
+"""
+Unit tests for the NumPy distribution statistics
+"""
+import numpy as np
+
+from services import distributions
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.projections = []
+
+    def find(self, query, projection=None):
+        self.projections.append(projection)
+        return iter(self.docs)
+
+
+def test_to_array_drops_missing_and_non_numeric_values():
+    array = distributions.to_array([90, None, 'A', True, 72.5, float('nan'), 0])
+
+    assert array.dtype == np.float64
+    assert array.tolist() == [90.0, 72.5, 0.0]
+
+
+def test_load_column_projects_a_single_field():
+    collection = FakeCollection([{'grade': 80}, {'grade': None}, {}, {'grade': 60}])
+
+    grades = distributions.load_column(collection, {'course_id': 'c1'}, 'grade')
+
+    assert grades.tolist() == [80.0, 60.0]
+    assert collection.projections == [{'grade': 1, '_id': 0}]
+
+
+def test_summarize_matches_reference_statistics():
+    values = [55, 70, 70, 85, 90, 100]
+
+    summary = distributions.summarize(values)
+
+    assert summary['count'] == 6
+    assert summary['mean'] == round(np.mean(values), 2)
+    assert summary['median'] == 77.5
+    assert summary['std'] == round(np.std(values), 2)
+    assert (summary['min'], summary['max']) == (55, 100)
+    assert summary['p25'] == 70 and summary['p90'] == 95.0
+    assert distributions.mean(values) == np.mean(values)
+
+
+def test_empty_column_summarizes_to_zeros():
+    summary = distributions.summarize([])
+
+    assert summary['count'] == 0 and summary['mean'] == 0 and summary['p75'] == 0
+    assert distributions.mean([None]) == 0.0
+    assert sum(bin_['count'] for bin_ in distributions.histogram([])) == 0
+
+
+def test_histogram_uses_fixed_bins_and_clips_outliers():
+    bins = distributions.histogram([0, 5, 10, 99, 100, 120, -3])
+
+    assert len(bins) == 10
+    assert bins[0] == {'min': 0, 'max': 10, 'label': '0-10', 'count': 3}
+    assert bins[1]['count'] == 1
+    assert bins[-1] == {'min': 90, 'max': 100, 'label': '90-100', 'count': 3}
+
+
+def test_describe_without_edges_skips_histogram():
+    described = distributions.describe([300, 1200, 60], edges=None)
+
+    assert described == {'summary': distributions.summarize([300, 1200, 60])}
+    assert 'histogram' in distributions.describe([50])
+
+
+def test_grade_percentages_use_each_assignments_max_points():
+    submissions = [
+        {'assignment_id': 'a150', 'grade': 120},
+        {'assignment_id': 'a150', 'grade': 75},
+        {'assignment_id': 'a10', 'grade': 5},
+        {'assignment_id': 'unknown', 'grade': 40},
+        {'assignment_id': 'a10', 'grade': None},
+        {'assignment_id': 'zero', 'grade': 3},
+    ]
+
+    percentages = distributions.grade_percentages(submissions, {'a150': 150, 'a10': 10, 'zero': 0})
+
+    assert percentages.tolist() == [80.0, 50.0, 50.0, 40.0]
+    bins = {row['label']: row['count'] for row in distributions.histogram(percentages)}
+    assert bins['80-90'] == 1 and bins['50-60'] == 2 and bins['90-100'] == 0
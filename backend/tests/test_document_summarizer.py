@@ -0,0 +1,97 @@
+"""
+Unit tests for map-reduce document summarization
+"""
+import threading
+
+import pytest
+
+from services import ai_cache, document_summarizer
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    ai_cache.clear_local()
+    yield
+    ai_cache.clear_local()
+
+
+@pytest.fixture
+def fake_generate(monkeypatch):
+    """Record prompts and return one short line per call"""
+    calls = []
+    lock = threading.Lock()
+
+    def generate(prompt, endpoint='default', timeout=None, model_name=None):
+        with lock:
+            calls.append((endpoint, prompt))
+            return f'{endpoint} summary {len(calls)}'
+
+    monkeypatch.setattr(document_summarizer.ai_client, 'generate', generate)
+    return calls
+
+
+def paragraphs(count, words=200, prefix='topic'):
+    return [' '.join(f'{prefix}{i}word{j}' for j in range(words)) for i in range(count)]
+
+
+def test_chunks_respect_token_budget_and_paragraphs():
+    """Chunks stay under the budget and only split inside oversized paragraphs"""
+    pages = ['\n\n'.join(paragraphs(6, words=50)), ' '.join(['long'] * 2000)]
+    chunks = list(document_summarizer.chunk_text(pages, max_tokens=400))
+
+    assert all(document_summarizer.estimate_tokens(chunk) <= 400 for chunk in chunks)
+    assert sum(len(chunk.split()) for chunk in chunks) == 6 * 50 + 2000
+    assert chunks[0].startswith('topic0word0')
+
+
+def test_short_document_uses_single_call(fake_generate):
+    """A document that fits one chunk is summarized directly"""
+    outcome = document_summarizer.summarize_pages(None, ['A short page about recursion.'])
+
+    assert [endpoint for endpoint, _ in fake_generate] == ['summarize']
+    assert outcome['chunk_count'] == 1
+    assert outcome['word_count_original'] == 5
+    assert outcome['excerpt'] == 'A short page about recursion.'
+
+
+def test_long_document_is_mapped_then_reduced(fake_generate, monkeypatch):
+    """Every chunk is summarized once, then merged by one final call"""
+    monkeypatch.setattr(document_summarizer, 'SUMMARY_CHUNK_TOKENS', 300)
+    pages = ['\n\n'.join(paragraphs(2, words=150, prefix=f'page{n}')) for n in range(5)]
+
+    outcome = document_summarizer.summarize_pages(None, iter(pages), concurrency=3)
+
+    endpoints = [endpoint for endpoint, _ in fake_generate]
+    assert endpoints.count('summary_map') == outcome['chunk_count'] > 1
+    assert endpoints[-1] == 'summarize'
+    assert outcome['summary'].startswith('summarize summary')
+    assert outcome['word_count_original'] == 5 * 2 * 150
+
+
+def test_unchanged_chunks_are_served_from_cache(fake_generate, monkeypatch):
+    """Editing one section only re-summarizes that chunk and the final merge"""
+    monkeypatch.setattr(document_summarizer, 'SUMMARY_CHUNK_TOKENS', 300)
+    pages = ['\n\n'.join(paragraphs(2, words=150, prefix=f'page{n}')) for n in range(4)]
+    document_summarizer.summarize_pages(None, pages)
+    first_run = len(fake_generate)
+
+    pages[2] = pages[2].replace('page2', 'edited')
+    document_summarizer.summarize_pages(None, pages)
+
+    rerun = [endpoint for endpoint, _ in fake_generate[first_run:]]
+    assert rerun.count('summary_map') == 2
+    assert rerun[-1] == 'summarize'
+
+
+def test_reduce_runs_in_rounds_when_summaries_are_long(monkeypatch):
+    """Chunk summaries that exceed the reduce budget are merged in groups first"""
+    def generate(prompt, endpoint='default', timeout=None, model_name=None):
+        return 'point ' * 300
+
+    monkeypatch.setattr(document_summarizer.ai_client, 'generate', generate)
+    monkeypatch.setattr(document_summarizer, 'SUMMARY_CHUNK_TOKENS', 300)
+    monkeypatch.setattr(document_summarizer, 'SUMMARY_REDUCE_TOKENS', 1000)
+    pages = paragraphs(12, words=150)
+
+    outcome = document_summarizer.summarize_pages(None, pages)
+    assert outcome['reduce_rounds'] >= 2
@@ -0,0 +1,132 @@
+"""
+Unit tests for the course material vector index and retrieval
+"""
+import os
+
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from services import material_index
+from services.material_index import HashingEmbedder
+
+
+class FakeCursor(list):
+    pass
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+
+    def find(self, query=None, projection=None):
+        query = query or {}
+        return FakeCursor(d for d in self.docs if all(d.get(k) == v for k, v in query.items()))
+
+    def find_one(self, query, projection=None):
+        matches = self.find(query)
+        return matches[0] if matches else None
+
+    def distinct(self, field, query=None):
+        return sorted({d[field] for d in self.find(query)})
+
+
+class FakeDB:
+    def __init__(self, materials, documents=()):
+        self.materials = FakeCollection(materials)
+        self.documents = FakeCollection(documents)
+
+
+@pytest.fixture(autouse=True)
+def index_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(material_index, 'MATERIAL_INDEX_DIR', str(tmp_path))
+    material_index.clear_cache()
+    yield tmp_path
+    material_index.clear_cache()
+
+
+@pytest.fixture
+def db(tmp_path):
+    notes = tmp_path / 'notes.txt'
+    notes.write_text(
+        "Recursion is when a function calls itself. Every recursive function needs a base case.\n\n"
+        "The call stack grows with each recursive call until the base case returns."
+    )
+    document_id = ObjectId()
+    return FakeDB(
+        materials=[
+            {'_id': ObjectId(), 'course_id': 'c1', 'title': 'Recursion notes', 'type': 'document',
+             'description': '', 'content': str(document_id)},
+            {'_id': ObjectId(), 'course_id': 'c1', 'title': 'Sorting algorithms', 'type': 'video',
+             'description': 'Merge sort and quicksort compared by running time', 'content': 'v1'},
+            {'_id': ObjectId(), 'course_id': 'c2', 'title': 'Photosynthesis', 'type': 'video',
+             'description': 'Plants convert light into chemical energy in chloroplasts', 'content': 'v2'},
+        ],
+        documents=[{'_id': document_id, 'file_path': str(notes), 'mime_type': 'text/plain'}]
+    )
+
+
+def test_hashing_embedder_is_normalized_and_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    vectors = embedder.embed(['binary search tree', 'binary search tree', ''])
+
+    assert vectors.shape == (3, 64)
+    assert vectors.dtype == np.float32
+    assert np.allclose(vectors[0], vectors[1])
+    assert abs(np.linalg.norm(vectors[0]) - 1.0) < 1e-5
+    assert not vectors[2].any()
+
+
+def test_build_and_search_document_text(db):
+    assert material_index.build_course_index(db, 'c1') >= 2
+    material_index.build_course_index(db, 'c2')
+
+    results = material_index.search(['c1', 'c2'], 'what is a base case in recursion', k=2, min_score=0.05)
+    assert results
+    assert results[0]['course_id'] == 'c1'
+    assert results[0]['title'] == 'Recursion notes'
+    assert 'base case' in results[0]['text']
+    assert all(r['score'] >= results[-1]['score'] for r in results)
+
+
+def test_search_only_covers_given_courses(db):
+    material_index.build_course_index(db, 'c1')
+    material_index.build_course_index(db, 'c2')
+
+    results = material_index.search(['c1'], 'chloroplasts light energy', min_score=0.05)
+    assert all(r['course_id'] == 'c1' for r in results)
+
+
+def test_retrieve_context_respects_budget(db):
+    material_index.build_course_index(db, 'c1')
+
+    context = material_index.retrieve_context(['c1'], 'recursion base case call stack', max_tokens=30)
+    assert context.startswith('[Recursion notes]')
+    assert len(context) <= 30 * 4
+    assert material_index.retrieve_context([], 'recursion') == ''
+    assert material_index.retrieve_context(['missing'], 'recursion') == ''
+
+
+def test_stale_marking_and_rebuild(db, index_dir):
+    assert material_index.courses_needing_build(db) == ['c1', 'c2']
+
+    material_index.build_course_index(db, 'c1')
+    material_index.build_course_index(db, 'c2')
+    assert material_index.courses_needing_build(db) == []
+
+    material_index.mark_stale('c1')
+    assert material_index.courses_needing_build(db) == ['c1']
+
+    material_index.build_course_index(db, 'c1')
+    assert material_index.courses_needing_build(db) == []
+    # Only the current version's files remain next to the pointer
+    assert len(os.listdir(index_dir / 'c1')) == 3
+
+
+def test_index_from_other_embedder_is_ignored(db):
+    material_index.build_course_index(db, 'c1')
+    try:
+        material_index.set_embedder(HashingEmbedder(dim=32))
+        assert material_index.search(['c1'], 'recursion base case', min_score=0) == []
+    finally:
+        material_index.set_embedder(None)
@@ -0,0 +1,112 @@
+"""
+Unit tests for student performance snapshots
+"""
+from datetime import datetime, timedelta
+
+from services import performance_snapshots
+
+
+class RecordingCollection:
+    def __init__(self):
+        self.updates = []
+
+    def update_one(self, query, update):
+        self.updates.append((query, update))
+
+    def update_many(self, query, update):
+        self.updates.append((query, update))
+
+
+def make_snapshot(**overrides):
+    now = datetime.utcnow()
+    snapshot = {
+        '_id': 'student1',
+        'course_ids': ['c1', 'c2'],
+        'courses': {
+            'c1': {'title': 'Algorithms', 'progress': 80, 'enrolled_at': now},
+            'c2': {'title': 'Databases', 'progress': 40, 'enrolled_at': now}
+        },
+        'deadlines': {
+            'c1': {'a1': now - timedelta(days=1), 'a2': now - timedelta(days=2)},
+            'c2': {'a3': now + timedelta(days=3), 'a4': now - timedelta(hours=1)}
+        },
+        'submissions': {
+            'a1': {'grade': 90, 'submitted_at': now - timedelta(days=2)},
+            'a3': {'grade': None, 'submitted_at': now - timedelta(days=10)}
+        },
+        'stale': False,
+        'built_at': now
+    }
+    snapshot.update(overrides)
+    return snapshot
+
+
+def test_summary_derives_report_figures():
+    """Averages, overdue count and recent activity come from one snapshot"""
+    report = performance_snapshots.summarize_snapshot(
+        make_snapshot(), {'total_points': 120, 'achievements': ['first']}
+    )
+
+    assert report['total_courses'] == 2
+    assert report['avg_progress'] == 60.0
+    assert report['total_assignments'] == 2
+    assert report['graded_assignments'] == 1
+    assert report['avg_grade'] == 90.0
+    assert report['overdue_count'] == 2  # a2 and a4 are past due and unsubmitted
+    assert report['recent_activity'] == 1
+    assert report['performance_score'] == round(90 * 0.6 + 60 * 0.4, 1)
+    assert report['total_points'] == 120 and report['achievements_count'] == 1
+
+
+def test_summary_without_grades_uses_progress():
+    """Students with no graded work are scored on progress alone"""
+    report = performance_snapshots.summarize_snapshot(make_snapshot(submissions={}), None)
+    assert report['performance_score'] == 60.0
+    assert report['highest_grade'] == 0 and report['learning_pace'] == 'normal'
+
+
+def test_hooks_patch_existing_snapshot_only():
+    """Incremental updates never upsert and target nested fields"""
+    collection = RecordingCollection()
+    db = {performance_snapshots.COLLECTION: collection}
+
+    performance_snapshots.record_grade(db, 'student1', 'a3', 75)
+    performance_snapshots.record_progress(db, 'student1', 'c2', 55.5)
+
+    grade_query, grade_update = collection.updates[0]
+    assert grade_query == {'_id': 'student1'}
+    assert grade_update['$set']['submissions.a3.grade'] == 75
+
+    progress_query, progress_update = collection.updates[1]
+    assert progress_query == {'_id': 'student1', 'courses.c2': {'$exists': True}}
+    assert progress_update['$set']['courses.c2.progress'] == 55.5
+
+
+def test_assignment_changes_mark_course_snapshots_stale():
+    """Course-wide changes flag snapshots for rebuild instead of patching them"""
+    collection = RecordingCollection()
+    performance_snapshots.mark_course_stale({performance_snapshots.COLLECTION: collection}, 'c1')
+    assert collection.updates == [({'course_ids': 'c1'}, {'$set': {'stale': True}})]
+
+
+def test_stale_or_old_snapshot_is_rebuilt(monkeypatch):
+    """Reads fall back to a full rebuild when the snapshot cannot be trusted"""
+    rebuilt = []
+    monkeypatch.setattr(performance_snapshots, 'build_snapshot',
+                        lambda db, student_id: rebuilt.append(student_id) or {'_id': student_id})
+
+    class SnapshotStore:
+        def __init__(self, doc):
+            self.doc = doc
+
+        def find_one(self, query):
+            return self.doc
+
+    old = datetime.utcnow() - timedelta(hours=performance_snapshots.SNAPSHOT_MAX_AGE_HOURS + 1)
+    for doc in [None, make_snapshot(stale=True), make_snapshot(built_at=old)]:
+        performance_snapshots.get_snapshot({performance_snapshots.COLLECTION: SnapshotStore(doc)}, 'student1')
+    fresh = make_snapshot()
+    assert performance_snapshots.get_snapshot(
+        {performance_snapshots.COLLECTION: SnapshotStore(fresh)}, 'student1'
+    ) is fresh
+    assert rebuilt == ['student1'] * 3
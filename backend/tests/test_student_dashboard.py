@@ -0,0 +1,83 @@
+"""
+Unit tests for the student dashboard analytics
+"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from routes.analytics import compute_student_dashboard
+
+
+class FakeCollection:
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        matches = []
+        for doc in self.docs:
+            if '_id' in query:
+                if doc['_id'] in query['_id']['$in']:
+                    matches.append(doc)
+            elif all(doc.get(k) == v for k, v in query.items()):
+                matches.append(doc)
+        return iter(matches)
+
+    def find_one(self, query, projection=None):
+        raise AssertionError('per-document lookups are not expected')
+
+
+class FakeDB:
+    def __init__(self, enrollments, courses, submissions, assignments):
+        self.enrollments = FakeCollection(enrollments)
+        self.courses = FakeCollection(courses)
+        self.submissions = FakeCollection(submissions)
+        self.assignments = FakeCollection(assignments)
+
+
+def test_dashboard_from_four_queries():
+    c1, c2, missing = ObjectId(), ObjectId(), ObjectId()
+    assignments = [ObjectId() for _ in range(7)]
+    db = FakeDB(
+        enrollments=[
+            {'student_id': 's1', 'course_id': str(c1), 'progress': 80},
+            {'student_id': 's1', 'course_id': str(c2), 'progress': 40},
+            {'student_id': 's1', 'course_id': str(missing), 'progress': 30},
+        ],
+        courses=[{'_id': c1, 'title': 'Algorithms'}, {'_id': c2, 'title': 'Databases'}],
+        submissions=[
+            {'student_id': 's1', 'assignment_id': str(a), 'grade': 70 + i if i % 2 else None,
+             'status': 'graded' if i % 2 else 'submitted', 'submitted_at': datetime(2024, 5, i + 1)}
+            for i, a in enumerate(assignments)
+        ],
+        assignments=[{'_id': a, 'title': f'A{i}'} for i, a in enumerate(assignments)],
+    )
+
+    data = compute_student_dashboard(db, 's1', {'total_points': 12})
+
+    assert data['enrolled_courses'] == 3
+    assert data['average_progress'] == 40.0
+    assert data['course_progress'] == [
+        {'course_title': 'Algorithms', 'progress': 80},
+        {'course_title': 'Databases', 'progress': 40},
+    ]
+    assert data['assignments_submitted'] == 7
+    assert data['average_assignment_grade'] == 73.0
+    assert data['total_points'] == 12
+    assert [a['title'] for a in data['recent_activities']] == [f'Submitted: A{i}' for i in (6, 5, 4, 3, 2)]
+
+    # One query per collection; titles are fetched with a single $in each
+    for collection in (db.enrollments, db.courses, db.submissions, db.assignments):
+        assert len(collection.queries) == 1
+    assert len(db.assignments.queries[0]['_id']['$in']) == 5
+
+
+def test_student_without_activity_skips_lookups():
+    db = FakeDB(enrollments=[], courses=[], submissions=[], assignments=[])
+
+    data = compute_student_dashboard(db, 's1', {})
+
+    assert data['enrolled_courses'] == 0 and data['average_progress'] == 0
+    assert data['recent_activities'] == [] and data['course_progress'] == []
+    assert db.courses.queries == [] and db.assignments.queries == []
@@ -0,0 +1,104 @@
+"""
+Unit tests for grouped teacher assignment statistics
+"""
+from datetime import datetime
+
+from bson import ObjectId
+
+from routes.analytics import (
+    build_assignment_submission_pipeline,
+    build_course_enrollment_pipeline,
+    compute_teacher_assignment_stats,
+)
+
+
+class FakeCollection:
+    def __init__(self, docs=(), groups=()):
+        self.docs = list(docs)
+        self.groups = list(groups)
+        self.pipelines = []
+
+    def find(self, query, projection=None):
+        def matches(doc):
+            for key, value in query.items():
+                if isinstance(value, dict) and '$in' in value:
+                    if doc.get(key) not in value['$in']:
+                        return False
+                elif doc.get(key) != value:
+                    return False
+            return True
+        return [d for d in self.docs if matches(d)]
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return iter(self.groups)
+
+
+C1, C2 = ObjectId(), ObjectId()
+A1, A2, A3 = ObjectId(), ObjectId(), ObjectId()
+
+
+def make_db(submission_groups):
+    class DB:
+        courses = FakeCollection([
+            {'_id': C1, 'teacher_id': 't1', 'title': 'Algorithms'},
+            {'_id': C2, 'teacher_id': 't1', 'title': 'Databases'},
+        ])
+        assignments = FakeCollection([
+            {'_id': A1, 'course_id': str(C1), 'title': 'Sorting', 'max_points': 50,
+             'due_date': datetime(2024, 3, 1), 'created_at': datetime(2024, 2, 1)},
+            {'_id': A2, 'course_id': str(C1), 'title': 'Graphs', 'max_points': 100,
+             'due_date': datetime(2024, 4, 1), 'created_at': datetime(2024, 3, 1)},
+            {'_id': A3, 'course_id': str(C2), 'title': 'SQL', 'max_points': 100,
+             'due_date': datetime(2024, 4, 1), 'created_at': datetime(2024, 1, 1)},
+        ])
+        submissions = FakeCollection(groups=submission_groups)
+        enrollments = FakeCollection(groups=[{'_id': str(C1), 'count': 10}, {'_id': str(C2), 'count': 5}])
+    return DB()
+
+
+def test_pipelines_group_by_assignment_and_course():
+    submissions = build_assignment_submission_pipeline(['a1'])
+    enrollments = build_course_enrollment_pipeline(['c1'])
+    assert submissions[0] == {'$match': {'assignment_id': {'$in': ['a1']}}}
+    assert submissions[1]['$group']['_id'] == '$assignment_id'
+    assert enrollments[1]['$group']['_id'] == '$course_id'
+
+
+def test_stats_joined_from_grouped_counts():
+    db = make_db([
+        {'_id': str(A1), 'total': 8, 'graded': 6, 'grade_sum': 240},
+        {'_id': str(A3), 'total': 4, 'graded': 4, 'grade_sum': 320},
+    ])
+
+    stats = compute_teacher_assignment_stats(db, 't1')
+
+    assert stats['total_assignments'] == 3
+    assert stats['pending_submissions'] == 2
+    assert stats['graded_submissions'] == 10
+    assert stats['average_grade'] == 56.0
+    # 12 submissions out of 10 + 10 + 5 possible
+    assert stats['completion_rate'] == 48.0
+    assert len(db.submissions.pipelines) == 1
+    assert len(db.enrollments.pipelines) == 1
+
+    workload = stats['grading_workload']
+    assert [w['assignment_title'] for w in workload] == ['Sorting']
+    assert workload[0]['course_title'] == 'Algorithms'
+    assert workload[0]['priority'] == 'low'
+
+    performance = {p['assignment_title']: p for p in stats['assignment_performance']}
+    assert [p['assignment_title'] for p in stats['assignment_performance']] == ['Graphs', 'Sorting', 'SQL']
+    assert performance['Sorting']['average_grade'] == 40.0
+    assert performance['Sorting']['grade_percentage'] == 80.0
+    assert performance['Sorting']['submission_rate'] == 80.0
+    assert performance['Graphs']['total_submissions'] == 0
+    assert performance['SQL']['course_title'] == 'Databases'
+
+
+def test_teacher_without_courses():
+    db = make_db([])
+    stats = compute_teacher_assignment_stats(db, 'nobody')
+    assert stats['total_assignments'] == 0
+    assert stats['assignment_performance'] == []
+    assert db.submissions.pipelines == []
@@ -0,0 +1,81 @@
+"""
+Unit tests for the aggregated teacher dashboard statistics
+"""
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from routes.analytics import (
+    build_teacher_enrollment_pipeline,
+    build_teacher_submission_pipeline,
+    compute_teacher_dashboard_stats,
+)
+
+
+class FakeCollection:
+    def __init__(self, docs=(), facets=None):
+        self.docs = list(docs)
+        self.facets = facets
+        self.pipelines = []
+        self.find_calls = 0
+
+    def find(self, query, projection=None):
+        self.find_calls += 1
+        return [d for d in self.docs if all(d.get(k) == v for k, v in query.items())]
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return iter([self.facets])
+
+
+class FakeDB:
+    def __init__(self, courses, enrollment_facets, submission_facets):
+        self.courses = FakeCollection(courses)
+        self.enrollments = FakeCollection(facets=enrollment_facets)
+        self.submissions = FakeCollection(facets=submission_facets)
+
+
+def test_pipelines_are_scoped_to_teacher_courses():
+    since = datetime(2024, 1, 1)
+    for pipeline in (build_teacher_enrollment_pipeline(['a', 'b'], since),
+                     build_teacher_submission_pipeline(['a', 'b'], since)):
+        assert pipeline[0] == {'$match': {'course_id': {'$in': ['a', 'b']}}}
+        assert '$facet' in pipeline[1]
+
+
+def test_stats_from_one_aggregation_per_collection():
+    now = datetime.utcnow()
+    c1, c2, c3 = ObjectId(), ObjectId(), ObjectId()
+    db = FakeDB(
+        courses=[
+            {'_id': c1, 'teacher_id': 't1', 'is_active': True, 'created_at': now - timedelta(days=3)},
+            {'_id': c2, 'teacher_id': 't1', 'is_active': False, 'created_at': now - timedelta(days=90)},
+            {'_id': c3, 'teacher_id': 't1', 'created_at': '2024-01-01'},
+        ],
+        enrollment_facets={
+            'totals': [{'_id': None, 'students': 12, 'recent': 4}],
+            'course_progress': [{'_id': str(c1), 'avg_progress': 80.0}, {'_id': str(c2), 'avg_progress': 40.0}]
+        },
+        submission_facets={'pending': [{'count': 5}], 'recent': []}
+    )
+
+    stats = compute_teacher_dashboard_stats(db, 't1')
+
+    assert stats['active_courses'] == 2
+    assert stats['total_students'] == 12
+    assert stats['pending_grades'] == 5
+    assert stats['course_rating'] == 3.0
+    assert stats['monthly_growth'] == {'courses': 1, 'students': 4, 'submissions': 0, 'rating_change': 0.0}
+    assert len(db.enrollments.pipelines) == 1
+    assert len(db.submissions.pipelines) == 1
+    assert db.courses.find_calls == 1
+
+
+def test_teacher_without_courses_skips_aggregations():
+    db = FakeDB(courses=[], enrollment_facets={}, submission_facets={})
+
+    stats = compute_teacher_dashboard_stats(db, 't1')
+
+    assert stats['total_students'] == 0 and stats['pending_grades'] == 0
+    assert stats['course_rating'] == 0.0
+    assert db.enrollments.pipelines == [] and db.submissions.pipelines == []
@@ -0,0 +1,129 @@
+"""
+Unit tests for the orphaned upload garbage collector
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+from utils.upload_gc import (
+    normalize_reference,
+    diff_sorted,
+    SortedSpill,
+    scan_upload_tree,
+    collect_orphans,
+    quarantine_file,
+    purge_quarantine,
+    QUARANTINE_DIRNAME,
+    QUARANTINE_DATE_FORMAT
+)
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    old = time.time() - 48 * 3600
+    os.utime(path, (old, old))
+
+
+def test_normalize_reference_formats():
+    """Stored paths, serving URLs and bare filenames map to upload-relative paths"""
+    assert normalize_reference('/srv/app/backend/uploads/documents/a.pdf') == 'documents/a.pdf'
+    assert normalize_reference('C:\\app\\uploads\\videos\\v.mp4') == 'videos/v.mp4'
+    assert normalize_reference('/api/courses/thumbnails/t.png') == 'thumbnails/t.png'
+    assert normalize_reference('/api/courses/videos/v.mp4') == 'videos/v.mp4'
+    assert normalize_reference('v.mp4', 'videos') == 'videos/v.mp4'
+    assert normalize_reference('https://youtube.com/watch?v=1') is None
+    assert normalize_reference('64f0c0ffee0000000000abcd') is None
+    assert normalize_reference(None) is None
+    assert normalize_reference('') is None
+
+
+def test_sorted_spill_merges_runs():
+    """Records spilled across several runs come back fully sorted"""
+    spill = SortedSpill(run_size=3)
+    for record in ['e', 'b', 'a', 'd', 'c', 'g', 'f']:
+        spill.add(record)
+    try:
+        assert list(spill) == ['a', 'b', 'c', 'd', 'e', 'f', 'g']
+        assert spill.count == 7
+    finally:
+        spill.close()
+
+
+def test_diff_sorted_yields_unreferenced_files():
+    """Only files without a matching reference are reported, duplicates ignored"""
+    files = ['documents/a.pdf\t10', 'documents/b.pdf\t20', 'videos/c.mp4\t30']
+    references = ['documents/a.pdf', 'documents/a.pdf', 'thumbnails/x.png', 'videos/c.mp4']
+
+    assert list(diff_sorted(files, references)) == [('documents/b.pdf', 20)]
+
+
+def test_scan_skips_recent_and_hidden_files(tmp_path):
+    """Fresh uploads and the quarantine folder are not scanned"""
+    root = str(tmp_path)
+    _write(os.path.join(root, 'documents', 'old.pdf'), 5)
+    _write(os.path.join(root, QUARANTINE_DIRNAME, '20240101', 'documents', 'q.pdf'), 5)
+    with open(os.path.join(root, 'documents', 'new.pdf'), 'wb') as f:
+        f.write(b'y')
+
+    spill = SortedSpill()
+    try:
+        stats = scan_upload_tree(root, spill, workers=2, min_age_hours=1)
+        assert list(spill) == ['documents/old.pdf\t5']
+        assert stats == {'files': 1, 'bytes': 5, 'skipped_recent': 1}
+    finally:
+        spill.close()
+
+
+def test_quarantine_and_purge(tmp_path):
+    """Quarantined files are only purged once past the retention window"""
+    root = str(tmp_path)
+    _write(os.path.join(root, 'videos', 'v.mp4'), 8)
+
+    old_batch = datetime.utcnow() - timedelta(days=10)
+    target = quarantine_file(root, 'videos/v.mp4', old_batch)
+    assert os.path.exists(target)
+    assert not os.path.exists(os.path.join(root, 'videos', 'v.mp4'))
+
+    preview = purge_quarantine(root, retention_days=30, dry_run=False)
+    assert preview['batches'] == []
+
+    result = purge_quarantine(root, retention_days=7, dry_run=False)
+    assert result['batches'] == [old_batch.strftime(QUARANTINE_DATE_FORMAT)]
+    assert result['files'] == 1 and result['bytes'] == 8
+    assert not os.path.exists(target)
+
+
+class FakeCursor(list):
+    def batch_size(self, size):
+        return self
+
+
+class FakeDB:
+    def __init__(self, references):
+        self.references = references
+
+    def __getitem__(self, collection):
+        docs = self.references.get(collection, [])
+        return type('FakeCollection', (), {
+            'find': lambda _, query, projection: FakeCursor(
+                doc for doc in docs if next(iter(projection)) in doc
+            )
+        })()
+
+
+def test_collect_orphans_leaves_material_indexes_alone(tmp_path):
+    """Retrieval index files have no database record but are not orphans"""
+    root = str(tmp_path)
+    _write(os.path.join(root, 'documents', 'kept.pdf'), 4)
+    _write(os.path.join(root, 'documents', 'orphan.pdf'), 6)
+    for name in ('v1.npy', 'v1.json', 'CURRENT'):
+        _write(os.path.join(root, 'material_index', 'course1', name), 3)
+    db = FakeDB({'documents': [{'file_path': 'uploads/documents/kept.pdf'}]})
+
+    report = collect_orphans(db, root=root, dry_run=False, workers=2)
+
+    assert report['sample'] == ['documents/orphan.pdf']
+    assert report['quarantined'] == 1
+    assert sorted(os.listdir(os.path.join(root, 'material_index', 'course1'))) == ['CURRENT', 'v1.json', 'v1.npy']
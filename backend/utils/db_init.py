@@ -1,11 +1,17 @@
+from services import counters
+
+
 def initialize_database(db):
-    """Initialize database with indexes only"""
+    """Initialize database indexes and fill in missing counters"""
     
     print("🔧 Initializing database...")
     
     # Create indexes for better performance
     create_indexes(db)
     
+    # Courses and assignments created before the denormalized counters existed
+    counters.backfill_missing_counters(db)
+    
     print("✅ Database initialized with indexes")
     print("ℹ️  To seed sample data, run: python backend/scripts/seeders/seed_sample_data.py")
 
@@ -22,6 +28,7 @@ def create_indexes(db):
     db.courses.create_index("teacher_id")
     db.courses.create_index("category")
     db.courses.create_index("is_active")
+    db.courses.create_index("updated_at")  # incremental recommender refresh
     
     # Modules collection indexes (Requirement 7.2)
     db.modules.create_index("course_id")
@@ -45,6 +52,7 @@ def create_indexes(db):
     # Submissions collection indexes
     db.submissions.create_index([("assignment_id", 1), ("student_id", 1)], unique=True)
     db.submissions.create_index("student_id")
+    db.submissions.create_index([("course_id", 1), ("grade", 1)])  # teacher dashboard
     
     # Progress collection indexes
     db.progress.create_index([("student_id", 1), ("course_id", 1)], unique=True)
@@ -60,6 +68,27 @@ def create_indexes(db):
     # Chat history indexes
     db.chat_history.create_index("user_id")
     db.chat_history.create_index("timestamp")
+    db.chat_history.create_index([("user_id", 1), ("timestamp", -1), ("_id", -1)])
+    
+    # Summaries collection indexes (also holds queued AI jobs)
+    db.summaries.create_index([("status", 1), ("next_attempt_at", 1)], sparse=True)
+    db.summaries.create_index([("user_id", 1), ("status", 1)])
+    
+    # AI response cache indexes (entries expire via TTL)
+    db.ai_response_cache.create_index("expires_at", expireAfterSeconds=0)
+    
+    # AI usage rollups (one document per feature per day, expire via TTL)
+    db.ai_usage_daily.create_index([("day", 1), ("endpoint", 1)])
+    db.ai_usage_daily.create_index("expires_at", expireAfterSeconds=0)
+    
+    # AI rate-limit buckets (idle buckets expire via TTL)
+    db.ai_rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    
+    # Daily platform rollups (system analytics trends)
+    db.daily_rollups.create_index("day")
+    
+    # Student performance snapshots (marked stale per course)
+    db.student_performance_snapshots.create_index("course_ids")
     
     # Password reset tokens indexes
     db.password_resets.create_index("token_hash", unique=True)
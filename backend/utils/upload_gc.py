@@ -0,0 +1,356 @@
+"""
+Garbage collection for orphaned files under backend/uploads/.
+
+Deleted videos, abandoned course creations and failed submissions leave files
+on disk that no database record points to. The collector:
+
+1. Scans the upload tree with a thread pool (one task per directory).
+2. Streams referenced paths out of MongoDB in batches.
+3. Sorts both sides into bounded on-disk runs and merge-joins them, so
+   neither side has to be held in memory.
+4. Moves orphans into a dated quarantine folder; quarantined batches older
+   than the retention window are deleted by a later purge.
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
+
+UPLOAD_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
+QUARANTINE_DIRNAME = '.quarantine'
+QUARANTINE_DATE_FORMAT = '%Y%m%d'
+
+DEFAULT_WORKERS = 8
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_RUN_SIZE = 50000
+DEFAULT_MIN_AGE_HOURS = 24
+DEFAULT_RETENTION_DAYS = 7
+
+# (collection, field, default sub-directory for bare filenames)
+REFERENCE_SOURCES = [
+    ('videos', 'file_path', None),
+    ('videos', 'filename', 'videos'),
+    ('documents', 'file_path', None),
+    ('documents', 'filename', 'documents'),
+    ('materials', 'file_path', None),
+    ('materials', 'filename', 'videos'),
+    ('materials', 'url', None),
+    ('materials', 'content', None),
+    ('submissions', 'file_path', None),
+    ('courses', 'thumbnail', None),
+]
+
+# Top-level directories of generated files that no record references (course
+# retrieval indexes were built under uploads/ before MATERIAL_INDEX_DIR moved)
+EXCLUDED_DIRS = {'material_index'}
+
+# URL prefixes served straight out of an upload sub-directory
+URL_PREFIXES = {
+    '/api/courses/thumbnails/': 'thumbnails',
+    '/api/courses/videos/': 'videos',
+}
+
+
+def normalize_reference(value, default_subdir=None):
+    """
+    Map a stored path, URL or filename to a path relative to the upload root.
+
+    Args:
+        value: Value stored in the database record
+        default_subdir: Sub-directory to assume for bare filenames
+
+    Returns:
+        POSIX-style relative path (e.g. 'documents/abc.pdf') or None when the
+        value does not point into the upload tree.
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip().replace('\\', '/')
+    if not value or value.startswith(('http://', 'https://')):
+        return None
+
+    for prefix, subdir in URL_PREFIXES.items():
+        if value.startswith(prefix):
+            name = value[len(prefix):].split('?', 1)[0]
+            return f"{subdir}/{name}" if name else None
+
+    marker = 'uploads/'
+    index = value.rfind(marker)
+    if index != -1 and (index == 0 or value[index - 1] == '/'):
+        relative = value[index + len(marker):].strip('/')
+        return relative or None
+
+    if '/' not in value and default_subdir and '.' in value:
+        return f"{default_subdir}/{value}"
+
+    return None
+
+
+class SortedSpill:
+    """
+    Accumulate string records and yield them back in sorted order.
+
+    Records are buffered up to ``run_size`` entries, then sorted and written
+    to a temporary run file. Iteration merges the runs with ``heapq.merge``,
+    so memory use is bounded by the run size rather than the record count.
+    """
+
+    def __init__(self, run_size=DEFAULT_RUN_SIZE, directory=None):
+        self.run_size = run_size
+        self.directory = directory
+        self.count = 0
+        self._buffer = []
+        self._runs = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self._buffer.append(record)
+            self.count += 1
+            if len(self._buffer) >= self.run_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        self._buffer.sort()
+        run = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=self.directory)
+        for record in self._buffer:
+            run.write(record + '\n')
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = []
+
+    def __iter__(self):
+        self._flush()
+        streams = [(line.rstrip('\n') for line in run) for run in self._runs]
+        return heapq.merge(*streams)
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+
+def _scan_directory(root, relative_dir, cutoff):
+    """Scan a single directory; returns (files, subdirectories, skipped_recent)."""
+    files = []
+    subdirs = []
+    skipped = 0
+    path = os.path.join(root, relative_dir) if relative_dir else root
+
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or (not relative_dir and entry.name in EXCLUDED_DIRS):
+                continue
+            relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(relative)
+            elif entry.is_file(follow_symlinks=False):
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > cutoff:
+                    skipped += 1
+                    continue
+                files.append((relative, stat.st_size))
+
+    return files, subdirs, skipped
+
+
+def scan_upload_tree(root, spill, workers=DEFAULT_WORKERS, min_age_hours=DEFAULT_MIN_AGE_HOURS):
+    """
+    Walk the upload tree in parallel and add ``"<path>\\t<size>"`` records to a spill.
+
+    Hidden entries (including the quarantine folder) and EXCLUDED_DIRS are
+    skipped, as are files
+    modified within ``min_age_hours`` - uploads are saved before their
+    database record is inserted, so fresh files may not be referenced yet.
+
+    Returns:
+        Dict with scanned file count, total bytes and recently-modified skips
+    """
+    cutoff = time.time() - min_age_hours * 3600
+    stats = {'files': 0, 'bytes': 0, 'skipped_recent': 0}
+
+    if not os.path.isdir(root):
+        return stats
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(_scan_directory, root, '', cutoff)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs, skipped = future.result()
+                stats['skipped_recent'] += skipped
+                for relative, size in files:
+                    spill.add(f"{relative}\t{size}")
+                    stats['files'] += 1
+                    stats['bytes'] += size
+                for subdir in subdirs:
+                    pending.add(executor.submit(_scan_directory, root, subdir, cutoff))
+
+    return stats
+
+
+def stream_referenced_paths(db, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Yield upload-relative paths referenced by database records.
+
+    Each source is read with a projected cursor fetched ``batch_size``
+    documents at a time. Paths may repeat; the merge step de-duplicates.
+    """
+    for collection, field, default_subdir in REFERENCE_SOURCES:
+        cursor = db[collection].find(
+            {field: {'$exists': True, '$nin': ['', None]}},
+            {field: 1, '_id': 0}
+        ).batch_size(batch_size)
+        for document in cursor:
+            relative = normalize_reference(document.get(field), default_subdir)
+            if relative:
+                yield relative
+
+
+def diff_sorted(files, references):
+    """
+    Merge-join sorted file records against sorted referenced paths.
+
+    Args:
+        files: Sorted iterable of ``"<path>\\t<size>"`` records
+        references: Sorted iterable of paths (duplicates allowed)
+
+    Yields:
+        (path, size) for every file with no matching reference
+    """
+    references = iter(references)
+    current = next(references, None)
+
+    for record in files:
+        path, _, size = record.rpartition('\t')
+        while current is not None and current < path:
+            current = next(references, None)
+        if current != path:
+            yield path, int(size)
+
+
+def quarantine_file(root, relative_path, batch_date=None):
+    """Move an orphan into ``.quarantine/<YYYYMMDD>/`` preserving its relative path."""
+    batch_date = batch_date or datetime.utcnow()
+    source = os.path.join(root, *relative_path.split('/'))
+    target = os.path.join(
+        root, QUARANTINE_DIRNAME, batch_date.strftime(QUARANTINE_DATE_FORMAT),
+        *relative_path.split('/')
+    )
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.move(source, target)
+    return target
+
+
+def collect_orphans(db, root=UPLOAD_ROOT, dry_run=True, workers=DEFAULT_WORKERS,
+                    batch_size=DEFAULT_BATCH_SIZE, min_age_hours=DEFAULT_MIN_AGE_HOURS,
+                    run_size=DEFAULT_RUN_SIZE, sample_size=20):
+    """
+    Find orphaned uploads and, unless ``dry_run`` is set, quarantine them.
+
+    Returns:
+        Report dict with scan totals, orphan count, reclaimable bytes per
+        top-level directory and a sample of orphan paths.
+    """
+    file_spill = SortedSpill(run_size=run_size)
+    reference_spill = SortedSpill(run_size=run_size)
+
+    try:
+        scan_stats = scan_upload_tree(root, file_spill, workers=workers, min_age_hours=min_age_hours)
+        for relative in stream_referenced_paths(db, batch_size=batch_size):
+            reference_spill.add(relative)
+
+        if not dry_run and scan_stats['files'] and reference_spill.count == 0:
+            raise RuntimeError(
+                'No upload references found in the database; refusing to quarantine every file'
+            )
+
+        report = {
+            'dry_run': dry_run,
+            'upload_root': root,
+            'scanned_files': scan_stats['files'],
+            'scanned_bytes': scan_stats['bytes'],
+            'skipped_recent': scan_stats['skipped_recent'],
+            'references': reference_spill.count,
+            'orphan_count': 0,
+            'reclaimable_bytes': 0,
+            'by_directory': {},
+            'quarantined': 0,
+            'errors': [],
+            'sample': []
+        }
+
+        batch_date = datetime.utcnow()
+        for relative, size in diff_sorted(file_spill, reference_spill):
+            report['orphan_count'] += 1
+            report['reclaimable_bytes'] += size
+            top_level = relative.split('/', 1)[0] if '/' in relative else '.'
+            bucket = report['by_directory'].setdefault(top_level, {'files': 0, 'bytes': 0})
+            bucket['files'] += 1
+            bucket['bytes'] += size
+            if len(report['sample']) < sample_size:
+                report['sample'].append(relative)
+
+            if not dry_run:
+                try:
+                    quarantine_file(root, relative, batch_date)
+                    report['quarantined'] += 1
+                except OSError as e:
+                    report['errors'].append(f"{relative}: {e}")
+
+        return report
+    finally:
+        file_spill.close()
+        reference_spill.close()
+
+
+def purge_quarantine(root=UPLOAD_ROOT, retention_days=DEFAULT_RETENTION_DAYS, dry_run=True):
+    """
+    Delete quarantine batches older than ``retention_days``.
+
+    Returns:
+        Dict with purged batch names, file count and bytes freed
+    """
+    quarantine_root = os.path.join(root, QUARANTINE_DIRNAME)
+    result = {'dry_run': dry_run, 'batches': [], 'files': 0, 'bytes': 0}
+
+    if not os.path.isdir(quarantine_root):
+        return result
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    for name in sorted(os.listdir(quarantine_root)):
+        try:
+            batch_date = datetime.strptime(name, QUARANTINE_DATE_FORMAT)
+        except ValueError:
+            continue
+        if batch_date >= cutoff:
+            continue
+
+        batch_path = os.path.join(quarantine_root, name)
+        for dirpath, _, filenames in os.walk(batch_path):
+            for filename in filenames:
+                result['files'] += 1
+                result['bytes'] += os.path.getsize(os.path.join(dirpath, filename))
+        result['batches'].append(name)
+
+        if not dry_run:
+            shutil.rmtree(batch_path)
+
+    return result
+
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TB"
@@ -60,8 +60,12 @@ export const API_ENDPOINTS = {
     SUMMARIZE: `${API_BASE_URL}/ai/summarize`,
 
     RECOMMENDATIONS: `${API_BASE_URL}/ai/recommendations`,
+    RECOMMENDATIONS_BLENDED: `${API_BASE_URL}/ai/recommendations/blended`,
     CHAT_HISTORY: `${API_BASE_URL}/ai/chat-history`,
+    CHAT_HISTORY_ENTRY: (id: string) => `${API_BASE_URL}/ai/chat-history/${id}`,
     LEARNING_PATH: `${API_BASE_URL}/ai/learning-path`,
+    JOB: (id: string) => `${API_BASE_URL}/ai/jobs/${id}`,
+    METRICS: `${API_BASE_URL}/ai/metrics`,
   },
 
   // Analytics
@@ -456,22 +460,68 @@ export const assignmentsAPI = {
 
 
 
+// Summaries and learning paths run as background jobs: the POST answers 202 with a
+// job_id and the result is fetched from /ai/jobs/<id> once the worker finishes.
+const AI_JOB_POLL_INTERVAL_MS = 1500;
+const AI_JOB_TIMEOUT_MS = 3 * 60 * 1000;
+
+interface AIJobStatus<T> {
+  job_id: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  result?: T;
+  error?: string;
+}
+
+export const waitForAIJob = async <T = any>(
+  jobId: string,
+  intervalMs: number = AI_JOB_POLL_INTERVAL_MS,
+  timeoutMs: number = AI_JOB_TIMEOUT_MS
+): Promise<T> => {
+  const deadline = Date.now() + timeoutMs;
+  for (;;) {
+    const job = await apiClient.get<AIJobStatus<T>>(API_ENDPOINTS.AI.JOB(jobId));
+    if (job.status === 'completed') {
+      return job.result as T;
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'AI request failed');
+    }
+    if (Date.now() + intervalMs > deadline) {
+      throw new Error('AI request is taking longer than expected. Please try again later.');
+    }
+    await new Promise(resolve => setTimeout(resolve, intervalMs));
+  }
+};
+
+const submitAIJob = async <T = any>(endpoint: string, data: any): Promise<T> => {
+  const job = await apiClient.post<{ job_id: string }>(endpoint, data);
+  return waitForAIJob<T>(job.job_id);
+};
+
 export const aiAPI = {
   chat: (message: string) => apiClient.post(API_ENDPOINTS.AI.CHAT, { message }),
   getWelcomeMessage: () => apiClient.get(API_ENDPOINTS.AI.CHAT_WELCOME),
+  // Resolves with the finished summary ({ summary, word_count_original, ... })
   summarize: (content: string, type: string = 'text') =>
-    apiClient.post(API_ENDPOINTS.AI.SUMMARIZE, { content, type }),
+    submitAIJob(API_ENDPOINTS.AI.SUMMARIZE, { content, type }),
 
   getRecommendations: () => apiClient.get(API_ENDPOINTS.AI.RECOMMENDATIONS),
-  getChatHistory: (page: number = 1, limit: number = 20) =>
-    apiClient.get(`${API_ENDPOINTS.AI.CHAT_HISTORY}?page=${page}&limit=${limit}`),
+  getBlendedRecommendations: (limit: number = 5) =>
+    apiClient.get(`${API_ENDPOINTS.AI.RECOMMENDATIONS_BLENDED}?limit=${limit}`),
+  getChatHistory: (cursor?: string, limit: number = 20) =>
+    apiClient.get(`${API_ENDPOINTS.AI.CHAT_HISTORY}?limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`),
+  getChatHistoryEntry: (chatId: string) => apiClient.get(API_ENDPOINTS.AI.CHAT_HISTORY_ENTRY(chatId)),
+  // Resolves with { learning_path } once the job completes
   generateLearningPath: (goal: string, timeframe: string = 'month') =>
-    apiClient.post(API_ENDPOINTS.AI.LEARNING_PATH, { goal, timeframe }),
+    submitAIJob(API_ENDPOINTS.AI.LEARNING_PATH, { goal, timeframe }),
+  getJob: (jobId: string) => apiClient.get(API_ENDPOINTS.AI.JOB(jobId)),
+  getMetrics: (days: number = 7) => apiClient.get(`${API_ENDPOINTS.AI.METRICS}?days=${days}`),
 };
 
 export const analyticsAPI = {
   getDashboard: () => apiClient.get(API_ENDPOINTS.ANALYTICS.DASHBOARD),
-  getCourseAnalytics: (id: string) => apiClient.get(API_ENDPOINTS.ANALYTICS.COURSE(id)),
+  getCourseAnalytics: (id: string, page: number = 1, perPage: number = 20, sort: string = 'performance', order?: 'asc' | 'desc') =>
+    apiClient.get(`${API_ENDPOINTS.ANALYTICS.COURSE(id)}?page=${page}&per_page=${perPage}&sort=${sort}${order ? `&order=${order}` : ''}`),
   getStudentAnalytics: (id: string) => apiClient.get(API_ENDPOINTS.ANALYTICS.STUDENT(id)),
   getSystemAnalytics: (days: number = 30) =>
     apiClient.get(`${API_ENDPOINTS.ANALYTICS.SYSTEM}?days=${days}`),
@@ -0,0 +1,41 @@
+import { describe, it, expect, vi, afterEach } from 'vitest';
+import { aiAPI, apiClient, waitForAIJob } from '../../config/api';
+
+describe('AI background jobs', () => {
+  afterEach(() => {
+    vi.restoreAllMocks();
+  });
+
+  it('polls the job until it completes and resolves with its result', async () => {
+    const get = vi.spyOn(apiClient, 'get')
+      .mockResolvedValueOnce({ job_id: 'job-1', status: 'queued' })
+      .mockResolvedValueOnce({ job_id: 'job-1', status: 'running' })
+      .mockResolvedValueOnce({ job_id: 'job-1', status: 'completed', result: { summary: 'short' } });
+
+    await expect(waitForAIJob('job-1', 0)).resolves.toEqual({ summary: 'short' });
+    expect(get).toHaveBeenCalledTimes(3);
+    expect(get).toHaveBeenCalledWith(expect.stringContaining('/ai/jobs/job-1'));
+  });
+
+  it('rejects with the job error when the job fails', async () => {
+    vi.spyOn(apiClient, 'get').mockResolvedValueOnce({ job_id: 'job-2', status: 'failed', error: 'quota' });
+
+    await expect(waitForAIJob('job-2', 0)).rejects.toThrow('quota');
+  });
+
+  it('gives up after the timeout', async () => {
+    vi.spyOn(apiClient, 'get').mockResolvedValue({ job_id: 'job-3', status: 'queued' });
+
+    await expect(waitForAIJob('job-3', 10, 0)).rejects.toThrow('taking longer');
+  });
+
+  it('generateLearningPath resolves with the finished learning path', async () => {
+    vi.spyOn(apiClient, 'post').mockResolvedValueOnce({ job_id: 'job-4', status: 'queued' });
+    vi.spyOn(apiClient, 'get').mockResolvedValueOnce({
+      job_id: 'job-4', status: 'completed', result: { learning_path: { goal: 'Learn SQL' } }
+    });
+
+    const pathData: any = await aiAPI.generateLearningPath('Learn SQL');
+    expect(pathData.learning_path.goal).toBe('Learn SQL');
+  });
+});